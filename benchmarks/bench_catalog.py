@@ -0,0 +1,53 @@
+"""Memory of the unified catalog against the per-mode frames, and the cost
+of a refresh with few changes
+
+Run with `python benchmarks/bench_catalog.py`
+"""
+import os
+import tempfile
+import timeit
+
+from tradingAPI.catalog import InstrumentCatalog
+from tradingAPI.schema import read_instruments_csv
+from tradingAPI.utils import INSTRUMENTS_CSV, TRADING_MODES
+
+REPEAT = 5
+MODES = (TRADING_MODES.INVEST, TRADING_MODES.ISA)
+
+
+def main():
+    frames = {mode: read_instruments_csv(INSTRUMENTS_CSV[mode])
+              for mode in MODES}
+    frames_kib = sum(df.memory_usage(deep=True).sum()
+                     for df in frames.values()) / 1024
+    catalog = InstrumentCatalog.from_csvs(
+        {mode: INSTRUMENTS_CSV[mode] for mode in MODES})
+    catalog_kib = catalog.df.memory_usage(deep=True).sum() / 1024
+    print(f'rows {sum(map(len, frames.values()))} -> '
+          f'{len(catalog.df)} listings')
+    print(f'memory {frames_kib:.1f} KiB -> {catalog_kib:.1f} KiB')
+
+    # refresh with 3 delisted listings
+    fetched = frames[TRADING_MODES.INVEST].iloc[:-3]
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'INVEST.csv')
+        delta_path = os.path.join(tmp, 'deltas.ndjson')
+        csv_t = min(timeit.repeat(
+            lambda: fetched.to_csv(csv_path, index=False), number=1,
+            repeat=REPEAT))
+
+        def delta_refresh():
+            refreshed = InstrumentCatalog.from_csvs(
+                {TRADING_MODES.INVEST: INSTRUMENTS_CSV[TRADING_MODES.INVEST]},
+                delta_path)
+            refreshed.update(TRADING_MODES.INVEST, fetched)
+
+        delta_t = min(timeit.repeat(delta_refresh, number=1, repeat=1))
+        print(f'refresh write {os.path.getsize(csv_path) / 1024:.1f} KiB '
+              f'({csv_t * 1e3:.1f} ms) -> '
+              f'{os.path.getsize(delta_path) / 1024:.1f} KiB '
+              f'(diff + log {delta_t * 1e3:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
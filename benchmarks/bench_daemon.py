@@ -0,0 +1,74 @@
+"""Reads through the trade121 daemon: a paper session holding 50 positions
+queried by a client, in process and from a fresh process as a cron job
+
+Run with `python benchmarks/bench_daemon.py`
+"""
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from tradingAPI.daemon import Daemon, DaemonClient
+from tradingAPI.paper import PaperBroker
+from tradingAPI.utils import TRADING_MODES
+
+POSITIONS = 50
+CALLS = 500
+CRON = 5
+
+
+def broker():
+    symbols = [f'S{i:02d}' for i in range(POSITIONS)]
+    paper = PaperBroker.from_symbols(symbols, funds=1e6,
+                                     trading_mode=TRADING_MODES.CFD)
+    paper.tick(symbols, [10.] * POSITIONS, [10.1] * POSITIONS)
+    for symbol in symbols:
+        window = paper.new_cfd_order_window(symbol, 'MARKET')
+        window.open()
+        window.fill('buy', 1)
+        window.confirm()
+    return paper
+
+
+def per_call(call):
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        call()
+    return (time.perf_counter() - start) / CALLS
+
+
+def main():
+    logging.getLogger('tradingAPI').setLevel(logging.WARNING)
+    path = os.path.join(tempfile.mkdtemp(), 'trade121.sock')
+    daemon = Daemon(path)
+    daemon.add_session('paper', broker())
+    daemon.start()
+    client = DaemonClient(path)
+    print(f'{POSITIONS} positions, per call:')
+    for name, call in (('load_positions', client.load_positions),
+                       ('get_account_snapshot', client.get_account_snapshot),
+                       ('get_quote', lambda: client.get_quote('S00'))):
+        print(f'  {name:22} {1e3 * per_call(call):.2f} ms')
+    script = ('import sys\nfrom tradingAPI.daemon import main\n'
+              'sys.exit(main())')
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    start = time.perf_counter()
+    for _ in range(CRON):
+        subprocess.run([sys.executable, '-c', script, '--socket', path,
+                        'positions'], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    cron = (time.perf_counter() - start) / CRON
+    start = time.perf_counter()
+    for _ in range(CRON):
+        subprocess.run([sys.executable, '-c', 'import tradingAPI'], env=env,
+                       check=True, stderr=subprocess.DEVNULL)
+    imports = (time.perf_counter() - start) / CRON
+    print(f'  trade121 positions     {cron:.2f} s, of which importing '
+          f'tradingAPI {imports:.2f} s')
+    client.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Inserts and P&L queries of six months of history in the HistoryStore:
+position snapshots every 5 minutes of the trading hours and a fill every
+minute
+
+Run with `python benchmarks/bench_history.py`
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from tradingAPI.history import HistoryStore, TABLES
+
+POSITIONS = 50
+DAYS = 126
+SNAPSHOTS_PER_DAY = 102
+UNBATCHED_ROWS = 2000
+
+
+def snapshot_times():
+    days = pd.bdate_range('2020-01-01', periods=DAYS)
+    minutes = pd.to_timedelta(np.arange(SNAPSHOTS_PER_DAY) * 5 + 8 * 60,
+                              unit='min')
+    return (days.values[:, None] + minutes.values[None, :]).ravel()
+
+
+def position_rows(times):
+    rng = np.random.default_rng(0)
+    epochs = ((pd.DatetimeIndex(times) - pd.Timestamp(0)) /
+              pd.Timedelta(seconds=1)).to_numpy()
+    symbols = [f'S{i:03d}' for i in range(POSITIONS)]
+    prices = 100 * np.exp(np.cumsum(
+        rng.normal(0, 0.002, (len(times), POSITIONS)), axis=0))
+    return [(epochs[t], 'INVEST', str(p), symbols[p], 'buy', 10., 100.,
+             prices[t, p])
+            for t in range(len(times)) for p in range(POSITIONS)]
+
+
+def fill_rows(times):
+    rng = np.random.default_rng(1)
+    epochs = ((pd.DatetimeIndex(times) - pd.Timestamp(0)) /
+              pd.Timedelta(seconds=1)).to_numpy()
+    rows = []
+    for t in range(0, len(times)):
+        for _ in range(5):
+            symbol = f'S{rng.integers(POSITIONS):03d}'
+            direction = 'buy' if rng.random() < 0.55 else 'sell'
+            rows.append((epochs[t], 'INVEST', str(len(rows)), None, symbol,
+                         'MARKET', direction, 'FILLED', 1.,
+                         100 + rng.normal(), None, None, None))
+    return rows
+
+
+def insert_unbatched(path, rows):
+    """One transaction per row, as an autocommit insert would do"""
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    columns = TABLES['position_snapshots']
+    start = time.perf_counter()
+    for row in rows:
+        connection.execute(
+            f'INSERT INTO position_snapshots ({", ".join(columns)}) '
+            f'VALUES ({", ".join("?" * len(columns))})', row)
+        connection.commit()
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return elapsed
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    logging.getLogger('tradingAPI').setLevel(logging.WARNING)
+    times = snapshot_times()
+    positions, fills = position_rows(times), fill_rows(times)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.sqlite'),
+                             batch_size=5000)
+        start = time.perf_counter()
+        store._add('position_snapshots', positions)
+        store._add('order_events', fills)
+        store.flush()
+        batched = time.perf_counter() - start
+        unbatched = insert_unbatched(os.path.join(tmp, 'history.sqlite'),
+                                     positions[:UNBATCHED_ROWS])
+        rows = len(positions) + len(fills)
+        print(f'{rows} rows: batched {batched:.2f}s '
+              f'({rows / batched:.0f} rows/s), one transaction per row '
+              f'{UNBATCHED_ROWS / unbatched:.0f} rows/s')
+
+        month = (pd.Timestamp(times[-1]) - pd.Timedelta(days=30),
+                 pd.Timestamp(times[-1]))
+        elapsed, frame = timed(lambda: store.unrealized_pnl(
+            *month, symbol='S007'))
+        print(f'unrealized P&L of a symbol over a month: '
+              f'{1000 * elapsed:.1f} ms ({len(frame)} rows)')
+        elapsed, frame = timed(lambda: store.unrealized_pnl(
+            month[1] - pd.Timedelta(minutes=5), month[1]))
+        print(f'unrealized P&L of the last snapshot: '
+              f'{1000 * elapsed:.1f} ms ({len(frame)} rows)')
+        start = time.perf_counter()
+        store.fills()
+        print(f'first read of {len(fills)} fills: '
+              f'{1000 * (time.perf_counter() - start):.1f} ms')
+        elapsed, frame = timed(lambda: store.realized_pnl(
+            *month, symbol='S007'))
+        print(f'realized P&L of a symbol over a month: '
+              f'{1000 * elapsed:.1f} ms ({len(frame)} fills)')
+        elapsed, frame = timed(lambda: store.realized_pnl(*month))
+        print(f'realized P&L of all symbols over a month: '
+              f'{1000 * elapsed:.1f} ms ({len(frame)} fills)')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Cost of a tick of indicators over many instruments, recomputed from the
+records of each Stock in Python against the incremental IndicatorEngine
+
+Run with `python benchmarks/bench_indicators.py`
+"""
+import math
+import time
+
+import numpy as np
+
+from tradingAPI.base import Stock
+from tradingAPI.indicators import IndicatorEngine
+
+INSTRUMENTS = 200
+TICKS = 300
+WINDOWS = (20, 500)
+
+
+def naive(stock, window, alpha):
+    """Indicators of the last window records, recomputed in Python"""
+    records = stock.records[-window - 1:]
+    mids = [(sell + buy) / 2 for sell, buy, _ in records]
+    returns = [math.log(b / a) for a, b in zip(mids, mids[1:])]
+    last = mids[-window:]
+    sma = sum(last) / len(last)
+    ema = mids[0]
+    for mid in mids[1:]:
+        ema += alpha * (mid - ema)
+    mean = sum(returns) / len(returns) if returns else 0.
+    volatility = (math.sqrt(sum((r - mean) ** 2 for r in returns) /
+                            (len(returns) - 1)) if len(returns) > 1 else None)
+    spread = sum(buy - sell for sell, buy, _ in records[-window:]) / len(last)
+    return sma, ema, volatility, spread
+
+
+def quotes(ticks):
+    rng = np.random.default_rng(0)
+    mids = 100 * np.exp(np.cumsum(rng.normal(0, 0.001,
+                                             (ticks, INSTRUMENTS)), 0))
+    spreads = rng.uniform(0.01, 0.1, (ticks, INSTRUMENTS))
+    sentiments = rng.uniform(0, 1, (ticks, INSTRUMENTS))
+    return (mids - spreads / 2).tolist(), (mids + spreads / 2).tolist(), \
+        sentiments.tolist()
+
+
+def run(window):
+    bids, asks, sentiments = quotes(window + TICKS)
+    names = [f'stock {i}' for i in range(INSTRUMENTS)]
+    stocks = [Stock(name) for name in names]
+    engine = IndicatorEngine(window)
+    alpha = engine.alpha
+    # warm up: fill the windows
+    for t in range(window):
+        for i, stock in enumerate(stocks):
+            stock.new_rec([bids[t][i], asks[t][i], sentiments[t][i]])
+        engine.update_from_stocks(stocks)
+    naive_time = engine_time = 0.
+    for t in range(window, window + TICKS):
+        for i, stock in enumerate(stocks):
+            stock.new_rec([bids[t][i], asks[t][i], sentiments[t][i]])
+        start = time.perf_counter()
+        for stock in stocks:
+            naive(stock, window, alpha)
+        naive_time += time.perf_counter() - start
+        start = time.perf_counter()
+        engine.update_from_stocks(stocks)
+        engine.frame()
+        engine_time += time.perf_counter() - start
+    print(f'window {window}, {INSTRUMENTS} instruments, per tick: '
+          f'naive {1000 * naive_time / TICKS:.2f} ms, '
+          f'engine {1000 * engine_time / TICKS:.2f} ms')
+
+
+if __name__ == '__main__':
+    for window in WINDOWS:
+        run(window)
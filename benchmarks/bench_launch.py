@@ -0,0 +1,41 @@
+"""Time-to-interactive and memory of the default and lean launch profiles
+
+Needs Chrome and chromedriver. Run with `python benchmarks/bench_launch.py`
+"""
+import time
+
+from tradingAPI.links import urls
+from tradingAPI.low_level import LowLevelAPI
+
+VISITS = 5
+
+
+def bench(lean, headless=True):
+    api = LowLevelAPI()
+    start = time.time()
+    api.launch(headless=headless, lean=lean)
+    launch_t = time.time() - start
+    get_t, metrics = [], []
+    try:
+        for _ in range(VISITS):
+            start = time.time()
+            api.browser.get(urls['demo'])
+            get_t.append(time.time() - start)
+            metrics.append(api.page_metrics())
+    finally:
+        api.browser.quit()
+    interactive = sorted(m['dom_interactive'] for m in metrics)
+    heap = max(m['js_heap'] or 0 for m in metrics) / 2 ** 20
+    print(f'{"lean" if lean else "default":8} launch {launch_t:5.2f} s | '
+          f'get() median {sorted(get_t)[VISITS // 2]:5.2f} s | '
+          f'dom interactive median {interactive[VISITS // 2]} ms | '
+          f'js heap {heap:.1f} MiB')
+
+
+def main():
+    bench(lean=False)
+    bench(lean=True)
+
+
+if __name__ == '__main__':
+    main()
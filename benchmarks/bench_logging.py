@@ -0,0 +1,105 @@
+"""Cost of the debug logging of the hot paths on the calling thread, with
+synchronous file handlers and eager formatting against queued handlers and
+lazy formatting
+
+Run with `python benchmarks/bench_logging.py`
+"""
+import json
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener, TimedRotatingFileHandler
+
+from tradingAPI.capture import TrafficCapture
+from tradingAPI.logconf import LazyQueueHandler, LOGGING
+from tradingAPI.schema import read_instruments_csv
+from tradingAPI.base import Instrument
+from tradingAPI.utils import INVEST_INSTRUMENTS_CSV
+
+FEEDS = 2000
+REPEAT = 3
+
+
+def file_handler(tmp):
+    handler = TimedRotatingFileHandler(os.path.join(tmp, 'logfile.log'),
+                                       when='midnight', backupCount=3)
+    config = LOGGING['formatters']['deafult']
+    handler.setFormatter(logging.Formatter(config['format'],
+                                           config['datefmt']))
+    return handler
+
+
+def configure(tmp, queued, level=logging.DEBUG):
+    """Route the tradingAPI loggers to a file in tmp, returns a stop()"""
+    logger = logging.getLogger('tradingAPI')
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    handler = file_handler(tmp)
+    if not queued:
+        logger.addHandler(handler)
+        return handler.close
+    records = queue.SimpleQueue()
+    logger.addHandler(LazyQueueHandler(records))
+    listener = QueueListener(records, handler)
+    listener.start()
+
+    def stop():
+        listener.stop()
+        handler.close()
+    return stop
+
+
+def crawl_eager(instruments, log):
+    for i, instrument in enumerate(instruments):
+        log.debug(f'{i}, {instrument}')
+
+
+def crawl_lazy(instruments, log):
+    debug = log.isEnabledFor(logging.DEBUG)
+    for i, instrument in enumerate(instruments):
+        if debug:
+            log.debug('%d, %s', i, instrument)
+
+
+def refresh(capture, body):
+    for _ in range(FEEDS):
+        capture.feed('https://demo.trading212.com/rest/trading/v1/orders',
+                     body)
+
+
+def timed(func, *args):
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main():
+    instruments = [Instrument.intern(*row) for row in read_instruments_csv(
+        INVEST_INSTRUMENTS_CSV).itertuples(index=False, name=None)]
+    log = logging.getLogger('tradingAPI.low_level')
+    capture = TrafficCapture(api=None)
+    body = json.dumps([{'ticker': 'AAPL_US_EQ', 'quantity': 1,
+                        'type': 'LIMIT', 'limitPrice': 100.}])
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, queued, crawl, level in (
+                ('sync, eager', False, crawl_eager, logging.DEBUG),
+                ('queued, lazy', True, crawl_lazy, logging.DEBUG),
+                ('queued, lazy, INFO', True, crawl_lazy, logging.INFO)):
+            stop = configure(tmp, queued, level)
+            crawl_t = timed(crawl, instruments, log)
+            refresh_t = timed(refresh, capture, body)
+            stop()
+            print(f'{label:20} crawl {len(instruments)} instruments '
+                  f'{crawl_t:7.1f} ms | refresh {FEEDS} payloads '
+                  f'{refresh_t:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
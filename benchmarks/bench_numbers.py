@@ -0,0 +1,59 @@
+"""Parsing of scraped numeric columns: the previous per cell num and
+format_float against parse_values (floats only) and parse_numbers (with
+currency and separators)
+
+Run with `python benchmarks/bench_numbers.py`
+"""
+import re
+import timeit
+
+import numpy as np
+
+from tradingAPI.parsers import parse_numbers, parse_values
+from tradingAPI.utils import format_float, num
+
+ROWS = 2000
+COLUMNS = 4
+REPEAT = 10
+
+
+def old_num(string):
+    """The previous num, regexes compiled (from the re cache) per call"""
+    try:
+        string = re.sub(r'[^a-zA-Z0-9\.\-]', '', string)
+        number = re.findall(r"[-+]?\d*\.\d+|[-+]?\d+", string)
+        return float(number[0])
+    except Exception:
+        return None
+
+
+def column(rng):
+    values = rng.uniform(0, 20000, ROWS)
+    return [f'£{value:,.2f}' for value in values]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    columns = [column(rng) for _ in range(COLUMNS)]
+    cells = ROWS * COLUMNS
+    results = {}
+    for name, parse in (('old num', lambda: [[old_num(t) for t in c]
+                                             for c in columns]),
+                        ('num', lambda: [[num(t) for t in c]
+                                         for c in columns]),
+                        ('format_float', lambda: [[format_float(t) for t in c]
+                                                  for c in columns]),
+                        ('parse_values', lambda: [parse_values(c)
+                                                  for c in columns]),
+                        ('parse_numbers', lambda: [parse_numbers(c)
+                                                   for c in columns])):
+        results[name] = min(timeit.repeat(parse, number=1, repeat=REPEAT))
+    expected = [format_float(t) for t in columns[0]]
+    assert np.allclose(parse_values(columns[0]), expected)
+    assert np.allclose(parse_numbers(columns[0])['value'], expected)
+    print(f'{cells} cells ({COLUMNS} columns): ' + ', '.join(
+        f'{name} {1e3 * seconds:.1f} ms' for name, seconds in results.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Backtest of a month of minute ticks over hundreds of instruments with the
+PaperBroker, on one core
+
+Run with `python benchmarks/bench_paper.py`
+"""
+import logging
+import time
+
+import numpy as np
+
+from tradingAPI.paper import PaperBroker, Backtest, synthetic_ticks
+from tradingAPI.utils import ORDER_TYPES
+
+INSTRUMENTS = 300
+STEPS = 30 * 24 * 60
+EVERY = 60
+
+
+class MeanReversion(object):
+    """Buy limits below the market, take the profit of rallied holdings"""
+    def __init__(self, orders=5, seed=1):
+        self.orders = orders
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, broker, timestamp):
+        for symbol in self.rng.choice(broker.symbols, self.orders):
+            window = broker.new_invest_order_window(symbol, ORDER_TYPES.LIMIT)
+            window.open()
+            window.fill(quantity=1)
+            window.set_target(limit=broker.get_quote(symbol).ask * 0.995)
+            try:
+                window.confirm()
+            except Exception:
+                pass
+        positions = broker.account.positions
+        if not len(positions):
+            return
+        bids = broker.bids[positions['row']]
+        rallied = [positions.objects[i].instrument.symbol for i
+                   in np.flatnonzero(bids > positions['price'] * 1.01)]
+        for symbol in rallied:
+            broker.close_position(symbol)
+
+
+def main():
+    logging.getLogger('tradingAPI').setLevel(logging.WARNING)
+    symbols = [f'S{i:03d}' for i in range(INSTRUMENTS)]
+    start = time.perf_counter()
+    bids, asks = synthetic_ticks(symbols, STEPS, seed=0)
+    generated = time.perf_counter() - start
+    broker = PaperBroker.from_symbols(symbols, funds=100000)
+    start = time.perf_counter()
+    equity = Backtest(broker, MeanReversion(), every=EVERY).run(bids, asks)
+    elapsed = time.perf_counter() - start
+    history = broker.account.history
+    filled = sum(order.status == 'FILLED' for order in history)
+    print(f'{STEPS} ticks x {INSTRUMENTS} instruments '
+          f'(generated in {generated:.2f}s)')
+    print(f'backtest: {elapsed:.2f}s, {filled} fills, '
+          f'{len(broker.account.book)} pending, '
+          f'final value {equity["account_value"].iloc[-1]:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Live P&L of a portfolio on each tick: a Python loop over the positions
+against the PnLEngine, recomputing everything or only the changed quotes
+
+Run with `python benchmarks/bench_pnl.py`
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from tradingAPI.pnl import PnLEngine, UNKNOWN_CURRENCY
+from tradingAPI.schema import apply_schema, POSITIONS_SCHEMA
+from tradingAPI.utils import TRADING_MODES, BUY, SELL
+
+CHANGED = 5
+TICKS = 1000
+
+
+def positions_frame(symbols, positions, rng):
+    return apply_schema(pd.DataFrame({
+        'instrument': rng.choice(symbols, positions),
+        'direction': rng.choice([BUY, SELL], positions),
+        'quantity': rng.integers(1, 10, positions).astype(float),
+        'price': rng.uniform(90, 110, positions),
+    }), POSITIONS_SCHEMA)
+
+
+def loop(positions, quotes, margin_rate=0.2):
+    """Result and margin of each position, one at a time"""
+    unrealized = margin = 0.
+    for position in positions.itertuples(index=False):
+        bid, ask = quotes[position.instrument]
+        if position.direction == BUY:
+            unrealized += position.quantity * (bid - position.price)
+        else:
+            unrealized += position.quantity * (position.price - ask)
+        margin += position.quantity * (bid + ask) / 2 * margin_rate
+    return unrealized, margin
+
+
+def run(instruments, positions_count):
+    rng = np.random.default_rng(0)
+    symbols = [f'S{i:03d}' for i in range(instruments)]
+    positions = positions_frame(symbols, positions_count, rng)
+    mids = rng.uniform(90, 110, instruments)
+    engine = PnLEngine()
+    engine.set_positions(positions, TRADING_MODES.CFD)
+    engine.update_quotes(symbols, mids - 0.05, mids + 0.05)
+    quotes = {s: (m - 0.05, m + 0.05) for s, m in zip(symbols, mids)}
+    loop_time = full_time = incremental_time = 0.
+    for _ in range(TICKS):
+        changed = rng.choice(instruments, CHANGED, replace=False)
+        mids[changed] *= np.exp(rng.normal(0, 0.001, CHANGED))
+        for i in changed:
+            quotes[symbols[i]] = (mids[i] - 0.05, mids[i] + 0.05)
+        start = time.perf_counter()
+        expected = loop(positions, quotes)
+        loop_time += time.perf_counter() - start
+        start = time.perf_counter()
+        risk = engine.update_quotes([symbols[i] for i in changed],
+                                    mids[changed] - 0.05,
+                                    mids[changed] + 0.05)[UNKNOWN_CURRENCY]
+        incremental_time += time.perf_counter() - start
+        start = time.perf_counter()
+        engine._recompute(np.arange(instruments), exact=True)
+        engine.risk()
+        full_time += time.perf_counter() - start
+        assert np.isclose(risk.unrealized, expected[0])
+        assert np.isclose(risk.used_margin, expected[1])
+    print(f'{positions_count} positions, {instruments} instruments, {CHANGED} '
+          f'quotes changed per tick:')
+    print(f'  python loop {1e6 * loop_time / TICKS:.0f} us, '
+          f'vectorized {1e6 * full_time / TICKS:.0f} us, '
+          f'incremental {1e6 * incremental_time / TICKS:.0f} us per tick')
+
+
+def main():
+    run(300, 1000)
+    run(5000, 20000)
+
+
+if __name__ == '__main__':
+    main()
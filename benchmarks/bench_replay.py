@@ -0,0 +1,58 @@
+"""Replay a recorded session through a LowLevelAPI method, at full CPU speed
+
+Record the trace on a live session with
+
+    api.start_recording()
+    api.load_orders()
+    api.stop_recording('orders.ndjson.gz')
+
+then run `python benchmarks/bench_replay.py orders.ndjson.gz load_orders
+--mode INVEST [--profile]`.
+"""
+import argparse
+import cProfile
+import pstats
+import time
+
+from tradingAPI.low_level import LowLevelAPI
+from tradingAPI.recorder import Trace
+
+
+def replay(trace_path, method, mode):
+    api = LowLevelAPI()
+    api.trading_mode = mode
+    api.load_instruments()
+    driver = api.replay(trace_path)
+    start = time.perf_counter()
+    getattr(api, method)()
+    elapsed = time.perf_counter() - start
+    return elapsed, driver
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('trace')
+    parser.add_argument('method', help='e.g. load_orders, load_positions')
+    parser.add_argument('--mode', default='INVEST')
+    parser.add_argument('--profile', action='store_true')
+    args = parser.parse_args()
+
+    trace = Trace.load(args.trace)
+    recorded = sum(command['elapsed'] for command in trace.commands)
+    print(f'{len(trace)} commands, {recorded * 1e3:.1f} ms in the browser')
+    for name, count, seconds in trace.summary()[:5]:
+        print(f'  {name:32} {count:6} {seconds * 1e3:9.1f} ms')
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elapsed, driver = replay(args.trace, args.method, args.mode)
+    if args.profile:
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+    print(f'replayed {driver.replayed} commands in {elapsed * 1e3:.1f} ms '
+          f'({driver.remaining()} not replayed)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Memory / throughput of the dataframe schemas against untyped frames
+
+Run with `python benchmarks/bench_schema.py`
+"""
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from tradingAPI.schema import apply_schema, read_instruments_csv, \
+    ORDERS_SCHEMA, POSITIONS_SCHEMA
+from tradingAPI.utils import INVEST_INSTRUMENTS_CSV, ORDER_TYPES, \
+    ORDER_STATUS
+
+ROWS = 5000
+REPEAT = 20
+
+
+def synthetic_rows(symbols, rows=ROWS, seed=0):
+    """Rows shaped like the as_dict output of the order decoder"""
+    rand = np.random.RandomState(seed)
+    start = datetime(2020, 1, 1)
+    return [{
+        'instrument': symbols[rand.randint(len(symbols))],
+        'quantity': float(rand.randint(1, 100)),
+        'direction': ['Buy', 'Sell'][rand.randint(2)],
+        'price': float(rand.uniform(1, 500)),
+        'cost': None if rand.rand() < 0.5 else float(rand.uniform(1, 5000)),
+        'order_type': list(ORDER_TYPES)[rand.randint(len(ORDER_TYPES))],
+        'status': ORDER_STATUS.PLACED,
+        'exchange_id': str(rand.randint(10 ** 9)),
+        'timestamp': (start + timedelta(minutes=i)).strftime(
+            '%d.%m.%Y %H:%M:%S'),
+    } for i in range(rows)]
+
+
+def memory(df):
+    return df.memory_usage(deep=True).sum() / 1024
+
+
+def bench(name, raw, typed, instruments):
+    symbol = raw['instrument'].iloc[0]
+
+    def query(df):
+        df.loc[df['instrument'] == symbol]
+        df.merge(instruments, left_on='instrument', right_on='symbol')
+
+    raw_t = min(timeit.repeat(lambda: query(raw), number=1, repeat=REPEAT))
+    typed_t = min(timeit.repeat(lambda: query(typed), number=1,
+                                repeat=REPEAT))
+    print(f'{name:12} memory {memory(raw):9.1f} KiB -> {memory(typed):9.1f}'
+          f' KiB | filter+join {raw_t * 1e3:7.2f} ms -> {typed_t * 1e3:7.2f}'
+          f' ms')
+
+
+def main():
+    raw_instruments = pd.read_csv(INVEST_INSTRUMENTS_CSV)
+    instruments = read_instruments_csv(INVEST_INSTRUMENTS_CSV)
+    print(f'{"instruments":12} memory {memory(raw_instruments):9.1f} KiB -> '
+          f'{memory(instruments):9.1f} KiB')
+    construct_t = min(timeit.repeat(
+        lambda: read_instruments_csv(INVEST_INSTRUMENTS_CSV), number=1,
+        repeat=REPEAT))
+    print(f'{"":12} typed read_csv {construct_t * 1e3:.2f} ms')
+
+    symbols = list(raw_instruments['symbol'].unique())
+    rows = synthetic_rows(symbols)
+    raw_orders = pd.DataFrame(rows)
+    bench('orders', raw_orders,
+          apply_schema(pd.DataFrame(rows), ORDERS_SCHEMA), instruments)
+
+    position_cols = ['instrument', 'quantity', 'price', 'timestamp',
+                     'exchange_id', 'direction']
+    raw_positions = raw_orders[position_cols].copy()
+    bench('positions', raw_positions,
+          apply_schema(raw_positions.copy(), POSITIONS_SCHEMA), instruments)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Driver commands of a pending orders refresh, with and without snapshot
+
+The page is a synthetic orders table served by a parsed copy of itself and
+the commands are counted with the recorder: each one is a WebDriver round
+trip on a live session.
+
+Run with `python benchmarks/bench_snapshot.py`
+"""
+import random
+import time
+
+from bs4 import BeautifulSoup
+
+from tradingAPI.dom_components import PendingOrdersTab
+from tradingAPI.low_level import LowLevelAPI
+from tradingAPI.recorder import RecordingDriver
+from tradingAPI.snapshot import SnapshotElement
+from tradingAPI.utils import TRADING_MODES
+
+ROWS = 100
+
+ROW = '''<tr>
+  <td class="name">{name}</td><td class="humanId">{i}</td>
+  <td class="direction">Buy</td><td class="type">Limit</td>
+  <td class="quantity">{quantity}</td><td class="value"></td>
+  <td class="currentPrice">{price:.2f}</td>
+  <td class="targetPrice">{target:.2f}</td>
+  <td class="created">01.02.2020 10:00:{second:02d}</td>
+</tr>'''
+
+
+def page(short_names, rows=ROWS, seed=0):
+    rand = random.Random(seed)
+    body = ''.join(ROW.format(
+        name=rand.choice(short_names), i=i, quantity=rand.randint(1, 50),
+        price=rand.uniform(1, 500), target=rand.uniform(1, 500),
+        second=i % 60) for i in range(rows))
+    return (f'<html><body><div id="ordersTable"><table><tbody>{body}'
+            '</tbody></table></div></body></html>')
+
+
+def refresh(api, snapshot):
+    recorder = api.browser = RecordingDriver(api.browser.driver)
+    start = time.perf_counter()
+    tab = PendingOrdersTab(api)
+    tab.is_open = True
+    if snapshot:
+        tab.get_orders(as_df=True)
+    else:
+        # as before, a query per cell
+        api.snapshot = lambda root: _no_snapshot()
+        tab.get_orders(as_df=True)
+        del api.snapshot
+    return len(recorder.trace), time.perf_counter() - start
+
+
+class _no_snapshot(object):
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+def main():
+    api = LowLevelAPI()
+    api.trading_mode = TRADING_MODES.INVEST
+    api.load_instruments()
+    short_names = list(api.instruments[api.trading_mode]['short_name'][:50])
+    html = page(short_names)
+    document = SnapshotElement(BeautifulSoup(html, 'html.parser'))
+    api.browser = RecordingDriver(document)
+    for label, snapshot in (('per cell', False), ('snapshot', True)):
+        commands, seconds = refresh(api, snapshot)
+        print(f'{label:10} {ROWS} orders: {commands:5} driver commands, '
+              f'{seconds * 1e3:6.1f} ms local')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Parsing of the watchlist panel: BeautifulSoup selects against the
+single pass tradebox parser
+
+Run with `python benchmarks/bench_tradebox.py`
+"""
+import timeit
+
+from bs4 import BeautifulSoup
+
+from tradingAPI.parsers import parse_tradeboxes
+
+BOXES = 100
+REPEAT = 20
+
+TRADEBOX = '''
+<div class="tradebox{closed}" data-code="SYM{i}">
+  <div class="tradebox-header">
+    <span class="instrument-name">Instrument {i}</span>
+    <img src="flag.png"><br>
+  </div>
+  <div class="tradebox-prices">
+    <div class="tradebox-price-sell">{sell:.2f}</div>
+    <div class="tradebox-price-buy">{buy:.2f}</div>
+  </div>
+  <span class="tradebox-buyers-container number-box">{sent}%</span>
+</div>'''
+
+
+def panel(boxes=BOXES):
+    return '<div class="tradeboxes">{}</div>'.format(''.join(
+        TRADEBOX.format(i=i, closed=' tradebox-market-closed' * (i % 7 == 0),
+                        sell=100 + i, buy=100.5 + i, sent=i % 100)
+        for i in range(boxes)))
+
+
+def soup_parse(html, preferences):
+    """The previous checkStock parsing"""
+    records = []
+    for product in BeautifulSoup(html, 'html.parser').select('div.tradebox'):
+        prod_name = product.select('span.instrument-name')[0].text
+        if not [x for x in preferences if x.lower() in prod_name.lower()]:
+            continue
+        if 'tradebox-market-closed' in product['class']:
+            continue
+        records.append([
+            product.select('div.tradebox-price-sell')[0].text,
+            product.select('div.tradebox-price-buy')[0].text,
+            int(product.select('span.tradebox-buyers-container.number-box')
+                [0].text.strip('%')) / 100])
+    return records
+
+
+def main():
+    html = panel()
+    preferences = [f'Instrument {i}' for i in range(BOXES)]
+    soup_t = min(timeit.repeat(lambda: soup_parse(html, preferences),
+                               number=1, repeat=REPEAT))
+    fast_t = min(timeit.repeat(lambda: parse_tradeboxes(html), number=1,
+                               repeat=REPEAT))
+    print(f'{BOXES} tradeboxes: BeautifulSoup {soup_t * 1e3:.2f} ms, '
+          f'single pass {fast_t * 1e3:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,9 @@ setup(
     include_package_data=True,
     package_data={'': ['*.ini', 'logs/*.ini', 'data/*_instruments.csv']},
     zip_safe=False,
+    entry_points={
+        'console_scripts': ['trade121 = tradingAPI.daemon:main'],
+    },
     author="Alex Radu",
     author_email="dragosthealx@gmail.com",
     description="Package to interact with the broker service Trading212",
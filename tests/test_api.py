@@ -0,0 +1,108 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from tradingAPI.api import API
+from tradingAPI.links import dommap
+from tradingAPI.scripts import WATCHLIST_NAMES
+from tradingAPI.utils import TRADING_MODES
+
+
+class FakeElement(object):
+    """Element found by a css, actions are logged by the driver"""
+    def __init__(self, driver, css, index=0):
+        self.driver = driver
+        self.css = css
+        self.index = index
+
+    def click(self):
+        self.driver.log.append(('click', self.css))
+
+    def clear(self):
+        pass
+
+    def send_keys(self, keys):
+        self.driver.log.append(('search', keys))
+
+    def get_attribute(self, name):
+        return 'added'
+
+    def find_elements_by_css_selector(self, css):
+        return [FakeElement(self.driver, css)]
+
+
+class FakeDriver(object):
+    """Page with a watchlist of tradeboxes"""
+    def __init__(self, names):
+        self.names = names
+        self.log = []
+
+    def execute_script(self, script, css):
+        if script != WATCHLIST_NAMES:
+            raise AssertionError('unexpected script')
+        return list(self.names)
+
+    def find_elements_by_css_selector(self, css):
+        if css == dommap['tradebox']:
+            return [FakeElement(self, css, index)
+                    for index in range(len(self.names))]
+        return [FakeElement(self, css)]
+
+
+class TestSyncWatchlist(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('tradingAPI.api.w')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.api = API()
+        self.api.trading_mode = TRADING_MODES.CFD
+        self.api.instruments[TRADING_MODES.CFD] = pd.DataFrame({
+            'name': ['Apple Inc', 'Tesla Inc', 'Vodafone'],
+            'short_name': ['Apple', 'Tesla', 'Vodafone'],
+            'symbol': ['AAPL', 'TSLA', 'VOD'],
+            'exchange': ['NASDAQ', 'NASDAQ', 'LSE'],
+            'fractional': [False] * 3})
+
+    def sync(self, names, targets, **kwargs):
+        self.api.browser = FakeDriver(names)
+        with mock.patch('tradingAPI.api.ActionChains') as chains:
+            result = self.api.sync_watchlist(targets, **kwargs)
+        removed = [call.args[0].index
+                   for call in chains.return_value.context_click.call_args_list]
+        return result, removed
+
+    def test_only_difference(self):
+        """
+        only the missing targets are added and the others removed
+        """
+        result, removed = self.sync(['Apple', 'Vodafone', 'Unknown'],
+                                    ['AAPL', 'Tesla', 'PEAR'])
+        self.assertEqual(result, {'added': ['Tesla'], 'removed': ['Vodafone'],
+                                  'unresolved': ['PEAR']})
+        self.assertEqual(removed, [1])
+        self.assertEqual([entry for entry in self.api.browser.log
+                          if entry[0] == 'search'], [('search', 'TSLA')])
+        self.assertEqual(self.api.preferences, ['Apple', 'Tesla'])
+
+    def test_in_sync(self):
+        """
+        a watchlist already in sync is left untouched
+        """
+        result, removed = self.sync(['Apple', 'Tesla'], ['TSLA', 'AAPL'])
+        self.assertEqual((result['added'], result['removed']), ([], []))
+        self.assertEqual(self.api.browser.log, [])
+
+    def test_remove_unknown(self):
+        """
+        unresolved items are removed only if asked, from the bottom
+        """
+        result, removed = self.sync(['Unknown', 'Apple', 'Other'], [],
+                                    remove_unknown=True)
+        self.assertEqual(result['removed'], ['Unknown', 'Apple', 'Other'])
+        self.assertEqual(removed, [2, 1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import pickle
+import unittest
+
+from tradingAPI.base import Instrument
+
+
+class TestInstrument(unittest.TestCase):
+
+    def test_intern_shares_instance(self):
+        """
+        a listing is interned once, other exchanges are distinct
+        """
+        bp = Instrument.intern('BP plc', 'BP', 'BP', 'LSE', False)
+        self.assertIs(Instrument.intern('BP plc', 'BP', 'BP', 'LSE'), bp)
+        self.assertIsNot(Instrument.intern('BP plc', 'BP', 'BP', 'NYSE'), bp)
+        self.assertIs(pickle.loads(pickle.dumps(bp)), bp)
+        with self.assertRaises(AttributeError):
+            bp.symbol = 'BP.'
+
+    def test_intern_refreshes_fields(self):
+        """
+        short name and fractional are updated unless unknown
+        """
+        shell = Instrument.intern('Shell plc', 'Shell', 'SHEL', 'LSE', False)
+        Instrument.intern('Shell plc', 'Shell PLC', 'SHEL', 'LSE', True)
+        self.assertEqual((shell.short_name, shell.fractional),
+                         ('Shell PLC', True))
+        Instrument.intern('Shell plc', float('nan'), 'SHEL', 'LSE', None)
+        self.assertEqual((shell.short_name, shell.fractional),
+                         ('Shell PLC', True))
+
+    def test_nan_key(self):
+        """
+        a NaN exchange, as read from frames, interns as None
+        """
+        vod = Instrument.intern('Vodafone', 'Vodafone', 'VOD', float('nan'))
+        self.assertIsNone(vod.exchange)
+        self.assertIs(Instrument.intern('Vodafone', 'Vodafone', 'VOD'), vod)
+
+    def test_from_dict_ignores_unknown_fields(self):
+        """
+        fields of other versions are ignored when decoding
+        """
+        tsco = Instrument.from_dict({'name': 'Tesco', 'short_name': 'Tesco',
+                                     'symbol': 'TSCO', 'exchange': 'LSE',
+                                     'fractional': False, 'isin': 'GB00'})
+        self.assertIs(Instrument.intern('Tesco', None, 'TSCO', 'LSE'), tsco)
+        self.assertEqual(tsco.short_name, 'Tesco')
+
+
+if __name__ == '__main__':
+    unittest.main()
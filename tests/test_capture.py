@@ -0,0 +1,132 @@
+import json
+import time
+import unittest
+from types import SimpleNamespace
+
+from tradingAPI.capture import TrafficCapture
+from tradingAPI.utils import BUY, SELL, ORDER_STATUS, ORDER_TYPES, \
+    CFD_ORDER_TYPES, TRADING_MODES
+
+ORDERS = {'items': [
+    {'id': 11, 'ticker': 'AAPL_US_EQ', 'quantity': 2, 'type': 'limit',
+     'limitPrice': 150.5, 'creationTime': '2024-01-02T10:00:00'},
+    {'id': 12, 'ticker': 'TSLA_US_EQ', 'quantity': -1, 'type': 'MARKET',
+     'currentPrice': 200},
+    {'ticker': 'BAD', 'quantity': 'x', 'type': 'MARKET'},
+]}
+POSITIONS = [
+    {'positionId': 1, 'code': 'AAPL', 'quantity': 3, 'averagePrice': 140,
+     'initialFillDate': 1704189600000},
+]
+ACCOUNT = {'free': '100.5', 'blocked': 10, 'total': 'n/a', 'ppl': -2.5}
+
+
+class TestTrafficCapture(unittest.TestCase):
+
+    def setUp(self):
+        # no browser, payloads are fed
+        self.api = SimpleNamespace(trading_mode=TRADING_MODES.INVEST)
+        self.capture = TrafficCapture(self.api)
+
+    def feed(self, path, payload):
+        return self.capture.feed('https://demo.trading212.com' + path,
+                                 json.dumps(payload))
+
+    def test_feed_classifies(self):
+        """
+        only the captured URLs with a JSON body are stored
+        """
+        self.assertTrue(self.feed('/equity/orders', ORDERS))
+        self.assertFalse(self.feed('/charts/candles', ORDERS))
+        self.assertFalse(self.capture.feed(
+            'https://demo.trading212.com/positions', 'not json'))
+        self.assertIsNone(self.capture.latest('positions'))
+
+    def test_get_orders(self):
+        """
+        orders are decoded with their type, direction and status
+        """
+        self.feed('/equity/orders', ORDERS)
+        orders = self.capture.get_orders()
+        self.assertEqual(len(orders), 2)
+        limit, market = orders
+        self.assertEqual(limit.instrument.symbol, 'AAPL')
+        self.assertEqual(limit.order_type, ORDER_TYPES.LIMIT)
+        self.assertEqual((limit.direction, limit.price), (BUY, 150.5))
+        self.assertEqual(limit.exchange_id, 11)
+        self.assertEqual(limit.status, ORDER_STATUS.PLACED)
+        self.assertEqual(limit.timestamp.year, 2024)
+        self.assertEqual((market.direction, market.quantity), (SELL, 1))
+        frame = self.capture.get_orders(as_df=True)
+        self.assertEqual(frame['instrument'].tolist(), ['AAPL', 'TSLA'])
+
+    def test_order_types_of_mode(self):
+        """
+        the order types are mapped for the trading mode
+        """
+        self.api.trading_mode = TRADING_MODES.CFD
+        self.feed('/orders', ORDERS)
+        orders = self.capture.get_orders()
+        self.assertEqual(orders[0].order_type, CFD_ORDER_TYPES.LIMIT_STOP)
+
+    def test_payloads_by_mode(self):
+        """
+        a payload is only served in the mode it was received in
+        """
+        self.feed('/positions', POSITIONS)
+        self.api.trading_mode = TRADING_MODES.CFD
+        self.assertIsNone(self.capture.get_positions())
+        self.api.trading_mode = TRADING_MODES.INVEST
+        self.assertEqual(len(self.capture.get_positions()), 1)
+
+    def test_get_positions(self):
+        """
+        positions are decoded with epoch timestamps
+        """
+        self.feed('/positions', POSITIONS)
+        position, = self.capture.get_positions()
+        self.assertEqual(position.instrument.symbol, 'AAPL')
+        self.assertEqual((position.quantity, position.price), (3, 140))
+        self.assertEqual(position.direction, BUY)
+        self.assertEqual(position.timestamp.year, 2024)
+
+    def test_get_account(self):
+        """
+        invalid fields are None, the others floats
+        """
+        self.feed('/account/summary', ACCOUNT)
+        account = self.capture.get_account()
+        self.assertEqual(account['free_funds'], 100.5)
+        self.assertEqual(account['blocked_funds'], 10.)
+        self.assertIsNone(account['account_value'])
+        self.assertEqual(account['live_result'], -2.5)
+        self.assertIsNone(account['used_margin'])
+
+    def test_max_age_and_discard(self):
+        """
+        old payloads and discarded ones are not served
+        """
+        self.feed('/account/summary', ACCOUNT)
+        key = (TRADING_MODES.INVEST, 'account')
+        received, payload = self.capture.payloads[key]
+        self.capture.payloads[key] = (time.time() - 60, payload)
+        self.assertIsNone(self.capture.get_account(max_age=10))
+        self.assertIsNotNone(self.capture.get_account())
+        self.capture.discard('account')
+        self.assertIsNone(self.capture.get_account())
+
+    def test_get_instruments(self):
+        """
+        instruments are read from the catalog payload
+        """
+        self.feed('/instruments', {'instruments': [
+            {'ticker': 'VOD_EQ', 'name': 'Vodafone', 'shortName': 'VOD',
+             'exchange': 'LSE', 'isFractional': True},
+            {'name': 'no ticker'}]})
+        instruments = self.capture.get_instruments()
+        self.assertEqual(instruments['symbol'].tolist(), ['VOD'])
+        self.assertTrue(instruments['fractional'].iloc[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
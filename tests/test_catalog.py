@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from tradingAPI.catalog import InstrumentCatalog, ADD, DELIST, RENAME
+from tradingAPI.utils import TRADING_MODES
+
+CFD, INVEST = TRADING_MODES.CFD, TRADING_MODES.INVEST
+
+
+def instruments(*rows):
+    return pd.DataFrame(
+        [dict(name=name, short_name=symbol, symbol=symbol, exchange=exchange,
+              fractional=False) for name, symbol, exchange in rows])
+
+
+BASELINE = instruments(('Apple', 'AAPL', 'NASDAQ'),
+                       ('BP', 'BP', 'LSE'),
+                       ('BP', 'BP', 'NYSE'),
+                       ('Tesla', 'TSLA', 'NASDAQ'))
+
+
+class TestInstrumentCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'deltas.ndjson')
+        self.catalog = InstrumentCatalog(self.path)
+        self.catalog.load(CFD, BASELINE)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_listings_shared_by_modes(self):
+        """
+        a listing of two modes is held once
+        """
+        self.catalog.load(INVEST, BASELINE.iloc[:2])
+        self.assertEqual(len(self.catalog.df), 4)
+        self.assertEqual(self.catalog.count(CFD), 4)
+        self.assertEqual(self.catalog.count(INVEST), 2)
+        self.assertEqual(self.catalog.frame(INVEST)['symbol'].tolist(),
+                         ['AAPL', 'BP'])
+
+    def test_update_deltas(self):
+        """
+        refreshes are recorded as add, delist and rename deltas
+        """
+        fetched = instruments(('Apple Inc', 'AAPL', 'NASDAQ'),
+                              ('BP', 'BP', 'LSE'),
+                              ('BP', 'BP', 'NYSE'),
+                              ('Vodafone', 'VOD', 'LSE'))
+        deltas = self.catalog.update(CFD, fetched)
+        ops = sorted((delta.op, delta.instrument.symbol) for delta in deltas)
+        self.assertEqual(ops, [(ADD, 'VOD'), (DELIST, 'TSLA'),
+                               (RENAME, 'AAPL')])
+        rename, = [delta for delta in deltas if delta.op == RENAME]
+        self.assertEqual(rename.previous.name, 'Apple')
+        self.assertEqual(self.catalog.version, 1)
+        self.assertEqual(sorted(self.catalog.frame(CFD)['name']),
+                         ['Apple Inc', 'BP', 'BP', 'Vodafone'])
+        # no change, no version
+        self.assertEqual(self.catalog.update(CFD, fetched), [])
+        self.assertEqual(self.catalog.version, 1)
+        self.assertEqual(len(self.catalog.delta_since(0, CFD)), 3)
+        self.assertEqual(self.catalog.delta_since(1), [])
+
+    def test_sync_other_session(self):
+        """
+        a session catches up with the deltas logged by another one
+        """
+        other = InstrumentCatalog(self.path)
+        other.load(CFD, BASELINE)
+        self.catalog.update(CFD, BASELINE.iloc[:3])
+        applied = other.sync()
+        self.assertEqual([delta.op for delta in applied], [DELIST])
+        self.assertEqual(other.version, 1)
+        self.assertEqual(other.count(CFD), 3)
+        # only the new lines are read
+        self.assertEqual(other.sync(), [])
+        # the next update of the other session gets the next version
+        deltas = other.update(CFD, BASELINE)
+        self.assertEqual(deltas[0].version, 2)
+        self.assertEqual(self.catalog.sync()[0].op, ADD)
+        self.assertEqual(self.catalog.count(CFD), 4)
+
+    def test_replay_log(self):
+        """
+        a new session replays the log on top of the baseline
+        """
+        self.catalog.update(CFD, BASELINE.iloc[1:])
+        csv_path = os.path.join(self.directory.name, 'cfd.csv')
+        BASELINE.to_csv(csv_path, index=False)
+        catalog = InstrumentCatalog.from_csvs({CFD: csv_path}, self.path)
+        self.assertEqual(catalog.version, 1)
+        self.assertNotIn('AAPL', catalog.frame(CFD)['symbol'].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+from tradingAPI import exceptions
+from tradingAPI.base import Instrument
+from tradingAPI.crawler import ShardedCatalogCrawler, search_shards
+from tradingAPI.low_level import LowLevelAPI
+from tradingAPI.utils import TRADING_MODES
+
+# names of the listings, one per symbol
+NAMES = ['AAA %02d' % i for i in range(25)] + ['BAB', 'CAB 1', 'DOG']
+
+
+def listing(name, exchange='TEST'):
+    symbol = name.replace(' ', '')
+    return Instrument.intern(name, symbol, symbol, exchange, False)
+
+
+def search(query, names=NAMES, cap=12):
+    """Search showing the first cap names containing the query"""
+    return [listing(name) for name in names if query in name][:cap]
+
+
+class TestSearchShards(unittest.TestCase):
+
+    def test_split_until_under_cap(self):
+        """
+        truncated shards are split until every listing is found
+        """
+        queries = []
+
+        def logged(query):
+            queries.append(query)
+            return search(query)
+
+        instruments, truncated = search_shards(logged, ['A', 'D', 'Z'],
+                                               result_cap=12, max_length=5)
+        self.assertEqual(truncated, [])
+        self.assertEqual(sorted(i.name for i in instruments), sorted(NAMES))
+        self.assertIn('AA', queries)
+        self.assertIn('AAA 2', queries)
+        self.assertNotIn('DO', queries)
+
+    def test_truncated_at_max_length(self):
+        """
+        shards still truncated at the longest query are reported
+        """
+        instruments, truncated = search_shards(search, ['A'], result_cap=12,
+                                               max_length=2)
+        self.assertEqual(sorted(truncated), ['A ', 'AA'])
+        self.assertEqual(len(instruments), len(set(
+            i.key for i in instruments)))
+
+
+class TestShardedCatalogCrawler(unittest.TestCase):
+
+    def test_merge(self):
+        """
+        overlapping shards are merged once per listing, sorted
+        """
+        merged = ShardedCatalogCrawler.merge([
+            [listing('DOG'), listing('BAB')],
+            [listing('BAB'), listing('BAB', 'OTHER')], []])
+        self.assertEqual(list(zip(merged['symbol'], merged['exchange'])),
+                         [('BAB', 'OTHER'), ('BAB', 'TEST'), ('DOG', 'TEST')])
+
+    def test_truncated_crawl_refused(self):
+        """
+        a truncated crawl raises and leaves the catalog as it was
+        """
+        crawler = ShardedCatalogCrawler('user', 'pass', TRADING_MODES.CFD,
+                                        workers=2, shards=['A', 'B', 'A'])
+        self.assertEqual(crawler.shards, ['A', 'B'])
+        results = iter([([listing('BAB')], []), ([], ['AAAA'])])
+        api = LowLevelAPI()
+        api.trading_mode = TRADING_MODES.CFD
+        api.get_catalog = mock.Mock()
+        with mock.patch('tradingAPI.crawler.crawl_shards',
+                        side_effect=lambda *args: next(results)):
+            with self.assertRaises(exceptions.CatalogTruncated) as raised:
+                api.refresh_instruments_sharded('user', 'pass', workers=2)
+        self.assertEqual(raised.exception.queries, ['AAAA'])
+        api.get_catalog.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
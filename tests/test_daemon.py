@@ -0,0 +1,90 @@
+import json
+import time
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from tradingAPI.base import AccountSnapshot, Instrument, InvestMarketOrder
+from tradingAPI.daemon import encode, decode
+from tradingAPI.parsers import parse_number_columns
+from tradingAPI.pnl import Risk
+from tradingAPI.quotes import Quote
+from tradingAPI.utils import BUY, ORDER_TYPES
+
+
+def round_trip(value):
+    return decode(json.loads(json.dumps(encode(value))))
+
+
+class TestEncoding(unittest.TestCase):
+
+    def test_frame_dtypes(self):
+        """
+        frames keep their dtypes, missing values and index
+        """
+        frame = pd.DataFrame({
+            'quantity': [1.5, np.nan],
+            'count': pd.Series([1, 2], dtype='int64'),
+            'direction': pd.Categorical(['buy', 'sell']),
+            'timestamp': pd.to_datetime(['2024-01-02 10:00', None]),
+            'exchange_id': pd.Series(['1', None], dtype=object),
+        })
+        frame.index = pd.Index(['a', 'b'], name='symbol')
+        pd.testing.assert_frame_equal(round_trip(frame), frame)
+
+    def test_number_details_with_none(self):
+        """
+        the detail columns of parsed numbers round trip with their gaps
+        """
+        frame = pd.DataFrame({'price': ['£1,234.5', '', '2,5'],
+                              'quantity': ['3', '4', None]})
+        parse_number_columns(frame, ['price', 'quantity'])
+        self.assertTrue(frame['quantity_thousands'].isna().all())
+        decoded = round_trip(frame)
+        pd.testing.assert_frame_equal(decoded, frame)
+        self.assertEqual(decoded['price_currency'].iloc[0], '£')
+        self.assertTrue(pd.isna(decoded['price_thousands'].iloc[1]))
+
+    def test_empty_frame(self):
+        """
+        empty frames keep their columns
+        """
+        frame = pd.DataFrame({'symbol': pd.Series([], dtype=object),
+                              'quantity': pd.Series([], dtype='float64')})
+        pd.testing.assert_frame_equal(round_trip(frame), frame)
+
+    def test_tuples(self):
+        """
+        result namedtuples keep their class
+        """
+        now = time.time()
+        values = [Quote('AAPL', 1.5, None, now),
+                  AccountSnapshot(1., 2., 3., -4., None, now),
+                  Risk(1., 2., 3., 5., -1., 0.)]
+        for value in values:
+            decoded = round_trip(value)
+            self.assertIs(type(decoded), type(value))
+            self.assertEqual(decoded, value)
+
+    def test_objects(self):
+        """
+        orders and nested containers are decoded
+        """
+        instrument = Instrument.intern('Apple', 'AAPL', 'AAPL', 'NASDAQ')
+        order = InvestMarketOrder(instrument, 2., 150., BUY,
+                                  ORDER_TYPES.MARKET, 300.,
+                                  datetime(2024, 1, 2, 10))
+        decoded = round_trip({'orders': [order], 'count': 1, 'none': None})
+        self.assertEqual(decoded['count'], 1)
+        self.assertIsNone(decoded['none'])
+        copy, = decoded['orders']
+        self.assertIsInstance(copy, InvestMarketOrder)
+        self.assertIs(copy.instrument, instrument)
+        self.assertEqual(copy.timestamp, order.timestamp)
+        self.assertEqual(copy.api_id, order.api_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from tradingAPI.base import AccountSnapshot, Instrument, InvestMarketOrder
+from tradingAPI.history import HistoryStore, realized_from_fills
+from tradingAPI.utils import BUY, SELL, ORDER_STATUS, ORDER_TYPES, \
+    TRADING_MODES
+
+MODE = TRADING_MODES.INVEST
+
+
+def positions(*rows):
+    return pd.DataFrame(
+        [dict(exchange_id=str(i), instrument=symbol, direction=direction,
+              quantity=quantity, price=price)
+         for i, (symbol, direction, quantity, price) in enumerate(rows)],
+        columns=['exchange_id', 'instrument', 'direction', 'quantity',
+                 'price'])
+
+
+def pending(*rows):
+    return pd.DataFrame(
+        [dict(exchange_id=exchange_id, instrument=symbol, direction=direction,
+              quantity=quantity, price=price, order_type=ORDER_TYPES.LIMIT,
+              status=ORDER_STATUS.PLACED, limit=price)
+         for exchange_id, symbol, direction, quantity, price in rows])
+
+
+def at(second):
+    return datetime(2024, 1, 2, 10, 0, second)
+
+
+class TestRealizedFromFills(unittest.TestCase):
+
+    def test_average_cost(self):
+        """
+        sells realize against the average price, reversals reopen
+        """
+        fills = pd.DataFrame({
+            'mode': MODE, 'symbol': 'AAPL',
+            'direction': [BUY, BUY, SELL, SELL, BUY],
+            'quantity': [10., 10., 15., 10., 5.],
+            'price': [100., 110., 120., 100., 90.]})
+        costs = {}
+        realized = realized_from_fills(fills, costs)
+        # average 105: 15 * 15, then 5 * -5 closing the long
+        # and the short of 5 opened at 100 closed at 90
+        self.assertEqual(realized.tolist(), [0., 0., 225., -25., 50.])
+        self.assertEqual(costs[MODE + '|AAPL'][0], 0.)
+
+    def test_continues_from_costs(self):
+        """
+        costs carry the positions over to the next fills
+        """
+        costs = {MODE + '|AAPL': (10., 100.)}
+        fills = pd.DataFrame({'mode': [MODE], 'symbol': ['AAPL'],
+                              'direction': [SELL], 'quantity': [4.],
+                              'price': [110.]})
+        self.assertEqual(realized_from_fills(fills, costs).tolist(), [40.])
+        self.assertEqual(costs[MODE + '|AAPL'], (6., 100.))
+
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = HistoryStore(':memory:')
+
+    def tearDown(self):
+        self.store.close()
+
+    def statuses(self):
+        orders = self.store.orders(mode=MODE)
+        return list(zip(orders['symbol'], orders['status'],
+                        orders['quantity'], orders['price']))
+
+    def test_market_order_filled(self):
+        """
+        a confirmed market order is filled by the snapshot showing it
+        """
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 10., 100.)), at=at(0))
+        order = InvestMarketOrder(
+            Instrument.intern('Apple', 'AAPL', 'AAPL', 'NASDAQ'), 10., 110.,
+            BUY, ORDER_TYPES.MARKET, 1100., at(1))
+        order.status = ORDER_STATUS.PLACED
+        self.store.record_order(MODE, order, at=at(1))
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 20., 106.)), at=at(2))
+        self.assertEqual(self.statuses(), [
+            ('AAPL', ORDER_STATUS.PLACED, 10., 110.),
+            # the price of the fill moved the average from 100 to 106
+            ('AAPL', ORDER_STATUS.FILLED, 10., 112.)])
+
+    def test_pending_orders_gone(self):
+        """
+        pending orders gone are filled or cancelled by the next snapshot
+        """
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 10., 100.)), at=at(0))
+        self.store.record_orders(MODE, pending(
+            ('1', 'AAPL', SELL, 4., 120.), ('2', 'TSLA', BUY, 1., 200.)),
+            at=at(1))
+        self.store.record_orders(MODE, pending(), at=at(2))
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 6., 100.)), at=at(3))
+        events = self.store.orders(mode=MODE)
+        final = events.loc[events['status'] != ORDER_STATUS.PLACED]
+        self.assertEqual(
+            sorted(zip(final['exchange_id'], final['status'],
+                       final['price'])),
+            [('1', ORDER_STATUS.FILLED, 120.),
+             ('2', ORDER_STATUS.CANCELLED, 200.)])
+
+    def test_fills_without_orders(self):
+        """
+        positions closed without an order are filled at the bid
+        """
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 10., 100.)), at=at(0))
+        self.store.record_positions(MODE, positions(), prices={'AAPL': 90.},
+                                    at=at(1))
+        # not claimed by an order at the next snapshot
+        self.store.record_positions(MODE, positions(), at=at(2))
+        self.assertEqual(self.statuses(), [
+            ('AAPL', ORDER_STATUS.FILLED, 10., 90.)])
+        self.assertEqual(self.store.held(MODE), [])
+
+    def test_realized_pnl(self):
+        """
+        the realized P&L is read from the inferred fills
+        """
+        self.store.record_positions(MODE, positions(), at=at(0))
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 10., 100.)), at=at(1))
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 4., 100.)), prices={'AAPL': 110.}, at=at(2))
+        self.store.record_positions(MODE, positions(
+            ('AAPL', BUY, 4., 100.)), at=at(3))
+        realized = self.store.realized_pnl(mode=MODE)
+        self.assertEqual(realized['realized'].tolist(), [0., 60.])
+        self.assertEqual(self.store.realized_pnl(symbol='TSLA').empty, True)
+
+    def test_snapshots(self):
+        """
+        account and position snapshots are read back by period
+        """
+        self.store.record_account(MODE, AccountSnapshot(
+            100., 5., 200., 10., None, 0.), at=at(0))
+        self.store.record_positions(MODE, positions(
+            ('AAPL', SELL, 2., 100.)), prices={'AAPL': 90.}, at=at(1))
+        accounts = self.store.accounts(mode=MODE)
+        self.assertEqual(accounts['free_funds'].tolist(), [100.])
+        unrealized = self.store.unrealized_pnl(start=at(1))
+        self.assertEqual(unrealized['unrealized'].tolist(), [20.])
+        self.assertTrue(self.store.unrealized_pnl(end=at(1)).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
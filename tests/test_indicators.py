@@ -0,0 +1,95 @@
+import math
+import unittest
+
+import numpy as np
+
+from tradingAPI.base import Stock
+from tradingAPI.indicators import IndicatorEngine, compute_history
+
+FIELDS = ('ticks', 'price', 'sma', 'ema', 'volatility', 'spread',
+          'relative_spread', 'sentiment', 'sentiment_trend')
+
+
+def random_walk(ticks, seed=0):
+    rng = np.random.default_rng(seed)
+    bids = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, ticks)))
+    asks = bids + rng.uniform(0.01, 0.05, ticks)
+    sentiments = rng.uniform(0, 1, ticks)
+    return bids.tolist(), asks.tolist(), sentiments.tolist()
+
+
+class TestIndicatorEngine(unittest.TestCase):
+
+    def assertMatchesHistory(self, indicators, history):
+        for field in FIELDS:
+            expected = history[field]
+            value = getattr(indicators, field)
+            if isinstance(expected, float) and math.isnan(expected):
+                self.assertTrue(math.isnan(value), field)
+            else:
+                self.assertAlmostEqual(value, expected, places=9,
+                                       msg=field)
+
+    def test_matches_compute_history(self):
+        """
+        the engine state equals compute_history over the same ticks
+        """
+        bids, asks, sentiments = random_walk(95)
+        engine = IndicatorEngine(window=10)
+        history = compute_history(bids, asks, sentiments, window=10)
+        for i in range(len(bids)):
+            engine.update('AAPL', bids[i], asks[i], sentiments[i])
+            if i in (0, 1, 2, 9, 10, 11, 50, 94):
+                self.assertMatchesHistory(engine.get('AAPL'),
+                                          history.iloc[i])
+
+    def test_many_instruments(self):
+        """
+        a tick of many instruments updates each as on its own
+        """
+        walks = [random_walk(30, seed) for seed in range(3)]
+        engine = IndicatorEngine(window=5, capacity=1)
+        for i in range(30):
+            engine.update_many(['A', 'B', 'C'],
+                               [walk[0][i] for walk in walks],
+                               [walk[1][i] for walk in walks],
+                               [walk[2][i] for walk in walks])
+        frame = engine.frame()
+        for symbol, walk in zip('ABC', walks):
+            history = compute_history(*walk, window=5)
+            self.assertMatchesHistory(frame.loc[symbol], history.iloc[-1])
+
+    def test_missing_and_text_prices(self):
+        """
+        text prices are parsed, a missing side uses the other one
+        """
+        engine = IndicatorEngine()
+        engine.update('X', '£1,000.5', None)
+        engine.update('X', None, None)
+        indicators = engine.get('X')
+        self.assertEqual(indicators.ticks, 1)
+        self.assertEqual(indicators.price, 1000.5)
+        self.assertEqual(indicators.spread, 0.)
+        self.assertIsNone(engine.get('Y'))
+
+    def test_load_history_and_stocks(self):
+        """
+        seeding from history gives the state of the whole stream
+        """
+        bids, asks, sentiments = random_walk(60)
+        seeded = IndicatorEngine(window=10)
+        seeded.load_history('A', bids, asks, sentiments)
+        history = compute_history(bids, asks, sentiments, window=10)
+        latest = seeded.get('A')
+        for field in ('sma', 'volatility', 'spread', 'relative_spread'):
+            self.assertAlmostEqual(getattr(latest, field),
+                                   history[field].iloc[-1], places=9)
+        stock = Stock('A')
+        stock.new_rec([bids[0], asks[0], sentiments[0]])
+        engine = IndicatorEngine()
+        engine.update_from_stocks([stock, Stock('empty')])
+        self.assertEqual(list(engine.frame().index), ['A'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import logging
+import os
+import queue
+import unittest
+from unittest import mock
+
+from tradingAPI import logconf
+
+
+class TestLogconf(unittest.TestCase):
+
+    def tearDown(self):
+        logging.getLogger('tradingAPI.capture').setLevel(logging.NOTSET)
+        logconf.configure()
+
+    def test_parse_levels(self):
+        """
+        levels are parsed by logger name, ignoring malformed items
+        """
+        self.assertEqual(
+            logconf.parse_levels('tradingAPI=debug, tradingAPI.capture='
+                                 'WARNING,,oops'),
+            {'tradingAPI': 'DEBUG', 'tradingAPI.capture': 'WARNING'})
+        self.assertEqual(logconf.parse_levels(None), {})
+
+    def test_default_level(self):
+        """
+        the package logs at INFO unless the environment overrides it
+        """
+        with mock.patch.dict(os.environ, {logconf.LEVELS_ENV: ''}):
+            logconf.configure()
+        self.assertEqual(logging.getLogger('tradingAPI').level, logging.INFO)
+        self.assertFalse(logging.getLogger('tradingAPI.retry')
+                         .isEnabledFor(logging.DEBUG))
+        levels = 'tradingAPI=DEBUG,tradingAPI.capture=WARNING'
+        with mock.patch.dict(os.environ, {logconf.LEVELS_ENV: levels}):
+            logconf.configure()
+        self.assertTrue(logging.getLogger('tradingAPI.retry')
+                        .isEnabledFor(logging.DEBUG))
+        self.assertFalse(logging.getLogger('tradingAPI.capture')
+                         .isEnabledFor(logging.INFO))
+
+    def test_lazy_queue_handler(self):
+        """
+        records are queued with their message, merged at the call
+        """
+        records = queue.SimpleQueue()
+        logger = logging.getLogger('tradingAPI.test_logconf')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(logconf.LazyQueueHandler(records))
+        self.addCleanup(logger.handlers.clear)
+        args = ['a']
+        logger.debug('args %s', args)
+        args.append('b')
+        record = records.get_nowait()
+        self.assertEqual(record.msg, "args ['a']")
+        self.assertIsNone(record.args)
+
+
+if __name__ == '__main__':
+    unittest.main()
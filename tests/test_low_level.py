@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+
+from tradingAPI.links import blocked_urls, equity_ids
+from tradingAPI.low_level import LowLevelAPI
+from tradingAPI.scripts import ACCOUNT_SNAPSHOT
+
+
+class TestLaunch(unittest.TestCase):
+
+    def launch(self, **kwargs):
+        api = LowLevelAPI()
+        with mock.patch('tradingAPI.low_level.webdriver.Chrome') as chrome:
+            self.assertTrue(api.launch(**kwargs))
+        options = chrome.call_args.kwargs['options']
+        return api.browser, options
+
+    def test_lean_profile(self):
+        """
+        the lean profile loads eagerly and blocks the heavy requests
+        """
+        browser, options = self.launch(headless=True, lean=True)
+        self.assertEqual(options.to_capabilities()['pageLoadStrategy'],
+                         'eager')
+        self.assertIn('--blink-settings=imagesEnabled=false',
+                      options.arguments)
+        self.assertIn('--disable-dev-shm-usage', options.arguments)
+        browser.execute_cdp_cmd.assert_has_calls([
+            mock.call('Network.enable', {}),
+            mock.call('Network.setBlockedURLs', {'urls': blocked_urls})])
+
+    def test_default_profile(self):
+        """
+        without lean nothing is blocked and pages load normally
+        """
+        browser, options = self.launch()
+        self.assertNotEqual(options.to_capabilities().get('pageLoadStrategy'),
+                            'eager')
+        self.assertNotIn('--blink-settings=imagesEnabled=false',
+                         options.arguments)
+        browser.execute_cdp_cmd.assert_not_called()
+
+
+class EquityDriver(object):
+    """Page showing the equity fields, counting the reads"""
+    def __init__(self):
+        self.reads = 0
+        self.texts = {'free_funds': '£1,000.50', 'blocked_funds': '0',
+                      'account_value': '£1,200', 'live_result': '-£3.20',
+                      'used_margin': ''}
+
+    def execute_script(self, script, ids):
+        if script != ACCOUNT_SNAPSHOT or ids != equity_ids:
+            raise AssertionError('unexpected script')
+        self.reads += 1
+        return dict(self.texts)
+
+
+class TestAccountSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.api = LowLevelAPI()
+        self.api.browser = EquityDriver()
+
+    def test_read_once_within_ttl(self):
+        """
+        the equity fields are read in one script, then served from cache
+        """
+        snapshot = self.api.get_account_snapshot()
+        self.assertEqual((snapshot.free_funds, snapshot.live_result),
+                         (1000.5, -3.2))
+        self.assertIsNone(snapshot.used_margin)
+        self.assertEqual(self.api.get_bottom_info('account_value'), 1200)
+        self.assertIs(self.api.get_account_snapshot(), snapshot)
+        self.assertEqual(self.api.browser.reads, 1)
+
+    def test_expiry_and_invalidation(self):
+        """
+        the page is read again once stale or invalidated
+        """
+        snapshot = self.api.get_account_snapshot()
+        self.api.browser.texts['free_funds'] = '900'
+        self.api._account_snapshot = snapshot._replace(
+            time=snapshot.time - self.api.account_ttl - 1)
+        self.assertEqual(self.api.get_account_snapshot().free_funds, 900)
+        self.api.invalidate_account_snapshot()
+        self.api.get_account_snapshot()
+        self.assertEqual(self.api.browser.reads, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
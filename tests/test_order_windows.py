@@ -0,0 +1,223 @@
+import unittest
+from unittest import mock
+
+import pandas as pd
+from selenium.common.exceptions import WebDriverException
+
+from tradingAPI import exceptions
+from tradingAPI.api import API
+from tradingAPI.base import Instrument
+from tradingAPI.links import dommap
+from tradingAPI.scripts import FILL_ORDER
+from tradingAPI.utils import BUY, ORDER_STATUS, CFD_ORDER_TYPES, \
+    TRADING_MODES
+
+PRICE_CSS = 'div.buy-sell-control-container div.buy-price'
+# elements of the order window, present while it is open
+WINDOW_CSS = (dommap['search-box'], dommap['close'], dommap['confirm-btn'],
+              '#market-order', dommap['quantity'], PRICE_CSS,
+              'div.order-costs', dommap['buy-btn'], dommap['sell-btn'])
+
+
+class FakeElement(object):
+    """WebElement found by a css or xpath, clicks go to the driver"""
+    def __init__(self, driver, path):
+        self.driver = driver
+        self.path = path
+
+    @property
+    def text(self):
+        return self.driver.texts.get(self.path, '')
+
+    def click(self):
+        self.driver.clicked(self.path)
+
+    def send_keys(self, keys):
+        self.driver.log.append(('keys', self.path, keys))
+
+    def clear(self):
+        pass
+
+    def is_displayed(self):
+        return True
+
+    def get_property(self, name):
+        return self.text
+
+    def find_elements_by_css_selector(self, css):
+        return self.driver.find_elements_by_css_selector(css)
+
+
+class FakeDriver(object):
+    """Page with the new position modal of the CFD mode"""
+    def __init__(self, price='1,234.5'):
+        self.log = []
+        self.open = False
+        # fields the fill script fails to set
+        self.fill_errors = []
+        self.texts = {PRICE_CSS: price, 'div.order-costs': '£100'}
+
+    def clicked(self, path):
+        self.log.append(('click', path))
+        if path == dommap['add-mov']:
+            self.open = True
+        elif path == dommap['close']:
+            self.open = False
+
+    def find_elements_by_css_selector(self, css):
+        if css == dommap['add-mov'] or (self.open and css in WINDOW_CSS):
+            return [FakeElement(self, css)]
+        return []
+
+    def find_elements_by_xpath(self, xpath):
+        if not self.open:
+            return []
+        return [FakeElement(self, xpath)]
+
+    def execute_script(self, script, control, spec):
+        if script != FILL_ORDER:
+            raise AssertionError('unexpected script')
+        self.log.append(('fill', spec['direction']))
+        failed = self.fill_errors
+        quantity = spec['quantity'] and spec['quantity']['value']
+        return {'quantity': None if 'quantity' in failed else quantity,
+                'limits': [None if 'limits' in failed else limit['value']
+                           for limit in spec['limits']],
+                'errors': list(failed)}
+
+
+class TestOrderWindows(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('tradingAPI.utils.w')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.api = API()
+        self.api.browser = FakeDriver()
+        self.api.trading_mode = TRADING_MODES.CFD
+        self.api.instruments[TRADING_MODES.CFD] = pd.DataFrame({
+            'name': ['Apple Inc'], 'short_name': ['Apple'],
+            'symbol': ['AAPL'], 'exchange': ['NASDAQ'],
+            'fractional': [False]})
+
+    def test_confirm_places_instrument_order(self):
+        """
+        the order placed carries the instrument the name resolves to
+        """
+        window = self.api.new_cfd_order_window('Apple',
+                                               CFD_ORDER_TYPES.MARKET)
+        window.open()
+        window.fill(BUY, 2)
+        self.assertTrue(window.confirm())
+        order, = self.api.orders
+        self.assertIsInstance(order.instrument, Instrument)
+        self.assertEqual(order.instrument.symbol, 'AAPL')
+        self.assertEqual((order.quantity, order.price, order.status),
+                         (2, 1234.5, ORDER_STATUS.PLACED))
+        self.assertTrue(order.api_id)
+        self.assertIn(('keys', dommap['search-box'], 'Apple'),
+                      self.api.browser.log)
+
+    def test_fill_single_script(self):
+        """
+        the form is filled by one script call, nothing typed afterwards
+        """
+        window = self.api.new_cfd_order_window('Apple',
+                                               CFD_ORDER_TYPES.MARKET)
+        window.open()
+        del self.api.browser.log[:]
+        window.fill(BUY, 3, stop_limit={'gain': ['unit', 5]})
+        self.assertEqual(self.api.browser.log, [('fill', dommap['buy-btn'])])
+        self.assertEqual((window.direction, window.quantity), (BUY, 3))
+        self.assertEqual(window.stop_limit['gain'],
+                         {'mode': 'unit', 'value': 5})
+
+    def test_fill_fallback(self):
+        """
+        the fields the script could not set are set one by one
+        """
+        window = self.api.new_cfd_order_window('Apple',
+                                               CFD_ORDER_TYPES.MARKET)
+        window.open()
+        del self.api.browser.log[:]
+        self.api.browser.fill_errors = ['direction', 'quantity', 'limits']
+        window.fill(BUY, 3, stop_limit={'loss': ['value', 7]})
+        self.assertEqual(self.api.browser.log[1:], [
+            ('click', dommap['buy-btn']),
+            ('keys', dommap['quantity'], 3),
+            ('keys', dommap['limit-loss-value'], '7')])
+        self.assertEqual((window.direction, window.quantity), (BUY, 3))
+        self.assertEqual(window.stop_limit['loss'],
+                         {'mode': 'value', 'value': 7})
+
+    def place(self):
+        window = self.api.new_cfd_order_window(
+            'Apple', CFD_ORDER_TYPES.MARKET, reuse=True)
+        if window.state != 'open':
+            window.open()
+        window.fill(BUY, 1)
+        window.confirm()
+        return window
+
+    def searches(self):
+        return [entry for entry in self.api.browser.log
+                if entry[0] == 'keys']
+
+    def test_reuse_skips_search(self):
+        """
+        a reusable window takes the next order without searching again
+        """
+        window = self.place()
+        self.assertIs(self.place(), window)
+        self.assertEqual(len(self.api.orders), 2)
+        self.assertEqual(len(self.searches()), 1)
+
+    def test_reuse_after_close(self):
+        """
+        a reusable window closed meanwhile is replaced, searching again
+        """
+        window = self.place()
+        # e.g. by the refresh of the positions tab
+        self.api.close_all()
+        self.assertIsNot(self.place(), window)
+        self.assertEqual(window.state, 'closed')
+        self.assertEqual(len(self.searches()), 2)
+
+    def test_unknown_instrument(self):
+        """
+        an instrument not listed is not searched
+        """
+        window = self.api.new_cfd_order_window('Pear',
+                                               CFD_ORDER_TYPES.MARKET)
+        with self.assertRaises(exceptions.ProductNotFound):
+            window.open()
+        self.assertEqual(self.api.browser.log, [])
+
+    def test_addMov_market_closed(self):
+        """
+        without a price the market is closed and the window is closed
+        """
+        self.api.browser.texts[PRICE_CSS] = '-'
+        self.assertFalse(self.api.addMov('Apple', quantity=1))
+        self.assertFalse(self.api.browser.open)
+        self.assertEqual(self.api.orders, [])
+
+    def test_addMov_failure_closes(self):
+        """
+        a failed confirmation closes the window and places nothing
+        """
+        with mock.patch.object(FakeElement, 'click', autospec=True,
+                               side_effect=self.fail_confirm):
+            self.assertFalse(self.api.addMov('Apple', quantity=1))
+        self.assertFalse(self.api.browser.open)
+        self.assertEqual(self.api.orders, [])
+
+    @staticmethod
+    def fail_confirm(element):
+        if element.path == dommap['confirm-btn']:
+            raise WebDriverException('confirm failed')
+        element.driver.clicked(element.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
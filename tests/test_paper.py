@@ -0,0 +1,126 @@
+import unittest
+
+from tradingAPI import exceptions
+from tradingAPI.api import API
+from tradingAPI.base import Order
+from tradingAPI.paper import PaperBroker
+from tradingAPI.utils import BUY, SELL, ORDER_STATUS, ORDER_TYPES, \
+    CFD_ORDER_TYPES, TRADING_MODES
+
+
+class PaperAPI(PaperBroker, API):
+    """The high level API on the paper broker"""
+
+
+class TestPaperBroker(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = PaperBroker.from_symbols(
+            ['AAA', 'BBB'], fractional=False, funds=1000.,
+            trading_mode=TRADING_MODES.INVEST)
+        self.broker.tick(['AAA', 'BBB'], [10., 20.], [10.5, 20.5])
+
+    def order(self, direction, quantity, order_type=ORDER_TYPES.MARKET,
+              limit=None, stop=None, symbol='AAA'):
+        order = Order(self.broker.find_instrument(symbol), quantity, None,
+                      direction, order_type, None, self.broker.timestamp())
+        order.limit, order.stop = limit, stop
+        return self.broker.submit(order)
+
+    def test_market_order(self):
+        """
+        market orders fill at once, buys at the ask
+        """
+        order = self.order(BUY, 10)
+        self.assertEqual(order.status, ORDER_STATUS.FILLED)
+        self.assertEqual(order.price, 10.5)
+        self.assertEqual(self.broker.account.cash, 895.)
+        snapshot = self.broker.get_account_snapshot()
+        # valued at the bid
+        self.assertEqual(snapshot.live_result, -5.)
+        self.assertEqual(snapshot.account_value, 995.)
+
+    def test_limit_and_stop(self):
+        """
+        limits fill at or better than their price, stops once crossed
+        """
+        limit = self.order(BUY, 10, ORDER_TYPES.LIMIT, limit=10.)
+        self.assertEqual(limit.status, ORDER_STATUS.PLACED)
+        self.assertEqual(self.broker.get_account_snapshot().blocked_funds,
+                         100.)
+        self.broker.tick(['AAA'], [9.5], [9.9])
+        self.assertEqual((limit.status, limit.price),
+                         (ORDER_STATUS.FILLED, 9.9))
+        stop = self.order(SELL, 10, ORDER_TYPES.STOP, stop=9.)
+        self.broker.tick(['AAA'], [9.2], [9.3])
+        self.assertEqual(stop.status, ORDER_STATUS.PLACED)
+        self.broker.tick(['AAA'], [8.8], [8.9])
+        self.assertEqual((stop.status, stop.price),
+                         (ORDER_STATUS.FILLED, 8.8))
+        self.assertAlmostEqual(self.broker.account.realized, -11.)
+
+    def test_insufficient_funds_cancelled(self):
+        """
+        a buy beyond the cash is cancelled when it fills
+        """
+        order = self.order(BUY, 1000)
+        self.assertEqual(order.status, ORDER_STATUS.CANCELLED)
+        self.assertEqual(self.broker.account.cash, 1000.)
+
+    def test_cancel_order(self):
+        """
+        pending orders can be cancelled once
+        """
+        order = self.order(BUY, 1, ORDER_TYPES.LIMIT, limit=1.)
+        self.broker.load_orders()
+        self.assertEqual(len(self.broker.placed_orders[
+            TRADING_MODES.INVEST]), 1)
+        self.assertTrue(self.broker.cancel_order(order.exchange_id))
+        self.assertFalse(self.broker.cancel_order(order.exchange_id))
+        self.assertEqual(order.status, ORDER_STATUS.CANCELLED)
+
+    def test_cfd_exits(self):
+        """
+        take profit and stop loss close CFD positions
+        """
+        self.broker.go_to_mode(TRADING_MODES.CFD)
+        window = self.broker.new_cfd_order_window('AAA',
+                                                  CFD_ORDER_TYPES.MARKET)
+        window.open()
+        window.fill(BUY, 10, stop_limit={'gain': ['unit', 1.],
+                                         'loss': ['unit', 1.]})
+        window.confirm()
+        self.broker.load_positions()
+        self.assertEqual(len(self.broker.positions[TRADING_MODES.CFD]), 1)
+        self.broker.tick(['AAA'], [11.6], [11.7])
+        self.assertEqual(len(self.broker.account.positions), 0)
+        self.assertAlmostEqual(self.broker.account.realized, 11.)
+
+    def test_validated_windows(self):
+        """
+        order windows validate as the broker would
+        """
+        window = self.broker.new_invest_order_window('AAA',
+                                                     ORDER_TYPES.MARKET)
+        window.open()
+        window.fill(quantity=2.5)
+        with self.assertRaises(exceptions.FractionalShares):
+            window.confirm()
+        window.fill(SELL, 1)
+        with self.assertRaises(exceptions.InsufficientFunds):
+            window.confirm()
+
+    def test_addMov(self):
+        """
+        addMov places market orders, False if the market is closed
+        """
+        broker = PaperAPI.from_symbols(['AAA', 'CCC'], fractional=False)
+        broker.tick(['AAA'], [10.], [10.5])
+        order = broker.addMov('AAA', auto_margin=100.)
+        self.assertEqual((order.quantity, order.status),
+                         (9, ORDER_STATUS.FILLED))
+        self.assertFalse(broker.addMov('CCC', quantity=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import math
+import unittest
+
+import pandas as pd
+
+from tradingAPI.parsers import (parse_values, parse_numbers,
+                                parse_number_columns, parse_tradeboxes,
+                                Tradebox)
+
+PANEL = '''
+<div id="tradePanel">
+  <div class="tradebox" data-code="AAPL">
+    <div class="tradebox-header"><span class="instrument-name">
+      Apple</span><img src="logo.png"><br></div>
+    <div class="tradebox-price-sell">150.25</div>
+    <div class="tradebox-price-buy"><span>150</span>.35</div>
+    <span class="tradebox-buyers-container number-box">64%</span>
+  </div>
+  <div class="tradebox tradebox-market-closed">
+    <span class="instrument-name">Tesla &amp; Co</span>
+    <div class="tradebox-price-sell"></div>
+  </div>
+  <div class="tradebox"><span class="other">no name</span></div>
+  <span class="instrument-name">outside</span>
+</div>
+'''
+
+
+class TestParseValues(unittest.TestCase):
+
+    def assertValues(self, texts, expected, decimal=None):
+        values = parse_values(texts, decimal)
+        self.assertEqual(len(values), len(expected))
+        for value, number in zip(values, expected):
+            if number is None:
+                self.assertTrue(math.isnan(value))
+            else:
+                self.assertAlmostEqual(value, number)
+
+    def test_first_number_of_each_cell(self):
+        """
+        only the first number of a cell is read
+        """
+        self.assertValues(['5 shares, 2.5', '£1,234.56', '12%'],
+                          [5, 1234.56, 12])
+
+    def test_locale_separators(self):
+        """
+        each cell is read with the separators it shows
+        """
+        self.assertValues(['1.234,5 €', '3,50', "1'234.5", '1 234,5'],
+                          [1234.5, 3.5, 1234.5, 1234.5])
+
+    def test_negative_numbers(self):
+        """
+        a minus before the number, or before its currency, is kept
+        """
+        self.assertValues(['-5', '£-5.00', '-£5.00', '− 2.5'],
+                          [-5, -5, -5, -2.5])
+
+    def test_missing_cells(self):
+        """
+        empty, None and text only cells are nan
+        """
+        self.assertValues(['', None, 'n/a', '0.001'],
+                          [None, None, None, 0.001])
+
+    def test_ambiguous_separator(self):
+        """
+        '1,234' follows the other cells of the column, or decimal
+        """
+        self.assertValues(['1,234', '2,5'], [1.234, 2.5])
+        self.assertValues(['1,234', '2.5'], [1234, 2.5])
+        self.assertValues(['1,234'], [1234])
+        self.assertValues(['1,234'], [1.234], decimal=',')
+
+    def test_empty_column(self):
+        """
+        no cells, no values
+        """
+        self.assertEqual(len(parse_values([])), 0)
+
+
+class TestParseNumbers(unittest.TestCase):
+
+    def test_details(self):
+        """
+        currency and separators are kept in their own columns
+        """
+        parsed = parse_numbers(['£1,234.56', '1.234,5 €', '12%', None])
+        self.assertEqual(list(parsed.columns),
+                         ['value', 'currency', 'decimal', 'thousands'])
+        self.assertEqual(parsed['value'].iloc[0], 1234.56)
+        self.assertEqual(parsed['currency'].tolist()[:3], ['£', '€', '%'])
+        self.assertTrue(pd.isna(parsed['currency'].iloc[3]))
+        self.assertEqual(parsed['decimal'].tolist()[:2], ['.', ','])
+        self.assertEqual(parsed['thousands'].tolist()[:2], [',', '.'])
+        self.assertTrue(math.isnan(parsed['value'].iloc[3]))
+
+    def test_keeps_series_index(self):
+        """
+        the rows of a Series keep its index
+        """
+        texts = pd.Series(['1', '2'], index=[10, 20])
+        self.assertEqual(parse_numbers(texts).index.tolist(), [10, 20])
+
+    def test_number_columns(self):
+        """
+        the numeric columns are replaced, the others left alone
+        """
+        frame = pd.DataFrame({'price': ['$1.5', '$2'],
+                              'name': ['a', 'b']})
+        parse_number_columns(frame, ['price', 'missing'])
+        self.assertEqual(frame['price'].tolist(), [1.5, 2.0])
+        self.assertEqual(frame['price_currency'].tolist(), ['$', '$'])
+        self.assertEqual(frame['name'].tolist(), ['a', 'b'])
+        frame = pd.DataFrame({'price': ['$1.5']})
+        parse_number_columns(frame, ['price'], details=False)
+        self.assertEqual(list(frame.columns), ['price'])
+
+
+class TestParseTradeboxes(unittest.TestCase):
+
+    def test_fields(self):
+        """
+        the fields of each tradebox are read in order, nested text joined
+        """
+        apple, tesla = parse_tradeboxes(PANEL)
+        self.assertEqual(apple, Tradebox('Apple', False, '150.25', '150.35',
+                                         0.64))
+        self.assertEqual(tesla, Tradebox('Tesla & Co', True, None, None,
+                                         None))
+
+    def test_empty(self):
+        """
+        a panel without tradeboxes gives none
+        """
+        self.assertEqual(parse_tradeboxes('<div id="tradePanel"></div>'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
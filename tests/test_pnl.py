@@ -0,0 +1,107 @@
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradingAPI.pnl import PnLEngine
+from tradingAPI.quotes import Quote, QuoteCache
+from tradingAPI.utils import BUY, SELL, TRADING_MODES
+
+POSITIONS = pd.DataFrame({
+    'instrument': ['AAPL', 'AAPL', 'VOD'],
+    'direction': [BUY, SELL, BUY],
+    'quantity': [10., 4., 100.],
+    'price': [100., 105., 1.5]})
+INSTRUMENTS = pd.DataFrame({'symbol': ['AAPL', 'VOD'],
+                            'exchange': ['NASDAQ', 'London Stock Exchange']})
+
+
+class TestPnLEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = PnLEngine(margin_rate=0.5, capacity=1)
+        self.engine.set_positions(POSITIONS, TRADING_MODES.CFD, INSTRUMENTS)
+
+    def test_unquoted_at_cost(self):
+        """
+        positions without quotes are valued at cost, by risk and frame
+        """
+        risk = self.engine.risk()
+        self.assertEqual(sorted(risk), ['GBP', 'USD'])
+        self.assertEqual(risk['USD'].unrealized, 0.)
+        self.assertEqual(risk['USD'].long_exposure, 1000.)
+        self.assertEqual(risk['USD'].short_exposure, 420.)
+        self.assertEqual(risk['GBP'].used_margin, 75.)
+        self.assertEqual(self.engine.risk('EUR').gross_exposure, 0.)
+        self.assertEqual(sorted(self.engine.held()), ['AAPL', 'VOD'])
+        frame = self.engine.frame()
+        self.assertEqual(frame['current_price'].tolist(), [100., 105., 1.5])
+        self.assertEqual(frame['result'].tolist(), [0., 0., 0.])
+        self.assertAlmostEqual(frame['margin'].sum(),
+                               sum(r.used_margin for r in risk.values()))
+
+    def test_quotes(self):
+        """
+        longs close at the bid, shorts at the ask
+        """
+        risk = self.engine.update_quotes(['AAPL', 'VOD'], [110., 1.4],
+                                         [111., np.nan])
+        usd, gbp = risk['USD'], risk['GBP']
+        # 10 * 10 long, 4 * -6 short, 100 * -0.1 long
+        self.assertAlmostEqual(usd.unrealized, 100. - 24.)
+        self.assertAlmostEqual(gbp.unrealized, -10.)
+        self.assertAlmostEqual(usd.net_exposure, 1100. - 444.)
+        self.assertAlmostEqual(usd.used_margin, 14 * 110.5 * .5)
+        self.assertAlmostEqual(gbp.used_margin, 100 * 1.4 * .5)
+        frame = self.engine.frame()
+        self.assertEqual(frame['current_price'].tolist(), [110., 111., 1.4])
+        self.assertEqual(frame['currency'].tolist(), ['USD', 'USD', 'GBP'])
+        results = frame.groupby('currency')['result'].sum()
+        self.assertAlmostEqual(results['USD'], usd.unrealized)
+        self.assertAlmostEqual(results['GBP'], gbp.unrealized)
+
+    def test_incremental_matches_full(self):
+        """
+        incremental updates add up to the totals computed from scratch
+        """
+        rng = np.random.default_rng(0)
+        for i in range(50):
+            bid = 100 + rng.normal()
+            self.engine.update_quotes(['AAPL'], [bid], [bid + .1])
+        incremental = self.engine.risk()
+        self.engine._recompute(np.arange(len(self.engine.symbols)),
+                               exact=True)
+        exact = self.engine.risk()
+        for currency, risk in incremental.items():
+            for value, expected in zip(risk, exact[currency]):
+                self.assertAlmostEqual(value, expected)
+
+    def test_exposure(self):
+        """
+        exposure is grouped by instrument, exchange or currency
+        """
+        self.engine.update_quotes(['AAPL', 'VOD'], [100., 2.], [100., 2.])
+        by_currency = self.engine.exposure('currency')
+        self.assertEqual(by_currency.loc['USD', 'net'], 600.)
+        self.assertEqual(by_currency.loc['GBP', 'long'], 200.)
+        with self.assertRaises(ValueError):
+            self.engine.exposure('sector')
+
+    def test_follows_quote_cache(self):
+        """
+        the quotes of a cache update the tracked instruments only
+        """
+        cache = QuoteCache()
+        cache.register_observer(self.engine)
+        cache.update_many([('VOD', 1.6, 1.7), ('TSLA', 200., 201.)])
+        self.assertAlmostEqual(self.engine.risk('GBP').unrealized, 10.)
+        self.assertNotIn('TSLA', self.engine.rows)
+        cache.update('VOD', None, 1.8)
+        self.assertEqual(cache.get('VOD').bid, 1.6)
+        self.engine.update_from_quotes([Quote('VOD', 1.5, 1.5, time.time())])
+        self.assertAlmostEqual(self.engine.risk('GBP').unrealized, 0.)
+
+
+if __name__ == '__main__':
+    unittest.main()
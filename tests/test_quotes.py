@@ -0,0 +1,107 @@
+import json
+import time
+import unittest
+
+from tradingAPI.patterns import Observable, Observer
+from tradingAPI.quotes import QuoteCache, WebSocketQuoteTap, \
+    decode_price_frame
+
+
+class FakeCapture(Observable):
+    """Capture whose frames are fed by the test"""
+    def __init__(self):
+        super().__init__()
+        self.polls = 0
+
+    def poll(self):
+        self.polls += 1
+
+    def frame(self, payload):
+        self.notify_observers('Network.webSocketFrameReceived',
+                              {'response': {'payloadData': payload}})
+
+
+class Recorder(Observer):
+    def __init__(self, observable):
+        super().__init__(observable)
+        self.events = []
+
+    def notify(self, observable, event, data):
+        self.events.append((event, data))
+
+
+class TestDecodePriceFrame(unittest.TestCase):
+
+    def test_formats(self):
+        """
+        plain JSON, socket.io and SignalR frames are decoded
+        """
+        self.assertEqual(decode_price_frame(json.dumps(
+            {'ticker': 'AAPL_US_EQ', 'bid': '150.1', 'ask': 150.3})),
+            [('AAPL', 150.1, 150.3)])
+        self.assertEqual(decode_price_frame(
+            '42["prices", [{"code": "VOD", "sell": 70}, {"i": "BP"}]]'),
+            [('VOD', 70., None)])
+        self.assertEqual(decode_price_frame(
+            '{"symbol": "A", "b": 1}\x1e{oops}\x1e{"s": 1}\x1e'),
+            [('A', 1., None)])
+
+
+class TestQuoteCache(unittest.TestCase):
+
+    def test_update_keeps_missing_side(self):
+        """
+        a quote missing a side keeps the previous one
+        """
+        cache = QuoteCache()
+        cache.update('AAPL', 150., 151.)
+        quote = cache.update('AAPL', None, 152.)
+        self.assertEqual((quote.bid, quote.ask), (150., 152.))
+        self.assertIs(cache.get('AAPL'), quote)
+
+    def test_max_age(self):
+        """
+        stale quotes are served only without a max age
+        """
+        cache = QuoteCache()
+        cache.update('VOD', 70., 71., timestamp=time.time() - 60)
+        self.assertIsNone(cache.get('VOD'))
+        self.assertEqual(cache.get('VOD', max_age=None).bid, 70.)
+        self.assertIsNone(cache.get('BP', max_age=None))
+
+    def test_notifies_once_per_frame(self):
+        """
+        observers get the quotes of a frame in one notification
+        """
+        cache = QuoteCache()
+        recorder = Recorder(cache)
+        cache.update_many([('A', 1., 2.), ('B', 3., 4.)])
+        cache.update_many([])
+        event, quotes = recorder.events[0]
+        self.assertEqual(len(recorder.events), 1)
+        self.assertEqual(event, 'quotes')
+        self.assertEqual([quote.symbol for quote in quotes], ['A', 'B'])
+
+
+class TestWebSocketQuoteTap(unittest.TestCase):
+
+    def test_frames_fill_cache(self):
+        """
+        price frames fill the cache, other events are ignored
+        """
+        capture = FakeCapture()
+        tap = WebSocketQuoteTap(capture, symbols=['AAPL'])
+        capture.frame(json.dumps([{'ticker': 'AAPL', 'bid': 1, 'ask': 2},
+                                  {'ticker': 'VOD', 'bid': 3, 'ask': 4}]))
+        capture.notify_observers('Network.responseReceived', {})
+        self.assertEqual(tap.ticks, 1)
+        self.assertEqual(tap.get('AAPL').ask, 2.)
+        self.assertEqual(capture.polls, 1)
+        self.assertIsNone(tap.get('VOD'))
+        tap.subscribe('VOD')
+        capture.frame(json.dumps({'ticker': 'VOD', 'bid': 3, 'ask': 4}))
+        self.assertEqual(tap.get('VOD').bid, 3.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+
+from selenium.common.exceptions import NoSuchElementException
+
+from tradingAPI.low_level import LowLevelAPI
+from tradingAPI.recorder import RecordingDriver, ReplayDriver, Trace
+
+
+class FakeElement(object):
+    """WebElement with an id, as wrapped by the recorder"""
+    def __init__(self, id, text):
+        self.id = id
+        self.text = text
+        self.clicks = 0
+
+    def find_elements(self, by, value):
+        return []
+
+    def get_attribute(self, name):
+        return f'{name} of {self.id}'
+
+    def click(self):
+        self.clicks += 1
+
+
+class FakeDriver(object):
+    """Page with two rows"""
+    def __init__(self):
+        self.rows = [FakeElement('a', 'Apple'), FakeElement('b', 'Tesla')]
+
+    def find_elements_by_css_selector(self, css):
+        return self.rows if css == 'div.row' else []
+
+    def find_elements_by_xpath(self, xpath):
+        raise NoSuchElementException('no ' + xpath)
+
+    def execute_script(self, script, *args):
+        return {'texts': [arg.text for arg in args], 'first': args[0]}
+
+
+def session(driver):
+    """Drive a page, returning what was read"""
+    rows = driver.find_elements_by_css_selector('div.row')
+    read = [len(rows), rows[0].text, rows[1].get_attribute('class'),
+            driver.find_elements_by_css_selector('div.none')]
+    rows[1].click()
+    result = driver.execute_script('return 1', *rows)
+    read += [result['texts'], result['first'] is rows[0]]
+    try:
+        driver.find_elements_by_xpath('//table')
+    except NoSuchElementException as e:
+        read.append(str(e))
+    return read
+
+
+class TestRecorder(unittest.TestCase):
+
+    def test_round_trip(self):
+        """
+        a saved trace replays the responses, elements and errors
+        """
+        driver = FakeDriver()
+        recorder = RecordingDriver(driver)
+        recorded = session(recorder)
+        self.assertEqual(driver.rows[1].clicks, 1)
+        self.assertIn('no //table', recorded[-1])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.ndjson.gz')
+            self.assertEqual(recorder.trace.save(path), len(recorder.trace))
+            replay = ReplayDriver.load(path)
+        self.assertEqual(session(replay), recorded)
+        self.assertEqual(replay.remaining(), 0)
+        self.assertEqual(replay.replayed, len(recorder.trace))
+        names = [name for name, count, seconds in recorder.trace.summary()]
+        self.assertEqual(sorted(names), sorted(set(names)))
+        self.assertIn('find_elements_by_css_selector', names)
+
+    def test_replay_matches_arguments(self):
+        """
+        calls out of the recorded order are answered by their arguments
+        """
+        recorder = RecordingDriver(FakeDriver())
+        recorder.find_elements_by_css_selector('div.none')
+        recorder.find_elements_by_css_selector('div.row')
+        replay = ReplayDriver(recorder.trace)
+        self.assertEqual(len(replay.find_elements_by_css_selector('div.row')),
+                         2)
+        self.assertEqual(replay.find_elements_by_css_selector('div.none'), [])
+        with self.assertRaises(LookupError):
+            replay.find_elements_by_css_selector('div.row')
+
+    def test_version_checked(self):
+        """
+        traces of another version are refused
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.ndjson')
+            with open(path, 'w') as f:
+                f.write('{"version": 0}\n')
+            with self.assertRaises(ValueError):
+                Trace.load(path)
+
+    def test_session_recording(self):
+        """
+        the session records through its browser and replays from a file
+        """
+        api = LowLevelAPI()
+        driver = api.browser = FakeDriver()
+        api.start_recording()
+        texts = [row.text for row in api.css('div.row')]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.ndjson')
+            trace = api.stop_recording(path)
+            self.assertIs(api.browser, driver)
+            api.replay(path)
+        self.assertEqual(len(trace), 3)
+        self.assertEqual([row.text for row in api.css('div.row')], texts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import time
+import unittest
+
+from selenium.common import exceptions as selenium_exceptions
+
+from tradingAPI.exceptions import CircuitOpen, CredentialsException, \
+    ElementNotFound
+from tradingAPI.retry import CircuitBreaker, RetryPolicy, is_retryable
+
+
+class Failing(object):
+    """Callable failing with the given exceptions, then returning 'ok'"""
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return 'ok'
+
+
+def policy(name, **kwargs):
+    kwargs.setdefault('base_delay', 0)
+    kwargs.setdefault('jitter', 0)
+    return RetryPolicy(name, **kwargs)
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_classification(self):
+        """
+        transient webdriver errors are retryable, the session ones are not
+        """
+        self.assertTrue(is_retryable(
+            selenium_exceptions.StaleElementReferenceException()))
+        self.assertTrue(is_retryable(ElementNotFound('div.x')))
+        self.assertFalse(is_retryable(
+            selenium_exceptions.InvalidSessionIdException()))
+        self.assertFalse(is_retryable(ValueError()))
+
+    def test_retries_then_succeeds(self):
+        """
+        retryable failures are retried up to the attempts
+        """
+        func = Failing(selenium_exceptions.TimeoutException(),
+                       selenium_exceptions.TimeoutException())
+        self.assertEqual(policy('test.ok', attempts=3).call(func), 'ok')
+        self.assertEqual(func.calls, 3)
+        func = Failing(*[selenium_exceptions.TimeoutException()] * 3)
+        with self.assertRaises(selenium_exceptions.TimeoutException):
+            policy('test.exhausted', attempts=3).call(func)
+        self.assertEqual(func.calls, 3)
+
+    def test_fatal_not_retried(self):
+        """
+        fatal failures are raised at once
+        """
+        func = Failing(CredentialsException('user'))
+        with self.assertRaises(CredentialsException):
+            policy('test.fatal').call(func)
+        self.assertEqual(func.calls, 1)
+
+    def test_deadline(self):
+        """
+        no retry is started that would end past the deadline
+        """
+        func = Failing(*[selenium_exceptions.TimeoutException()] * 5)
+        with self.assertRaises(selenium_exceptions.TimeoutException):
+            policy('test.deadline', attempts=5, base_delay=10,
+                   deadline=1).call(func)
+        self.assertEqual(func.calls, 1)
+
+    def test_delay_backoff(self):
+        """
+        delays grow by the multiplier up to max_delay
+        """
+        retry = policy('test.delay', base_delay=1, max_delay=5)
+        self.assertEqual([retry.delay(i) for i in range(4)], [1, 2, 4, 5])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold(self):
+        """
+        consecutive failures open the breaker, calls are then refused
+        """
+        breaker = CircuitBreaker('test.open', failure_threshold=2,
+                                 reset_timeout=60)
+        retry = policy('test.open', attempts=1, breaker=breaker)
+        for i in range(2):
+            with self.assertRaises(selenium_exceptions.TimeoutException):
+                retry.call(Failing(selenium_exceptions.TimeoutException()))
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        func = Failing()
+        with self.assertRaises(CircuitOpen):
+            retry.call(func)
+        self.assertEqual(func.calls, 0)
+
+    def test_fatal_broker_failure_counts(self):
+        """
+        broker failures not retried count toward opening, fatal ones don't
+        """
+        breaker = CircuitBreaker('test.fatal', failure_threshold=1)
+        retry = policy('test.fatal', breaker=breaker)
+        for failure in (CredentialsException('user'),
+                        selenium_exceptions.InvalidSelectorException(),
+                        selenium_exceptions.InvalidSessionIdException()):
+            with self.assertRaises(type(failure)):
+                retry.call(Failing(failure))
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        retry = policy('test.fatal', breaker=breaker,
+                       retryable=lambda e: False)
+        with self.assertRaises(selenium_exceptions.TimeoutException):
+            retry.call(Failing(selenium_exceptions.TimeoutException()))
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open_single_trial(self):
+        """
+        once the timeout passed exactly one trial call is let through
+        """
+        breaker = CircuitBreaker('test.half', failure_threshold=1,
+                                 reset_timeout=60)
+        breaker.record_failure()
+        breaker.opened_at = time.time() - 61
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.before_call()
+        self.assertFalse(breaker.allows())
+        with self.assertRaises(CircuitOpen):
+            breaker.before_call()
+        # a failed trial opens it again
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        breaker.opened_at = time.time() - 61
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+    def test_release_trial(self):
+        """
+        a trial failing for reasons of its own lets another one through
+        """
+        breaker = CircuitBreaker('test.release', failure_threshold=1,
+                                 reset_timeout=60)
+        breaker.record_failure()
+        breaker.opened_at = time.time() - 61
+        retry = policy('test.release', breaker=breaker)
+        with self.assertRaises(ValueError):
+            retry.call(Failing(ValueError()))
+        self.assertTrue(breaker.allows())
+        self.assertEqual(retry.call(Failing()), 'ok')
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
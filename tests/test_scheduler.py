@@ -0,0 +1,133 @@
+import threading
+import unittest
+
+import pandas as pd
+
+from tradingAPI.base import Stock
+from tradingAPI.low_level import LowLevelAPI
+from tradingAPI.scheduler import Resource, RefreshScheduler
+from tradingAPI.utils import TRADING_MODES
+
+
+class FakeDriver(object):
+    """Page without any element"""
+    def find_elements_by_css_selector(self, css):
+        return []
+
+
+class FakeSession(LowLevelAPI):
+    """Session counting the refreshes of its resources"""
+    def __init__(self):
+        super().__init__()
+        self.browser = FakeDriver()
+        self.trading_mode = TRADING_MODES.CFD
+        self.stocks = {}
+        self.refreshes = []
+
+    def load_orders(self, close=False, max_age=None):
+        self.refreshes.append('orders')
+
+    def load_positions(self, close=False, max_age=None):
+        self.refreshes.append('positions')
+
+    def get_account_snapshot(self, max_age=None):
+        self.refreshes.append('account')
+
+    def load_instruments(self, force_reload=False):
+        self.refreshes.append('catalog')
+
+    def checkStock(self):
+        self.refreshes.append('quotes')
+        return self.stocks
+
+
+class TestResource(unittest.TestCase):
+
+    def test_ttl_adapts_to_changes(self):
+        """
+        the ttl grows while the data is the same, shrinks when it changes
+        """
+        values = [1, 1, 1, 1, 1, 2, 3]
+        resource = Resource('r', 0, 1., refresh=lambda: values.pop(0),
+                            max_ttl=4., backoff=2.)
+        ttls = []
+        while values:
+            resource.run()
+            ttls.append(resource.ttl)
+        self.assertEqual(ttls, [1., 2., 4., 4., 4., 2., 1.])
+        self.assertEqual((resource.refreshes, resource.changes), (7, 3))
+
+    def test_frames_fingerprint(self):
+        """
+        frames are compared by value
+        """
+        frames = [pd.DataFrame({'a': [1]}), pd.DataFrame({'a': [1]}),
+                  pd.DataFrame({'a': [2]})]
+        resource = Resource('r', 0, 1., refresh=lambda: frames.pop(0))
+        for _ in range(3):
+            resource.run()
+        self.assertEqual(resource.changes, 2)
+
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeSession()
+        self.scheduler = self.api.new_refresh_scheduler({'quotes': 2})
+
+    def test_priority_and_requests(self):
+        """
+        due resources refresh in priority order, requests are merged
+        """
+        self.assertEqual(self.scheduler.tick(), ['orders', 'positions',
+                                                 'account', 'quotes',
+                                                 'catalog'])
+        self.assertEqual(self.scheduler.tick(), [])
+        self.scheduler.request('positions', 'orders')
+        self.scheduler.request('positions')
+        self.assertEqual(self.scheduler.tick(), ['orders', 'positions'])
+        self.assertEqual(self.api.refreshes.count('positions'), 2)
+
+    def test_closed_markets(self):
+        """
+        quotes slow down while all markets are closed, until one reopens
+        """
+        quotes = self.scheduler.resources['quotes']
+        stock = Stock('AAPL')
+        self.api.stocks = {'AAPL': stock}
+        stock.market = False
+        self.scheduler.due()
+        self.assertEqual(quotes.ttl, quotes.max_ttl)
+        stock.market = True
+        self.scheduler.due()
+        self.assertEqual(quotes.ttl, 2)
+
+    def test_session_calls_wait(self):
+        """
+        calls on the session from another thread wait for the refresh
+        """
+        started, release = threading.Event(), threading.Event()
+
+        def refresh():
+            started.set()
+            release.wait(5)
+
+        self.scheduler.resources = {}
+        self.scheduler.add('slow', refresh, ttl=60)
+        refresher = threading.Thread(target=self.scheduler.tick)
+        refresher.start()
+        self.assertTrue(started.wait(5))
+        found = []
+        caller = threading.Thread(
+            target=lambda: found.append(self.api.css('div')))
+        caller.start()
+        caller.join(0.2)
+        self.assertTrue(caller.is_alive())
+        release.set()
+        refresher.join()
+        caller.join()
+        self.assertEqual(found, [[]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from tradingAPI.schema import apply_schema, parse_datetimes, \
+    read_instruments_csv, ORDERS_SCHEMA, POSITIONS_SCHEMA, DIRECTION_DTYPE
+from tradingAPI.utils import BUY, SELL, ORDER_TYPES
+
+
+class TestSchema(unittest.TestCase):
+
+    def test_orders_dtypes(self):
+        """
+        orders are cast to categories, float64 and datetimes
+        """
+        frame = apply_schema(pd.DataFrame({
+            'instrument': ['AAPL', 'AAPL', 'VOD'],
+            'direction': ['Buy', 'SELL', None],
+            'order_type': [ORDER_TYPES.LIMIT] * 3,
+            'quantity': [1, 2.5, None],
+            'timestamp': ['02.01.2024 10:00:00', None, 'oops'],
+            'note': ['a', 'b', 'c'],
+        }), ORDERS_SCHEMA)
+        self.assertEqual(frame['instrument'].dtype, 'category')
+        self.assertEqual(frame['direction'].dtype, DIRECTION_DTYPE)
+        self.assertEqual(frame['direction'].tolist()[:2], [BUY, SELL])
+        self.assertTrue(pd.isna(frame['direction'].iloc[2]))
+        self.assertEqual(frame['quantity'].dtype, 'float64')
+        self.assertEqual(frame['timestamp'].iloc[0],
+                         pd.Timestamp(2024, 1, 2, 10))
+        self.assertTrue(frame['timestamp'].iloc[1:].isna().all())
+        self.assertEqual(frame['note'].tolist(), ['a', 'b', 'c'])
+
+    def test_datetimes_fallback(self):
+        """
+        datetime objects, ISO and day first strings are parsed too
+        """
+        parsed = parse_datetimes(pd.Series([datetime(2024, 1, 2, 10),
+                                            '2024-01-03 11:00:00',
+                                            '04/01/2024 12:00']))
+        self.assertEqual(parsed.tolist(), [pd.Timestamp(2024, 1, 2, 10),
+                                           pd.Timestamp(2024, 1, 3, 11),
+                                           pd.Timestamp(2024, 1, 4, 12)])
+        frame = apply_schema(pd.DataFrame({'price': [1.]}), POSITIONS_SCHEMA)
+        self.assertEqual(list(frame.columns), ['price'])
+
+    def test_instruments_csv(self):
+        """
+        the instruments CSV is read into the schema, missing flags False
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'instruments.csv')
+            pd.DataFrame({'name': ['Apple Inc', 'BP'],
+                          'symbol': ['AAPL', 'BP'],
+                          'exchange': ['NASDAQ', None],
+                          'fractional': [True, None]}).to_csv(path,
+                                                             index=False)
+            frame = read_instruments_csv(path)
+        self.assertEqual(frame['symbol'].dtype, 'category')
+        self.assertEqual(frame['fractional'].tolist(), [True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import io
+import math
+import os
+import pickle
+import tempfile
+import unittest
+from datetime import datetime
+
+from tradingAPI.base import Instrument, Position, CFDMarketOrder, \
+    Serializable
+from tradingAPI.serializer import dump_ndjson, iter_ndjson, export_ndjson, \
+    import_ndjson
+from tradingAPI.utils import BUY, SELL, ORDER_STATUS, CFD_ORDER_TYPES
+
+
+def sample_objects():
+    instrument = Instrument.intern('Apple Inc', 'Apple', 'AAPL', 'NASDAQ',
+                                   True)
+    order = CFDMarketOrder(instrument, 2.5, 150.25, BUY,
+                           CFD_ORDER_TYPES.MARKET, 375.6,
+                           datetime(2024, 1, 2, 10, 30), take_profit=160.)
+    order.status = ORDER_STATUS.PLACED
+    order.exchange_id = '42'
+    position = Position(instrument, 3, float('nan'), 'yesterday',
+                        exchange_id=7, direction=SELL)
+    return instrument, order, position
+
+
+class TestSerializer(unittest.TestCase):
+
+    def test_round_trip(self):
+        """
+        objects are rebuilt with their class, fields and derived fields
+        """
+        instrument, order, position = sample_objects()
+        fp = io.StringIO()
+        self.assertEqual(dump_ndjson([order, position], fp), 2)
+        fp.seek(0)
+        order_copy, position_copy = iter_ndjson(fp)
+        self.assertIsInstance(order_copy, CFDMarketOrder)
+        self.assertEqual(order_copy.to_dict().keys(), order.to_dict().keys())
+        for field in ('quantity', 'price', 'status', 'exchange_id',
+                      'api_id', 'take_profit', 'timestamp'):
+            self.assertEqual(getattr(order_copy, field),
+                             getattr(order, field))
+        # the instrument is the interned instance
+        self.assertIs(order_copy.instrument, instrument)
+        # NaN is encoded as None, text timestamps are kept
+        self.assertIsNone(position_copy.price)
+        self.assertEqual(position_copy.timestamp, 'yesterday')
+        self.assertEqual(position_copy.direction, SELL)
+
+    def test_files(self):
+        """
+        plain and gzip files, appended to
+        """
+        instrument, order, position = sample_objects()
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('objects.ndjson', 'objects.ndjson.gz'):
+                path = os.path.join(directory, name)
+                export_ndjson([order], path)
+                export_ndjson([position], path, append=True)
+                objects = import_ndjson(path)
+                self.assertEqual([type(obj) for obj in objects],
+                                 [CFDMarketOrder, Position])
+
+    def test_json_and_pickle(self):
+        """
+        to_json / from_json and pickle keep interned instruments
+        """
+        instrument, order, position = sample_objects()
+        self.assertIs(Serializable.from_json(instrument.to_json()),
+                      instrument)
+        self.assertIs(pickle.loads(pickle.dumps(instrument)), instrument)
+        copy = Serializable.from_json(order.to_json())
+        self.assertEqual(copy.price, order.price)
+        self.assertFalse(math.isnan(copy.quantity))
+
+
+if __name__ == '__main__':
+    unittest.main()
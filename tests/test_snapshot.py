@@ -0,0 +1,140 @@
+import unittest
+
+from tradingAPI import exceptions
+from tradingAPI.low_level import LowLevelAPI
+from tradingAPI.snapshot import DomSnapshot, compile_xpath, select_xpath, \
+    is_hidden
+
+PAGE = '''
+<html><head><title>page</title></head><body>
+<div id="panel" class="panel main">
+  <div class="row"><span>A1</span><span>A2</span></div>
+  <div class="row" data-code="TSLA"><span>B1</span><span>B2</span></div>
+  <div class="row warning-row"><div><span>C1</span></div></div>
+</div>
+<div id="hidden" hidden><span class="row">hidden</span></div>
+<p id="styled" style="color: red; DISPLAY : none">gone</p>
+<p id="text">shown <b style="visibility:hidden">not</b> <i>here</i>
+  <script>var x;</script></p>
+<input id="secret" type="hidden" value="1">
+</body></html>
+'''
+
+
+def texts(elements):
+    return [element.text for element in elements]
+
+
+class TestXPath(unittest.TestCase):
+
+    def setUp(self):
+        self.root = DomSnapshot(PAGE).root
+
+    def test_compile(self):
+        """
+        xpaths compile to anchored steps, outside the subset they raise
+        """
+        absolute, steps = compile_xpath('//*[@id="panel"]/div[2]')
+        self.assertTrue(absolute)
+        self.assertEqual(steps, [(True, True, [('equals', ('id', 'panel'))]),
+                                 (False, 'div', [('position', 2)])])
+        self.assertFalse(compile_xpath('.//span')[0])
+        self.assertIs(compile_xpath('.//span'), compile_xpath('.//span'))
+        for xpath in ('//div[last()]', '//div/..', 'div', '//div[@id]'):
+            with self.assertRaises(ValueError):
+                compile_xpath(xpath)
+
+    def test_positions_per_parent(self):
+        """
+        positions count the children of each parent, as in XPath
+        """
+        self.assertEqual(texts(self.root.find_elements_by_xpath(
+            '//*[@id="panel"]/div/span[2]')), ['A2', 'B2'])
+        self.assertEqual(texts(self.root.find_elements_by_xpath(
+            '//div[@id="panel"]/div[3]//span')), ['C1'])
+        self.assertEqual(texts(self.root.find_elements_by_xpath(
+            '//div[@data-code="TSLA"]/span[1]')), ['B1'])
+
+    def test_contains_class(self):
+        """
+        contains matches a substring of the whole class attribute
+        """
+        rows = self.root.find_elements_by_xpath(
+            '//*[contains(@class, "row")]')
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(texts(self.root.find_elements_by_xpath(
+            '//*[contains(@class, "warning")]//span')), ['C1'])
+
+    def test_subtree(self):
+        """
+        a subtree answers relative xpaths only, without itself
+        """
+        panel = self.root.find_elements_by_css_selector('#panel')[0]
+        snapshot = DomSnapshot(panel.get_attribute('outerHTML'),
+                               source=panel)
+        self.assertEqual(len(snapshot.xpath('./div')), 3)
+        self.assertEqual(snapshot.xpath('.//*[@id="panel"]'), [])
+        with self.assertRaises(ValueError):
+            snapshot.xpath('//div')
+        # duplicates of nested contexts are found once
+        self.assertEqual(len(select_xpath(snapshot.root.tag, './/span')), 5)
+
+
+class TestHidden(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = DomSnapshot(PAGE)
+
+    def element(self, css):
+        return self.snapshot.css(css)[0]
+
+    def test_is_hidden(self):
+        """
+        the hidden attribute, inline styles and hidden inputs hide
+        """
+        for css in ('#hidden', '#styled', '#secret', 'script', 'head'):
+            self.assertTrue(is_hidden(self.element(css).tag), css)
+        self.assertFalse(is_hidden(self.element('#text').tag))
+
+    def test_text_and_displayed(self):
+        """
+        hidden subtrees have no text and are not displayed
+        """
+        self.assertEqual(self.element('#text').text, 'shown here')
+        hidden = self.element('#hidden span')
+        self.assertFalse(hidden.is_displayed())
+        self.assertEqual(hidden.text, '')
+        self.assertEqual(hidden.get_attribute('textContent'), 'hidden')
+        self.assertEqual(self.element('#styled').text, '')
+        self.assertTrue(self.element('#panel span').is_displayed())
+
+    def test_read_only(self):
+        """
+        actions need the live page
+        """
+        with self.assertRaises(exceptions.BrowserException):
+            self.element('#panel').click()
+
+
+class TestSessionSnapshot(unittest.TestCase):
+
+    def test_queries_answered_locally(self):
+        """
+        inside the block the page is read once, queries are local
+        """
+        page = type('Page', (), {'page_source': PAGE})
+        api = LowLevelAPI()
+        api.browser = page()
+        with api.snapshot() as snapshot:
+            rows = api.css('div.row')
+            self.assertEqual(texts(api.css('span', rows[1])), ['B1', 'B2'])
+            self.assertEqual(texts(api.xpath('//*[@id="panel"]/div[1]/span')),
+                             ['A1', 'A2'])
+            self.assertTrue(api.is_css('#secret'))
+        self.assertIsNone(api._snapshot)
+        self.assertEqual(len(rows), 3)
+        self.assertIs(rows[0].tag.parent, snapshot.root.tag.find(id='panel'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from types import SimpleNamespace
+
+import pandas as pd
+
+from tradingAPI import exceptions
+from tradingAPI.base import AccountSnapshot, Instrument
+from tradingAPI.utils import BUY, SELL, TRADING_MODES
+from tradingAPI.validation import PreTradeValidator
+
+MODE = TRADING_MODES.INVEST
+
+
+class FakeAPI(object):
+    """Session holding the positions, orders and funds checked against"""
+    def __init__(self, free_funds=1000.):
+        self.trading_mode = MODE
+        self.positions = {MODE: pd.DataFrame(
+            {'instrument': ['WHOLE'], 'quantity': [10.], 'direction': [BUY]})}
+        self.placed_orders = {MODE: pd.DataFrame(
+            {'instrument': ['WHOLE'], 'quantity': [4.],
+             'direction': [SELL]})}
+        self.free_funds = free_funds
+        self.instruments = {
+            'WHOLE': Instrument.intern('Whole Ltd', 'WHOLE', 'WHOLE',
+                                       'TEST', False),
+            'FRAC': Instrument.intern('Frac Ltd', 'FRAC', 'FRAC', 'TEST',
+                                      True)}
+
+    def find_instrument(self, name):
+        return self.instruments.get(name)
+
+    def get_account_snapshot(self):
+        return AccountSnapshot(self.free_funds, 0., None, None, None, 0.)
+
+
+class TestPreTradeValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeAPI()
+        self.validator = PreTradeValidator(self.api)
+
+    def tearDown(self):
+        for key in ('WHOLE', 'FRAC'):
+            self.validator.bounds.pop(key, None)
+
+    def test_fractional_shares(self):
+        """
+        fractional shares of a whole shares instrument are floored or raised
+        """
+        self.assertEqual(self.validator.check('WHOLE', 2.7, 10.), 2.)
+        self.assertEqual(self.validator.check('FRAC', 2.7, 10.), 2.7)
+        with self.assertRaises(exceptions.FractionalShares) as raised:
+            self.validator.check('WHOLE', 2.7, 10., clamp=False)
+        self.assertEqual(raised.exception.quant, 2.)
+
+    def test_learned_bounds(self):
+        """
+        quantities are clamped into the learned bounds
+        """
+        self.validator.bounds['FRAC'] = {'min': 1., 'max': 5.}
+        self.assertEqual(self.validator.check('FRAC', 8, 1.), 5.)
+        self.assertEqual(self.validator.check('FRAC', .5, 1.), 1.)
+        with self.assertRaises(exceptions.MaxQuantLimit):
+            self.validator.check('FRAC', 8, 1., clamp=False)
+        with self.assertRaises(exceptions.MinQuantLimit):
+            self.validator.check('FRAC', .5, 1., clamp=False)
+
+    def test_funds(self):
+        """
+        buys are limited by the free funds
+        """
+        self.assertEqual(self.validator.check('FRAC', 50, 100.), 10.)
+        self.assertEqual(self.validator.check('WHOLE', 50, 300.), 3.)
+        with self.assertRaises(exceptions.InsufficientFunds):
+            self.validator.check('FRAC', 50, 100., clamp=False)
+        self.api.free_funds = 0.
+        with self.assertRaises(exceptions.InsufficientFunds):
+            self.validator.check('FRAC', 1, 100.)
+
+    def test_by_value(self):
+        """
+        order values are checked as shares and returned as values
+        """
+        self.assertEqual(self.validator.check('FRAC', 5000., 100.,
+                                              by_value=True), 1000.)
+        # nothing to check without a price
+        self.assertEqual(self.validator.check('FRAC', 5000., None,
+                                              by_value=True), 5000.)
+
+    def test_sell_held_shares(self):
+        """
+        sells are limited to the shares held and not already being sold
+        """
+        self.assertEqual(self.validator.check('WHOLE', 10, 1., SELL), 6.)
+        with self.assertRaises(exceptions.InsufficientFunds):
+            self.validator.check('FRAC', 1, 1., SELL)
+
+    def test_cfd_unchecked(self):
+        """
+        CFD orders are not checked against the funds
+        """
+        self.api.trading_mode = TRADING_MODES.CFD
+        self.assertEqual(self.validator.check('FRAC', 1e6, 100.), 1e6)
+
+
+if __name__ == '__main__':
+    unittest.main()
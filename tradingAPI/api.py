@@ -1,8 +1,15 @@
-from bs4 import BeautifulSoup
+import re
+
+from selenium.webdriver.common.action_chains import ActionChains
 from .links import dommap
+from .parsers import parse_tradeboxes
+from .scripts import WATCHLIST_NAMES
 # exceptions
 from tradingAPI import exceptions
 from .low_level import LowLevelAPI
+from .utils import w, format_float, TRADING_MODES, ORDER_TYPES, \
+    CFD_ORDER_TYPES, synchronized
+from .indicators import IndicatorEngine
 from tradingAPI.base import Stock
 
 # logging
@@ -16,12 +23,34 @@ class API(LowLevelAPI):
     def __init__(self):
         super().__init__()
         self.preferences = []
-        self.stocks = []
+        # Stock instances by product name
+        self.stocks = {}
+        # indicators of the stocks, updated by checkStock
+        self.indicators = IndicatorEngine()
+        self._prefs_key = None
+        self._prefs_pattern = None
 
+    @synchronized
     def addMov(self, product, quantity=None, mode="buy", stop_limit=None,
                auto_margin=None, name_counter=None):
         """main function for placing movements
-        stop_limit = {'gain': [mode, value], 'loss': [mode, value]}"""
+        stop_limit = {'gain': [mode, value], 'loss': [mode, value]}
+
+        A market order through the order window of the current trading
+        mode, filled with a single script call.
+
+        Args:
+            product (str): Instrument, as for the order windows
+            quantity (float): Number of shares, exclusive with auto_margin
+            mode (str): 'buy' or 'sell'
+            stop_limit (dict): Take profit / stop loss, CFD only
+            auto_margin (float): Margin (CFD) or value (INVEST) to use,
+                exclusive with quantity
+
+        Returns:
+            (Order): The placed order, False if the market is closed or
+                the order could not be confirmed
+        """
         # ~ ARGS ~
         if (not isinstance(product, type('')) or
                 (not isinstance(name_counter, type('')) and
@@ -35,132 +64,233 @@ class API(LowLevelAPI):
         elif quantity is None and auto_margin is None:
             raise ValueError("need at least one quantity")
         # ~ MAIN ~
+        # validate locally before any UI action
+        if quantity is not None:
+            quote = self.get_quote(product)
+            quantity = self.validator.check(
+                product, quantity, price=getattr(
+                    quote, 'ask' if mode == 'buy' else 'bid', None),
+                direction=mode)
         # open new window
-        mov = self.new_pos_window(product)
+        if self.trading_mode == TRADING_MODES.CFD:
+            mov = self.new_cfd_order_window(product, CFD_ORDER_TYPES.MARKET)
+        else:
+            mov = self.new_invest_order_window(product, ORDER_TYPES.MARKET)
         mov.open()
-        mov.set_mode(mode)
-        # set quantity
-        if quantity is not None:
-            mov.set_quantity(quantity)
+        placed = False
+        try:
+            if auto_margin is not None:
+                # auto_margin calculate quantity (how simple!)
+                mov.fill(mode, 1, stop_limit=stop_limit)
+                unit_value = (mov.get_margin_info() if
+                              self.trading_mode == TRADING_MODES.CFD else
+                              mov.get_price())
+                quantity = self.validator.check(
+                    product, auto_margin / unit_value, mov.get_price(), mode)
+                mov.fill(quantity=quantity)
+            else:
+                mov.fill(mode, quantity, stop_limit=stop_limit)
             # for best performance in long times
+            margin = (mov.get_margin_info() if
+                      self.trading_mode == TRADING_MODES.CFD else
+                      mov.get_price() * mov.quantity)
+            # confirm
             try:
-                margin = mov.get_unit_value() * quantity
-            except TimeoutError:
-                mov.close()
-                logger.warning("market closed for %s" % mov.product)
-                return False
-        # auto_margin calculate quantity (how simple!)
-        elif auto_margin is not None:
-            unit_value = mov.get_unit_value()
-            mov.set_quantity(auto_margin * unit_value)
-            margin = auto_margin
-        # stop limit (how can be so simple!)
-        if stop_limit is not None:
-            mov.set_limit('gain', stop_limit['gain'][0], stop_limit['gain'][1])
-            mov.set_limit('loss', stop_limit['loss'][0], stop_limit['loss'][1])
-        # confirm
-        try:
-            mov.confirm()
-        except (exceptions.MaxQuantLimit, exceptions.MinQuantLimit) as e:
-            logger.warning(e.err)
-            # resolve immediately
-            mov.set_quantity(e.quant)
-            mov.confirm()
+                mov.confirm()
+            except (exceptions.MaxQuantLimit, exceptions.MinQuantLimit,
+                    exceptions.FractionalShares) as e:
+                logger.warning(e.err)
+                # resolve immediately
+                mov.fill(quantity=e.quant)
+                mov.confirm()
+            placed = True
+        except exceptions.MarketClosed:
+            logger.warning("market closed for %s" % product)
+            return False
+        except exceptions.InsufficientFunds:
+            # logged when raised
+            return False
         except Exception:
             logger.exception('undefined error in movement confirmation')
-        mov_logger.info(f"added {mov.product} movement of {mov.quantity} " +
+            return False
+        finally:
+            # a window left open by a failure would block the next order
+            if not placed and mov.state in ('open', 'opening'):
+                mov.close()
+        mov_logger.info(f"added {product} movement of {mov.quantity} " +
                         f"with margin of {margin}")
-        mov_logger.debug(f"stop_limit: {stop_limit}")
-
-#         return {'margin': margin, 'name': name}
+        mov_logger.debug("stop_limit: %s", stop_limit)
+        return self.orders[-1]
 
+    @synchronized
     def checkPos(self):
-        """check all positions"""
-        soup = BeautifulSoup(self.css1(dommap['movs-table']).html,
-                             'html.parser')
-        poss = []
-        for label in soup.find_all("tr"):
-            pos_id = label['id']
-            # init an empty list
-            # check if it already exist
-            pos_list = [x for x in self.positions if x.id == pos_id]
-            if pos_list:
-                # and update it
-                pos = pos_list[0]
-                pos.update(label)
-            else:
-                pos = self.new_pos(label)
-            pos.get_gain()
-            poss.append(pos)
-        # remove old positions
-        self.positions.clear()
-        self.positions.extend(poss)
-        logger.debug("%d positions update" % len(poss))
-        return self.positions
+        """check all positions, with their live result
 
+        Returns:
+            (pd.DataFrame): Positions of the current mode, with
+                current_price, value, result and margin columns
+        """
+        self.load_positions()
+        risk = self.refresh_pnl()
+        logger.debug("%d positions update, risk %s",
+                     len(self.positions[self.trading_mode]), risk)
+        return self.pnl.frame()
+
+    def _preferences_pattern(self):
+        """Regex matching any preference, recompiled when they change"""
+        key = tuple(self.preferences)
+        if self._prefs_key != key:
+            self._prefs_key = key
+            self._prefs_pattern = re.compile(
+                '|'.join(re.escape(pref) for pref in key), re.IGNORECASE)
+        return self._prefs_pattern
+
+    @synchronized
     def checkStock(self):
         """check stocks in preference"""
         if not self.preferences:
             logger.debug("no preferences")
             return None
-        soup = BeautifulSoup(
-            self.xpath(dommap['stock-table'])[0].html, "html.parser")
-        count = 0
+        html = (self.xpath(dommap['stock-table'])[0]
+                .get_attribute('outerHTML'))
+        pattern = self._preferences_pattern()
+        updated = []
         # iterate through product in left panel
-        for product in soup.select("div.tradebox"):
-            prod_name = product.select("span.instrument-name")[0].text
-            stk_name = [x for x in self.preferences
-                        if x.lower() in prod_name.lower()]
-            if not stk_name:
+        for box in parse_tradeboxes(html):
+            name = box.name
+            if not pattern.search(name):
                 continue
-            name = prod_name
-            if not [x for x in self.stocks if x.product == name]:
-                self.stocks.append(Stock(name))
-            stock = [x for x in self.stocks if x.product == name][0]
-            if 'tradebox-market-closed' in product['class']:
-                stock.market = False
+            stock = self.stocks.get(name)
+            if stock is None:
+                stock = self.stocks[name] = Stock(name)
+            stock.market = not box.market_closed
             if not stock.market:
-                logger.debug("market closed for %s" % stock.product)
+                logger.debug("market closed for %s", stock.product)
                 continue
-            sell_price = product.select("div.tradebox-price-sell")[0].text
-            buy_price = product.select("div.tradebox-price-buy")[0].text
-            sent = int(product.select(dommap['sent'])[0].text.strip('%')) / 100
-            stock.new_rec([sell_price, buy_price, sent])
-            count += 1
-        logger.debug(f"added %d stocks" % count)
+            # prices are floats from both sources, the DOM fills in the
+            # sides missing from the quote
+            quote = self.get_quote(name)
+            sell_price = quote.bid if quote is not None else None
+            buy_price = quote.ask if quote is not None else None
+            if sell_price is None and box.sell is not None:
+                sell_price = format_float(box.sell)
+            if buy_price is None and box.buy is not None:
+                buy_price = format_float(box.buy)
+            stock.new_rec([sell_price, buy_price, box.sentiment])
+            updated.append(stock)
+        # one vectorized step for all the stocks of the tick
+        self.indicators.update_from_stocks(updated)
+        logger.debug("added %d stocks", len(updated))
         return self.stocks
 
-    def addPrefs(self, prefs=[]):
-        self.preferences.extend(prefs)
+    def get_indicators(self, name=None):
+        """Get the indicators of the checked stocks
+
+        Args:
+            name (str): Product name, all the stocks if None
+
+        Returns:
+            (Indicators): The indicators of name, None if never checked
+            (pd.DataFrame): The indicators of all the stocks, if name is None
+        """
+        if name is None:
+            return self.indicators.frame()
+        return self.indicators.get(name)
+
+    @synchronized
+    def get_watchlist(self):
+        """Get the names shown in the watchlist, with a single script call
+
+        Returns:
+            (list <str>): Instrument names, in tradebox order
+        """
+        return self.browser.execute_script(WATCHLIST_NAMES,
+                                           dommap['tradebox-name'])
+
+    @synchronized
+    def sync_watchlist(self, target_symbols, remove_unknown=False):
+        """Make the watchlist hold the target instruments
+
+        The current watchlist is read in one call and only the difference is
+        added or removed. Only the items resolving to an instrument outside
+        the targets are removed, the ones that can't be resolved are kept.
+
+        Args:
+            target_symbols (iterable <str>): Symbols (or short names / names)
+                of the instruments to watch
+            remove_unknown (bool): Remove also the items that can't be
+                resolved to an instrument
+
+        Returns:
+            (dict): 'added' and 'removed' lists of instrument names,
+                'unresolved' list of the targets not found
+        """
+        targets = {}
+        unresolved = []
+        for identifier in target_symbols:
+            instrument = self.find_instrument(identifier)
+            if instrument is None:
+                logger.warning("%s not in the instruments list" % identifier)
+                unresolved.append(identifier)
+                continue
+            targets[instrument.symbol] = instrument
+        current = self.get_watchlist()
+        current_symbols = set()
+        to_remove = []
+        for index, name in enumerate(current):
+            instrument = self.find_instrument(name)
+            if instrument is None:
+                if remove_unknown:
+                    to_remove.append((index, name))
+            elif instrument.symbol in targets:
+                current_symbols.add(instrument.symbol)
+            else:
+                to_remove.append((index, name))
+        to_add = [instrument for symbol, instrument in targets.items()
+                  if symbol not in current_symbols]
+        # Remove from the bottom so the indexes of the others don't change
+        if to_remove:
+            tradeboxes = self.css(dommap['tradebox'])
+            for index, name in reversed(to_remove):
+                ActionChains(self.browser).context_click(
+                    tradeboxes[index]).perform()
+                w()
+                self.css1(dommap['tradebox-remove']).click()
+                w()
+        if to_add:
+            self.css1(dommap['search-btn']).click()
+            for instrument in to_add:
+                search = self.css1(dommap['search-pref'])
+                search.clear()
+                search.send_keys(instrument.symbol)
+                self.css1(dommap['pref-icon']).click()
+                btn = self.css1(dommap['watchlist-add'])
+                if self.css1('svg', btn).get_attribute('class') is not None:
+                    btn.click()
+                # remove window
+                self.css1(dommap['pref-icon']).click()
+            # close finally
+            self.css1(dommap['back-btn']).click()
+            self.css1(dommap['back-btn']).click()
+        self.preferences = [instrument.short_name
+                            for instrument in targets.values()]
+        logger.debug("watchlist synced: %d added, %d removed",
+                     len(to_add), len(to_remove))
+        return {'added': [instrument.short_name for instrument in to_add],
+                'removed': [name for index, name in to_remove],
+                'unresolved': unresolved}
 
+    @synchronized
     def clearPrefs(self):
         """clear the left panel and preferences"""
-        self.preferences.clear()
-        tradebox_num = len(self.css('div.tradebox'))
-        for i in range(tradebox_num):
-            self.xpath(dommap['trade-box'])[0].right_click()
-            self.css1('div.item-trade-contextmenu-list-remove').click()
+        self.sync_watchlist([], remove_unknown=True)
         logger.info("cleared preferences")
 
+    @synchronized
     def addPrefs(self, prefs=[]):
         """add preference in self.preferences"""
         if len(prefs) == len(self.preferences) == 0:
             logger.debug("no preferences")
             return None
-        self.preferences.extend(prefs)
-        self.css1(dommap['search-btn']).click()
-        count = 0
-        for pref in self.preferences:
-            self.css1(dommap['search-pref']).fill(pref)
-            self.css1(dommap['pref-icon']).click()
-            btn = self.css1('div.add-to-watchlist-popup-item .icon-wrapper')
-            if not self.css1('svg', btn)['class'] is None:
-                btn.click()
-                count += 1
-            # remove window
-            self.css1(dommap['pref-icon']).click()
-        # close finally
-        self.css1(dommap['back-btn']).click()
-        self.css1(dommap['back-btn']).click()
-        logger.debug("updated %d preferences" % count)
+        self.sync_watchlist(self.get_watchlist() + list(prefs))
         return self.preferences
@@ -1,36 +1,142 @@
 import json
+import math
+import threading
+from collections import namedtuple
+from datetime import datetime
 
 from tradingAPI.utils import ORDER_STATUS, ORDER_TYPES, CFD_ORDER_TYPES, BUY
 
+# Serializable classes by name, used when decoding
+SERIALIZABLE_CLASSES = {}
+
+
+def encode_value(value):
+    """Encode a field value into a JSON compatible value
+
+    Nested Serializable objects become dicts (no double encoding),
+    datetimes become ISO strings and NaN / inf floats become None.
+    """
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, Serializable):
+        return value.to_serializable()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        # numpy / pandas scalars
+        return encode_value(value.item())
+    if isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: encode_value(v) for k, v in value.items()}
+    return str(value)
+
+
+def _none_if_nan(value):
+    """Scraped frames hold missing strings as NaN, normalise them to None"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def decode_value(value):
+    """Decode a value encoded by encode_value, rebuilding nested objects"""
+    if isinstance(value, dict) and value.keys() == {'cls', 'fields'}:
+        return Serializable.from_serializable(value)
+    return value
+
 
 class Serializable(object):
-    """Mixin that provides to_json method."""
-    def to_json(self):
-        data = {
+    """Mixin that provides to_json method.
+
+    Subclasses declare their fields in __slots__, collected in FIELDS.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    # Fields holding datetimes, parsed back from ISO strings when decoding
+    DATETIME_FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        SERIALIZABLE_CLASSES[cls.__name__] = cls
+        fields = []
+        for klass in reversed(cls.__mro__):
+            for slot in klass.__dict__.get('__slots__', ()):
+                if not slot.startswith('__') and slot not in fields:
+                    fields.append(slot)
+        cls.FIELDS = tuple(fields)
+
+    def to_serializable(self):
+        """Get a JSON compatible dict, with class name and encoded fields"""
+        return {
             'cls': self.__class__.__name__,
-            'fields': self.__dict__
+            'fields': {k: encode_value(v) for k, v in self.to_dict().items()}
         }
 
-        def json_func(value):
-            if isinstance(value, Serializable):
-                return json.loads(value.to_json())
-            return str(value)
+    def to_json(self):
+        return json.dumps(self.to_serializable())
+
+    @staticmethod
+    def from_serializable(data):
+        """Rebuild an object from the output of to_serializable
+
+        The constructor is bypassed, so derived fields (e.g. status or API ID
+        of orders) are restored as they were.
+
+        Args:
+            data (dict): Dict with 'cls' and 'fields'
+
+        Returns:
+            (Serializable): The decoded instance
+        """
+        cls = SERIALIZABLE_CLASSES[data['cls']]
+        fields = {}
+        for field, value in data['fields'].items():
+            if field in cls.DATETIME_FIELDS and isinstance(value, str):
+                try:
+                    value = datetime.fromisoformat(value)
+                except ValueError:
+                    # timestamps scraped as text are kept as they are
+                    pass
+            fields[field] = decode_value(value)
+        return cls._from_fields(fields)
+
+    @classmethod
+    def _from_fields(cls, fields):
+        """Create an instance bypassing the constructor"""
+        obj = cls.__new__(cls)
+        for field, value in fields.items():
+            setattr(obj, field, value)
+        return obj
 
-        return json.dumps(data, default=json_func)
+    @classmethod
+    def from_json(cls, json_data):
+        return cls.from_serializable(json.loads(json_data))
 
     @classmethod
     def from_dict(cls, dict_data):
         return cls(**dict_data)
 
     def to_dict(self):
-        return self.__dict__
+        return {field: getattr(self, field, None) for field in self.FIELDS}
 
     def __repr__(self):
-        return json.dumps(self.__dict__, default=lambda o: str(o))
+        return json.dumps({k: encode_value(v)
+                           for k, v in self.to_dict().items()})
+
+
+# Equity fields of the account, time is the epoch when they were read
+AccountSnapshot = namedtuple('AccountSnapshot', [
+    'free_funds', 'blocked_funds', 'account_value', 'live_result',
+    'used_margin', 'time'])
 
 
 class Stock(object):
     """base class for stocks"""
+    __slots__ = ('product', 'market', 'records')
+
     def __init__(self, product):
         self.product = product
         self.market = True
@@ -43,14 +149,79 @@ class Stock(object):
 
 
 class Instrument(Serializable):
-    """Class storing an instrument"""
+    """Class storing an instrument
+
+    Instruments are immutable and should be created through intern, so that
+    there is exactly one instance per listing, shared by all orders,
+    positions and quotes. Symbols alone are not unique (e.g. BP is listed
+    both in London and New York), so listings are keyed by
+    (name, symbol, exchange); the other fields are refreshed on the shared
+    instance when a listing is interned again with different ones.
+    """
+    __slots__ = ('name', 'short_name', 'symbol', 'exchange', 'fractional')
+    # Interning table of all the instruments created
+    _interned = {}
+    _intern_lock = threading.Lock()
+
     def __init__(self, name, short_name, symbol, exchange=None,
                  fractional=False):
-        self.name = name
-        self.short_name = short_name
-        self.symbol = symbol
-        self.exchange = exchange
-        self.fractional = fractional
+        set_field = super().__setattr__
+        set_field('name', _none_if_nan(name))
+        set_field('short_name', _none_if_nan(short_name))
+        set_field('symbol', _none_if_nan(symbol))
+        set_field('exchange', _none_if_nan(exchange))
+        set_field('fractional', bool(fractional))
+
+    def __setattr__(self, key, value):
+        raise AttributeError('Instrument is immutable')
+
+    def __reduce__(self):
+        return self.__class__.intern, tuple(self.to_dict().values())
+
+    @property
+    def key(self):
+        """Interning key of the instrument"""
+        return self.name, self.symbol, self.exchange
+
+    @classmethod
+    def intern(cls, name, short_name, symbol, exchange=None,
+               fractional=None):
+        """Get the shared instance for a listing, creating it if needed
+
+        The short name and the fractional flag of an existing instance are
+        updated with the ones given, unless they are unknown (None).
+
+        Returns:
+            (Instrument): The interned instrument
+        """
+        key = (_none_if_nan(name), _none_if_nan(symbol),
+               _none_if_nan(exchange))
+        short_name = _none_if_nan(short_name)
+        fractional = _none_if_nan(fractional)
+        with cls._intern_lock:
+            instrument = cls._interned.get(key)
+            if instrument is None:
+                instrument = cls(name, short_name, symbol, exchange,
+                                 bool(fractional))
+                cls._interned[key] = instrument
+                return instrument
+            set_field = super(Instrument, instrument).__setattr__
+            if short_name is not None and short_name != instrument.short_name:
+                set_field('short_name', short_name)
+            if fractional is not None and \
+                    bool(fractional) != instrument.fractional:
+                set_field('fractional', bool(fractional))
+        return instrument
+
+    @classmethod
+    def from_dict(cls, dict_data):
+        return cls._from_fields(dict_data)
+
+    @classmethod
+    def _from_fields(cls, fields):
+        # fields of other versions are ignored
+        return cls.intern(**{field: value for field, value in fields.items()
+                             if field in cls.FIELDS})
 
 
 class Order(Serializable):
@@ -61,6 +232,11 @@ class Order(Serializable):
 
     Will use API ID to retrieve a newly placed order
     """
+    __slots__ = ('instrument', 'quantity', 'direction', 'price', 'cost',
+                 'order_type', 'status', 'exchange_id', 'timestamp', 'api_id',
+                 'limit', 'stop', 'by_value')
+    DATETIME_FIELDS = ('timestamp',)
+
     def __init__(self, instrument, quantity, price, direction, order_type, cost,
                  timestamp):
         """
@@ -84,6 +260,9 @@ class Order(Serializable):
         self.exchange_id = None
         self.timestamp = timestamp
         self.api_id = self.get_api_id()
+        self.limit = None
+        self.stop = None
+        self.by_value = None
 
     def get_api_id(self):
         """Calculates API ID from attributes
@@ -91,11 +270,14 @@ class Order(Serializable):
         Returns:
             (str): API ID
         """
-        return json.dumps([self.direction.upper(), self.instrument.symbol,
-                           self.quantity, self.price, self.timestamp])
+        return json.dumps([encode_value(v) for v in (
+            self.direction.upper(), self.instrument.symbol, self.quantity,
+            self.price, self.timestamp)])
 
 
 class CFDMarketOrder(Order):
+    __slots__ = ('take_profit', 'stop_loss')
+
     def __init__(self, instrument, quantity, price, direction, order_type, cost,
                  timestamp, take_profit=None, stop_loss=None):
         super().__init__(instrument, quantity, price, direction, order_type,
@@ -105,6 +287,8 @@ class CFDMarketOrder(Order):
 
 
 class InvestMarketOrder(Order):
+    __slots__ = ()
+
     def __init__(self, instrument, quantity, price, direction, order_type, cost,
                  timestamp, by_value=None):
         """
@@ -139,6 +323,10 @@ ORDER_CLASS_MAP = {
 
 class Position(Serializable):
     """class-storing position"""
+    __slots__ = ('instrument', 'quantity', 'price', 'timestamp',
+                 'exchange_id', 'direction')
+    DATETIME_FIELDS = ('timestamp',)
+
     def __init__(self, instrument, quantity, price, timestamp,
                  exchange_id=None, direction=BUY):
         self.instrument = instrument
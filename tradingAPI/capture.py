@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.capture
+~~~~~~~~~~~~~~
+
+This module provides the capture of the web app's own JSON traffic.
+
+Chrome's performance log holds the DevTools network events of the page.
+JSON responses matching the URLs in links.capture_urls are kept by kind
+('orders', 'positions', 'account', 'instruments') and trading mode, and
+parsed into the same models the DOM decoders produce. All the DevTools events read from the log
+are also published to observers (e.g. the websocket quote tap).
+"""
+
+import base64
+import json
+import re
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from .base import Instrument, Position, ORDER_CLASS_MAP
+from .exceptions import ProductNotFound
+from .links import capture_urls
+from .patterns import Observable
+from .schema import apply_schema, ORDERS_SCHEMA, POSITIONS_SCHEMA, \
+    INSTRUMENTS_SCHEMA
+from .utils import BUY, SELL, ORDER_TYPES, CFD_ORDER_TYPES, ORDER_STATUS, \
+    TRADING_MODES
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.capture')
+
+# Names used by the web app for each field, in order of preference
+FIELD_ALIASES = {
+    'id': ('id', 'orderId', 'positionId', 'humanId'),
+    'ticker': ('ticker', 'code', 'symbol', 'instrumentCode'),
+    'name': ('name', 'fullName', 'prettyName'),
+    'short_name': ('shortName', 'short_name', 'shortname'),
+    'exchange': ('exchange', 'exchangeName', 'market'),
+    'fractional': ('fractional', 'isFractional', 'fractionalEnabled'),
+    'quantity': ('quantity', 'qty', 'shares'),
+    'price': ('averagePrice', 'price', 'openPrice', 'currentPrice'),
+    'current_price': ('currentPrice', 'current_price', 'price'),
+    'limit': ('limitPrice', 'limit_price'),
+    'stop': ('stopPrice', 'stop_price'),
+    'value': ('value', 'orderValue'),
+    'type': ('type', 'orderType'),
+    'direction': ('direction', 'side'),
+    'timestamp': ('creationTime', 'initialFillDate', 'created', 'date'),
+    'free_funds': ('free', 'freeFunds', 'availableToTrade'),
+    'blocked_funds': ('blocked', 'blockedFunds', 'blockedForOrders'),
+    'account_value': ('total', 'totalValue', 'accountValue'),
+    'live_result': ('ppl', 'result', 'liveResult'),
+    'used_margin': ('margin', 'usedMargin', 'marginUsed'),
+}
+
+ACCOUNT_FIELDS = ('free_funds', 'blocked_funds', 'account_value',
+                  'live_result', 'used_margin')
+
+ORDER_TYPE_MAPS = {
+    TRADING_MODES.CFD: {
+        'MARKET': CFD_ORDER_TYPES.MARKET,
+        'LIMIT': CFD_ORDER_TYPES.LIMIT_STOP,
+        'STOP': CFD_ORDER_TYPES.LIMIT_STOP,
+        'STOP_LIMIT': CFD_ORDER_TYPES.LIMIT_STOP,
+        'OCO': CFD_ORDER_TYPES.OCO,
+    },
+    TRADING_MODES.INVEST: {t: t for t in ORDER_TYPES},
+    TRADING_MODES.ISA: {t: t for t in ORDER_TYPES},
+}
+
+
+def field(item, name, default=None):
+    """Get a field from a payload item, trying all its aliases"""
+    for alias in FIELD_ALIASES[name]:
+        if alias in item and item[alias] is not None:
+            return item[alias]
+    return default
+
+
+def items(payload):
+    """Get the list of items of a payload, unwrapping common envelopes"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in ('items', 'data', 'orders', 'positions', 'instruments'):
+            if isinstance(payload.get(key), list):
+                return payload[key]
+    return []
+
+
+def parse_timestamp(value):
+    """Parse ISO or epoch (ms) timestamps of the payloads"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000)
+    if isinstance(value, str):
+        try:
+            timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+        if timestamp.tzinfo is not None:
+            # naive local time, as get_timestamp
+            timestamp = timestamp.astimezone().replace(tzinfo=None)
+        return timestamp
+    return value
+
+
+class TrafficCapture(Observable):
+    """Latest JSON payloads received by the web app, by kind"""
+    def __init__(self, api, urls=None):
+        """
+        Args:
+            api (LowLevelAPI): Session with performance logging enabled
+            urls (dict): Kind to URL regex. Defaults to links.capture_urls
+        """
+        super().__init__()
+        self.api = api
+        self.urls = {kind: re.compile(pattern) for kind, pattern
+                     in (urls or capture_urls).items()}
+        # (trading mode, kind) -> (time received, decoded payload)
+        self.payloads = {}
+        # requestId -> url of JSON responses waiting for their body
+        self._pending = {}
+
+    def _mode(self):
+        """Trading mode of the session, None if fed without one"""
+        return getattr(self.api, 'trading_mode', None)
+
+    def classify(self, url):
+        """Get the kind of payload served by url, None if not captured"""
+        for kind, pattern in self.urls.items():
+            if pattern.search(url):
+                return kind
+        return None
+
+    def poll(self):
+        """Drain the performance log, storing any new captured payload
+
+        Returns:
+            (int): Number of payloads captured
+        """
+        if getattr(self.api, 'browser', None) is None:
+            return 0
+        captured = 0
+        for entry in self.api.browser.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            method, params = message['method'], message.get('params', {})
+            self.notify_observers(event=method, data=params)
+            if method == 'Network.responseReceived':
+                response = params['response']
+                if ('json' in response.get('mimeType', '') and
+                        self.classify(response['url'])):
+                    self._pending[params['requestId']] = response['url']
+            elif (method == 'Network.loadingFinished' and
+                  params['requestId'] in self._pending):
+                url = self._pending.pop(params['requestId'])
+                try:
+                    body = self.api.browser.execute_cdp_cmd(
+                        'Network.getResponseBody',
+                        {'requestId': params['requestId']})
+                except Exception as e:
+                    logger.debug('could not get body of %s: %s', url, e)
+                    continue
+                if body.get('base64Encoded'):
+                    body['body'] = base64.b64decode(body['body']).decode()
+                captured += self.feed(url, body['body'])
+        return captured
+
+    def feed(self, url, body):
+        """Store a JSON response body received from url
+
+        The payload is kept for the trading mode the session is in. Also used
+        to feed recorded payloads without a browser.
+
+        Args:
+            url (str): URL the response came from
+            body (str): JSON body
+
+        Returns:
+            (bool): True if the payload was captured
+        """
+        kind = self.classify(url)
+        if kind is None:
+            return False
+        try:
+            self.payloads[self._mode(), kind] = (time.time(),
+                                                 json.loads(body))
+        except ValueError:
+            logger.debug('%s did not return valid JSON', url)
+            return False
+        logger.debug('captured %s payload from %s', kind, url)
+        return True
+
+    def latest(self, kind, max_age=None):
+        """Get the latest payload of a kind, for the current trading mode
+
+        Args:
+            kind (str): 'orders', 'positions', 'account' or 'instruments'
+            max_age (float): Ignore payloads older than this, in seconds
+
+        Returns:
+            (mixed): The decoded payload, None if not available
+        """
+        self.poll()
+        key = (self._mode(), kind)
+        if key not in self.payloads:
+            return None
+        received, payload = self.payloads[key]
+        if max_age is not None and time.time() - received > max_age:
+            return None
+        return payload
+
+    def discard(self, kind):
+        """Drop the payload of a kind received so far, for the current mode
+
+        The log is drained first, so only the responses arriving after the
+        call are served again.
+
+        Args:
+            kind (str): 'orders', 'positions', 'account' or 'instruments'
+        """
+        self.poll()
+        self.payloads.pop((self._mode(), kind), None)
+
+    def _get_instrument(self, item):
+        """Map a payload item to an interned Instrument"""
+        ticker = field(item, 'ticker')
+        if ticker is None:
+            raise ValueError('item without ticker')
+        # e.g. AAPL_US_EQ
+        symbol = str(ticker).split('_')[0]
+        try:
+            return self.api.get_instrument(symbol=symbol)
+        except (ProductNotFound, AttributeError, KeyError):
+            return Instrument.intern(
+                name=field(item, 'name', symbol),
+                short_name=field(item, 'short_name', symbol),
+                symbol=symbol, exchange=field(item, 'exchange'),
+                fractional=field(item, 'fractional'))
+
+    def get_orders(self, as_df=False, max_age=None):
+        """Pending orders from the latest payload
+
+        Returns:
+            (mixed): list of Order objects or DataFrame, None if no payload
+        """
+        payload = self.latest('orders', max_age)
+        if payload is None:
+            return None
+        type_map = ORDER_TYPE_MAPS[self.api.trading_mode]
+        orders = []
+        for item in items(payload):
+            try:
+                quantity = float(field(item, 'quantity', 0))
+                order_type = type_map[str(field(item, 'type')).upper()]
+                limit, stop = field(item, 'limit'), field(item, 'stop')
+                cost = field(item, 'value')
+                order = ORDER_CLASS_MAP[order_type](
+                    instrument=self._get_instrument(item),
+                    quantity=abs(quantity),
+                    price=field(item, 'current_price', limit or stop),
+                    direction=str(field(
+                        item, 'direction', SELL if quantity < 0 else BUY)
+                    ).lower(),
+                    order_type=order_type, cost=cost,
+                    timestamp=parse_timestamp(field(item, 'timestamp')))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.debug('skipped captured order %s: %s', item, e)
+                continue
+            order.status = ORDER_STATUS.PLACED
+            order.exchange_id = field(item, 'id')
+            order.limit, order.stop = limit, stop
+            orders.append(order)
+        if as_df:
+            return self._as_df(orders, ORDERS_SCHEMA)
+        return orders
+
+    def get_positions(self, as_df=False, max_age=None):
+        """Open positions from the latest payload
+
+        Returns:
+            (mixed): list of Position objects or DataFrame, None if no payload
+        """
+        payload = self.latest('positions', max_age)
+        if payload is None:
+            return None
+        positions = []
+        for item in items(payload):
+            try:
+                quantity = float(field(item, 'quantity', 0))
+                positions.append(Position(
+                    instrument=self._get_instrument(item),
+                    quantity=abs(quantity), price=field(item, 'price'),
+                    timestamp=parse_timestamp(field(item, 'timestamp')),
+                    exchange_id=field(item, 'id'),
+                    direction=str(field(
+                        item, 'direction', SELL if quantity < 0 else BUY)
+                    ).lower()))
+            except (TypeError, ValueError) as e:
+                logger.debug('skipped captured position %s: %s', item, e)
+        if as_df:
+            return self._as_df(positions, POSITIONS_SCHEMA)
+        return positions
+
+    def get_instruments(self, max_age=None):
+        """Instruments from the latest payload
+
+        Returns:
+            (pd.DataFrame): Instruments dataframe, None if no payload
+        """
+        payload = self.latest('instruments', max_age)
+        if payload is None:
+            return None
+        instruments = []
+        for item in items(payload):
+            ticker = field(item, 'ticker')
+            if ticker is None:
+                continue
+            symbol = str(ticker).split('_')[0]
+            instruments.append(Instrument.intern(
+                name=field(item, 'name', symbol),
+                short_name=field(item, 'short_name', symbol),
+                symbol=symbol, exchange=field(item, 'exchange'),
+                fractional=field(item, 'fractional')).to_dict())
+        return apply_schema(pd.DataFrame(instruments), INSTRUMENTS_SCHEMA)
+
+    def get_account(self, max_age=None):
+        """Account equity fields from the latest payload
+
+        Returns:
+            (dict): Same keys as get_bottom_info, None if no payload
+        """
+        payload = self.latest('account', max_age)
+        if not isinstance(payload, dict):
+            return None
+        account = {}
+        for name in ACCOUNT_FIELDS:
+            value = field(payload, name)
+            try:
+                account[name] = float(value) if value is not None else None
+            except (TypeError, ValueError):
+                logger.debug('invalid captured %s: %r', name, value)
+                account[name] = None
+        return account
+
+    @staticmethod
+    def _as_df(objects, schema):
+        rows = []
+        for obj in objects:
+            row = obj.to_dict()
+            row['instrument'] = obj.instrument.symbol
+            rows.append(row)
+        return apply_schema(pd.DataFrame(rows), schema)
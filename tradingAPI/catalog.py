@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.catalog
+~~~~~~~~~~~~~~
+
+This module provides the instruments catalog shared by all trading modes.
+
+Each listing is held once, with a bitmask of the modes it is available in.
+Refreshes of a mode are recorded as deltas (add, delist, rename) under an
+increasing version number and appended to an NDJSON log, so that writes are
+proportional to the changes and other sessions can catch up incrementally:
+each session reads only the lines appended since its last read, and the
+updates hold a lock on the log, so that two sessions never record the same
+version.
+"""
+
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # no file locks (Windows): one session at a time updates a log
+    fcntl = None
+
+import pandas as pd
+
+from .base import Instrument, Serializable
+from .schema import apply_schema, read_instruments_csv, INSTRUMENTS_SCHEMA
+from .serializer import export_ndjson, import_ndjson, iter_ndjson
+from .utils import TRADING_MODES, INSTRUMENTS_CSV
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.catalog')
+
+MODE_BITS = {
+    TRADING_MODES.CFD: 1,
+    TRADING_MODES.INVEST: 2,
+    TRADING_MODES.ISA: 4,
+}
+
+ADD = 'add'
+DELIST = 'delist'
+RENAME = 'rename'
+
+
+class CatalogDelta(Serializable):
+    """A change of the catalog of a mode
+
+    previous is the instrument before a rename, None for other operations.
+    """
+    __slots__ = ('version', 'op', 'mode', 'instrument', 'previous')
+
+    def __init__(self, version, op, mode, instrument, previous=None):
+        self.version = version
+        self.op = op
+        self.mode = mode
+        self.instrument = instrument
+        self.previous = previous
+
+
+COLUMNS = list(Instrument.FIELDS)
+# Columns identifying a listing, see Instrument.key
+KEY = ['name', 'symbol', 'exchange']
+
+
+def _keys(df):
+    """Listing keys of the rows of an instruments dataframe, as strings"""
+    columns = [df[column].astype(object).fillna('').astype(str)
+               for column in KEY]
+    return columns[0] + '\x1f' + columns[1] + '\x1f' + columns[2]
+
+
+def _instruments(df):
+    """Interned instruments of the rows of an instruments dataframe"""
+    return [Instrument.intern(*row) for row in
+            df.reindex(columns=COLUMNS).itertuples(index=False, name=None)]
+
+
+class InstrumentCatalog(object):
+    """Deduplicated, versioned catalog of the instruments of all modes
+
+    The listings are held in a single dataframe with the instruments schema
+    and a 'modes' column, the bitmask of MODE_BITS they are available in.
+    """
+    def __init__(self, delta_path=None):
+        """
+        Args:
+            delta_path (str): NDJSON log the deltas are appended to. None
+                keeps them in memory only
+        """
+        self.delta_path = delta_path
+        self.version = 0
+        self.df = self._frame(pd.DataFrame(columns=COLUMNS))
+        self.deltas = []
+        # Bytes of the delta log read so far
+        self._offset = 0
+        # (mode, version, dataframe) of the last mode frame built
+        self._frame_cache = None
+
+    @staticmethod
+    def _frame(df, modes=0):
+        df = df.reindex(columns=COLUMNS).drop_duplicates(KEY)
+        df = df.assign(modes=modes).astype({'modes': 'uint8'})
+        return apply_schema(df.reset_index(drop=True), INSTRUMENTS_SCHEMA)
+
+    @classmethod
+    def from_csvs(cls, csv_paths=None, delta_path=None):
+        """Build the catalog from the per-mode CSVs, then replay the log
+
+        Args:
+            csv_paths (dict): Mode to CSV path, default utils.INSTRUMENTS_CSV
+            delta_path (str): Delta log to replay and append to
+
+        Returns:
+            (InstrumentCatalog): The catalog
+        """
+        catalog = cls(delta_path)
+        for mode, csv_path in (csv_paths or INSTRUMENTS_CSV).items():
+            if os.path.isfile(csv_path):
+                catalog.load(mode, read_instruments_csv(csv_path))
+        catalog.sync()
+        return catalog
+
+    def load(self, mode, df):
+        """Add the instruments of a mode as baseline, without deltas"""
+        self._set(mode, add=df)
+
+    def _set(self, mode, add=None, remove=None):
+        """Add / remove listings from a mode, in a few vectorized steps
+
+        Args:
+            mode (str): Field of TRADING_MODES
+            add (pd.DataFrame): Instruments to add to the mode
+            remove (pd.DataFrame): Instruments to remove from the mode
+        """
+        bit = MODE_BITS[mode]
+        keys = _keys(self.df)
+        modes = self.df['modes'].to_numpy().copy()
+        if remove is not None and not remove.empty:
+            modes[keys.isin(_keys(remove)).to_numpy()] &= ~bit & 0xff
+        new = None
+        if add is not None and not add.empty:
+            add_keys = _keys(add)
+            modes[keys.isin(add_keys).to_numpy()] |= bit
+            new = add.loc[~add_keys.isin(keys).to_numpy()]
+        df = self.df.assign(modes=modes)
+        df = df.loc[df['modes'] != 0]
+        if new is not None and not new.empty:
+            df = pd.concat([df, self._frame(new, bit)], ignore_index=True)
+        self.df = apply_schema(df.reset_index(drop=True), INSTRUMENTS_SCHEMA)
+        self._frame_cache = None
+
+    def _apply(self, deltas):
+        """Apply deltas to the listings, grouped by mode"""
+        for mode in MODE_BITS:
+            added, removed = [], []
+            for delta in deltas:
+                if delta.mode != mode:
+                    continue
+                if delta.op == DELIST:
+                    removed.append(delta.instrument.to_dict())
+                else:
+                    added.append(delta.instrument.to_dict())
+                if delta.op == RENAME:
+                    removed.append(delta.previous.to_dict())
+            if added or removed:
+                self._set(mode, pd.DataFrame(added, columns=COLUMNS),
+                          pd.DataFrame(removed, columns=COLUMNS))
+
+    def mask(self, mode):
+        """Boolean mask of the listings available in a mode"""
+        return (self.df['modes'] & MODE_BITS[mode]).to_numpy() != 0
+
+    def count(self, mode):
+        return int(self.mask(mode).sum())
+
+    def frame(self, mode):
+        """Instruments dataframe of a mode, as the per-mode CSVs
+
+        Only the last frame built is cached, until the next change.
+
+        Returns:
+            (pd.DataFrame): Instruments dataframe
+        """
+        cached = self._frame_cache
+        if cached is not None and cached[:2] == (mode, self.version):
+            return cached[2]
+        df = self.df.loc[self.mask(mode), COLUMNS].reset_index(drop=True)
+        self._frame_cache = (mode, self.version, df)
+        return df
+
+    def update(self, mode, df):
+        """Refresh a mode with a newly fetched list of instruments
+
+        Listings gone from the mode are delisted, new ones added. A delisted
+        and an added listing with the same symbol and exchange, and no other
+        listing of that symbol and exchange changing, are a rename.
+
+        The deltas of other sessions are applied first, and the log stays
+        locked until ours are appended.
+
+        Args:
+            mode (str): Field of TRADING_MODES
+            df (pd.DataFrame): Instruments dataframe of the whole mode
+
+        Returns:
+            (list <CatalogDelta>): The deltas recorded, empty if no change
+        """
+        with self._locked():
+            self.sync()
+            return self._update(mode, df)
+
+    def _update(self, mode, df):
+        current = self.df.loc[self.mask(mode), COLUMNS]
+        fetched = df.reindex(columns=COLUMNS).drop_duplicates(KEY)
+        current_keys, fetched_keys = _keys(current), _keys(fetched)
+        removed = _instruments(
+            current.loc[~current_keys.isin(fetched_keys).to_numpy()])
+        added = _instruments(
+            fetched.loc[~fetched_keys.isin(current_keys).to_numpy()])
+        if not added and not removed:
+            return []
+        by_listing = defaultdict(lambda: ([], []))
+        for instrument in removed:
+            by_listing[instrument.key[1:]][0].append(instrument)
+        for instrument in added:
+            by_listing[instrument.key[1:]][1].append(instrument)
+        version = self.version + 1
+        deltas = []
+        renamed = set()
+        for old, new in by_listing.values():
+            if len(old) == 1 and len(new) == 1:
+                deltas.append(CatalogDelta(version, RENAME, mode, new[0],
+                                           old[0]))
+                renamed.update((old[0].key, new[0].key))
+        deltas.extend(CatalogDelta(version, DELIST, mode, instrument)
+                      for instrument in removed
+                      if instrument.key not in renamed)
+        deltas.extend(CatalogDelta(version, ADD, mode, instrument)
+                      for instrument in added
+                      if instrument.key not in renamed)
+        self._record(deltas)
+        logger.info(f'catalog {mode} v{version}: {len(added)} added, '
+                    f'{len(removed)} removed, {len(renamed) // 2} renamed')
+        return deltas
+
+    @contextmanager
+    def _locked(self):
+        """Hold the lock of the delta log, against the other sessions"""
+        if self.delta_path is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.delta_path)),
+                    exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.delta_path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _record(self, deltas):
+        self._apply(deltas)
+        self.deltas.extend(deltas)
+        self.version = deltas[-1].version
+        if self.delta_path is not None:
+            export_ndjson(deltas, self.delta_path, append=True)
+            if not self.delta_path.endswith('.gz'):
+                # locked, nothing else was appended
+                self._offset = os.path.getsize(self.delta_path)
+
+    def _read_log(self):
+        """Deltas of the lines appended to the log since the last read"""
+        if self.delta_path.endswith('.gz'):
+            # compressed, no offsets to start from
+            return import_ndjson(self.delta_path)
+        with open(self.delta_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # a line still being written is read the next time
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        return list(iter_ndjson(data[:end].decode('utf-8').splitlines()))
+
+    def sync(self):
+        """Apply the deltas logged by other sessions since our version
+
+        Only the lines appended since the last sync are parsed.
+
+        Returns:
+            (list <CatalogDelta>): The deltas applied
+        """
+        if self.delta_path is None or not os.path.isfile(self.delta_path):
+            return []
+        deltas = [delta for delta in self._read_log()
+                  if delta.version > self.version]
+        if deltas:
+            self._apply(deltas)
+            self.deltas.extend(deltas)
+            self.version = deltas[-1].version
+        return deltas
+
+    def delta_since(self, version, mode=None):
+        """Get the changes after a version
+
+        Args:
+            version (int): Last version seen by the caller, 0 for all
+            mode (str): Only the changes of this mode
+
+        Returns:
+            (list <CatalogDelta>): Deltas in order
+        """
+        return [delta for delta in self.deltas if delta.version > version
+                and (mode is None or delta.mode == mode)]
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.crawler
+~~~~~~~~~~~~~~
+
+This module provides the sharded crawl of the instruments catalog.
+
+The catalog is split in search queries (shards), crawled in parallel by a
+pool of headless sessions, and the results are merged and deduplicated by
+listing key. The search shows a limited number of results, so a shard
+reaching that limit is split in longer queries, one per next character,
+until each is under the limit. A crawl with a shard still at the limit is
+refused rather than taken as the whole catalog.
+"""
+
+import string
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from tradingAPI import exceptions
+from .schema import apply_schema, INSTRUMENTS_SCHEMA
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.crawler')
+
+# One search per letter and digit covers every instrument name
+DEFAULT_SHARDS = list(string.ascii_uppercase + string.digits)
+
+# Characters appended to a truncated shard to split it
+SPLIT_CHARACTERS = string.ascii_uppercase + string.digits + ' '
+
+# Results shown at most by a search, a shard returning as many is truncated
+SEARCH_RESULT_CAP = 100
+
+# Longest query a shard is split into
+MAX_QUERY_LENGTH = 4
+
+
+def split_shards(shards, workers):
+    """Split shards round-robin into one list of queries per worker"""
+    return [shards[i::workers] for i in range(workers)
+            if shards[i::workers]]
+
+
+def search_shards(search, queries, result_cap=SEARCH_RESULT_CAP,
+                  max_length=MAX_QUERY_LENGTH):
+    """Search a list of queries, splitting the truncated ones
+
+    A query with as many results as result_cap is searched again as one
+    longer query per character of SPLIT_CHARACTERS, down to max_length.
+
+    Args:
+        search (callable): Search of a query, returning its instruments
+        queries (list <str>): Search queries
+        result_cap (int): Results shown at most by a search. None to take
+            every search as complete
+        max_length (int): Longest query to split into
+
+    Returns:
+        (tuple): The instruments found, one per listing, and the queries
+            still truncated at max_length
+    """
+    instruments = {}
+    truncated = []
+    pending = list(queries)
+    while pending:
+        query = pending.pop()
+        found = search(query)
+        logger.debug('shard %s: %d instruments', query, len(found))
+        for instrument in found:
+            instruments.setdefault(instrument.key, instrument)
+        if result_cap is None or len(found) < result_cap:
+            continue
+        if len(query) >= max_length:
+            logger.warning(f'shard {query} returned {len(found)} '
+                           f'instruments, the search limit, at the longest '
+                           f'query: results are likely missing')
+            truncated.append(query)
+            continue
+        logger.debug('shard %s truncated, splitting it', query)
+        pending.extend(query + character for character in SPLIT_CHARACTERS)
+    return list(instruments.values()), truncated
+
+
+def crawl_shards(username, password, trading_mode, queries, is_live=False,
+                 headless=True, result_cap=SEARCH_RESULT_CAP):
+    """Crawl a list of search queries in a new browser session
+
+    Args:
+        result_cap (int): Results shown at most by a search, see
+            search_shards
+
+    Returns:
+        (tuple): The instruments found and the queries still truncated,
+            see search_shards
+    """
+    # imported here as low_level depends on this module
+    from .low_level import LowLevelAPI
+    api = LowLevelAPI()
+    api.launch(headless=headless, lean=True)
+    try:
+        api.login(username, password, trading_mode, is_live, autoload=False)
+        modal = api.new_search_instruments_modal()
+        modal.open()
+        result = search_shards(modal.load_all_instruments, queries,
+                               result_cap)
+        modal.close()
+    finally:
+        api.shutdown()
+    return result
+
+
+class ShardedCatalogCrawler(object):
+    """Crawl the instruments catalog with a pool of browser sessions"""
+    def __init__(self, username, password, trading_mode, is_live=False,
+                 workers=4, shards=None, headless=True,
+                 result_cap=SEARCH_RESULT_CAP):
+        """
+        Args:
+            username (str): Plaintext username
+            password (str): Plaintext password
+            trading_mode (str): Field of TRADING_MODES
+            is_live (bool): Whether live trading or demo. Default False
+            workers (int): Number of parallel sessions. Default 4
+            shards (list <str>): Search queries. Default DEFAULT_SHARDS
+            headless (bool): Whether to run the sessions headless
+            result_cap (int): Results shown at most by a search. Default
+                SEARCH_RESULT_CAP
+        """
+        self.username = username
+        self.password = password
+        self.trading_mode = trading_mode
+        self.is_live = is_live
+        self.workers = workers
+        # the same query twice would only crawl the same results again
+        self.shards = list(dict.fromkeys(shards or DEFAULT_SHARDS))
+        self.headless = headless
+        self.result_cap = result_cap
+
+    def crawl(self):
+        """Crawl all the shards and merge them
+
+        Returns:
+            (pd.DataFrame): Deduplicated instruments dataframe
+
+        Raises:
+            (CatalogTruncated): If a shard still reached the result limit
+            (Exception): The first failure of a worker
+        """
+        groups = split_shards(self.shards, self.workers)
+        logger.info(f'crawling {len(self.shards)} shards with '
+                    f'{len(groups)} workers')
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            results = list(pool.map(
+                lambda queries: crawl_shards(
+                    self.username, self.password, self.trading_mode,
+                    queries, self.is_live, self.headless, self.result_cap),
+                groups))
+        truncated = [query for _, queries in results for query in queries]
+        if truncated:
+            raise exceptions.CatalogTruncated(truncated)
+        return self.merge([instruments for instruments, _ in results])
+
+    @staticmethod
+    def merge(results):
+        """Merge lists of instruments into a deduplicated dataframe"""
+        # the shards overlap, a listing is kept once by its key
+        unique = {}
+        for result in results:
+            for instrument in result:
+                unique.setdefault(instrument.key, instrument)
+        instruments = pd.DataFrame([instrument.to_dict()
+                                    for instrument in unique.values()])
+        if instruments.empty:
+            return instruments
+        instruments = (instruments
+                       .sort_values(['exchange', 'symbol'])
+                       .reset_index(drop=True))
+        return apply_schema(instruments, INSTRUMENTS_SCHEMA)
+
+    def refresh(self, csv_path):
+        """Crawl and write the catalog file
+
+        Returns:
+            (pd.DataFrame): Deduplicated instruments dataframe
+
+        Raises:
+            (CatalogTruncated): If a shard still reached the result limit
+        """
+        instruments = self.crawl()
+        instruments.to_csv(csv_path, index=False)
+        logger.info(f'{len(instruments)} instruments saved to {csv_path}')
+        return instruments
@@ -0,0 +1,747 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.daemon
+~~~~~~~~~~~~~~
+
+This module provides the trade121 daemon and its client.
+
+The daemon owns logged in sessions, so that scripts skip the launch, login
+and autoload of the browser. Requests are newline delimited JSON over a
+Unix socket; each session queues its requests and runs them one at a time,
+as the browser can only run one command at a time. Reads go through the
+RefreshScheduler of the session, so they are served from memory while the
+data is fresh.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .api import API
+from .base import AccountSnapshot, Serializable, encode_value
+from .exceptions import DaemonException
+from .indicators import Indicators
+from .pnl import Risk
+from .quotes import Quote
+from .utils import TRADING_MODES
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.daemon')
+
+# Socket of the daemon, private to the user
+DAEMON_SOCKET = os.environ.get('TRADE121_SOCKET') or os.path.join(
+    tempfile.gettempdir(), f'trade121-{os.getuid()}.sock')
+# Credentials of the session started with the daemon
+USERNAME_ENV = 'TRADE121_USERNAME'
+PASSWORD_ENV = 'TRADE121_PASSWORD'
+
+# Namedtuples returned by the sessions, rebuilt by the client
+RESULT_TUPLES = {cls.__name__: cls for cls in (Quote, AccountSnapshot, Risk,
+                                               Indicators)}
+# Methods of the daemon itself, the others are run by a session
+DAEMON_METHODS = ('ping', 'login', 'logout', 'shutdown')
+# Methods of Session exposed over the socket
+SESSION_METHODS = ('load_positions', 'load_orders', 'get_account_snapshot',
+                   'get_bottom_info', 'get_quote', 'get_instrument',
+                   'go_to_mode', 'refresh_pnl', 'checkPos', 'get_indicators',
+                   'place_order', 'addMov', 'stats')
+
+
+def _encode_frame(frame):
+    """Columns of a DataFrame as lists, with their dtypes"""
+    columns, dtypes = {}, {}
+    for name, column in frame.items():
+        dtype = column.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            dtypes[name] = {'categories': encode(list(dtype.categories))}
+            column = column.astype(object)
+        elif pd.api.types.is_datetime64_dtype(dtype):
+            # ticks of the unit, NaT included
+            dtypes[name] = str(dtype)
+            column = column.to_numpy().view('int64')
+        else:
+            dtypes[name] = str(dtype)
+        columns[name] = encode_value(list(column))
+    index = None
+    if not isinstance(frame.index, pd.RangeIndex):
+        index = {'name': frame.index.name,
+                 'values': encode_value(list(frame.index))}
+    return {'columns': columns, 'dtypes': dtypes, 'index': index}
+
+
+def _decode_frame(data):
+    columns = {}
+    for name, values in data['columns'].items():
+        dtype = data['dtypes'][name]
+        if isinstance(dtype, dict):
+            columns[name] = pd.Categorical(values,
+                                           categories=dtype['categories'])
+        elif dtype.startswith('datetime64'):
+            columns[name] = np.array(values, dtype='int64').view(dtype)
+        else:
+            columns[name] = pd.Series(values, dtype=dtype)
+    index = data['index']
+    if index is not None:
+        index = pd.Index(index['values'], name=index['name'])
+    frame = pd.DataFrame(columns)
+    if index is not None:
+        frame.index = index
+    return frame
+
+
+def encode(value):
+    """Encode a result into a JSON compatible value
+
+    DataFrames keep their dtypes, namedtuples and Serializable objects keep
+    their class.
+    """
+    if isinstance(value, pd.DataFrame):
+        return {'frame': _encode_frame(value)}
+    if isinstance(value, tuple) and hasattr(value, '_asdict'):
+        return {'tuple': type(value).__name__,
+                'fields': {k: encode(v) for k, v in value._asdict().items()}}
+    if isinstance(value, dict):
+        return {k: encode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [encode(v) for v in value]
+    return encode_value(value)
+
+
+def decode(value):
+    """Decode a value encoded by encode"""
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if value.keys() == {'frame'}:
+        return _decode_frame(value['frame'])
+    if value.keys() == {'tuple', 'fields'}:
+        fields = {k: decode(v) for k, v in value['fields'].items()}
+        if isinstance(fields.get('timestamp'), str):
+            fields['timestamp'] = datetime.fromisoformat(fields['timestamp'])
+        return RESULT_TUPLES[value['tuple']](**fields)
+    if value.keys() == {'cls', 'fields'}:
+        return Serializable.from_serializable(value)
+    return {k: decode(v) for k, v in value.items()}
+
+
+class Session(object):
+    """A logged in session and the queue of its requests"""
+    def __init__(self, name, api, max_queue=100, ttls=None):
+        """
+        Args:
+            name (str): Name of the session
+            api (LowLevelAPI): The logged in session
+            max_queue (int): Requests waiting before new ones are refused
+            ttls (dict): TTL of the refreshed resources, by name
+        """
+        self.name = name
+        self.api = api
+        self.scheduler = api.new_refresh_scheduler(ttls)
+        self.requests = queue.Queue(max_queue)
+        self.served = 0
+        self._worker = threading.Thread(target=self._work, daemon=True,
+                                        name=f'trade121-{name}')
+        self._worker.start()
+
+    def submit(self, method, params):
+        """Queue a request
+
+        Raises:
+            (queue.Full): If max_queue requests are already waiting
+
+        Returns:
+            (Future): The result of the request
+        """
+        future = Future()
+        self.requests.put_nowait((future, getattr(self, method), params))
+        return future
+
+    def _work(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            future, method, params = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                # the background refreshes hold the same lock
+                with self.scheduler.lock:
+                    result = method(**params)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            self.served += 1
+
+    def close(self):
+        """Stop the refreshes and the worker, and quit the browser"""
+        self.scheduler.stop()
+        self.requests.put(None)
+        self._worker.join()
+        self.api.shutdown()
+
+    def status(self):
+        return {'mode': self.api.trading_mode, 'queued': self.requests.qsize(),
+                'served': self.served}
+
+    # Requests, run by the worker
+
+    def load_positions(self, max_age=None):
+        """Positions of the current mode, see RefreshScheduler.get"""
+        self.scheduler.get('positions', max_age)
+        return self.api.positions[self.api.trading_mode]
+
+    def load_orders(self, max_age=None):
+        """Pending orders of the current mode, see RefreshScheduler.get"""
+        self.scheduler.get('orders', max_age)
+        return self.api.placed_orders[self.api.trading_mode]
+
+    def get_account_snapshot(self, max_age=None):
+        return self.api.get_account_snapshot(max_age)
+
+    def get_bottom_info(self, info):
+        return self.api.get_bottom_info(info)
+
+    def get_quote(self, name, max_age=None):
+        if max_age is None:
+            return self.api.get_quote(name)
+        return self.api.get_quote(name, max_age)
+
+    def get_instrument(self, short_name=None, symbol=None, name=None):
+        return self.api.get_instrument(short_name, symbol, name)
+
+    def go_to_mode(self, trading_mode=TRADING_MODES.INVEST, is_live=False,
+                   autoload=True):
+        return self.api.go_to_mode(trading_mode, is_live, autoload)
+
+    def refresh_pnl(self):
+        return self.api.refresh_pnl()
+
+    def checkPos(self, max_age=0):
+        """Positions with their live result, see API.checkPos"""
+        self.scheduler.get('positions', max_age)
+        self.api.refresh_pnl()
+        return self.api.pnl.frame()
+
+    def get_indicators(self, name=None):
+        return self.api.get_indicators(name)
+
+    def place_order(self, name, direction, quantity, order_type=None,
+                    by_value=None, stop_limit=None, limit=None, stop=None):
+        """Place an order through a reusable order window
+
+        Args:
+            name (str): Instrument, as for the order windows
+            direction (str): 'buy' or 'sell'
+            quantity (float): Quantity, or order value if by_value
+            order_type (str): Order type of the mode, default MARKET
+            by_value (bool): Whether quantity is the order value
+            stop_limit (dict): Take profit / stop loss, see OrderWindow.fill
+            limit (float): Limit price, if the window supports it
+            stop (float): Stop price, if the window supports it
+
+        Returns:
+            (Order): The placed order
+        """
+        api = self.api
+        if api.trading_mode == TRADING_MODES.CFD:
+            window = api.new_cfd_order_window(name, order_type or 'MARKET',
+                                              reuse=True)
+        else:
+            window = api.new_invest_order_window(name, order_type or 'MARKET',
+                                                 reuse=True)
+        if window.state != 'open':
+            window.open()
+        window.fill(direction, quantity, by_value, stop_limit)
+        if limit is not None or stop is not None:
+            if not hasattr(window, 'set_target'):
+                raise ValueError('limit and stop prices cannot be set on '
+                                 f'{type(window).__name__}')
+            window.set_target(limit, stop)
+        window.confirm()
+        self.scheduler.request('orders', 'positions', 'account')
+        return api.orders[-1]
+
+    def addMov(self, product, quantity=None, mode='buy', stop_limit=None,
+               auto_margin=None, name_counter=None):
+        self.api.addMov(product, quantity, mode, stop_limit, auto_margin,
+                        name_counter)
+        self.scheduler.request('orders', 'positions', 'account')
+
+    def stats(self):
+        """Refreshes of the resources, see RefreshScheduler.stats"""
+        return self.scheduler.stats()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One connection, one JSON request per line"""
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                request = {}
+                response = {'id': None, 'error': {'type': 'ValueError',
+                                                  'message': str(e)}}
+            else:
+                response = self.server.daemon.handle(request)
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+            if request.get('method') == 'shutdown':
+                return
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon(object):
+    """Long lived owner of sessions, serving them over a Unix socket"""
+    def __init__(self, path=DAEMON_SOCKET, max_queue=100, refresh=False,
+                 ttls=None):
+        """
+        Args:
+            path (str): Unix socket to listen on
+            max_queue (int): Requests waiting per session
+            refresh (bool): Whether to keep the data of the sessions fresh
+                in the background, see RefreshScheduler.start
+            ttls (dict): TTL of the refreshed resources, by name
+        """
+        self.path = path
+        self.max_queue = max_queue
+        self.refresh = refresh
+        self.ttls = ttls
+        self.sessions = {}
+        self.started = time.time()
+        self._server = None
+        self._lock = threading.Lock()
+
+    def add_session(self, name, api):
+        """Serve a logged in session, e.g. a PaperBroker
+
+        Returns:
+            (Session): The session
+        """
+        session = Session(name, api, self.max_queue, self.ttls)
+        if self.refresh:
+            session.scheduler.start()
+        with self._lock:
+            previous = self.sessions.pop(name, None)
+            self.sessions[name] = session
+        if previous is not None:
+            previous.close()
+        logger.info('serving session %s', name)
+        return session
+
+    def start_session(self, name, username, password,
+                      trading_mode=TRADING_MODES.INVEST, is_live=False,
+                      headless=True, lean=True, capture=False):
+        """Launch and log in a new session, see LowLevelAPI.login
+
+        Returns:
+            (Session): The session
+        """
+        api = API()
+        api.launch(headless=headless, lean=lean, capture=capture)
+        try:
+            api.login(username, password, trading_mode, is_live)
+        except BaseException:
+            api.shutdown()
+            raise
+        return self.add_session(name, api)
+
+    def close_session(self, name):
+        with self._lock:
+            session = self.sessions.pop(name)
+        session.close()
+        logger.info('closed session %s', name)
+
+    def _session(self, name=None):
+        if name is None:
+            if len(self.sessions) != 1:
+                raise KeyError('no session given, the daemon has '
+                               f'{len(self.sessions)}')
+            return next(iter(self.sessions.values()))
+        return self.sessions[name]
+
+    def handle(self, request):
+        """Answer a decoded request
+
+        Args:
+            request (dict): id, method, session and params
+
+        Returns:
+            (dict): id and result, or id and error (type and message)
+        """
+        method = request.get('method')
+        params = request.get('params') or {}
+        try:
+            if method in DAEMON_METHODS:
+                result = getattr(self, 'rpc_' + method)(**params)
+            elif method in SESSION_METHODS:
+                session = self._session(request.get('session'))
+                result = session.submit(method, params).result()
+            else:
+                raise AttributeError(f'no method {method}')
+        except queue.Full:
+            error = {'type': 'QueueFull',
+                     'message': f'{self.max_queue} requests waiting'}
+            return {'id': request.get('id'), 'error': error}
+        except BaseException as e:
+            if isinstance(e, (KeyboardInterrupt, SystemExit)):
+                raise
+            logger.debug('%s failed: %r', method, e)
+            error = {'type': type(e).__name__, 'message': str(e)}
+            return {'id': request.get('id'), 'error': error}
+        return {'id': request.get('id'), 'result': encode(result)}
+
+    # Methods of the daemon
+
+    def rpc_ping(self):
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started,
+                'sessions': {name: session.status()
+                             for name, session in self.sessions.items()}}
+
+    def rpc_login(self, username, password, session='default',
+                  trading_mode=TRADING_MODES.INVEST, is_live=False,
+                  headless=True, lean=True, capture=False):
+        self.start_session(session, username, password, trading_mode,
+                           is_live, headless, lean, capture)
+        return self.rpc_ping()
+
+    def rpc_logout(self, session='default'):
+        self.close_session(session)
+        return self.rpc_ping()
+
+    def rpc_shutdown(self):
+        threading.Thread(target=self.stop, daemon=True).start()
+        return True
+
+    # Serving
+
+    def serve_forever(self):
+        """Listen on the socket until stopped
+
+        Raises:
+            (DaemonException): If another daemon listens on the socket
+        """
+        if os.path.exists(self.path):
+            try:
+                DaemonClient(self.path, timeout=1).ping()
+            except DaemonException:
+                # left by a daemon that did not stop cleanly
+                os.unlink(self.path)
+            else:
+                raise DaemonException('AddressInUse',
+                                      f'a daemon listens on {self.path}')
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+        logger.info('listening on %s', self.path)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def start(self):
+        """Serve in a background thread, waiting until listening"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True,
+                                  name='trade121-daemon')
+        thread.start()
+        while self._server is None and thread.is_alive():
+            time.sleep(0.01)
+        return thread
+
+    def stop(self):
+        """Close the sessions and stop serving"""
+        for name in list(self.sessions):
+            try:
+                self.close_session(name)
+            except Exception:
+                logger.exception(f'closing session {name} failed')
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class DaemonClient(object):
+    """Thin client of the daemon, mirroring the API methods
+
+    The reads accept a max_age: data refreshed by the daemon less than
+    max_age seconds ago is returned without touching the browser.
+    """
+    def __init__(self, path=DAEMON_SOCKET, session=None, timeout=None):
+        """
+        Args:
+            path (str): Unix socket of the daemon
+            session (str): Session to use, the only one by default
+            timeout (float): Seconds to wait for each answer
+        """
+        self.path = path
+        self.session = session
+        self.timeout = timeout
+        self._socket = None
+        self._file = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise DaemonException('ConnectionError',
+                                  f'no daemon on {self.path}: {e}')
+        self._socket = sock
+        self._file = sock.makefile('rwb')
+
+    def call(self, method, **params):
+        """Run a method on the daemon
+
+        Raises:
+            (DaemonException): If the daemon is unreachable or the method
+                raised, kind is the name of the exception
+
+        Returns:
+            (mixed): The decoded result
+        """
+        request = {'id': next(self._ids), 'method': method,
+                   'session': self.session, 'params': params}
+        with self._lock:
+            if self._file is None:
+                self._connect()
+            try:
+                self._file.write(json.dumps(request).encode() + b'\n')
+                self._file.flush()
+                line = self._file.readline()
+            except OSError as e:
+                self.close()
+                raise DaemonException('ConnectionError', str(e))
+            if not line:
+                self.close()
+                raise DaemonException('ConnectionError',
+                                      'the daemon closed the connection')
+        response = json.loads(line)
+        if 'error' in response:
+            error = response['error']
+            raise DaemonException(error['type'], error['message'])
+        return decode(response['result'])
+
+    def close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+        self._socket = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Daemon
+
+    def ping(self):
+        """pid, uptime and status of the sessions of the daemon"""
+        return self.call('ping')
+
+    def login(self, username, password, trading_mode=TRADING_MODES.INVEST,
+              is_live=False, session='default', headless=True, lean=True,
+              capture=False):
+        """Start a session in the daemon, see LowLevelAPI.login"""
+        return self.call('login', username=username, password=password,
+                         session=session, trading_mode=trading_mode,
+                         is_live=is_live, headless=headless, lean=lean,
+                         capture=capture)
+
+    def logout(self, session='default'):
+        return self.call('logout', session=session)
+
+    def shutdown(self):
+        """Stop the daemon, closing its sessions"""
+        return self.call('shutdown')
+
+    # Session
+
+    def load_positions(self, max_age=None):
+        """
+        Returns:
+            (pd.DataFrame): Positions of the current mode
+        """
+        return self.call('load_positions', max_age=max_age)
+
+    def load_orders(self, max_age=None):
+        """
+        Returns:
+            (pd.DataFrame): Pending orders of the current mode
+        """
+        return self.call('load_orders', max_age=max_age)
+
+    def get_account_snapshot(self, max_age=None):
+        """
+        Returns:
+            (AccountSnapshot): Equity fields
+        """
+        return self.call('get_account_snapshot', max_age=max_age)
+
+    def get_bottom_info(self, info):
+        return self.call('get_bottom_info', info=info)
+
+    def get_quote(self, name, max_age=None):
+        """
+        Returns:
+            (Quote): Latest quote, None if not available
+        """
+        return self.call('get_quote', name=name, max_age=max_age)
+
+    def get_instrument(self, short_name=None, symbol=None, name=None):
+        return self.call('get_instrument', short_name=short_name,
+                         symbol=symbol, name=name)
+
+    def go_to_mode(self, trading_mode=TRADING_MODES.INVEST, is_live=False,
+                   autoload=True):
+        return self.call('go_to_mode', trading_mode=trading_mode,
+                         is_live=is_live, autoload=autoload)
+
+    def refresh_pnl(self):
+        """
+        Returns:
+            (dict): Unrealized P&L, exposures and used margin, Risk by
+                currency
+        """
+        return self.call('refresh_pnl')
+
+    def checkPos(self, max_age=0):
+        """
+        Returns:
+            (pd.DataFrame): Positions with their live result
+        """
+        return self.call('checkPos', max_age=max_age)
+
+    def get_indicators(self, name=None):
+        return self.call('get_indicators', name=name)
+
+    def place_order(self, name, direction, quantity, order_type=None,
+                    by_value=None, stop_limit=None, limit=None, stop=None):
+        """
+        Returns:
+            (Order): The placed order
+        """
+        return self.call('place_order', name=name, direction=direction,
+                         quantity=quantity, order_type=order_type,
+                         by_value=by_value, stop_limit=stop_limit,
+                         limit=limit, stop=stop)
+
+    def addMov(self, product, quantity=None, mode='buy', stop_limit=None,
+               auto_margin=None, name_counter=None):
+        return self.call('addMov', product=product, quantity=quantity,
+                         mode=mode, stop_limit=stop_limit,
+                         auto_margin=auto_margin, name_counter=name_counter)
+
+    def stats(self):
+        return self.call('stats')
+
+
+def _serve(args):
+    daemon = Daemon(args.socket, args.max_queue, args.refresh)
+    username = os.environ.get(USERNAME_ENV)
+    if username:
+        daemon.start_session(args.session, username,
+                             os.environ.get(PASSWORD_ENV, ''), args.mode,
+                             args.live, not args.show, True, args.capture)
+
+    def stop(signum, frame):
+        threading.Thread(target=daemon.stop, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    daemon.serve_forever()
+
+
+def main(argv=None):
+    """trade121 command line: run the daemon or query it"""
+    parser = argparse.ArgumentParser(
+        prog='trade121', description='Trading 212 sessions kept logged in by '
+        'a daemon, queried over a Unix socket')
+    parser.add_argument('--socket', default=DAEMON_SOCKET,
+                        help='Unix socket of the daemon')
+    parser.add_argument('--session', default=None,
+                        help='session to query, the only one by default')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser(
+        'serve', help=f'run the daemon, logging in as ${USERNAME_ENV} with '
+        f'${PASSWORD_ENV} if set')
+    serve.add_argument('--mode', default=TRADING_MODES.INVEST,
+                       choices=list(TRADING_MODES))
+    serve.add_argument('--live', action='store_true',
+                       help='live account instead of demo')
+    serve.add_argument('--show', action='store_true',
+                       help='show the browser instead of running headless')
+    serve.add_argument('--capture', action='store_true',
+                       help='capture the traffic of the web app')
+    serve.add_argument('--refresh', action='store_true',
+                       help='keep the data fresh in the background')
+    serve.add_argument('--max-queue', type=int, default=100)
+    commands.add_parser('status', help='sessions of the daemon')
+    commands.add_parser('stop', help='stop the daemon')
+    for name in ('positions', 'orders', 'account'):
+        command = commands.add_parser(name, help=f'print the {name}')
+        command.add_argument('--max-age', type=float, default=None,
+                             help='seconds the data may be old')
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        if args.session is None:
+            args.session = 'default'
+        return _serve(args)
+    client = DaemonClient(args.socket, args.session)
+    try:
+        if args.command == 'status':
+            result = client.ping()
+        elif args.command == 'stop':
+            result = client.shutdown()
+        elif args.command == 'positions':
+            result = client.load_positions(args.max_age)
+        elif args.command == 'orders':
+            result = client.load_orders(args.max_age)
+        else:
+            result = client.get_account_snapshot(args.max_age)._asdict()
+    except DaemonException as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    if isinstance(result, pd.DataFrame):
+        print(result.to_string())
+    else:
+        print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,19 +8,64 @@ from tradingAPI.base import CFDMarketOrder, InvestMarketOrder, ORDER_CLASS_MAP,
     Instrument, Position
 from tradingAPI.exceptions import ParsingException
 from tradingAPI.links import dommap
-from tradingAPI.utils import (click, CFD_ORDER_TYPES, format_float,
+from tradingAPI.parsers import parse_number_columns, NUMBER_DETAILS
+from tradingAPI.schema import apply_schema, ORDERS_SCHEMA, POSITIONS_SCHEMA
+from tradingAPI.scripts import FILL_ORDER
+from tradingAPI.utils import (click, fill, CFD_ORDER_TYPES, format_float,
                               num, ORDER_TYPES, w, get_timestamp, BUY,
-                              TRADING_MODES, ORDER_STATUS)
+                              TRADING_MODES, ORDER_STATUS, synchronized)
 
 logger = logging.getLogger('tradingAPI.low_level')
 
+# Numeric cells of the tables, parsed by column
+ORDER_NUMBERS = ('quantity', 'cost', 'price', 'limit', 'stop', 'target_price')
+POSITION_NUMBERS = ('quantity', 'price')
+# Numbers of the order frames, target_price is the limit or stop
+ORDER_FRAME_NUMBERS = ORDER_NUMBERS[:-1]
+
+
+def _number_rows(cells, columns):
+    """Parse the numeric columns of the cells of a table at once
+
+    Args:
+        cells (list <dict>): Texts of each row
+        columns (iterable <str>): Numeric columns
+
+    Returns:
+        (list <dict>): The rows, numbers as float and None where missing,
+            with the currency and separators of each, see
+            parse_number_columns
+    """
+    if not cells:
+        return []
+    frame = parse_number_columns(pd.DataFrame(cells), columns)
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+
+def _number_details(row, columns):
+    """Currency and separators of the numbers of a row of _number_rows"""
+    return {f'{column}_{detail}': row.get(f'{column}_{detail}')
+            for column in columns for detail in NUMBER_DETAILS}
+
 
 class OrderWindow(metaclass=ABCMeta):
-    """Class for new position modal window"""
-    def __init__(self, api, instrument, order_type):
+    """Class for new position modal window
+
+    A reusable window is reset after each confirmed order instead of being
+    concluded, keeping the instrument loaded for the next order.
+
+    The instrument searched is the name passed, the orders placed carry the
+    Instrument it resolves to when the window is opened.
+    """
+    # Order types accepted by the window
+    order_types = ()
+
+    def __init__(self, api, instrument, order_type, reusable=False):
         self.api = api
         self.name = instrument
         self.instrument = instrument
+        self._instrument = None
         self.direction = None
         self.quantity = None
         self.cost = None
@@ -29,9 +74,20 @@ class OrderWindow(metaclass=ABCMeta):
         self.order_control = None
         self.state = 'initialized'
         self.insfu = False
+        self.reusable = reusable
 
+    @synchronized
     def open(self):
-        """Open the new position modal and search for the product"""
+        """Open the new position modal and search for the product
+
+        Raises:
+            (exceptions.ProductNotFound): If the instrument is not listed or
+                not found by the search
+        """
+        if self._instrument is None:
+            self._instrument = self.api.find_instrument(self.instrument)
+            if self._instrument is None:
+                raise exceptions.ProductNotFound(self.instrument)
         self.state = 'opening'
         if self.api.css1(dommap['add-mov']).is_displayed():
             self.api.css1(dommap['add-mov']).click()
@@ -52,8 +108,17 @@ class OrderWindow(metaclass=ABCMeta):
         # Set the quantity order control element
         self.set_order_control()
 
-    def set_order_control(self):
-        """Set order control div"""
+    def set_order_control(self, order_type=None):
+        """Set order control div
+
+        Args:
+            order_type (str): Switch to this order type. Default keeps the
+                current one
+        """
+        if order_type is not None:
+            if order_type not in list(self.order_types):
+                raise ValueError(f'Order mode invalid for {self.instrument}')
+            self.order_type = order_type
         order_control_css = f'{self.order_type.lower()}-order'
         (self.api.xpath(f"//span[@data-tab='{order_control_css}']")[0]
          .click())
@@ -65,12 +130,48 @@ class OrderWindow(metaclass=ABCMeta):
         else:
             raise exceptions.WindowException()
 
+    def is_open(self):
+        """Whether the window is open and still shown
+
+        The modal is closed by the broker after some orders, and by the
+        other tabs (see LowLevelAPI.close_all): the window is then closed.
+        """
+        if self.state == 'open' and not self.api.is_css(dommap['close']):
+            logger.info('window for %s was closed', self.instrument)
+            self.state = 'closed'
+        return self.state == 'open'
+
+    @synchronized
     def close(self):
         """Close the window"""
         self._check_open()
         self.api.css1(dommap['close']).click()
         self.state = 'closed'
-        logger.debug(f'closed window for new position in {self.instrument}')
+        logger.debug('closed window for new position in %s', self.instrument)
+
+    @synchronized
+    def reset(self):
+        """Prepare the window for a new order on the same instrument
+
+        Direction and order type are kept, quantity, price and limits are
+        cleared. The instrument is not searched again: if the modal was
+        closed the window is closed, and a new one is needed.
+
+        Returns:
+            (bool): True if the window can take a new order
+        """
+        self.quantity = None
+        self.cost = None
+        self.price = None
+        self.insfu = False
+        if hasattr(self, 'stop_limit'):
+            del self.stop_limit
+        self.state = 'open'
+        if not self.is_open():
+            return False
+        self.set_order_control()
+        logger.debug('reset window for new position in %s', self.instrument)
+        return True
 
     @abstractmethod
     def confirm(self) -> bool:
@@ -80,6 +181,17 @@ class OrderWindow(metaclass=ABCMeta):
     def get_price(self) -> float:
         pass
 
+    @staticmethod
+    def _check_price(price):
+        """The price quoted, the window shows none while the market is closed
+
+        Raises:
+            (exceptions.MarketClosed): If there is no price
+        """
+        if price is None or price != price:
+            raise exceptions.MarketClosed()
+        return price
+
     def get_result(self, n=0):
         """Get nth result from instruments search, indexed from 0
 
@@ -105,24 +217,77 @@ class OrderWindow(metaclass=ABCMeta):
         if not hasattr(self, 'stop_limit'):
             self.stop_limit = {'gain': {}, 'loss': {}}
             logger.debug("initialized stop_limit")
-        if category == 'gain':
-            self.api.xpath(
-                dommap['limit-gain-%s' % limit_mode])[0].fill(str(value))
-        elif category == 'loss':
-            self.api.xpath(
-                dommap['limit-loss-%s' % limit_mode])[0].fill(str(value))
-        if category != 'both':
+        categories = ['gain', 'loss'] if category == 'both' else [category]
+        for cat in categories:
+            fill(self.api.xpath(
+                dommap[f'limit-{cat}-{limit_mode}'])[0], value)
+            self.stop_limit[cat]['mode'] = limit_mode
+            self.stop_limit[cat]['value'] = value
+        logger.debug("set limit")
+
+    @synchronized
+    def fill(self, direction=None, quantity=None, by_value=None,
+             stop_limit=None):
+        """Set direction, quantity and limits with a single script call
+
+        The script dispatches input events on each field and reads the form
+        back. Fields that did not take the value are set again one by one.
+
+        Args:
+            direction (str): 'buy' or 'sell', where supported
+            quantity (float): Quantity, or order value if by_value
+            by_value (bool): Whether quantity is the order value, where
+                supported. Default leaves the current mode
+            stop_limit (dict): {'gain': [mode, value], 'loss': [mode, value]}
+                as in API.addMov, either key optional
+        """
+        self._check_open()
+        spec = self._fill_spec(direction, quantity, by_value)
+        limits = []
+        for category, (limit_mode, value) in (stop_limit or {}).items():
+            if (limit_mode not in ["unit", "value"] or
+                    category not in ["gain", "loss"]):
+                raise ValueError()
+            limits.append((category, limit_mode, value))
+        spec['limits'] = [{'xpath': dommap[f'limit-{cat}-{mode}'],
+                           'value': str(value)}
+                          for cat, mode, value in limits]
+        state = self.api.browser.execute_script(FILL_ORDER,
+                                                self.order_control, spec)
+        if state['errors']:
+            logger.debug('fill script could not set %s', state['errors'])
+        if 'direction' in state['errors']:
+            self.set_direction(direction)
+        elif direction is not None:
+            self.direction = direction
+        if 'by_value' in state['errors']:
+            self._toggle_shares_by_value(by_value)
+        elif by_value is not None:
+            self.by_value = by_value
+        if quantity is not None:
+            if (state['quantity'] is None or
+                    format_float(state['quantity']) != float(quantity)):
+                # plain input, the value mode is already set
+                OrderWindow.set_quantity(self, quantity)
+            else:
+                self.quantity = quantity
+        if not hasattr(self, 'stop_limit'):
+            self.stop_limit = {'gain': {}, 'loss': {}}
+        for (category, limit_mode, value), set_value in zip(limits,
+                                                            state['limits']):
+            if set_value is None or format_float(set_value) != float(value):
+                self.set_limit(category, limit_mode, value)
             self.stop_limit[category]['mode'] = limit_mode
             self.stop_limit[category]['value'] = value
-        elif category == 'both':
-            self.api.xpath(
-                dommap['limit-gain-%s' % limit_mode])[0].fill(str(value))
-            self.api.xpath(
-                dommap['limit-loss-%s' % limit_mode])[0].fill(str(value))
-            for cat in ['gain', 'loss']:
-                self.stop_limit[cat]['mode'] = limit_mode
-                self.stop_limit[cat]['value'] = value
-        logger.debug("set limit")
+        logger.debug('filled order for %s', self.instrument)
+
+    def _fill_spec(self, direction, quantity, by_value):
+        """Build the spec of the FILL_ORDER script"""
+        spec = {'direction': None, 'by_value': None, 'quantity': None}
+        if quantity is not None:
+            spec['quantity'] = {'css': dommap['quantity'],
+                                'value': str(quantity)}
+        return spec
 
     def check_widget_message(self):
         """Check whether there is any error message
@@ -135,9 +300,22 @@ class OrderWindow(metaclass=ABCMeta):
             self.decode(widg[0])
             raise exceptions.WidgetException(widg)
 
+    def validator_check(self):
+        """Check the order locally before confirming it
+
+        Raises:
+            (FractionalShares, MaxQuantLimit, MinQuantLimit,
+                InsufficientFunds): Same as the broker would, carrying the
+                quantity to retry with
+        """
+        # quantity is in shares, also for orders by value
+        self.api.validator.check(self.instrument, self.quantity, self.price,
+                                 self.direction or BUY, clamp=False)
+
     def decode(self, message):
         """decode text pop-up"""
         text = message.text.strip()
+        self.api.validator.learn(self.instrument, text)
         if 'you have funds to' in text:
             self.insfu = True
         elif 'maximum remaining quantity' in text:
@@ -169,31 +347,42 @@ class OrderWindow(metaclass=ABCMeta):
         quant_input.clear()
         quant_input.send_keys(quant)
         self.quantity = quant
-        logger.debug(f'quantity set: {self.instrument} to {quant}')
+        logger.debug('quantity set: %s to %s', self.instrument, quant)
 
     def post_order_placement(self, order):
+        # Funds have changed
+        self.api.invalidate_account_snapshot()
+        # Sent, filled when the positions show it
+        order.status = ORDER_STATUS.PLACED
         # Append to API placed orders
         self.api.orders.append(order)
-        logger.debug(f'{self.quantity} x {self.instrument} @ {self.price}'
-                     f' PLACED')
+        self.api.record_order(order)
+        logger.debug('%s x %s @ %s PLACED', self.quantity, self.instrument,
+                     self.price)
         self.state = 'conclused'
         logger.debug('confirmed order placed')
+        if self.reusable:
+            self.reset()
 
 
 class CFDOrderWindow(OrderWindow):
     """add movement window"""
+    order_types = CFD_ORDER_TYPES
 
-    def __init__(self, api, instrument, order_type):
+    def __init__(self, api, instrument, order_type, reusable=False):
         """Init a modal window for opening position
 
         Args:
             api:
             instrument:
             order_type:
+            reusable (bool): Whether to reset instead of concluding after
+                each confirmed order
         """
         if order_type not in list(CFD_ORDER_TYPES):
             raise ValueError(f'Order mode invalid for {instrument}')
-        super().__init__(api=api, instrument=instrument, order_type=order_type)
+        super().__init__(api=api, instrument=instrument, order_type=order_type,
+                         reusable=reusable)
 
     def set_direction(self, direction):
         """Set buy or sell
@@ -206,20 +395,33 @@ class CFDOrderWindow(OrderWindow):
             raise ValueError('mode needs to be "buy" or "sell"')
         self.api.css1(dommap[direction + '-btn']).click()
         self.direction = direction
-        logger.debug(f'direction set to {direction}')
+        logger.debug('direction set to %s', direction)
+
+    def _fill_spec(self, direction, quantity, by_value):
+        spec = super()._fill_spec(direction, quantity, by_value)
+        if direction is not None:
+            if direction not in ['buy', 'sell']:
+                raise ValueError('mode needs to be "buy" or "sell"')
+            spec['direction'] = dommap[direction + '-btn']
+        return spec
 
     def get_price(self) -> float:
-        """get current price"""
-        if self.order_type not in ['buy', 'sell']:
-            raise ValueError()
+        """get current price, for the direction set"""
+        if self.direction not in ['buy', 'sell']:
+            raise ValueError('Direction has to be set')
         self._check_open()
 
-        price = format_float(self.api.css1(
-                f'div.buy-sell-control-container '
-                f'div.{self.order_type}-price'
-        ).text)
-        self.price = price
-        return price
+        quote = self.api.get_quote(self.instrument)
+        price = None
+        if quote is not None:
+            price = quote.ask if self.direction == BUY else quote.bid
+        if price is None:
+            price = format_float(self.api.css1(
+                    f'div.buy-sell-control-container '
+                    f'div.{self.direction}-price'
+            ).text)
+        self.price = self._check_price(price)
+        return self.price
 
     def get_margin_info(self):
         """Get the margin information"""
@@ -229,6 +431,7 @@ class CFDOrderWindow(OrderWindow):
                                               self.order_control).text)
         return 0
 
+    @synchronized
     def confirm(self) -> bool:
         """Confirms the order placement
 
@@ -243,32 +446,38 @@ class CFDOrderWindow(OrderWindow):
             raise ValueError('Quantity and buy/sell has to be set')
 
         self.get_price()
+        self.validator_check()
         # Calculate cost as price * quantity. For limit will be min cost
         self.cost = self.price * self.quantity
+        # built before the click, nothing can fail once the order is sent
+        order = CFDMarketOrder(self._instrument, self.quantity, self.price,
+                               self.direction, self.order_type, self.cost,
+                               get_timestamp())
         self.api.css1(dommap['confirm-btn'], self.order_control).click()
         # Check for errors
         self.check_widget_message()
-        timestamp = get_timestamp()
-        order = CFDMarketOrder(self.instrument, self.quantity, self.price,
-                               self.direction, self.order_type, self.cost,
-                               timestamp)
         self.post_order_placement(order)
         return True
 
 
 class InvestOrderWindow(OrderWindow):
     """add movement window"""
-    def __init__(self, api, instrument, order_type):
+    order_types = ORDER_TYPES
+
+    def __init__(self, api, instrument, order_type, reusable=False):
         """Init a modal window for opening position
 
         Args:
             api (tradingAPI.low_level.API): Api instance
             instrument ():
             order_type (str): Field of ORDER_MODES namedtuple
+            reusable (bool): Whether to reset instead of concluding after
+                each confirmed order
         """
         if order_type not in list(ORDER_TYPES):
             raise ValueError(f'Order mode invalid for {instrument}')
-        super().__init__(api=api, instrument=instrument, order_type=order_type)
+        super().__init__(api=api, instrument=instrument, order_type=order_type,
+                         reusable=reusable)
         self.by_value = False
 
     def _toggle_shares_by_value(self, by_value=False):
@@ -295,6 +504,28 @@ class InvestOrderWindow(OrderWindow):
                            self.order_control).click())
         return True
 
+    def _fill_spec(self, direction, quantity, by_value):
+        spec = super()._fill_spec(direction, quantity, by_value)
+        if by_value is not None:
+            spec['by_value'] = {
+                'disabled': 'div.invest-by-container.disabled',
+                'toggle': 'div.invest-by-content',
+                'item': 'div.item-invest-by-items-' +
+                        ('value' if by_value else 'quantity')}
+        return spec
+
+    @synchronized
+    def fill(self, direction=None, quantity=None, by_value=None,
+             stop_limit=None):
+        """Override for fractional shares, see OrderWindow.fill"""
+        if direction not in [None, BUY]:
+            raise ValueError('Invest orders can only buy')
+        super().fill(None, quantity, by_value, stop_limit)
+        self.direction = BUY
+        if quantity is not None and self.by_value:
+            self.quantity = quantity / self.get_price()
+
+    @synchronized
     def confirm(self) -> bool:
         """Confirms the order
 
@@ -305,29 +536,35 @@ class InvestOrderWindow(OrderWindow):
             (bool): True if placed
         """
         self._check_open()
+        if self.price is None:
+            self.get_price()
+        self.validator_check()
         self.cost = self.price * self.quantity
         self.api.css1(dommap['review-order'], self.order_control).click()
         self.check_widget_message()
+        order = InvestMarketOrder(self._instrument, self.quantity, self.price,
+                                  BUY, self.order_type, self.cost,
+                                  get_timestamp(), self.by_value)
         self.api.wait_for_element(dommap['send-order'])
         click(self.api.css1(dommap['send-order']))
         self.check_widget_message()
-        timestamp = get_timestamp()
-        order = InvestMarketOrder(self.instrument, self.quantity, self.price,
-                                  BUY, self.order_type, self.cost, timestamp,
-                                  self.by_value)
         self.post_order_placement(order)
         return True
-        
+
     def get_price(self):
         """Get current price from window
 
         Returns:
             (float): Current price
         """
+        quote = self.api.get_quote(self.instrument)
+        if quote is not None and quote.ask is not None:
+            self.price = quote.ask
+            return self.price
         price = format_float(self.api.css1('#invest-order '
                                            'div.fund-ammount-wrapper').text)
-        self.price = price
-        return price
+        self.price = self._check_price(price)
+        return self.price
 
     def set_quantity(self, quant, by_value=False):
         """Override for fractional shares
@@ -349,7 +586,7 @@ class InvestOrderWindow(OrderWindow):
             return super().set_quantity(quant=quant)
 
         # Otherwise we set the value
-        logger.debug(f'quantity BY VALUE')
+        logger.debug('quantity BY VALUE')
         super().set_quantity(quant)
 
         self.quantity = quant / self.get_price()
@@ -390,17 +627,19 @@ class BaseModalWindow(metaclass=ABCMeta):
         self.is_open = False
         return False
 
+    @synchronized
     def open(self):
         """Open the modal if closed"""
         if self.get():
             return
         self._open()
-        if not self.api.wait_for_element(self.div_css):
+        if not self.api.wait_for_element(self.div_css, required=False):
             self.is_open = False
             raise exceptions.ModalException(f'{self.__class__.__name__} could '
                                             f'not be open')
         self.is_open = True
 
+    @synchronized
     def close(self):
         """Close the modal if open"""
         self.is_open = False
@@ -446,6 +685,7 @@ class PendingOrdersTab(BaseModalWindow):
         if self.get():
             self.api.css1('span.tab-item.taborders').click()
 
+    @synchronized
     def get_orders(self, as_df=False) -> list or pd.DataFrame:
         """Load all the orders into Order objects
 
@@ -457,61 +697,89 @@ class PendingOrdersTab(BaseModalWindow):
             (mixed): Either list of Order objects or pandas DataFrame
         """
         self.check_open()
+        cells = []
+        table = self.get()
+        # the table is read once, the cells are decoded locally
+        with self.api.snapshot(table):
+            for order_element in self.api.css('tbody tr', table):
+                try:
+                    cells.append(self._read_order_element(order_element))
+                except (RuntimeError, IndexError, ValueError)as e:
+                    raise ParsingException('Order', e)
         orders = []
-        for order_element in self.api.css('tbody tr', self.get()):
+        for row in _number_rows(cells, ORDER_NUMBERS):
             try:
-                orders.append(self._decode_order_element(order_element, as_df))
+                order = self._decode_order_row(row, as_df)
             except (RuntimeError, IndexError, ValueError)as e:
                 raise ParsingException('Order', e)
+            if as_df:
+                order.update(_number_details(row, ORDER_FRAME_NUMBERS))
+            orders.append(order)
         if as_df:
-            return pd.DataFrame(orders)
+            return apply_schema(pd.DataFrame(orders), ORDERS_SCHEMA)
+        return orders
 
-    def _decode_order_element(self, el, as_dict=False):
-        """Decode an order WebElement into corresponding order
+    def _read_order_element(self, el):
+        """Read the cell texts of an order WebElement
 
         Args:
             el (selenium.WebElement): The <tr> order element
-            as_dict (bool): If True, get a dict instead of Order object
 
         Returns:
-            (mixed): Order instance or dict
+            (dict): Text of each cell, numbers are parsed by column
         """
-        # Get the instrument from short name
-        short_name = self.api.css1('td.name', el).text
-        instrument = self.api.get_instrument(short_name=short_name)
-        # Get the Exchange ID
-        exchange_id = self.api.css1('td.humanId', el).text
-        direction = self.api.css1('td.direction', el).text
-        order_type = self._parse_order_type(self.api.css1('td.type', el).text)
-        quantity = format_float(self.api.css1('td.quantity', el).text)
-        cost = format_float(self.api.css1('td.value', el).text)
-        price = format_float(self.api.css1('td.currentPrice', el).text)
-        timestamp = self.api.css1('td.created', el).text
+        cells = {
+            'short_name': self.api.css1('td.name', el).text,
+            'exchange_id': self.api.css1('td.humanId', el).text,
+            'direction': self.api.css1('td.direction', el).text,
+            'order_type': self.api.css1('td.type', el).text,
+            'quantity': self.api.css1('td.quantity', el).text,
+            'cost': self.api.css1('td.value', el).text,
+            'price': self.api.css1('td.currentPrice', el).text,
+            'timestamp': self.api.css1('td.created', el).text,
+            'limit': None, 'stop': None, 'target_price': None,
+        }
         # stop limit
-        limit = stop = None
         if self.api.is_css('span.stop-limit-order-data-limit-price', el):
-            limit = format_float(self.api.css1('span.stop-limit-order-'
-                                               'data-limit-price', el).text)
-            stop = format_float(self.api.css1('span.stop-limit-order-'
-                                              'data-limit-price', el).text)
+            cells['limit'] = self.api.css1('span.stop-limit-order-'
+                                           'data-limit-price', el).text
+            cells['stop'] = self.api.css1('span.stop-limit-order-'
+                                          'data-limit-price', el).text
         else:
-            target_price = format_float(self.api.css1('td.targetPrice', el)
-                                        .text)
+            cells['target_price'] = self.api.css1('td.targetPrice', el).text
+        return cells
+
+    def _decode_order_row(self, row, as_dict=False):
+        """Decode the parsed cells of an order into corresponding order
+
+        Args:
+            row (dict): Cells of _read_order_element, numbers parsed
+            as_dict (bool): If True, get a dict instead of Order object
+
+        Returns:
+            (mixed): Order instance or dict
+        """
+        # Get the instrument from short name
+        instrument = self.api.get_instrument(short_name=row['short_name'])
+        order_type = self._parse_order_type(row['order_type'])
+        limit, stop = row['limit'], row['stop']
+        if limit is None and stop is None:
             if order_type == ORDER_TYPES.LIMIT:
-                limit = target_price
+                limit = row['target_price']
             else:
-                stop = target_price
+                stop = row['target_price']
 
         order_cls = ORDER_CLASS_MAP[order_type]
-        order = order_cls(instrument=instrument, quantity=quantity, price=price,
-                          direction=direction, order_type=order_type, cost=cost,
-                          timestamp=timestamp)
+        order = order_cls(instrument=instrument, quantity=row['quantity'],
+                          price=row['price'], direction=row['direction'],
+                          order_type=order_type, cost=row['cost'],
+                          timestamp=row['timestamp'])
         # If we found order here it means status is placed
         order.status = ORDER_STATUS.PLACED
-        order.exchange_id = exchange_id
+        order.exchange_id = row['exchange_id']
 
         # Depending on order type add extra stuff
-        if cost:
+        if order.cost:
             # Means Market Invest/ISA order
             order.by_value = True
             order.quantity = order.cost / order.price
@@ -569,6 +837,7 @@ class PositionsTab(BaseModalWindow):
         if self.get():
             self.api.css1('span.tab-item.tabpositions').click()
 
+    @synchronized
     def get_positions(self, as_df=False) -> list or pd.DataFrame:
         """Load positions from table
 
@@ -577,39 +846,63 @@ class PositionsTab(BaseModalWindow):
                 list of Position objects. Default False
         """
         self.check_open()
+        cells = []
+        table = self.get()
+        # the table is read once, the cells are decoded locally
+        with self.api.snapshot(table):
+            for pos_element in self.api.css('tbody tr', table):
+                try:
+                    cells.append(self._read_pos_element(pos_element))
+                except (RuntimeError, IndexError, ValueError)as e:
+                    # raise ParsingException('Position', e)
+                    continue
         positions = []
-        for pos_element in self.api.css('tbody tr', self.get()):
+        for row in _number_rows(cells, POSITION_NUMBERS):
             try:
-                positions.append(self._decode_pos_element(pos_element, as_df))
-            except (RuntimeError, IndexError, ValueError)as e:
-                # raise ParsingException('Position', e)
+                position = self._decode_pos_row(row, as_df)
+            except (RuntimeError, IndexError, ValueError):
                 continue
+            if as_df:
+                position.update(_number_details(row, POSITION_NUMBERS))
+            positions.append(position)
         if as_df:
-            return pd.DataFrame(positions)
+            return apply_schema(pd.DataFrame(positions), POSITIONS_SCHEMA)
         return positions
 
-    def _decode_pos_element(self, el, as_dict=False):
-        """Decode a position WebElement into corresponding position
+    def _read_pos_element(self, el):
+        """Read the cell texts of a position WebElement
 
         Args:
             el (selenium.WebElement): The <tr> position element
-            as_dict (bool): If True, get a dict instead of Position object
 
         Returns:
-            (mixed): Order instance or dict
+            (dict): Text of each cell, numbers are parsed by column
         """
-        instrument = self.api.get_instrument(short_name=self.api
-                                             .css1('td.name', el).text)
-        exchange_id = self.api.css1('td.humanId', el).text
-        quantity = format_float(self.api.css1('td.quantity', el).text)
-        price = format_float(self.api.css1('td.averagePrice', el).text)
-        timestamp = self.api.css1('td.created', el).text
         direction = BUY
         if self.api.trading_mode == TRADING_MODES.CFD:
             direction = self.api.css1('td.direction', el).text
-        position = Position(instrument=instrument, quantity=quantity,
-                            direction=direction, price=price,
-                            timestamp=timestamp, exchange_id=exchange_id)
+        return {'short_name': self.api.css1('td.name', el).text,
+                'exchange_id': self.api.css1('td.humanId', el).text,
+                'quantity': self.api.css1('td.quantity', el).text,
+                'price': self.api.css1('td.averagePrice', el).text,
+                'timestamp': self.api.css1('td.created', el).text,
+                'direction': direction}
+
+    def _decode_pos_row(self, row, as_dict=False):
+        """Decode the parsed cells of a position into corresponding position
+
+        Args:
+            row (dict): Cells of _read_pos_element, numbers parsed
+            as_dict (bool): If True, get a dict instead of Position object
+
+        Returns:
+            (mixed): Position instance or dict
+        """
+        instrument = self.api.get_instrument(short_name=row['short_name'])
+        position = Position(instrument=instrument, quantity=row['quantity'],
+                            direction=row['direction'], price=row['price'],
+                            timestamp=row['timestamp'],
+                            exchange_id=row['exchange_id'])
         if as_dict:
             position.instrument = position.instrument.symbol
             return position.to_dict()
@@ -631,25 +924,41 @@ class SearchInstrumentsModal(BaseModalWindow):
         if self.get():
             self.api.css1('div.back-button', self.get()).click()
 
-    def load_all_instruments(self) -> list:
+    @synchronized
+    def load_all_instruments(self, query=None) -> list:
         """Load all instruments - might take some time
 
+        Args:
+            query (str): Only load the results of this search. Default loads
+                the whole list
+
         Returns:
             (list <Instrument>): List of Instrument instances
         """
+        if query is not None:
+            fill(self.api.css1(dommap['search-pref'], self.get()), query)
+            w()
 
         # Scroll to max first
         self.api.scroll_to_bottom('div.search-results div.scrollable-area-body')
 
         # Load all instruments
         instruments = []
-        for instrument_elem in self.api.css('div.search-results-instrument'):
-            try:
-                instrument = self._decode_instrument_element(instrument_elem)
-                self.api.log.debug(f'{len(instruments)}, {instrument}')
-            except (RuntimeError, IndexError) as e:
-                raise ParsingException('Instrument', e)
-            instruments.append(instrument)
+        debug = self.api.log.isEnabledFor(logging.DEBUG)
+        modal = self.get()
+        # the results are read once, the instruments are decoded locally
+        with self.api.snapshot(modal):
+            for instrument_elem in self.api.css(
+                    'div.search-results-instrument', modal):
+                try:
+                    instrument = self._decode_instrument_element(
+                        instrument_elem)
+                    if debug:
+                        self.api.log.debug('%d, %s', len(instruments),
+                                           instrument)
+                except (RuntimeError, IndexError) as e:
+                    raise ParsingException('Instrument', e)
+                instruments.append(instrument)
         return instruments
 
     def _decode_instrument_element(self, instrument_elem) -> Instrument:
@@ -667,8 +976,9 @@ class SearchInstrumentsModal(BaseModalWindow):
         name = self.api.css1('div.full-name', instrument_elem).text
         exchange = self.api.css1('div.market-name', instrument_elem).text
         fractional = self.api.is_css('svg.fractions-indicator', instrument_elem)
-        return Instrument(name=name, short_name=short_name, symbol=ticker,
-                          exchange=exchange, fractional=fractional)
+        return Instrument.intern(name=name, short_name=short_name,
+                                 symbol=ticker, exchange=exchange,
+                                 fractional=fractional)
 
 
 
@@ -66,6 +66,26 @@ class MinQuantLimit(Exception):
         self.err = "min quantity reached, need to be above %d" % quant
 
 
+class FractionalShares(Exception):
+    """in case of fractional shares of an instrument not allowing them"""
+    def __init__(self, product_name, quant):
+        # whole shares to retry with
+        self.quant = float(int(quant))
+        self.err = f"{product_name} does not allow fractional shares"
+        logger.error(self.err)
+        super().__init__(self.err)
+
+
+class InsufficientFunds(Exception):
+    """in case of not enough funds or shares for an order"""
+    def __init__(self, product_name, quant, available):
+        self.quant = available
+        self.err = (f"not enough funds for {quant} {product_name}, "
+                    f"available {available}")
+        logger.error(self.err)
+        super().__init__(self.err)
+
+
 class MarketClosed(Exception):
     """base exception for closed market"""
     def __init__(self):
@@ -79,8 +99,46 @@ class ProductNotFound(Exception):
         super().__init__(err)
 
 
+class ElementNotFound(IndexError):
+    """in case of an element missing from the page, maybe not loaded yet"""
+    def __init__(self, css_path):
+        self.css_path = css_path
+        err = f"element {css_path} not found"
+        # often expected, e.g. optional cells
+        logger.debug(err)
+        super().__init__(err)
+
+
 class ParsingException(Exception):
     def __init__(self, obj, exc):
         err = f'{obj} could not be parsed: {exc}'
         logger.error(err)
         super().__init__(err)
+
+
+class CircuitOpen(Exception):
+    """in case of calls refused by an open circuit breaker"""
+    def __init__(self, name, retry_in):
+        self.retry_in = retry_in
+        err = f"circuit {name} open, retry in {retry_in:.1f} s"
+        logger.error(err)
+        super().__init__(err)
+
+
+class CatalogTruncated(Exception):
+    """in case of a crawl with searches still showing the most results"""
+    def __init__(self, queries):
+        self.queries = queries
+        err = (f"searches {', '.join(queries)} reached the result limit, "
+               f"the catalog is incomplete")
+        logger.error(err)
+        super().__init__(err)
+
+
+class DaemonException(Exception):
+    """error of a request to the trade121 daemon"""
+    def __init__(self, kind, message):
+        self.kind = kind
+        err = f"daemon {kind}: {message}"
+        logger.error(err)
+        super().__init__(err)
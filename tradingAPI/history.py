@@ -0,0 +1,531 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.history
+~~~~~~~~~~~~~~
+
+This module provides the persistent history of a session.
+
+Order state transitions, position snapshots and account snapshots are
+stored in SQLite (WAL mode, so that readers do not block the refreshes).
+Rows are buffered and inserted in batches, one transaction each, and the
+tables are indexed by symbol, time and exchange ID, so that the P&L of any
+period is read back as a DataFrame without scraping the tables again.
+
+The pages don't show fills: they are inferred from the changes of the held
+quantities between position snapshots, attributed to the market orders
+confirmed and the pending orders gone since. Changes without an order
+(positions closed from their table, stops hit) are recorded as fills too.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .utils import USER_DATA_DIR, ORDER_STATUS, ORDER_TYPES, BUY, SELL
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.history')
+
+HISTORY_DB = os.path.join(USER_DATA_DIR, 'history.sqlite')
+
+TABLES = {
+    'order_events': ('time', 'mode', 'exchange_id', 'api_id', 'symbol',
+                     'order_type', 'direction', 'status', 'quantity', 'price',
+                     'cost', 'limit_price', 'stop_price'),
+    'position_snapshots': ('time', 'mode', 'exchange_id', 'symbol',
+                           'direction', 'quantity', 'price', 'current_price'),
+    'account_snapshots': ('time', 'mode', 'free_funds', 'blocked_funds',
+                          'account_value', 'live_result', 'used_margin'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS order_events (
+    time REAL NOT NULL, mode TEXT NOT NULL, exchange_id TEXT, api_id TEXT,
+    symbol TEXT, order_type TEXT, direction TEXT, status TEXT,
+    quantity REAL, price REAL, cost REAL, limit_price REAL, stop_price REAL);
+CREATE INDEX IF NOT EXISTS order_events_symbol
+    ON order_events (symbol, time);
+CREATE INDEX IF NOT EXISTS order_events_time ON order_events (time);
+CREATE INDEX IF NOT EXISTS order_events_exchange_id
+    ON order_events (exchange_id);
+CREATE TABLE IF NOT EXISTS position_snapshots (
+    time REAL NOT NULL, mode TEXT NOT NULL, exchange_id TEXT, symbol TEXT,
+    direction TEXT, quantity REAL, price REAL, current_price REAL);
+CREATE INDEX IF NOT EXISTS position_snapshots_symbol
+    ON position_snapshots (symbol, time);
+CREATE INDEX IF NOT EXISTS position_snapshots_time
+    ON position_snapshots (time);
+CREATE INDEX IF NOT EXISTS position_snapshots_exchange_id
+    ON position_snapshots (exchange_id);
+CREATE TABLE IF NOT EXISTS account_snapshots (
+    time REAL NOT NULL, mode TEXT NOT NULL, free_funds REAL,
+    blocked_funds REAL, account_value REAL, live_result REAL,
+    used_margin REAL);
+CREATE INDEX IF NOT EXISTS account_snapshots_time
+    ON account_snapshots (mode, time);
+"""
+
+
+def to_epoch(value):
+    """Seconds since the epoch of a datetime, text date or number
+
+    Naive datetimes are local time, as the scraped timestamps.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = pd.Timestamp(value)
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return None
+
+
+def _value(value):
+    """Column value of a field, NaN and missing as NULL"""
+    if value is None:
+        return None
+    if hasattr(value, 'symbol'):
+        return value.symbol
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _symbol(instrument):
+    return getattr(instrument, 'symbol', instrument)
+
+
+def realized_from_fills(fills, costs=None):
+    """Realized P&L of fills, by average cost
+
+    Args:
+        fills (pd.DataFrame): time, mode, symbol, direction, quantity and
+            price of the fills, oldest first
+        costs (dict): (held, average price) by 'mode|symbol' before the
+            fills, updated in place to continue from there
+
+    Returns:
+        (pd.Series): Realized P&L of each fill, 0 for fills adding to the
+            position
+    """
+    realized = [0.] * len(fills)
+    signed = (np.where(fills['direction'].to_numpy() == BUY, 1., -1.) *
+              fills['quantity'].to_numpy(dtype='float64')).tolist()
+    prices = fills['price'].to_numpy(dtype='float64').tolist()
+    keys = fills['mode'].astype(str) + '|' + fills['symbol'].astype(str)
+    # the cost of a position depends on all its previous fills, a loop on
+    # plain floats for each instrument
+    costs = {} if costs is None else costs
+    for key, indexes in fills.groupby(keys.to_numpy(),
+                                      sort=False).indices.items():
+        held, average = costs.get(key, (0., 0.))
+        for i in indexes.tolist():
+            quantity, price = signed[i], prices[i]
+            if held * quantity < 0:
+                closed = min(abs(quantity), abs(held))
+                realized[i] = closed * (price - average) * (
+                    1. if held > 0 else -1.)
+                if abs(quantity) > abs(held):
+                    # reversed, the rest opens at the fill price
+                    average = price
+            else:
+                average = (held * average + quantity * price) / (
+                    held + quantity)
+            held += quantity
+        costs[key] = (held, average)
+    return pd.Series(realized, index=fills.index)
+
+
+class HistoryStore(object):
+    """SQLite history of orders, positions and account snapshots"""
+    def __init__(self, path=HISTORY_DB, batch_size=500, flush_interval=5):
+        """
+        Args:
+            path (str): Database file, ':memory:' for a transient store
+            batch_size (int): Buffered rows flushed in one transaction
+            flush_interval (float): Max seconds rows stay buffered
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)),
+                        exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # WAL is durable across crashes of the process with NORMAL
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self._buffer = {table: [] for table in TABLES}
+        self._buffered = 0
+        self._flushed_at = time.time()
+        # Pending orders seen at the last refresh, by mode
+        self._pending = {}
+        # Signed quantity and average price by symbol at the last position
+        # snapshot, by mode
+        self._held = {}
+        # Orders that may have filled since: pending orders gone from the
+        # table and market orders confirmed, by mode
+        self._gone = {}
+        self._placing = {}
+        # Quantity changes not attributed to an order yet, by mode
+        self._deltas = {}
+        # Fills read so far with their realized P&L, see fills
+        self._fills = None
+        self._fills_rowid = 0
+        self._costs = {}
+        atexit.register(self.flush)
+
+    def _add(self, table, rows):
+        with self.lock:
+            self._buffer[table].extend(rows)
+            self._buffered += len(rows)
+            if (self._buffered >= self.batch_size or
+                    time.time() - self._flushed_at >= self.flush_interval):
+                self.flush()
+
+    def flush(self):
+        """Insert the buffered rows, in one transaction
+
+        Returns:
+            (int): Number of rows inserted
+        """
+        with self.lock:
+            self._flushed_at = time.time()
+            if not self._buffered:
+                return 0
+            count = self._buffered
+            with self.connection:
+                self.connection.execute('BEGIN')
+                for table, rows in self._buffer.items():
+                    if rows:
+                        columns = TABLES[table]
+                        self.connection.executemany(
+                            f'INSERT INTO {table} ({", ".join(columns)}) '
+                            f'VALUES ({", ".join("?" * len(columns))})', rows)
+                        rows.clear()
+            self._buffered = 0
+        logger.debug('flushed %d history rows', count)
+        return count
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+        self.connection.close()
+
+    # Recording
+
+    def record_order(self, mode, order, at=None):
+        """Record the current state of an order
+
+        Market orders just confirmed are filled at the next position
+        snapshot showing them.
+
+        Args:
+            mode (str): Trading mode
+            order (Order): The order, with its status
+            at (datetime): Time of the transition, now by default
+        """
+        order = {'exchange_id': order.exchange_id, 'api_id': order.api_id,
+                 'instrument': _symbol(order.instrument),
+                 'order_type': order.order_type,
+                 'direction': order.direction, 'status': order.status,
+                 'quantity': order.quantity, 'price': order.price,
+                 'cost': order.cost, 'limit': order.limit,
+                 'stop': order.stop}
+        at = to_epoch(at) or time.time()
+        with self.lock:
+            if (order['status'] == ORDER_STATUS.PLACED and
+                    order['order_type'] == ORDER_TYPES.MARKET and
+                    order['exchange_id'] is None):
+                # snapshots seen without the fill
+                order['_seen'] = 0
+                self._placing.setdefault(mode, []).append(order)
+        self._add('order_events', [self._order_row(at, mode, order)])
+
+    def record_orders(self, mode, orders, at=None):
+        """Record the transitions of the pending orders table
+
+        Orders new since the last call are recorded as they are. The table
+        does not tell whether the orders gone filled: they are FILLED when a
+        position snapshot shows their quantity, CANCELLED otherwise.
+
+        Args:
+            mode (str): Trading mode
+            orders (pd.DataFrame): Pending orders, as load_orders sets them
+            at (datetime): Time of the refresh, now by default
+        """
+        at = to_epoch(at) or time.time()
+        current = {}
+        if not orders.empty and 'exchange_id' in orders:
+            for order in orders.to_dict('records'):
+                current[order['exchange_id']] = order
+        with self.lock:
+            previous = self._pending.get(mode, {})
+            rows = [self._order_row(at, mode, current[exchange_id])
+                    for exchange_id in current.keys() - previous.keys()]
+            gone = self._gone.setdefault(mode, [])
+            for exchange_id in previous.keys() - current.keys():
+                gone.append(dict(previous[exchange_id], _at=at))
+            self._pending[mode] = current
+            # the snapshot may have seen the fill already
+            rows.extend(self._match_fills(mode))
+        if rows:
+            self._add('order_events', rows)
+
+    @staticmethod
+    def _order_row(at, mode, order):
+        return (at, mode, _value(order.get('exchange_id')),
+                _value(order.get('api_id')), _value(order.get('instrument')),
+                _value(order.get('order_type')),
+                _value(order.get('direction')), _value(order.get('status')),
+                _value(order.get('quantity')), _value(order.get('price')),
+                _value(order.get('cost')), _value(order.get('limit')),
+                _value(order.get('stop')))
+
+    def held(self, mode):
+        """Symbols held at the last position snapshot of a mode"""
+        return list(self._held.get(mode, ()))
+
+    def record_positions(self, mode, positions, prices=None, at=None,
+                         asks=None, infer_fills=True):
+        """Record a snapshot of the positions, and the fills it shows
+
+        Args:
+            mode (str): Trading mode
+            positions (pd.DataFrame): Positions, as load_positions sets them
+            prices (dict): Current (bid) price by symbol, for the unrealized
+                P&L and the price of the sells closing a position
+            at (datetime): Time of the snapshot, now by default
+            asks (dict): Current ask price by symbol, for the price of the
+                buys closing a position
+            infer_fills (bool): Whether to infer the fills from the changes
+                of the held quantities
+        """
+        at = to_epoch(at) or time.time()
+        prices = prices or {}
+        frame = positions.reindex(columns=['exchange_id', 'instrument',
+                                           'direction', 'quantity', 'price'])
+        if not positions.empty:
+            self._add('position_snapshots', [
+                (at, mode, _value(exchange_id), _value(symbol),
+                 _value(direction), _value(quantity), _value(price),
+                 _value(prices.get(symbol)))
+                for exchange_id, symbol, direction, quantity, price
+                in frame.itertuples(index=False)])
+        if infer_fills:
+            rows = self._infer_fills(mode, frame, prices, asks or {}, at)
+            if rows:
+                self._add('order_events', rows)
+
+    def _infer_fills(self, mode, frame, bids, asks, at):
+        """Order events of the quantity changes since the last snapshot"""
+        signed = (np.where(frame['direction'].to_numpy() == SELL, -1., 1.) *
+                  frame['quantity'].to_numpy(dtype='float64'))
+        totals = pd.DataFrame({
+            'symbol': frame['instrument'].astype(str).to_numpy(),
+            'quantity': signed,
+            'cost': signed * frame['price'].to_numpy(dtype='float64')
+        }).groupby('symbol', sort=False).sum()
+        current = {symbol: (quantity, cost / quantity if quantity else 0.)
+                   for symbol, quantity, cost
+                   in totals.itertuples(name=None)}
+        with self.lock:
+            previous = self._held.get(mode)
+            self._held[mode] = current
+            if previous is None:
+                # nothing to compare with yet
+                return []
+            rows = []
+            # changes no order claimed since the last snapshot
+            for symbol, (delta, price, when) in self._deltas.pop(
+                    mode, {}).items():
+                rows.append(self._order_row(when, mode, {
+                    'instrument': symbol, 'quantity': abs(delta),
+                    'direction': BUY if delta > 0 else SELL,
+                    'status': ORDER_STATUS.FILLED, 'price': price}))
+            deltas = self._deltas[mode] = {}
+            for symbol in previous.keys() | current.keys():
+                before, average = previous.get(symbol, (0., 0.))
+                after, new_average = current.get(symbol, (0., 0.))
+                delta = after - before
+                if abs(delta) < 1e-9:
+                    continue
+                if before * after >= 0 and abs(after) > abs(before):
+                    # added to the position: the fill moved its average
+                    price = (after * new_average - before * average) / delta
+                else:
+                    # closed, at the price it could be closed at
+                    price = (asks if delta > 0 else bids).get(symbol)
+                deltas[symbol] = [delta, price, at]
+            rows.extend(self._match_fills(mode))
+            # the snapshot is later than the orders gone: not filled
+            for order in self._gone.pop(mode, []):
+                rows.append(self._order_row(order.pop('_at'), mode, dict(
+                    order, status=ORDER_STATUS.CANCELLED)))
+            placing = []
+            for order in self._placing.pop(mode, []):
+                order['_seen'] += 1
+                if order['_seen'] < 2:
+                    placing.append(order)
+                else:
+                    logger.debug('market order %s not filled',
+                                 order['api_id'])
+                    order.pop('_seen')
+                    rows.append(self._order_row(at, mode, dict(
+                        order, status=ORDER_STATUS.CANCELLED)))
+            self._placing[mode] = placing
+        return rows
+
+    def _match_fills(self, mode):
+        """FILLED events of the orders explained by the quantity changes"""
+        deltas = self._deltas.get(mode)
+        if not deltas:
+            return []
+        rows = []
+        for orders in (self._placing.get(mode, []),
+                       self._gone.get(mode, [])):
+            for order in list(orders):
+                change = deltas.get(order['instrument'])
+                sign = 1. if order['direction'] == BUY else -1.
+                if change is None or change[0] * sign <= 0:
+                    continue
+                delta, price, when = change
+                quantity = min(abs(delta), order['quantity'] or abs(delta))
+                if price is None:
+                    price = (order.get('limit') or order.get('stop') or
+                             order['price'])
+                fill = {key: value for key, value in order.items()
+                        if not key.startswith('_')}
+                fill.update(status=ORDER_STATUS.FILLED, quantity=quantity,
+                            price=price)
+                rows.append(self._order_row(when, mode, fill))
+                orders.remove(order)
+                change[0] -= quantity * sign
+                if abs(change[0]) < 1e-9:
+                    del deltas[order['instrument']]
+        return rows
+
+    def record_account(self, mode, snapshot, at=None):
+        """Record an AccountSnapshot"""
+        at = to_epoch(at) or snapshot.time
+        self._add('account_snapshots', [
+            (at, mode, snapshot.free_funds, snapshot.blocked_funds,
+             snapshot.account_value, snapshot.live_result,
+             snapshot.used_margin)])
+
+    # Queries
+
+    def query(self, sql, params=()):
+        """Run a query on the flushed history
+
+        Returns:
+            (pd.DataFrame): The rows, 'time' as UTC datetimes
+        """
+        self.flush()
+        with self.lock:
+            frame = pd.read_sql_query(sql, self.connection, params=params)
+        if 'time' in frame:
+            frame['time'] = pd.to_datetime(frame['time'], unit='s', utc=True)
+        return frame
+
+    @staticmethod
+    def _where(start=None, end=None, mode=None, symbol=None):
+        clauses, params = [], []
+        for clause, value in (('time >= ?', to_epoch(start)),
+                              ('time < ?', to_epoch(end)),
+                              ('mode = ?', mode), ('symbol = ?', symbol)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return ' AND '.join(clauses) or '1', params
+
+    def orders(self, start=None, end=None, mode=None, symbol=None,
+               exchange_id=None):
+        """Order transitions of a period, oldest first"""
+        where, params = self._where(start, end, mode, symbol)
+        if exchange_id is not None:
+            where += ' AND exchange_id = ?'
+            params.append(exchange_id)
+        return self.query(f'SELECT * FROM order_events WHERE {where} '
+                          f'ORDER BY time', params)
+
+    def accounts(self, start=None, end=None, mode=None):
+        """Account snapshots of a period, oldest first"""
+        where, params = self._where(start, end, mode)
+        return self.query(f'SELECT * FROM account_snapshots WHERE {where} '
+                          f'ORDER BY time', params)
+
+    def unrealized_pnl(self, start=None, end=None, mode=None, symbol=None):
+        """Unrealized P&L of each position snapshot of a period
+
+        Returns:
+            (pd.DataFrame): time, mode, exchange_id, symbol, direction,
+                quantity, price, current_price and unrealized
+        """
+        where, params = self._where(start, end, mode, symbol)
+        return self.query(
+            f"SELECT *, (current_price - price) * quantity * "
+            f"(CASE direction WHEN '{BUY}' THEN 1 ELSE -1 END) AS unrealized "
+            f"FROM position_snapshots WHERE {where} ORDER BY time", params)
+
+    def fills(self):
+        """All the fills with their realized P&L, by average cost
+
+        Only the fills inserted since the last call are read and costed.
+
+        Returns:
+            (pd.DataFrame): time, mode, exchange_id, symbol, direction,
+                quantity, price and realized of each fill
+        """
+        new = self.query(
+            "SELECT rowid, time, mode, exchange_id, symbol, direction, "
+            "quantity, price FROM order_events WHERE rowid > ? AND "
+            "status = ? ORDER BY rowid",
+            [self._fills_rowid, ORDER_STATUS.FILLED])
+        if self._fills is None or not new.empty:
+            new['realized'] = realized_from_fills(new, self._costs)
+            if not new.empty:
+                self._fills_rowid = int(new['rowid'].iloc[-1])
+            new = new.drop(columns='rowid')
+            self._fills = (new if self._fills is None else
+                           pd.concat([self._fills, new], ignore_index=True))
+        return self._fills
+
+    def realized_pnl(self, start=None, end=None, mode=None, symbol=None):
+        """Realized P&L of the fills of a period, by average cost
+
+        Returns:
+            (pd.DataFrame): Same columns as fills
+        """
+        fills = self.fills()
+        mask = np.ones(len(fills), dtype=bool)
+        if start is not None:
+            mask &= (fills['time'] >= pd.Timestamp(
+                to_epoch(start), unit='s', tz='UTC')).to_numpy()
+        if end is not None:
+            mask &= (fills['time'] < pd.Timestamp(
+                to_epoch(end), unit='s', tz='UTC')).to_numpy()
+        if mode is not None:
+            mask &= (fills['mode'] == mode).to_numpy()
+        if symbol is not None:
+            mask &= (fills['symbol'] == symbol).to_numpy()
+        return fills[mask].reset_index(drop=True)
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.indicators
+~~~~~~~~~~~~~~
+
+This module provides the indicators of the quote streams.
+
+IndicatorEngine keeps the state of all the instruments in NumPy arrays, one
+row per instrument: ring buffers of the last `window` ticks and their
+running sums. A tick of any number of instruments is one vectorized update,
+so its cost does not depend on the window. compute_history gives the same
+indicators over stored history, vectorized with pandas.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .utils import num
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.indicators')
+
+Indicators = namedtuple('Indicators', [
+    'symbol', 'ticks', 'price', 'sma', 'ema', 'volatility', 'spread',
+    'relative_spread', 'sentiment', 'sentiment_trend'])
+
+# Ring buffers of the engine, one row per instrument
+RINGS = ('mid', 'ret', 'spread', 'rel_spread', 'sentiment')
+
+
+def to_price(value):
+    """Price of a record field, as float (nan if missing)"""
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        value = num(value)
+        return np.nan if value is None else value
+    return float(value)
+
+
+def _quote_arrays(bids, asks, sentiments):
+    bids = np.asarray([to_price(v) for v in bids], dtype='float64')
+    asks = np.asarray([to_price(v) for v in asks], dtype='float64')
+    sentiments = np.asarray([to_price(v) for v in sentiments],
+                            dtype='float64')
+    # a missing side is replaced by the other one
+    bids = np.where(np.isnan(bids), asks, bids)
+    asks = np.where(np.isnan(asks), bids, asks)
+    return bids, asks, sentiments
+
+
+class IndicatorEngine(object):
+    """Incremental indicators of many instruments, O(1) per tick"""
+    def __init__(self, window=20, alpha=None, capacity=64):
+        """
+        Args:
+            window (int): Ticks of the rolling indicators
+            alpha (float): Smoothing of the EMAs, default 2 / (window + 1)
+            capacity (int): Initial number of instrument rows
+        """
+        self.window = window
+        self.alpha = 2 / (window + 1) if alpha is None else alpha
+        # symbol -> row
+        self.rows = {}
+        self.symbols = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """Allocate (or grow) the state arrays to capacity rows"""
+        old = getattr(self, 'count', None)
+        size = 0 if old is None else len(old)
+
+        def grow(array, shape, fill=0.):
+            new = np.full(shape, fill, dtype=array.dtype if array is not None
+                          else 'float64')
+            if array is not None:
+                new[:size] = array
+            return new
+
+        get = self.__dict__.get
+        for ring in RINGS:
+            setattr(self, ring, grow(get(ring), (capacity, self.window)))
+            setattr(self, ring + '_sum', grow(get(ring + '_sum'), capacity))
+        self.ret_sq_sum = grow(get('ret_sq_sum'), capacity)
+        self.count = grow(get('count'), capacity).astype('int64')
+        self.pos = grow(get('pos'), capacity).astype('int64')
+        self.last_mid = grow(get('last_mid'), capacity, np.nan)
+        self.last_sentiment = grow(get('last_sentiment'), capacity, np.nan)
+        self.ema = grow(get('ema'), capacity, np.nan)
+        self.sentiment_ema = grow(get('sentiment_ema'), capacity, np.nan)
+
+    def _rows(self, symbols):
+        """Rows of symbols, adding the new ones"""
+        rows = np.empty(len(symbols), dtype='int64')
+        for i, symbol in enumerate(symbols):
+            row = self.rows.get(symbol)
+            if row is None:
+                row = self.rows[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+                if row >= len(self.count):
+                    self._allocate(2 * len(self.count))
+            rows[i] = row
+        return rows
+
+    def update(self, symbol, bid, ask, sentiment=None):
+        """Add a tick of one instrument"""
+        self.update_many([symbol], [bid], [ask], [sentiment])
+
+    def update_many(self, symbols, bids, asks, sentiments=None):
+        """Add a tick of many instruments, in one vectorized step
+
+        Args:
+            symbols (list <str>): Unique symbols (or product names)
+            bids (list): Sell prices, float or text
+            asks (list): Buy prices, float or text
+            sentiments (list): Share of buyers (0-1), None if unknown
+        """
+        if not len(symbols):
+            return
+        if sentiments is None:
+            sentiments = [None] * len(symbols)
+        bids, asks, sentiments = _quote_arrays(bids, asks, sentiments)
+        rows = self._rows(symbols)
+        valid = ~np.isnan(bids)
+        rows, bids, asks = rows[valid], bids[valid], asks[valid]
+        sentiments = sentiments[valid]
+
+        mid = (bids + asks) / 2
+        last_mid = self.last_mid[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = np.where(last_mid > 0, np.log(mid / last_mid), 0.)
+            rel_spread = np.where(mid > 0, (asks - bids) / mid, 0.)
+        sentiments = np.where(np.isnan(sentiments), self.last_sentiment[rows],
+                              sentiments)
+        sentiments = np.where(np.isnan(sentiments), 0.5, sentiments)
+        values = {'mid': mid, 'ret': ret, 'spread': asks - bids,
+                  'rel_spread': rel_spread, 'sentiment': sentiments}
+
+        pos = self.pos[rows]
+        for ring in RINGS:
+            buffer, total = getattr(self, ring), getattr(self, ring + '_sum')
+            old = buffer[rows, pos]
+            if ring == 'ret':
+                self.ret_sq_sum[rows] += ret ** 2 - old ** 2
+            total[rows] += values[ring] - old
+            buffer[rows, pos] = values[ring]
+
+        first = self.count[rows] == 0
+        self.ema[rows] = np.where(first, mid, self.ema[rows] +
+                                  self.alpha * (mid - self.ema[rows]))
+        self.sentiment_ema[rows] = np.where(
+            first, sentiments, self.sentiment_ema[rows] +
+            self.alpha * (sentiments - self.sentiment_ema[rows]))
+        self.last_mid[rows] = mid
+        self.last_sentiment[rows] = sentiments
+        self.count[rows] += 1
+        self.pos[rows] = (pos + 1) % self.window
+
+        # the running sums drift, they are recomputed once per window
+        wrapped = rows[self.pos[rows] == 0]
+        if len(wrapped):
+            for ring in RINGS:
+                getattr(self, ring + '_sum')[wrapped] = getattr(
+                    self, ring)[wrapped].sum(axis=1)
+            self.ret_sq_sum[wrapped] = (self.ret[wrapped] ** 2).sum(axis=1)
+
+    def update_from_stocks(self, stocks):
+        """Add the latest record of each Stock, see API.checkStock
+
+        Args:
+            stocks (iterable <Stock>): Stocks with [sell, buy, sentiment]
+                records
+        """
+        latest = [stock for stock in stocks if stock.records]
+        self.update_many([stock.product for stock in latest],
+                         [stock.records[-1][0] for stock in latest],
+                         [stock.records[-1][1] for stock in latest],
+                         [stock.records[-1][2] for stock in latest])
+
+    def load_history(self, symbol, bids, asks, sentiments=None):
+        """Seed the state of an instrument from stored ticks, oldest first"""
+        if sentiments is None:
+            sentiments = [None] * len(bids)
+        start = max(0, len(bids) - self.window - 1)
+        for bid, ask, sentiment in zip(bids[start:], asks[start:],
+                                       sentiments[start:]):
+            self.update(symbol, bid, ask, sentiment)
+
+    def _values(self, rows):
+        count = self.count[rows]
+        filled = np.minimum(count, self.window)
+        # the first tick has no return
+        returns = np.where(count > self.window, self.window, count - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sma = self.mid_sum[rows] / filled
+            ret_mean = self.ret_sum[rows] / returns
+            variance = (self.ret_sq_sum[rows] - returns * ret_mean ** 2) / (
+                returns - 1)
+            volatility = np.where(returns > 1,
+                                  np.sqrt(np.maximum(variance, 0.)), np.nan)
+            spread = self.spread_sum[rows] / filled
+            rel_spread = self.rel_spread_sum[rows] / filled
+            sentiment_trend = (self.last_sentiment[rows] -
+                               self.sentiment_sum[rows] / filled)
+        return {'ticks': count, 'price': self.last_mid[rows], 'sma': sma,
+                'ema': self.ema[rows], 'volatility': volatility,
+                'spread': spread, 'relative_spread': rel_spread,
+                'sentiment': self.sentiment_ema[rows],
+                'sentiment_trend': sentiment_trend}
+
+    def get(self, symbol):
+        """Get the indicators of an instrument
+
+        Returns:
+            (Indicators): The indicators, None if no tick was added
+        """
+        row = self.rows.get(symbol)
+        if row is None:
+            return None
+        values = self._values(np.array([row]))
+        return Indicators(symbol=symbol, **{
+            name: value[0].item() for name, value in values.items()})
+
+    def frame(self):
+        """Indicators of all the instruments
+
+        Returns:
+            (pd.DataFrame): One row per instrument, indexed by symbol
+        """
+        values = self._values(np.arange(len(self.symbols)))
+        return pd.DataFrame(values, index=pd.Index(self.symbols,
+                                                   name='symbol'))
+
+
+def compute_history(bids, asks, sentiments=None, window=20, alpha=None):
+    """Indicators over stored ticks, vectorized
+
+    The last row equals the state of an IndicatorEngine fed the same ticks.
+
+    Args:
+        bids (list): Sell prices, oldest first, float or text
+        asks (list): Buy prices
+        sentiments (list): Share of buyers (0-1)
+        window (int): Ticks of the rolling indicators
+        alpha (float): Smoothing of the EMAs, default 2 / (window + 1)
+
+    Returns:
+        (pd.DataFrame): One row per tick, columns as Indicators
+    """
+    alpha = 2 / (window + 1) if alpha is None else alpha
+    if sentiments is None:
+        sentiments = [None] * len(bids)
+    bids, asks, sentiments = _quote_arrays(bids, asks, sentiments)
+    valid = ~np.isnan(bids)
+    mid = pd.Series((bids + asks)[valid] / 2)
+    spread = pd.Series((asks - bids)[valid])
+    sentiment = pd.Series(sentiments[valid]).ffill().fillna(0.5)
+    returns = np.log(mid / mid.shift(1))
+    rolling = {'min_periods': 1, 'window': window}
+    return pd.DataFrame({
+        'ticks': np.arange(1, len(mid) + 1),
+        'price': mid,
+        'sma': mid.rolling(**rolling).mean(),
+        'ema': mid.ewm(alpha=alpha, adjust=False).mean(),
+        'volatility': returns.rolling(window, min_periods=2).std(),
+        'spread': spread.rolling(**rolling).mean(),
+        'relative_spread': (spread / mid).rolling(**rolling).mean(),
+        'sentiment': sentiment.ewm(alpha=alpha, adjust=False).mean(),
+        'sentiment_trend': sentiment - sentiment.rolling(**rolling).mean(),
+    })
@@ -52,6 +52,40 @@ dommap = {
     'trade-box': '//div[@id="tradePanel"]/div[5]/div[3]/div[1]' +
         '/div[2]/div[2]/span',
     'back-btn': 'div.back-button',
+    'tradebox': 'div#tradePanel div.tradebox',
+    'tradebox-name': 'div#tradePanel div.tradebox span.instrument-name',
+    'tradebox-remove': 'div.item-trade-contextmenu-list-remove',
+    'watchlist-add': 'div.add-to-watchlist-popup-item .icon-wrapper',
+}
+
+# Ids of the equity fields at the bottom of the page
+equity_ids = {
+    'free_funds': 'equity-free',
+    'blocked_funds': 'equity-blocked',
+    'account_value': 'equity-total',
+    'live_result': 'equity-ppl',
+    'used_margin': 'equity-margin',
+}
+
+# Requests blocked by the lean launch profile: images, fonts, media and
+# third party analytics / marketing hosts
+blocked_urls = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3',
+    '*google-analytics.com*', '*googletagmanager.com*',
+    '*doubleclick.net*', '*googleadservices.com*', '*facebook.net*',
+    '*facebook.com/tr*', '*hotjar.com*', '*bat.bing.com*', '*criteo.*',
+    '*taboola.com*', '*outbrain.com*', '*optimizely.com*',
+    '*adroll.com*', '*twitter.com/i/adsct*', '*ads-twitter.com*',
+]
+
+# JSON endpoints of the web app captured from the performance log, by kind
+capture_urls = {
+    'orders': r'/(equity/)?(pending-)?orders/?(\?|$)',
+    'positions': r'/(equity/portfolio|open-positions|positions)/?(\?|$)',
+    'account': r'/account(s)?/(summary|cash|info)/?(\?|$)',
+    'instruments': r'/(metadata/)?instruments/?(\?|$)',
 }
 
 urls = {
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.logconf
+~~~~~~~~~~~~~~
+
+This module provides the logging setup of the package.
+
+The file handlers run behind queues on background threads, so that a log
+call only costs putting the record in a queue: formatting and disk writes
+happen off the calling thread. The package logs at INFO by default, so
+that debug calls cost a level check. Levels can be set per subsystem, e.g.
+with TRADINGAPI_LOG_LEVELS="tradingAPI=DEBUG,tradingAPI.capture=WARNING".
+"""
+
+import atexit
+import logging
+import logging.config
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_DIR = os.path.dirname(os.path.realpath(__file__))
+LOG_DIR = os.path.join(ROOT_DIR, 'logs')
+LEVELS_ENV = 'TRADINGAPI_LOG_LEVELS'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'deafult': {
+            'format':
+                '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+            'datefmt': '%Y-%m-%d %H:%M:%S'
+        },
+        'mov_form': {
+            'format': '%(asctime)s - %(message)s'
+        }
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'level': 'DEBUG',
+            'formatter': 'deafult',
+        },
+        'rotating': {
+            'class': 'logging.handlers.TimedRotatingFileHandler',
+            'level': 'DEBUG',
+            'formatter': 'deafult',
+            'filename': os.path.join(LOG_DIR, 'logfile.log'),
+            'when': 'midnight',
+            'backupCount': 3
+        },
+        'movs_handler': {
+            'class': 'logging.FileHandler',
+            'level': 'DEBUG',
+            'formatter': 'mov_form',
+            'filename': os.path.join(LOG_DIR, 'movlist.log'),
+            'mode': 'w'
+        }
+    },
+    'loggers': {
+        '': {
+            'handlers': ['console'],
+            'level': 'CRITICAL',
+            'propagate': True
+        },
+        'tradingAPI': {
+            'handlers': ['rotating'],
+            'level': 'INFO'
+        },
+        'mover': {
+            'handlers': ['movs_handler'],
+            'level': 'INFO'
+        }
+    }
+}
+
+# Loggers whose handlers are moved behind a queue
+QUEUED_LOGGERS = ('tradingAPI', 'mover')
+
+_listeners = []
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queue the record with its message, formatted by the listener's thread
+
+    The message is merged with its args before queueing, as the args may
+    change before the listener gets to them, but unlike QueueHandler the
+    record is not formatted (time, level, traceback) on the calling thread.
+    """
+    def prepare(self, record):
+        # all the handlers of the logger are behind the queue, no copy
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_levels(spec):
+    """Parse 'name=LEVEL,name=LEVEL' into a dict"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def set_levels(levels):
+    """Set the level of subsystems
+
+    Args:
+        levels (dict): Logger name (e.g. 'tradingAPI.capture') to level
+    """
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def stop():
+    """Flush the queues and stop the listeners"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def configure(levels=None, queued=True):
+    """Configure the logging of the package
+
+    Args:
+        levels (dict): Levels by logger name, on top of the ones in the
+            TRADINGAPI_LOG_LEVELS environment variable
+        queued (bool): Whether to run the file handlers behind queues.
+            Default True
+    """
+    stop()
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.config.dictConfig(LOGGING)
+    if queued:
+        for name in QUEUED_LOGGERS:
+            logger = logging.getLogger(name)
+            handlers = logger.handlers[:]
+            records = queue.SimpleQueue()
+            for handler in handlers:
+                logger.removeHandler(handler)
+            logger.addHandler(LazyQueueHandler(records))
+            listener = QueueListener(records, *handlers,
+                                     respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+    set_levels(parse_levels(os.environ.get(LEVELS_ENV)))
+    set_levels(levels or {})
+
+
+atexit.register(stop)
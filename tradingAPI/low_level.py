@@ -7,19 +7,33 @@ tradingAPI.low_level
 This module provides the low level functions with the service.
 """
 
+import threading
 import time
-import os
+from contextlib import contextmanager
 from datetime import datetime
 
 import pandas as pd
-from tradingAPI.base import Instrument
+from tradingAPI.base import Instrument, AccountSnapshot
+from tradingAPI.capture import TrafficCapture
+from tradingAPI.catalog import InstrumentCatalog
+from tradingAPI.crawler import ShardedCatalogCrawler
+from tradingAPI.history import HistoryStore, HISTORY_DB
+from tradingAPI.pnl import PnLEngine
+from tradingAPI.quotes import WebSocketQuoteTap, QUOTE_MAX_AGE
+from tradingAPI.recorder import RecordingDriver, ReplayDriver
+from tradingAPI.snapshot import DomSnapshot, SnapshotElement
+from tradingAPI.retry import RetryPolicy, CircuitBreaker
+from tradingAPI.scheduler import RefreshScheduler
+from tradingAPI.validation import PreTradeValidator
 from tradingAPI.dom_components import InvestOrderWindow, \
     CFDOrderWindow, PendingOrdersTab, SearchInstrumentsModal, PositionsTab
 from tradingAPI.exceptions import CredentialsException, BaseExc
+from tradingAPI.schema import apply_schema, INSTRUMENTS_SCHEMA
 from .glob import Glob
-from .links import dommap, urls
-from .utils import num, expect, send_keys_human, w, click, TRADING_MODES, \
-    INVEST_INSTRUMENTS_CSV, ISA_INSTRUMENTS_CSV, CFD_INSTRUMENTS_CSV
+from .links import dommap, urls, blocked_urls, equity_ids
+from .scripts import PAGE_METRICS, ACCOUNT_SNAPSHOT
+from .utils import num, send_keys_human, w, click, TRADING_MODES, \
+    CATALOG_DELTAS, get_timestamp, synchronized
 from tradingAPI import exceptions
 import selenium.common.exceptions
 from selenium.webdriver.chrome.options import Options
@@ -53,13 +67,59 @@ class LowLevelAPI(object):
             TRADING_MODES.INVEST: pd.DataFrame(),
             TRADING_MODES.ISA: pd.DataFrame()
         }  # Dataframe with instruments
+        # Catalog of all modes, loaded with the first instruments
+        self.catalog = None
+        # TrafficCapture and WebSocketQuoteTap, if launched with capture=True
+        self.capture = None
+        self.quotes = None
+        # Orders placed through order windows, and the reusable window
+        self.orders = []
+        self.order_window = None
+        self.validator = PreTradeValidator(self)
+        # Seconds an account snapshot is served from cache
+        self.account_ttl = 2
+        # Seconds a captured orders or positions payload is trusted, older
+        # ones are read from the page
+        self.capture_ttl = 10
+        self._account_snapshot = None
+        # Instruments already looked up, by (mode, field, value)
+        self._instrument_index = {}
+        # DomSnapshot answering the queries, in a snapshot() block
+        self._snapshot = None
+        # HistoryStore recording the refreshes, see open_history
+        self.history = None
+        # P&L of the positions of the current mode, see refresh_pnl
+        self.pnl = PnLEngine()
+        # Retries of the selenium calls, failing fast while the broker's
+        # UI is down
+        self.breaker = CircuitBreaker('broker')
+        self.retry_policies = {
+            'find': RetryPolicy('find', attempts=3, base_delay=0.1),
+            'login': RetryPolicy('login', attempts=3, base_delay=2,
+                                 deadline=60, breaker=self.breaker),
+            'go_to_mode': RetryPolicy('go_to_mode', attempts=3, base_delay=1,
+                                      deadline=45, breaker=self.breaker),
+        }
+        # The browser can run one command at a time: the methods driving it
+        # hold this lock, see utils.synchronized
+        self.lock = threading.RLock()
         self.log = logger
         # init globals
         Glob()
 
-    def launch(self, headless=False):
+    def launch(self, headless=False, lean=False, capture=False):
         """launch browser and virtual display, first of all to be launched
 
+        Args:
+            headless (bool): Whether to run Chrome headless. Default False
+            lean (bool): Whether to use the lean profile: eager page loads,
+                blocking of images, fonts and third party trackers and, if
+                headless, fewer renderer features. Default False
+            capture (bool): Whether to capture the JSON traffic of the web
+                app from the performance log, serving orders, positions,
+                instruments, account info and streamed quotes from it.
+                Default False
+
         Returns:
             (bool): True if launched successfully
 
@@ -75,13 +135,99 @@ class LowLevelAPI(object):
         options.add_argument('--disable-blink-features=AutomationControlled')
         if headless:
             options.add_argument("--headless")
+        if lean:
+            # Return from get() once the DOM is interactive
+            options.set_capability('pageLoadStrategy', 'eager')
+            options.add_argument('--blink-settings=imagesEnabled=false')
+            options.add_argument('--mute-audio')
+            options.add_argument('--disable-background-networking')
+            options.add_argument('--disable-sync')
+            options.add_argument('--disable-default-apps')
+            options.add_argument('--disable-notifications')
+        if capture:
+            options.set_capability('goog:loggingPrefs',
+                                   {'performance': 'ALL'})
+            options.add_experimental_option('perfLoggingPrefs',
+                                            {'enableNetwork': True,
+                                             'enablePage': False})
+        if lean and headless:
+            options.add_argument('--disable-dev-shm-usage')
+            options.add_argument('--disable-software-rasterizer')
+            options.add_argument('--disable-features=Translate,MediaRouter,'
+                                 'OptimizationHints,AudioServiceOutOfProcess')
         try:
             self.browser = webdriver.Chrome(options=options)
             logger.debug('Chromium launched launched')
         except Exception:
             raise exceptions.BrowserException('Chromium', 'failed to launch')
+        if lean:
+            self.block_urls(blocked_urls)
+        if capture:
+            self.capture = TrafficCapture(self)
+            self.quotes = WebSocketQuoteTap(self.capture)
+            # the P&L follows every streamed quote
+            self.quotes.cache.register_observer(self.pnl)
         return True
 
+    def start_recording(self):
+        """Record the driver commands from now on, see recorder"""
+        if not isinstance(self.browser, RecordingDriver):
+            self.browser = RecordingDriver(self.browser)
+
+    def stop_recording(self, path=None):
+        """Stop recording, saving the trace
+
+        Args:
+            path (str): Trace file, gzip compressed if ending in '.gz'
+
+        Returns:
+            (Trace): The recorded trace
+        """
+        recorder = self.browser
+        if not isinstance(recorder, RecordingDriver):
+            raise exceptions.BrowserException('Chromium', 'not recording')
+        self.browser = recorder.driver
+        if path is not None:
+            recorder.trace.save(path)
+        return recorder.trace
+
+    def replay(self, path, realtime=False):
+        """Use a recorded trace in place of the browser
+
+        Args:
+            path (str): Trace file saved by stop_recording
+            realtime (bool): Whether to wait the recorded duration of each
+                command. Default False, to run at full CPU speed
+
+        Returns:
+            (ReplayDriver): The replaying driver, also set as browser
+        """
+        self.browser = ReplayDriver.load(path, realtime)
+        return self.browser
+
+    @synchronized
+    def block_urls(self, patterns):
+        """Block requests matching URL patterns, through DevTools
+
+        Args:
+            patterns (list <str>): URL patterns, '*' as wildcard
+        """
+        self.browser.execute_cdp_cmd('Network.enable', {})
+        self.browser.execute_cdp_cmd('Network.setBlockedURLs',
+                                     {'urls': list(patterns)})
+        logger.debug('blocking %d url patterns', len(patterns))
+
+    @synchronized
+    def page_metrics(self):
+        """Get load timings and memory usage of the current page
+
+        Returns:
+            (dict): 'dom_interactive', 'dom_content_loaded' and 'load' in ms
+                from navigation start, 'js_heap' in bytes
+        """
+        return self.browser.execute_script(PAGE_METRICS)
+
+    @synchronized
     def shutdown(self):
         """Close the driver, logging out"""
         try:
@@ -90,16 +236,68 @@ class LowLevelAPI(object):
             raise exceptions.BrowserException('Chromium', "not started")
         return True
 
+    @contextmanager
+    def snapshot(self, root=None):
+        """Answer the queries from a parsed copy of the page in this block
+
+        The html is read once. Inside the block css, css1, xpath, is_css,
+        search_names... on root or on the elements found are answered
+        locally, other queries still go to the live page. Elements found are
+        read-only: text, get_attribute and queries work, clicks do not.
+
+        Args:
+            root (mixed): Live element or CSS path of the subtree to read,
+                the whole page by default
+
+        Yields:
+            (DomSnapshot): The snapshot
+        """
+        # the queries of other threads must not be answered by it
+        with self.lock:
+            if isinstance(root, str):
+                root = self.css1(root)
+            if root is None:
+                html = self.browser.page_source
+            else:
+                html = root.get_attribute('outerHTML')
+            previous = self._snapshot
+            self._snapshot = DomSnapshot(html, root)
+            try:
+                yield self._snapshot
+            finally:
+                self._snapshot = previous
+
+    def _snapshot_for(self, dom):
+        """The active snapshot, if it can answer the queries on dom"""
+        if self._snapshot is None:
+            return None
+        if dom is self.browser:
+            dom = None
+        return self._snapshot if self._snapshot.answers(dom) else None
+
+    @synchronized
     def css(self, css_path, dom=None):
         """css find function abbreviation"""
+        snapshot = self._snapshot_for(dom)
+        if snapshot is not None:
+            return snapshot.css(css_path, dom)
         dom = dom if dom else self.browser
-        return expect(dom.find_elements_by_css_selector, args=[css_path])
+        return self.retry_policies['find'].call(
+            dom.find_elements_by_css_selector, css_path)
 
     def css1(self, css_path, dom=None):
-        """return the first value of self.css"""
+        """return the first value of self.css
+
+        Raises:
+            (ElementNotFound): If no element matches
+        """
         dom = dom if dom else self.browser
-        return self.css(css_path, dom)[0]
+        elements = self.css(css_path, dom)
+        if not elements:
+            raise exceptions.ElementNotFound(css_path)
+        return elements[0]
 
+    @synchronized
     def search_names(self, name, dom=None):
         """Return list of elements matching name passed
 
@@ -110,18 +308,39 @@ class LowLevelAPI(object):
         Returns:
             (list <WebElement>): List of matching elements
         """
+        snapshot = self._snapshot_for(dom)
+        if snapshot is not None:
+            return snapshot.names(name, dom)
         dom = dom if dom else self.browser
-        return expect(dom.find_elements_by_name, args=[name])
+        return self.retry_policies['find'].call(dom.find_elements_by_name,
+                                                name)
 
     def search_name(self, name, dom=None):
-        """Return first result by name"""
+        """Return first result by name
+
+        Raises:
+            (ElementNotFound): If no element matches
+        """
         dom = dom if dom else self.browser
-        return self.search_names(name, dom)[0]
+        elements = self.search_names(name, dom)
+        if not elements:
+            raise exceptions.ElementNotFound(f'[name={name}]')
+        return elements[0]
 
+    @synchronized
     def xpath(self, xpath, dom=None):
         """xpath find function abbreviation"""
+        snapshot = self._snapshot_for(dom)
+        if snapshot is not None:
+            try:
+                return snapshot.xpath(xpath, dom)
+            except ValueError:
+                if isinstance(dom, SnapshotElement):
+                    raise
+                logger.debug('xpath %s not supported by snapshots', xpath)
         dom = dom if dom else self.browser
-        return expect(dom.find_elements_by_xpath, args=[xpath])
+        return self.retry_policies['find'].call(dom.find_elements_by_xpath,
+                                                xpath)
 
     def is_css(self, css_path, dom=None):
         """Check if there is an element by CSS path
@@ -141,6 +360,7 @@ class LowLevelAPI(object):
         dom = dom if dom else self.browser
         return len(self.xpath(xpath, dom)) > 0
 
+    @synchronized
     def get(self, url):
         """Connect to the URL through 'GET' request
 
@@ -152,28 +372,39 @@ class LowLevelAPI(object):
         """
         try:
             w()
-            logger.debug(f'visiting {url}')
+            logger.debug('visiting %s', url)
             self.browser.get(url)
-            logger.debug(f'connected to {url}')
+            logger.debug('connected to %s', url)
             w()
         except selenium.common.exceptions.WebDriverException:
             logger.critical('connection timed out')
             raise
 
-    def wait_for_element(self, css_path):
+    @synchronized
+    def wait_for_element(self, css_path, required=True):
         """Wait for a css path to appear
 
         Useful to check popups/modals after navigating to a new url
 
+        Args:
+            required (bool): Whether to raise if it doesn't appear, else
+                return False. Default True
+
         Returns:
-            (mixed): Element if it appears, false otherwise
+            (mixed): Element if it appears, False if not required
+
+        Raises:
+            (ElementNotFound): If required and it doesn't appear in time
         """
         timeout = time.time() + 4
         while not self.is_css(css_path):
             if time.time() > timeout:
+                if required:
+                    raise exceptions.ElementNotFound(css_path)
                 return False
         return self.css1(css_path)
 
+    @synchronized
     def wait_for_element_disappear(self, css_path):
         """Wait for a css path to disappear
 
@@ -188,6 +419,7 @@ class LowLevelAPI(object):
                 return False
         return True
 
+    @synchronized
     def login(self, username, password, trading_mode=TRADING_MODES.INVEST,
               is_live=False, autoload=True):
         """Login onto the platform, navigating to desired mode
@@ -201,27 +433,14 @@ class LowLevelAPI(object):
                 orders
         Returns:
             (bool): True if login successful, otherwise False
+
+        Raises:
+            (CredentialsException): If the credentials are refused
+            (CircuitOpen): If the broker failed too many times recently
         """
-        # Access login page
-        url = urls['login']
-        self.get(url)
         try:
-            username_input = self.search_name("login[username]")
-            pass_input = self.search_name("login[password]")
-            # Fill input
-            send_keys_human(username_input, username)
-            send_keys_human(pass_input, password)
-            click(self.css1(dommap['login-submit']))
-
-            # define a timeout for logging in, checking each second
-            timeout = time.time() + 10
-            while not self.is_css(dommap['logo']):
-                if time.time() > timeout:
-                    logger.critical("login failed")
-                    raise CredentialsException(username)
-                time.sleep(1)
-            logger.info(f'logged in as {username}')
-            self._post_login_checks(is_live)
+            self.retry_policies['login'].call(self._login, username,
+                                              password, is_live)
             # Navigate on corresponding mode
             self.go_to_mode(trading_mode, is_live, autoload)
         except Exception as e:
@@ -229,19 +448,44 @@ class LowLevelAPI(object):
             raise BaseExc(e)
         return True
 
+    def _login(self, username, password, is_live=False):
+        """Submit the credentials on the login page, see login"""
+        # Access login page
+        url = urls['login']
+        self.get(url)
+        username_input = self.search_name("login[username]")
+        pass_input = self.search_name("login[password]")
+        # Fill input
+        send_keys_human(username_input, username)
+        send_keys_human(pass_input, password)
+        click(self.css1(dommap['login-submit']))
+
+        # define a timeout for logging in, checking each second
+        timeout = time.time() + 10
+        while not self.is_css(dommap['logo']):
+            if time.time() > timeout:
+                logger.critical("login failed")
+                raise CredentialsException(username)
+            time.sleep(1)
+        logger.info(f'logged in as {username}')
+        self._post_login_checks(is_live)
+
     def _post_login_checks(self, is_live=False):
         """Do checks for modals after login"""
         # check if it's a weekend
         if not is_live and datetime.now().isoweekday() in range(5, 8):
-            alert_box = self.wait_for_element(dommap['alert-box'])
+            alert_box = self.wait_for_element(dommap['alert-box'],
+                                              required=False)
             if alert_box:
                 click(alert_box)
                 logger.debug("weekend trading alert-box closed")
         # Check new account modal
-        new_acc_modal = self.wait_for_element(dommap['new-acc-modal'])
+        new_acc_modal = self.wait_for_element(dommap['new-acc-modal'],
+                                              required=False)
         if new_acc_modal:
             click(new_acc_modal)
 
+    @synchronized
     def go_to_mode(self, trading_mode=TRADING_MODES.INVEST, is_live=False,
                    autoload=True):
         """Navigate to desired mode of trading
@@ -252,7 +496,24 @@ class LowLevelAPI(object):
 
         Returns:
             (bool): True if navigated successfully
+
+        Raises:
+            (CircuitOpen): If the broker failed too many times recently
         """
+        if trading_mode not in TRADING_MODES:
+            raise BaseExc(ValueError(f'Invalid mode: {trading_mode}'))
+        self.retry_policies['go_to_mode'].call(self._go_to_mode,
+                                               trading_mode, is_live)
+        # Autoload
+        # If autoload, reload all pos, instruments
+        if autoload:
+            self.load_instruments()
+            self.load_orders()
+            self.load_positions()
+        return True
+
+    def _go_to_mode(self, trading_mode, is_live=False):
+        """Switch the account menu to a mode, see go_to_mode"""
         if is_live:
             self.get(url=urls['live'])
             self.is_live = True
@@ -270,20 +531,12 @@ class LowLevelAPI(object):
             self.css1(f"{dommap['acc-items']}.equity").click()
         elif trading_mode == TRADING_MODES.ISA:
             self.css1(f"{dommap['acc-items']}.isa").click()
-        else:
-            raise BaseExc(f'Invalid mode: {mode}')
         self.wait_for_element(dommap['acc-menu'])  # wait until done
         # Do modal checks again
         self._post_login_checks(is_live)
         self.trading_mode = trading_mode
-        # Autoload
-        # If autoload, reload all pos, instruments
-        if autoload:
-            self.load_instruments()
-            self.load_orders()
-            self.load_positions()
-        return True
 
+    @synchronized
     def get_bottom_info(self, info):
         """Get information regarding current status
 
@@ -293,58 +546,188 @@ class LowLevelAPI(object):
                 'used_margin' only for CFD page
 
         Returns:
-
+            (float): The value, from the cached account snapshot
         """
-        accepted_values = {
-            'free_funds': 'equity-free',
-            'blocked_funds': 'equity-blocked',
-            'account_value': 'equity-total',
-            'live_result': 'equity-ppl',
-            'used_margin': 'equity-margin'}
-        try:
-            info_label = accepted_values[info]
-            val = self.css1(f'div#{info_label} span.equity-item-value').text
-            return num(val)
-        except KeyError as e:
-            raise exceptions.BaseExc(e)
+        if info not in equity_ids:
+            raise exceptions.BaseExc(KeyError(info))
+        return getattr(self.get_account_snapshot(), info)
+
+    @synchronized
+    def get_account_snapshot(self, max_age=None):
+        """Get all the equity fields at once
 
+        The snapshot is cached for account_ttl seconds, and invalidated when
+        an order is confirmed or positions are reloaded.
+
+        Args:
+            max_age (float): Override account_ttl for this call
+
+        Returns:
+            (AccountSnapshot): Equity fields, None where not shown
+        """
+        max_age = self.account_ttl if max_age is None else max_age
+        snapshot = self._account_snapshot
+        if snapshot is not None and time.time() - snapshot.time <= max_age:
+            return snapshot
+        account = None
+        if self.capture is not None:
+            account = self.capture.get_account(max_age)
+        if account is None:
+            texts = self.browser.execute_script(ACCOUNT_SNAPSHOT, equity_ids)
+            account = {info: num(text) if text else None
+                       for info, text in texts.items()}
+        self._account_snapshot = AccountSnapshot(time=time.time(), **account)
+        self._record_account()
+        return self._account_snapshot
+
+    def invalidate_account_snapshot(self):
+        """Force the next get_account_snapshot to read the page, or a
+        payload captured after this call"""
+        self._account_snapshot = None
+        if self.capture is not None:
+            self.capture.discard('account')
+
+    @synchronized
     def close_all(self):
         """Close any modal window if open"""
         if self.is_css(dommap['close']):
             self.css1(dommap['close']).click()
 
-    def load_orders(self, close=False):
+    @synchronized
+    def load_orders(self, close=False, max_age=None):
         """Reload and set pending orders, for current trading mode
 
         Args:
             close (bool): Whether to close window after loading. Default False
+            max_age (float): Oldest captured payload used, in seconds.
+                Defaults to capture_ttl, the page is read if older
         """
-        orders_modal = self.new_pending_orders_tab()
-        orders_modal.open()
-        orders = orders_modal.get_orders(as_df=True)
-        if close:
-            orders_modal.close()
+        max_age = self.capture_ttl if max_age is None else max_age
+        orders = None
+        if self.capture is not None:
+            orders = self.capture.get_orders(as_df=True, max_age=max_age)
+        if orders is None:
+            orders_modal = self.new_pending_orders_tab()
+            orders_modal.open()
+            orders = orders_modal.get_orders(as_df=True)
+            if close:
+                orders_modal.close()
         new_orders_no = len(orders) - len(self.placed_orders[self.trading_mode])
         self.placed_orders[self.trading_mode] = orders
-        self.log.debug(f'Reloading orders: {new_orders_no} new, total'
-                       f' {len(orders)}')
+        self._record_orders()
+        self.log.debug('Reloading orders: %d new, total %d', new_orders_no,
+                       len(orders))
 
-    def load_positions(self, close=False):
+    @synchronized
+    def load_positions(self, close=False, max_age=None):
         """Reload and set pending orders, for current trading mode
 
         Args:
             close (bool): Whether to close window after loading. Default False
+            max_age (float): Oldest captured payload used, in seconds.
+                Defaults to capture_ttl, the page is read if older
         """
-        pos_modal = self.new_positions_tab()
-        pos_modal.open()
-        pos = pos_modal.get_positions(as_df=True)
-        if close:
-            pos_modal.close()
+        max_age = self.capture_ttl if max_age is None else max_age
+        pos = None
+        if self.capture is not None:
+            pos = self.capture.get_positions(as_df=True, max_age=max_age)
+        if pos is None:
+            pos_modal = self.new_positions_tab()
+            pos_modal.open()
+            pos = pos_modal.get_positions(as_df=True)
+            if close:
+                pos_modal.close()
+        self.invalidate_account_snapshot()
         new_pos_no = len(pos) - len(self.positions[self.trading_mode])
         self.positions[self.trading_mode] = pos
-        self.log.debug(f'Reloading positions: {new_pos_no} new, total'
-                       f' {len(pos)}')
+        self._record_positions()
+        self._set_pnl_positions()
+        self.log.debug('Reloading positions: %d new, total %d', new_pos_no,
+                       len(pos))
+
+    def timestamp(self):
+        """Time of the session's events"""
+        return get_timestamp()
+
+    def open_history(self, path=HISTORY_DB, **kwargs):
+        """Record orders, positions and account snapshots from now on
+
+        Args:
+            path (str): SQLite database, see history.HistoryStore
+
+        Returns:
+            (HistoryStore): The store, also set as self.history
+        """
+        self.history = HistoryStore(path, **kwargs)
+        return self.history
+
+    def record_order(self, order):
+        """Record the current state of an order, if keeping history"""
+        if self.history is not None:
+            self.history.record_order(self.trading_mode, order,
+                                      self.timestamp())
+
+    def _record_orders(self):
+        if self.history is None:
+            return
+        self.history.record_orders(self.trading_mode,
+                                   self.placed_orders[self.trading_mode],
+                                   self.timestamp())
+
+    def _record_positions(self, infer_fills=True):
+        if self.history is None:
+            return
+        positions = self.positions[self.trading_mode]
+        # also the ones just closed, for the price of the closing fills
+        symbols = set(self.history.held(self.trading_mode))
+        if 'instrument' in positions:
+            symbols.update(positions['instrument'].astype(str).unique())
+        quotes = self.latest_quotes(symbols)
+        prices = {symbol: quote.bid for symbol, quote in quotes.items()
+                  if quote.bid is not None}
+        asks = {symbol: quote.ask for symbol, quote in quotes.items()
+                if quote.ask is not None}
+        self.history.record_positions(self.trading_mode, positions, prices,
+                                      self.timestamp(), asks, infer_fills)
+
+    def _record_account(self):
+        if self.history is not None:
+            self.history.record_account(self.trading_mode,
+                                        self._account_snapshot,
+                                        self.timestamp())
+
+    def latest_quotes(self, symbols):
+        """Latest streamed quotes of instruments, by symbol
 
+        Returns:
+            (dict): Quote by symbol, for the quoted ones
+        """
+        if self.quotes is None:
+            return {}
+        quotes = {}
+        for symbol in symbols:
+            quote = self.quotes.get(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def _set_pnl_positions(self):
+        self.pnl.set_positions(self.positions[self.trading_mode],
+                               self.trading_mode,
+                               self.instruments[self.trading_mode])
+        self.refresh_pnl()
+
+    def refresh_pnl(self):
+        """Recompute the P&L of the positions whose quotes changed
+
+        Returns:
+            (dict): Unrealized P&L, exposures and used margin of the current
+                mode, Risk by currency, see pnl.PnLEngine.risk
+        """
+        return self.pnl.update_from_quotes(
+            self.latest_quotes(self.pnl.held()).values())
+
+    @synchronized
     def load_instruments(self, force_reload=False):
         """Set own instruments list, for the current trading mode
 
@@ -355,43 +738,100 @@ class LowLevelAPI(object):
             force_reload (bool): Whether to force the reload instead of using
                 the cahced CSVs
         """
-        self.instruments[self.trading_mode] = (
-            self.get_all_instruments(force_reload)
-        )
+        self.get_all_instruments(force_reload)
+        self._clear_instrument_index()
 
     def get_all_instruments(self, force_reload=False):
         """Depending on the trading mode, load instruments available
 
+        Changes logged by other sessions are picked up, a reload is recorded
+        in the catalog as a delta of the mode.
+        """
+        catalog = self.get_catalog()
+        catalog.sync()
+        if force_reload or not catalog.count(self.trading_mode):
+            catalog.update(self.trading_mode, self._fetch_instruments())
+        return catalog.frame(self.trading_mode)
+
+    def get_catalog(self):
+        """Get the catalog of all modes, built from the shipped CSVs
+
+        Returns:
+            (InstrumentCatalog): The catalog
         """
-        if self.trading_mode == TRADING_MODES.INVEST:
-            return self._get_refresh_instruments(INVEST_INSTRUMENTS_CSV,
-                                                 force_reload)
-        if self.trading_mode == TRADING_MODES.CFD:
-            return self._get_refresh_instruments(CFD_INSTRUMENTS_CSV,
-                                                 force_reload)
-        if self.trading_mode == TRADING_MODES.ISA:
-            return self._get_refresh_instruments(ISA_INSTRUMENTS_CSV,
-                                                 force_reload)
+        if self.catalog is None:
+            self.catalog = InstrumentCatalog.from_csvs(
+                delta_path=CATALOG_DELTAS)
+        return self.catalog
 
-    def _get_refresh_instruments(self, csv_path, force_reload):
-        """Loads instruments from csv or forces reload
+    def get_catalog_delta(self, version, mode=None):
+        """Get the catalog changes after a version
+
+        Changes logged by other sessions are picked up first.
 
         Args:
-            csv_path (str): Path to store / retrieve from
-            force_reload (bool)): If true, do a new search
+            version (int): Last version seen, 0 for all the changes
+            mode (str): Only the changes of this mode
+
+        Returns:
+            (list <CatalogDelta>): Deltas in order, see catalog.version
+        """
+        catalog = self.get_catalog()
+        if catalog.sync():
+            self._clear_instrument_index()
+        return catalog.delta_since(version, mode)
+
+    def _clear_instrument_index(self):
+        self._instrument_index = {
+            key: instrument for key, instrument
+            in self._instrument_index.items() if key[0] != self.trading_mode}
+        if self.catalog is not None:
+            self.instruments[self.trading_mode] = self.catalog.frame(
+                self.trading_mode)
+
+    def refresh_instruments_sharded(self, username, password, workers=4,
+                                    shards=None):
+        """Reload the catalog of the current mode with parallel sessions
+
+        Args:
+            username (str): Plaintext username, each worker logs in
+            password (str): Plaintext password
+            workers (int): Number of parallel headless sessions. Default 4
+            shards (list <str>): Search queries splitting the catalog
+
+        Returns:
+            (pd.DataFrame): Instruments dataframe, also saved and set
+
+        Raises:
+            (CatalogTruncated): If a shard still reached the result limit,
+                the catalog is left as it was
+        """
+        crawler = ShardedCatalogCrawler(
+            username, password, self.trading_mode,
+            getattr(self, 'is_live', False), workers, shards)
+        instruments = crawler.crawl()
+        self.get_catalog().update(self.trading_mode, instruments)
+        self._clear_instrument_index()
+        return self.instruments[self.trading_mode]
+
+    def _fetch_instruments(self):
+        """Fetch the instruments of the current mode from the service
 
         Returns:
             (pd.DataFrame): Instruments dataframe
         """
-        if os.path.isfile(csv_path) and not force_reload:
-            return pd.read_csv(csv_path)
+        if self.capture is not None:
+            instruments = self.capture.get_instruments()
+            if instruments is not None and not instruments.empty:
+                return instruments
         # Perform a new search of instruments
         instruments_modal = self.new_search_instruments_modal()
         instruments_modal.open()
         instruments = instruments_modal.load_all_instruments()
         # Convert to list of dicts
-        instruments = pd.DataFrame([i.to_dict() for i in instruments])
-        instruments.to_csv(csv_path, index=False)
+        instruments = apply_schema(
+            pd.DataFrame([i.to_dict() for i in instruments]),
+            INSTRUMENTS_SCHEMA)
         instruments_modal.close()
         return instruments
 
@@ -410,22 +850,72 @@ class LowLevelAPI(object):
             (ValueError): If nothing passed
             (ProductNotFound): If not found the instrument
         """
-        if (self.instruments[self.trading_mode] is None or
-                self.instruments[self.trading_mode].empty):
-            self.load_instruments()
-        instrums = self.instruments[self.trading_mode]
         if short_name:
-            instrument = instrums.loc[instrums['short_name'] == short_name]
+            field, value = 'short_name', short_name
         elif name:
-            instrument = instrums.loc[instrums['name'] == name]
+            field, value = 'name', name
         elif symbol:
-            instrument = instrums.loc[instrums['symbol'] == symbol]
+            field, value = 'symbol', symbol
         else:
             raise ValueError('You must pass at least one identifier')
+        key = (self.trading_mode, field, value)
+        if key in self._instrument_index:
+            return self._instrument_index[key]
+        if (self.instruments[self.trading_mode] is None or
+                self.instruments[self.trading_mode].empty):
+            self.load_instruments()
+        instrums = self.instruments[self.trading_mode]
+        instrument = instrums.loc[instrums[field] == value]
         if instrument.empty:
             raise exceptions.ProductNotFound(f'{short_name}/{symbol}/{name}')
-        return Instrument.from_dict(instrument.iloc[0].to_dict())
+        instrument = Instrument.from_dict(instrument.iloc[0].to_dict())
+        self._instrument_index[key] = instrument
+        return instrument
+
+    def find_instrument(self, identifier):
+        """Find an instrument by symbol, short name or name
 
+        Returns:
+            (Instrument): The instrument, None if not found
+        """
+        for field in ('symbol', 'short_name', 'name'):
+            try:
+                return self.get_instrument(**{field: identifier})
+            except exceptions.ProductNotFound:
+                continue
+        return None
+
+    def get_quote(self, name, max_age=QUOTE_MAX_AGE):
+        """Get the latest streamed quote of an instrument
+
+        Args:
+            name (str): Symbol, short name or full name of the instrument
+            max_age (float): Ignore quotes older than this, in seconds
+
+        Returns:
+            (Quote): Latest quote, None if not capturing or not available
+        """
+        if self.quotes is None:
+            return None
+        quote = self.quotes.get(name, max_age)
+        if quote is not None:
+            return quote
+        for field in ('short_name', 'name'):
+            try:
+                symbol = self.get_instrument(**{field: name}).symbol
+            except exceptions.ProductNotFound:
+                continue
+            return self.quotes.cache.get(symbol, max_age)
+        return None
+
+    def subscribe_quotes(self, *symbols):
+        """Only keep the streamed quotes of these symbols"""
+        if self.quotes is None:
+            raise exceptions.BrowserException('Chromium',
+                                              'not launched with capture')
+        self.quotes.subscribe(*symbols)
+
+    @synchronized
     def scroll_to_bottom(self, css_path):
         """Scrolls element to bottom
 
@@ -448,33 +938,71 @@ class LowLevelAPI(object):
         """Instantiate the search window modal"""
         return SearchInstrumentsModal(self)
 
-    def new_cfd_order_window(self, name, order_mode):
+    def new_cfd_order_window(self, name, order_mode, reuse=False):
         """Instantiate a OpenCFDPositionWindow for opening invest positions
 
         Args:
             name (str): Name of the instrument. Should be from available names
             order_mode (str): Field of CFD_ORDER_MODES namedtuple
+            reuse (bool): If True, return the open reusable window when it is
+                on the same instrument, switched to order_mode, and make the
+                new window reusable otherwise. Default False
 
         Returns:
             (OpenCFDPositionWindow) The window instance
         """
         if self.trading_mode != TRADING_MODES.CFD:
             raise ValueError('Cannot open CFD window unless in CFD mode')
-        return CFDOrderWindow(self, name, order_mode)
+        return self._get_order_window(CFDOrderWindow, name, order_mode, reuse)
 
-    def new_invest_order_window(self, name, order_mode):
+    def new_invest_order_window(self, name, order_mode, reuse=False):
         """Instantiate a OpenInvestPositionWindow for opening invest positions
 
         Args:
             name (str): Name of the instrument. Should be from available names
             order_mode (str): Field of ORDER_MODES namedtuple
+            reuse (bool): If True, return the open reusable window when it is
+                on the same instrument, switched to order_mode, and make the
+                new window reusable otherwise. Default False
 
         Returns:
             (OpenInvestPositionWindow) The window instance
         """
         if self.trading_mode != TRADING_MODES.INVEST:
             raise ValueError('Cannot open CFD window unless in CFD mode')
-        return InvestOrderWindow(self, name, order_mode)
+        return self._get_order_window(InvestOrderWindow, name, order_mode,
+                                      reuse)
+
+    def _get_order_window(self, window_cls, name, order_mode, reuse):
+        """Get the open reusable window or instantiate a new one
+
+        A window closed meanwhile is replaced by a new one, to be opened,
+        searching the instrument again.
+        """
+        if not reuse:
+            return window_cls(self, name, order_mode)
+        window = self.order_window
+        if window is not None and window.is_open():
+            if isinstance(window, window_cls) and window.instrument == name:
+                if window.order_type != order_mode:
+                    window.set_order_control(order_mode)
+                return window
+            window.close()
+        self.order_window = window_cls(self, name, order_mode, reusable=True)
+        return self.order_window
+
+    def new_refresh_scheduler(self, ttls=None, max_per_tick=None):
+        """Instantiate the refresh scheduler of this session
+
+        Args:
+            ttls (dict): Override the default TTL of resources, by name
+            max_per_tick (int): Max refreshes per tick
+
+        Returns:
+            (RefreshScheduler): The scheduler, also set as self.scheduler
+        """
+        self.scheduler = RefreshScheduler(self, ttls, max_per_tick)
+        return self.scheduler
 
     def new_pending_orders_tab(self):
         """
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.metrics
+~~~~~~~~~~~~~~
+
+This module provides the in-process metrics of the API.
+
+Counters, gauges and timings are kept by name in the Metrics singleton, so
+that any subsystem can report without being handed a collector.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from .patterns import Singleton
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.metrics')
+
+
+class Metrics(object, metaclass=Singleton):
+    """Registry of counters, gauges and timings"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        # name -> [count, total seconds, max seconds]
+        self.timings = {}
+
+    def incr(self, name, value=1):
+        """Increment a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """Set a gauge to its current value"""
+        self.gauges[name] = value
+
+    def timing(self, name, seconds):
+        """Record the duration of an operation"""
+        with self._lock:
+            timing = self.timings.setdefault(name, [0, 0., 0.])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block, see timing"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timing(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Get all the metrics
+
+        Returns:
+            (dict): {'counters': {...}, 'gauges': {...}, 'timings': {name:
+                {'count', 'total', 'mean', 'max'}}}
+        """
+        with self._lock:
+            timings = {name: {'count': count, 'total': total,
+                              'mean': total / count if count else 0.,
+                              'max': longest}
+                       for name, (count, total, longest)
+                       in self.timings.items()}
+            return {'counters': dict(self.counters),
+                    'gauges': dict(self.gauges), 'timings': timings}
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.timings.clear()
@@ -0,0 +1,804 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.paper
+~~~~~~~~~~~~~~
+
+This module provides the paper trading broker and the backtests.
+
+PaperBroker has the surface of LowLevelAPI (order windows, load_orders,
+load_positions, get_bottom_info, get_quote...) for CFD, INVEST and ISA, but
+fills the orders against recorded or synthetic ticks instead of a browser.
+Pending orders and positions are held in NumPy columns, so that each tick
+matches the whole book and checks every take profit / stop loss in one
+vectorized step.
+"""
+
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from tradingAPI import exceptions
+from .base import Order, CFDMarketOrder, InvestMarketOrder, Position, \
+    Instrument, AccountSnapshot
+from .low_level import LowLevelAPI
+from .quotes import Quote
+from .schema import apply_schema, ORDERS_SCHEMA, POSITIONS_SCHEMA, \
+    INSTRUMENTS_SCHEMA
+from .utils import ORDER_TYPES, CFD_ORDER_TYPES, ORDER_STATUS, \
+    TRADING_MODES, BUY, SELL, get_timestamp
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.paper')
+
+# Matching rule of each order type
+MARKET, LIMIT, STOP, STOP_LIMIT, OCO = range(5)
+KINDS = {
+    ORDER_TYPES.MARKET: MARKET,
+    ORDER_TYPES.LIMIT: LIMIT,
+    ORDER_TYPES.STOP: STOP,
+    ORDER_TYPES.STOP_LIMIT: STOP_LIMIT,
+    CFD_ORDER_TYPES.MARKET: MARKET,
+    CFD_ORDER_TYPES.OCO: OCO,
+    # CFD_ORDER_TYPES.LIMIT_STOP is a limit or a stop, see PaperBroker.submit
+}
+
+# (name, dtype, default) of the pending orders. gain and loss are the
+# distances of the take profit and stop loss from the fill price
+BOOK_COLUMNS = (('row', 'int64', 0), ('side', 'int8', 1),
+                ('kind', 'int8', MARKET), ('quantity', 'float64', 0.),
+                ('limit', 'float64', np.nan), ('stop', 'float64', np.nan),
+                ('gain', 'float64', np.nan), ('loss', 'float64', np.nan),
+                ('triggered', 'bool', False))
+POSITION_COLUMNS = (('row', 'int64', 0), ('side', 'int8', 1),
+                    ('quantity', 'float64', 0.), ('price', 'float64', 0.),
+                    ('take_profit', 'float64', np.nan),
+                    ('stop_loss', 'float64', np.nan))
+
+
+def side_of(direction):
+    return 1 if direction == BUY else -1
+
+
+class Rows(object):
+    """Objects with parallel NumPy columns, deleted by mask"""
+    def __init__(self, columns):
+        self.defaults = {name: default for name, _, default in columns}
+        self.columns = {name: np.zeros(0, dtype) for name, dtype, _ in columns}
+        self.objects = []
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def append(self, obj, **values):
+        self.objects.append(obj)
+        for name, column in self.columns.items():
+            value = values.get(name)
+            self.columns[name] = np.append(
+                column, self.defaults[name] if value is None else value
+            ).astype(column.dtype)
+
+    def delete(self, mask):
+        self.objects = [obj for obj, drop in zip(self.objects, mask)
+                        if not drop]
+        for name, column in self.columns.items():
+            self.columns[name] = column[~mask]
+
+
+class PaperAccount(object):
+    """Cash, pending orders and positions of a trading mode"""
+    def __init__(self, mode, funds):
+        self.mode = mode
+        self.cash = float(funds)
+        self.realized = 0.
+        self.book = Rows(BOOK_COLUMNS)
+        self.positions = Rows(POSITION_COLUMNS)
+        # Filled and cancelled orders, in order
+        self.history = []
+
+
+class PaperBroker(LowLevelAPI):
+    """Simulated broker with the surface of LowLevelAPI"""
+    def __init__(self, instruments, funds=10000., margin_rate=0.2,
+                 trading_mode=TRADING_MODES.INVEST, validate=True):
+        """
+        Args:
+            instruments (list <Instrument>): Tradable instruments, the ticks
+                are given by their symbols
+            funds (float): Starting cash of each mode
+            margin_rate (float): Margin of the CFD positions, share of their
+                value. Default 0.2 (leverage 1:5)
+            trading_mode (str): Mode to start in
+            validate (bool): Whether orders go through the pre-trade
+                validator, as with the broker
+        """
+        super().__init__()
+        self.trading_mode = trading_mode
+        self.is_live = False
+        self.margin_rate = margin_rate
+        self.pnl.margin_rate = margin_rate
+        self.validate = validate
+        frame = apply_schema(pd.DataFrame([instrument.to_dict()
+                                           for instrument in instruments]),
+                             INSTRUMENTS_SCHEMA)
+        for mode in TRADING_MODES:
+            self.instruments[mode] = frame
+        self.symbols = [instrument.symbol for instrument in instruments]
+        self.rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.bids = np.full(len(self.symbols), np.nan)
+        self.asks = np.full(len(self.symbols), np.nan)
+        # Time of the last tick, the simulated clock
+        self.now = None
+        self.accounts = {mode: PaperAccount(mode, funds)
+                         for mode in TRADING_MODES}
+        self._exchange_ids = itertools.count(1)
+
+    @classmethod
+    def from_symbols(cls, symbols, fractional=True, **kwargs):
+        """Broker of instruments named after their symbols"""
+        return cls([Instrument.intern(symbol, symbol, symbol,
+                                      fractional=fractional)
+                    for symbol in symbols], **kwargs)
+
+    @property
+    def account(self):
+        """Account of the current mode"""
+        return self.accounts[self.trading_mode]
+
+    # Session
+
+    def launch(self, headless=False, lean=False, capture=False):
+        logger.debug('paper broker, no browser to launch')
+
+    def shutdown(self):
+        return True
+
+    def _login(self, username, password, is_live=False):
+        logger.debug('paper broker, logged in as %s', username)
+
+    def _go_to_mode(self, trading_mode, is_live=False):
+        self.is_live = is_live
+        self.trading_mode = trading_mode
+
+    def load_instruments(self, force_reload=False):
+        self._clear_instrument_index()
+
+    def timestamp(self):
+        """Time of the simulated clock, wall time before the first tick"""
+        return get_timestamp() if self.now is None else self.now
+
+    # Quotes and matching
+
+    def get_quote(self, name, max_age=None):
+        """Quote of the last tick, max_age is ignored"""
+        row = self.rows.get(name)
+        if row is None:
+            instrument = self.find_instrument(name)
+            if instrument is None:
+                return None
+            row = self.rows[instrument.symbol]
+        if np.isnan(self.bids[row]) and np.isnan(self.asks[row]):
+            return None
+        return Quote(self.symbols[row], self.bids[row].item(),
+                     self.asks[row].item(), self.timestamp())
+
+    def tick(self, symbols, bids, asks, timestamp=None):
+        """Update the quotes of some instruments, filling the orders
+
+        Args:
+            symbols (list <str>): Symbols of the quotes
+            bids (list <float>): Sell prices
+            asks (list <float>): Buy prices
+            timestamp (datetime): Time of the quotes
+        """
+        rows = np.fromiter((self.rows[symbol] for symbol in symbols),
+                           dtype='int64', count=len(symbols))
+        self.bids[rows] = bids
+        self.asks[rows] = asks
+        self.step(timestamp)
+        # the P&L of the loaded positions follows every tick
+        tracked = [i for i, symbol in enumerate(symbols)
+                   if symbol in self.pnl.rows]
+        if tracked:
+            self.pnl.update_quotes([symbols[i] for i in tracked],
+                                   self.bids[rows[tracked]],
+                                   self.asks[rows[tracked]])
+
+    def step(self, timestamp=None):
+        """Match the books and the exits against the current quotes"""
+        if timestamp is not None:
+            self.now = timestamp
+        for account in self.accounts.values():
+            if len(account.book):
+                self._match(account)
+            if len(account.positions) and account.mode == TRADING_MODES.CFD:
+                self._check_exits(account)
+
+    def _match(self, account):
+        book = account.book
+        row, side, kind = book['row'], book['side'], book['kind']
+        price = np.where(side > 0, self.asks[row], self.bids[row])
+        with np.errstate(invalid='ignore'):
+            # buy at or below the limit, sell at or above it
+            limit_hit = side * (book['limit'] - price) >= 0
+            stop_hit = side * (price - book['stop']) >= 0
+        triggered = book['triggered'] | ((kind == STOP_LIMIT) & stop_hit)
+        book.columns['triggered'] = triggered
+        fill = ~np.isnan(price) & (
+            (kind == MARKET) |
+            (((kind == LIMIT) | (kind == OCO) | triggered) & limit_hit) |
+            (((kind == STOP) | (kind == OCO)) & stop_hit))
+        if not fill.any():
+            return
+        for i in np.flatnonzero(fill):
+            self._fill(account, book.objects[i], row[i], side[i], price[i],
+                       book['gain'][i], book['loss'][i])
+        book.delete(fill)
+
+    def _fill(self, account, order, row, side, price, gain, loss):
+        quantity = order.quantity
+        if account.mode == TRADING_MODES.CFD:
+            account.positions.append(
+                Position(order.instrument, quantity, price, self.timestamp(),
+                         order.exchange_id, order.direction),
+                row=row, side=side, quantity=quantity, price=price,
+                take_profit=price + side * gain,
+                stop_loss=price - side * loss)
+        elif side > 0:
+            if quantity * price > account.cash + 1e-9:
+                self._finish(account, order, ORDER_STATUS.CANCELLED)
+                logger.debug('cancelled %s, insufficient funds',
+                             order.exchange_id)
+                return
+            account.cash -= quantity * price
+            self._add_holding(account, order, row, quantity, price)
+        else:
+            quantity = self._reduce_holding(account, row, quantity, price)
+            if not quantity:
+                self._finish(account, order, ORDER_STATUS.CANCELLED)
+                return
+        order.quantity = quantity
+        order.price = price.item()
+        order.cost = quantity * order.price
+        self._finish(account, order, ORDER_STATUS.FILLED)
+
+    def _finish(self, account, order, status):
+        order.status = status
+        account.history.append(order)
+        if self.history is not None:
+            self.history.record_order(account.mode, order, self.timestamp())
+        if account.mode == self.trading_mode:
+            self.invalidate_account_snapshot()
+
+    def _add_holding(self, account, order, row, quantity, price):
+        positions = account.positions
+        found = np.flatnonzero(positions['row'] == row)
+        if not len(found):
+            positions.append(
+                Position(order.instrument, quantity, price, self.timestamp(),
+                         order.exchange_id),
+                row=row, quantity=quantity, price=price)
+            return
+        i = found[0]
+        held = positions['quantity'][i]
+        average = (held * positions['price'][i] + quantity * price) / (
+            held + quantity)
+        positions['quantity'][i] = held + quantity
+        positions['price'][i] = average
+        position = positions.objects[i]
+        position.quantity, position.price = held + quantity, average.item()
+
+    def _reduce_holding(self, account, row, quantity, price):
+        """Sell up to quantity shares, returns the quantity sold"""
+        positions = account.positions
+        found = np.flatnonzero(positions['row'] == row)
+        if not len(found):
+            return 0.
+        i = found[0]
+        held = positions['quantity'][i]
+        quantity = min(quantity, held)
+        account.cash += quantity * price
+        account.realized += quantity * (price - positions['price'][i])
+        positions['quantity'][i] = held - quantity
+        positions.objects[i].quantity = (held - quantity).item()
+        if held - quantity <= 1e-12:
+            positions.delete(positions['row'] == row)
+        return quantity
+
+    def _check_exits(self, account):
+        positions = account.positions
+        row, side = positions['row'], positions['side']
+        price = np.where(side > 0, self.bids[row], self.asks[row])
+        with np.errstate(invalid='ignore'):
+            hit = ((side * (price - positions['take_profit']) >= 0) |
+                   (side * (positions['stop_loss'] - price) >= 0))
+        if not hit.any():
+            return
+        for i in np.flatnonzero(hit):
+            self._close_cfd(account, i, price[i])
+        positions.delete(hit)
+
+    def _close_cfd(self, account, i, price):
+        positions = account.positions
+        result = positions['side'][i] * positions['quantity'][i] * (
+            price - positions['price'][i])
+        account.cash += result
+        account.realized += result
+        logger.debug('closed %s with %.2f', positions.objects[i].exchange_id,
+                     result)
+        if account.mode == self.trading_mode:
+            self.invalidate_account_snapshot()
+
+    # Orders
+
+    def submit(self, order, take_profit=None, stop_loss=None):
+        """Place an order in the book of the current mode
+
+        Market orders are filled at once if the instrument is quoted.
+
+        Args:
+            order (Order): The order, with limit / stop set as needed
+            take_profit (float): CFD only, distance of the take profit from
+                the fill price
+            stop_loss (float): CFD only, distance of the stop loss
+
+        Returns:
+            (Order): The order, PLACED or FILLED
+        """
+        account = self.account
+        if order.order_type == CFD_ORDER_TYPES.LIMIT_STOP:
+            kind = LIMIT if order.limit is not None else STOP
+        else:
+            kind = KINDS[order.order_type]
+        if kind in (LIMIT, STOP_LIMIT, OCO) and order.limit is None or \
+                kind in (STOP, STOP_LIMIT, OCO) and order.stop is None:
+            raise ValueError(f'{order.order_type} order needs its prices')
+        order.exchange_id = str(next(self._exchange_ids))
+        order.status = ORDER_STATUS.PLACED
+        self.record_order(order)
+        account.book.append(
+            order, row=self.rows[order.instrument.symbol],
+            side=side_of(order.direction), kind=kind,
+            quantity=order.quantity, limit=order.limit, stop=order.stop,
+            gain=take_profit, loss=stop_loss)
+        self.invalidate_account_snapshot()
+        if kind == MARKET:
+            self._match(account)
+        return order
+
+    def cancel_order(self, exchange_id):
+        """Cancel a pending order of the current mode
+
+        Returns:
+            (bool): True if it was pending
+        """
+        book = self.account.book
+        mask = np.array([order.exchange_id == exchange_id
+                         for order in book.objects], dtype=bool)
+        if not mask.any():
+            return False
+        self._finish(self.account, book.objects[np.argmax(mask)],
+                     ORDER_STATUS.CANCELLED)
+        book.delete(mask)
+        return True
+
+    def close_position(self, identifier, quantity=None):
+        """Close a position of the current mode at market
+
+        Args:
+            identifier (str): Exchange ID of a CFD position, or symbol of an
+                INVEST / ISA holding
+            quantity (float): Shares to sell, all by default. INVEST / ISA
+
+        Returns:
+            (bool): True if something was closed
+        """
+        account = self.account
+        positions = account.positions
+        if account.mode == TRADING_MODES.CFD:
+            mask = np.array([position.exchange_id == identifier
+                             for position in positions.objects], dtype=bool)
+            if not mask.any():
+                return False
+            i = np.argmax(mask)
+            row, side = positions['row'][i], positions['side'][i]
+            price = self.bids[row] if side > 0 else self.asks[row]
+            self._close_cfd(account, i, price)
+            positions.delete(mask)
+            return True
+        instrument = self.find_instrument(identifier)
+        row = self.rows[instrument.symbol]
+        held = positions['quantity'][positions['row'] == row].sum()
+        if not held:
+            return False
+        order = InvestMarketOrder(instrument, quantity or held.item(),
+                                  self.bids[row].item(), SELL,
+                                  ORDER_TYPES.MARKET, None, self.timestamp())
+        self.submit(order)
+        return order.status == ORDER_STATUS.FILLED
+
+    # LowLevelAPI surface
+
+    def get_account_snapshot(self, max_age=None):
+        """Equity fields of the current mode, valued at the last tick"""
+        account = self.account
+        positions = account.positions
+        row, side = positions['row'], positions['side']
+        quantity, price = positions['quantity'], positions['price']
+        if account.mode == TRADING_MODES.CFD:
+            current = np.where(side > 0, self.bids[row], self.asks[row])
+            live_result = np.nansum(side * quantity * (current - price))
+            mid = (self.bids[row] + self.asks[row]) / 2
+            used_margin = np.nansum(quantity * mid) * self.margin_rate
+            account_value = account.cash + live_result
+            free_funds = account_value - used_margin
+            blocked_funds = 0.
+        else:
+            current = self.bids[row]
+            current = np.where(np.isnan(current), price, current)
+            live_result = np.sum(quantity * (current - price))
+            book = account.book
+            buys = book['side'] > 0
+            target = np.where(np.isnan(book['limit']), book['stop'],
+                              book['limit'])
+            target = np.where(np.isnan(target), self.asks[book['row']], target)
+            blocked_funds = np.nansum((book['quantity'] * target)[buys])
+            account_value = (account.cash + np.sum(quantity * price) +
+                             live_result)
+            free_funds = account.cash - blocked_funds
+            used_margin = None
+        self._account_snapshot = AccountSnapshot(
+            free_funds=float(free_funds), blocked_funds=float(blocked_funds),
+            account_value=float(account_value),
+            live_result=float(live_result),
+            used_margin=None if used_margin is None else float(used_margin),
+            time=time.time())
+        self._record_account()
+        return self._account_snapshot
+
+    def load_orders(self, close=False, max_age=None):
+        """Set the pending orders of the current mode"""
+        orders = [order.to_dict() for order in self.account.book.objects]
+        for order in orders:
+            order['instrument'] = order['instrument'].symbol
+        self.placed_orders[self.trading_mode] = apply_schema(
+            pd.DataFrame(orders), ORDERS_SCHEMA)
+        self._record_orders()
+
+    def load_positions(self, close=False, max_age=None):
+        """Set the positions of the current mode"""
+        positions = [position.to_dict()
+                     for position in self.account.positions.objects]
+        for position in positions:
+            position['instrument'] = position['instrument'].symbol
+        self.positions[self.trading_mode] = apply_schema(
+            pd.DataFrame(positions), POSITIONS_SCHEMA)
+        # the fills are recorded as they happen, see _finish
+        self._record_positions(infer_fills=False)
+        self._set_pnl_positions()
+
+    def _record_orders(self):
+        # the transitions are recorded as they happen, see _finish
+        pass
+
+    def latest_quotes(self, symbols):
+        """Quotes of the last tick, by symbol"""
+        quotes = {}
+        for symbol in symbols:
+            quote = self.get_quote(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def new_cfd_order_window(self, name, order_mode, reuse=False):
+        """Instantiate a PaperCFDOrderWindow, see LowLevelAPI"""
+        if self.trading_mode != TRADING_MODES.CFD:
+            raise ValueError('Cannot open CFD window unless in CFD mode')
+        return self._get_order_window(PaperCFDOrderWindow, name, order_mode,
+                                      reuse)
+
+    def new_invest_order_window(self, name, order_mode, reuse=False):
+        """Instantiate a PaperInvestOrderWindow, see LowLevelAPI"""
+        if self.trading_mode == TRADING_MODES.CFD:
+            raise ValueError('Cannot open invest window in CFD mode')
+        return self._get_order_window(PaperInvestOrderWindow, name,
+                                      order_mode, reuse)
+
+
+class PaperOrderWindow(object):
+    """Order window of the paper broker, as the order windows of the UI
+
+    The limit and stop prices of pending orders are set with set_target.
+    """
+    # Order types accepted by the window
+    order_types = ()
+
+    def __init__(self, api, instrument, order_type, reusable=False):
+        if order_type not in list(self.order_types):
+            raise ValueError(f'Order mode invalid for {instrument}')
+        self.api = api
+        self.name = instrument
+        self.instrument = instrument
+        self.direction = None
+        self.quantity = None
+        self.cost = None
+        self.price = None
+        self.limit = None
+        self.stop = None
+        self.by_value = False
+        self.stop_limit = {'gain': {}, 'loss': {}}
+        self.order_type = order_type
+        self.state = 'initialized'
+        self.reusable = reusable
+        self._instrument = None
+
+    def open(self):
+        """Look the instrument up"""
+        self._instrument = self.api.find_instrument(self.instrument)
+        if self._instrument is None:
+            raise exceptions.ProductNotFound(self.instrument)
+        self.state = 'open'
+
+    def set_order_control(self, order_type=None):
+        if order_type is not None:
+            if order_type not in list(self.order_types):
+                raise ValueError(f'Order mode invalid for {self.instrument}')
+            self.order_type = order_type
+
+    def _check_open(self):
+        if self.state == 'open' or self.state == 'opening':
+            return True
+        else:
+            raise exceptions.WindowException()
+
+    def is_open(self):
+        return self.state == 'open'
+
+    def close(self):
+        self._check_open()
+        self.state = 'closed'
+
+    def reset(self):
+        """Prepare the window for a new order on the same instrument"""
+        self.quantity = self.cost = self.price = None
+        self.limit = self.stop = None
+        self.stop_limit = {'gain': {}, 'loss': {}}
+        self.state = 'open'
+        return True
+
+    def set_direction(self, direction):
+        self._check_open()
+        if direction not in [BUY, SELL]:
+            raise ValueError('mode needs to be "buy" or "sell"')
+        self.direction = direction
+
+    def set_quantity(self, quant, by_value=False):
+        """Set the number of shares, or the order value if by_value"""
+        self._check_open()
+        self.by_value = by_value
+        self.quantity = quant / self.get_price() if by_value else quant
+
+    def get_quantity(self) -> float:
+        return self.quantity
+
+    def set_limit(self, category, limit_mode, value):
+        """Set the take profit ('gain') and / or stop loss ('loss')
+
+        Args:
+            category (str): 'gain', 'loss' or 'both'
+            limit_mode (str): 'unit' for a distance in price, 'value' for
+                an amount of profit / loss
+            value (float): The distance or amount
+        """
+        self._check_open()
+        if (limit_mode not in ["unit", "value"] or category
+                not in ["gain", "loss", "both"]):
+            raise ValueError()
+        categories = ['gain', 'loss'] if category == 'both' else [category]
+        for cat in categories:
+            self.stop_limit[cat] = {'mode': limit_mode, 'value': value}
+
+    def set_target(self, limit=None, stop=None):
+        """Set the limit and / or stop price of a pending order"""
+        self._check_open()
+        self.limit = limit
+        self.stop = stop
+
+    def fill(self, direction=None, quantity=None, by_value=None,
+             stop_limit=None):
+        """Set direction, quantity and limits, see OrderWindow.fill"""
+        self._check_open()
+        if direction is not None:
+            self.set_direction(direction)
+        for category, (limit_mode, value) in (stop_limit or {}).items():
+            self.set_limit(category, limit_mode, value)
+        if quantity is not None:
+            self.set_quantity(quantity, bool(by_value))
+
+    def get_price(self) -> float:
+        """Price of the last tick for the direction set"""
+        quote = self.api.get_quote(self.instrument)
+        price = None
+        if quote is not None:
+            price = quote.bid if self.direction == SELL else quote.ask
+        if price is None or price != price:
+            raise exceptions.MarketClosed()
+        self.price = price
+        return price
+
+    def get_margin_info(self):
+        if self.api.trading_mode != TRADING_MODES.CFD:
+            return 0
+        return self.get_price() * self.quantity * self.api.margin_rate
+
+    def _distance(self, category):
+        """Distance of the take profit / stop loss from the fill price"""
+        limit = self.stop_limit[category]
+        if not limit:
+            return None
+        if limit['mode'] == 'value':
+            return limit['value'] / self.quantity
+        return limit['value']
+
+    def validator_check(self):
+        """Check the order as the broker would, see OrderWindow"""
+        if self.direction == SELL and \
+                self.api.trading_mode != TRADING_MODES.CFD:
+            # the held shares are read from the frames
+            self.api.load_positions()
+            self.api.load_orders()
+        self.api.validator.check(self._instrument, self.quantity,
+                                 self.limit or self.stop or self.price,
+                                 self.direction, clamp=False)
+
+    def new_order(self):
+        """Order of the window, see confirm"""
+        return Order(self._instrument, self.quantity, self.price,
+                     self.direction, self.order_type, self.cost,
+                     self.api.timestamp())
+
+    def confirm(self) -> bool:
+        """Place the order with the paper broker
+
+        Raises:
+            (MarketClosed): If the instrument was never quoted
+            (FractionalShares, MaxQuantLimit, MinQuantLimit,
+                InsufficientFunds): If validating
+
+        Returns:
+            (bool): True if placed
+        """
+        self._check_open()
+        if not self.quantity or not self.direction:
+            raise ValueError('Quantity and buy/sell has to be set')
+        self.get_price()
+        if self.api.validate:
+            self.validator_check()
+        self.cost = self.price * self.quantity
+        order = self.new_order()
+        order.limit, order.stop = self.limit, self.stop
+        self.api.submit(order, self._distance('gain'), self._distance('loss'))
+        self.api.orders.append(order)
+        self.state = 'conclused'
+        if self.reusable:
+            self.reset()
+        return True
+
+
+class PaperCFDOrderWindow(PaperOrderWindow):
+    order_types = CFD_ORDER_TYPES
+
+    def new_order(self):
+        if self.order_type != CFD_ORDER_TYPES.MARKET:
+            return super().new_order()
+        # take profit and stop loss are only known once filled
+        return CFDMarketOrder(self._instrument, self.quantity, self.price,
+                              self.direction, self.order_type, self.cost,
+                              self.api.timestamp())
+
+
+class PaperInvestOrderWindow(PaperOrderWindow):
+    """INVEST / ISA order window, buying by default
+
+    Unlike the UI window, selling is allowed to close holdings.
+    """
+    order_types = ORDER_TYPES
+
+    def __init__(self, api, instrument, order_type, reusable=False):
+        super().__init__(api, instrument, order_type, reusable)
+        self.direction = BUY
+
+    def new_order(self):
+        if self.order_type != ORDER_TYPES.MARKET:
+            return super().new_order()
+        return InvestMarketOrder(self._instrument, self.quantity, self.price,
+                                 self.direction, self.order_type, self.cost,
+                                 self.api.timestamp(), self.by_value)
+
+
+def synthetic_ticks(symbols, steps, start='2020-01-01', freq='1min',
+                    volatility=0.001, spread=0.0005, price=100., seed=None):
+    """Random walk quotes of many instruments
+
+    Returns:
+        (pd.DataFrame, pd.DataFrame): Bids and asks, indexed by time with a
+            column per symbol
+    """
+    rng = np.random.default_rng(seed)
+    mids = price * np.exp(np.cumsum(
+        rng.normal(0, volatility, (steps, len(symbols))), axis=0))
+    index = pd.date_range(start, periods=steps, freq=freq)
+    half = mids * spread / 2
+    return (pd.DataFrame(mids - half, index=index, columns=symbols),
+            pd.DataFrame(mids + half, index=index, columns=symbols))
+
+
+def ticks_to_frames(ticks):
+    """Bids and asks frames of long ticks
+
+    Args:
+        ticks (pd.DataFrame): Columns timestamp, symbol, bid and ask, e.g.
+            recorded quotes
+
+    Returns:
+        (pd.DataFrame, pd.DataFrame): Bids and asks, indexed by time with a
+            column per symbol, the last quote carried forward
+    """
+    bids = ticks.pivot_table(index='timestamp', columns='symbol',
+                             values='bid', aggfunc='last').ffill()
+    asks = ticks.pivot_table(index='timestamp', columns='symbol',
+                             values='ask', aggfunc='last').ffill()
+    return bids, asks
+
+
+class Backtest(object):
+    """Run a strategy against a PaperBroker over ticks"""
+    def __init__(self, broker, strategy=None, every=1):
+        """
+        Args:
+            broker (PaperBroker): The simulated broker
+            strategy (callable): Called as strategy(broker, timestamp) after
+                the orders were matched
+            every (int): Call the strategy every this many ticks
+        """
+        self.broker = broker
+        self.strategy = strategy
+        self.every = every
+
+    def run(self, bids, asks, record_every=1):
+        """Feed the ticks, oldest first
+
+        Args:
+            bids (pd.DataFrame): Bids indexed by time, a column per symbol
+            asks (pd.DataFrame): Asks, same shape
+            record_every (int): Record the account every this many ticks
+
+        Returns:
+            (pd.DataFrame): Equity fields of the current mode, by time
+        """
+        broker = self.broker
+        columns = np.array([broker.rows[symbol] for symbol in bids.columns])
+        bid_values = bids.to_numpy(dtype='float64')
+        ask_values = asks[bids.columns].to_numpy(dtype='float64')
+        timestamps = bids.index.to_pydatetime()
+        records, times = [], []
+        started = time.perf_counter()
+        for t, timestamp in enumerate(timestamps):
+            broker.bids[columns] = bid_values[t]
+            broker.asks[columns] = ask_values[t]
+            broker.step(timestamp)
+            if self.strategy is not None and t % self.every == 0:
+                self.strategy(broker, timestamp)
+            if t % record_every == 0:
+                records.append(broker.get_account_snapshot()[:-1])
+                times.append(timestamp)
+        logger.debug('backtest of %d ticks in %.2fs', len(timestamps),
+                     time.perf_counter() - started)
+        return pd.DataFrame(records, index=pd.DatetimeIndex(times),
+                            columns=AccountSnapshot._fields[:-1])
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.parsers
+~~~~~~~~~~~~~~
+
+This module provides fast parsers of html read from the page, and of the
+numbers of the scraped table columns.
+"""
+
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+import numpy as np
+import pandas as pd
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.parsers')
+
+Tradebox = namedtuple('Tradebox', ['name', 'market_closed', 'sell', 'buy',
+                                   'sentiment'])
+
+# Elements without end tag
+VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img',
+                       'input', 'link', 'meta', 'param', 'source', 'track',
+                       'wbr'])
+
+# Field of the tradebox held by the text of an element, by (tag, classes)
+TRADEBOX_FIELDS = (
+    ('span', {'instrument-name'}, 'name'),
+    ('div', {'tradebox-price-sell'}, 'sell'),
+    ('div', {'tradebox-price-buy'}, 'buy'),
+    ('span', {'tradebox-buyers-container', 'number-box'}, 'sentiment'),
+)
+
+# The first number of each line, by the separators it shows: ',' thousands
+# with or without '.' decimals, '.' thousands with or without ','
+# decimals, space or apostrophe thousands, a single separator (the decimal
+# unless it may group thousands, e.g. '1,234') and digits only. The text
+# before and after it is kept for the currency. The number is optional so
+# that every line gives one match.
+NUMBER_LINES = re.compile(
+    r"^([^\d\n]*)(?:"
+    r"(\d{1,3}(?:,\d{3})+\.\d+|\d{1,3}(?:,\d{3}){2,})|"
+    r"(\d{1,3}(?:\.\d{3})+,\d+|\d{1,3}(?:\.\d{3}){2,})|"
+    r"(\d{1,3}(?:([' \xa0\u202f])\d{3})(?:\5\d{3})*(?:[.,]\d+)?)|"
+    r"(\d+[.,]\d+)|(\d+))?([^\n]*)$", re.M)
+# A minus before the number, also before its currency ('-£5', '£-5')
+NEGATIVE = re.compile(r'[-\u2212]\s*(?:[^\d\s]{1,3}\s*)?$')
+# A single separator may group thousands: 1-3 digits (not 0) and 3 more
+MAYBE_GROUPED = re.compile(r'[1-9]\d{0,2}[.,]\d{3}')
+# Signs and spaces around the number, the rest is its currency
+NUMBER_NOISE = '+-\u2212 \t\xa0\u202f'
+# Columns of parse_numbers added by parse_number_columns
+NUMBER_DETAILS = ('currency', 'decimal', 'thousands')
+
+
+class TradeboxParser(HTMLParser):
+    """Single pass parser of the tradeboxes in the watchlist panel
+
+    No tree is built: the parser tracks the depth inside the current
+    tradebox and collects the text of the elements in TRADEBOX_FIELDS.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tradeboxes = []
+        self._box = None
+        self._depth = 0
+        # (field, depth at which the field element was opened)
+        self._field = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        classes = None
+        for attr, value in attrs:
+            if attr == 'class':
+                classes = set(value.split()) if value else set()
+                break
+        if self._box is None:
+            if classes and 'tradebox' in classes:
+                self._box = {'market_closed':
+                             'tradebox-market-closed' in classes}
+                self._depth = 1
+            return
+        self._depth += 1
+        if self._field is None and classes:
+            for field_tag, field_classes, field in TRADEBOX_FIELDS:
+                if tag == field_tag and field_classes <= classes:
+                    self._field = (field, self._depth)
+                    self._box[field] = ''
+                    break
+
+    def handle_endtag(self, tag):
+        if self._box is None or tag in VOID_TAGS:
+            return
+        if self._field is not None and self._field[1] == self._depth:
+            self._field = None
+        self._depth -= 1
+        if self._depth == 0:
+            self._close_box()
+
+    def handle_data(self, data):
+        if self._field is not None:
+            self._box[self._field[0]] += data
+
+    def _close_box(self):
+        box, self._box = self._box, None
+        if 'name' not in box:
+            return
+        sentiment = box.get('sentiment', '').strip().strip('%')
+        self.tradeboxes.append(Tradebox(
+            name=box['name'].strip(),
+            market_closed=box['market_closed'],
+            sell=box.get('sell', '').strip() or None,
+            buy=box.get('buy', '').strip() or None,
+            sentiment=int(sentiment) / 100 if sentiment.isdigit() else None))
+
+
+def parse_tradeboxes(html):
+    """Parse all the tradeboxes of a watchlist panel
+
+    Args:
+        html (str): html of the panel
+
+    Returns:
+        (list <Tradebox>): name, market_closed, sell, buy and sentiment of
+            each tradebox, in order
+    """
+    parser = TradeboxParser()
+    parser.feed(html)
+    parser.close()
+    return parser.tradeboxes
+
+
+def _join(texts):
+    """The cells as one text, a line each"""
+    texts = [text.replace('\n', ' ') if isinstance(text, str) else ''
+             for text in texts]
+    return '\n'.join(texts), len(texts)
+
+
+def _to_floats(numbers):
+    """Floats of number strings, nan where empty or invalid"""
+    try:
+        return np.array([number or 'nan' for number in numbers],
+                        dtype='float64')
+    except ValueError:
+        values = np.full(len(numbers), np.nan)
+        for i, number in enumerate(numbers):
+            try:
+                values[i] = float(number)
+            except ValueError:
+                pass
+        return values
+
+
+def _scan(texts, decimal=None):
+    """The first number of each cell, with its separators
+
+    Each cell is read with the separators it shows. Only a single
+    separator that may group thousands ('1,234') is ambiguous: it is read
+    with decimal if given, else with the separator the unambiguous cells of
+    the column use, '.' if they don't agree.
+
+    Returns:
+        (tuple): values (np.ndarray), and lists of the text before and after
+            each number, its decimal and thousands separators
+    """
+    joined, size = _join(texts)
+    cells = NUMBER_LINES.findall(joined) if size else []
+    numbers, decimals, groupings, around = [], [], [], []
+    ambiguous = []
+    seen = set()
+    for before, dot, comma, spaced, space, single, digits, after in cells:
+        point = grouping = None
+        if dot:
+            number = dot.replace(',', '')
+            grouping, point = ',', '.' if '.' in dot else None
+        elif comma:
+            number = comma.replace('.', '').replace(',', '.')
+            grouping, point = '.', ',' if ',' in comma else None
+        elif spaced:
+            number = spaced.replace(space, '')
+            grouping = "'" if space == "'" else ' '
+            if ',' in number:
+                point, number = ',', number.replace(',', '.')
+            elif '.' in number:
+                point = '.'
+        elif single:
+            point = ',' if ',' in single else '.'
+            number = single.replace(',', '.')
+            if MAYBE_GROUPED.fullmatch(single):
+                ambiguous.append(len(numbers))
+        else:
+            number = digits
+        if point is not None and not (ambiguous and
+                                      ambiguous[-1] == len(numbers)):
+            seen.add(point)
+        if number and NEGATIVE.search(before):
+            number = '-' + number
+        numbers.append(number)
+        decimals.append(point)
+        groupings.append(grouping)
+        around.append((before, after))
+    if ambiguous:
+        if decimal is None:
+            decimal = seen.pop() if len(seen) == 1 else '.'
+        for i in ambiguous:
+            single = cells[i][5]
+            if single[-4] != decimal:
+                # groups thousands
+                numbers[i] = numbers[i][:-4] + single[-3:]
+                decimals[i], groupings[i] = None, single[-4]
+    return _to_floats(numbers), around, decimals, groupings
+
+
+def parse_values(texts, decimal=None):
+    """Parse a column of scraped numbers into floats, in one pass
+
+    The cells are joined and read by one precompiled pattern, taking the
+    first number of each cell, as num does. The separators are decided for
+    each cell, see _scan.
+
+    Args:
+        texts (iterable <str>): Cell texts, None for missing cells
+        decimal (str): '.' or ',', separator of the ambiguous cells
+            ('1,234') instead of inferring it
+
+    Returns:
+        (np.ndarray): The numbers, nan where missing
+    """
+    return _scan(texts, decimal)[0]
+
+
+def parse_numbers(texts, decimal=None):
+    """Parse a column of scraped numbers, see parse_values
+
+    Currency symbols and units ('£', 'EUR', '%') and the separators are
+    kept in their own columns.
+
+    Args:
+        texts (iterable <str>): Cell texts, None for missing cells
+        decimal (str): '.' or ',', separator of the ambiguous cells
+            ('1,234') instead of inferring it
+
+    Returns:
+        (pd.DataFrame): value (float), currency, decimal and thousands
+            separators, None where absent, in the order of texts
+    """
+    index = texts.index if isinstance(texts, pd.Series) else None
+    values, around, decimals, groupings = _scan(list(texts), decimal)
+    return pd.DataFrame({
+        'value': values,
+        'currency': [(before + after).strip(NUMBER_NOISE) or None
+                     if value == value else None
+                     for (before, after), value in zip(around, values)],
+        'decimal': decimals,
+        'thousands': groupings,
+    }, index=index, columns=['value', 'currency', 'decimal', 'thousands'])
+
+
+def parse_number_columns(frame, columns, details=True):
+    """Replace the text columns of a scraped table by their numbers
+
+    Args:
+        frame (pd.DataFrame): Table of cell texts, modified in place
+        columns (list <str>): Numeric columns, the missing ones are skipped
+        details (bool): Add the currency and separators of each column as
+            <column>_currency, <column>_decimal and <column>_thousands.
+            Default True
+
+    Returns:
+        (pd.DataFrame): The same frame
+    """
+    for column in columns:
+        if column not in frame.columns:
+            continue
+        if details:
+            parsed = parse_numbers(frame[column])
+            frame[column] = parsed['value']
+            for detail in NUMBER_DETAILS:
+                frame[f'{column}_{detail}'] = parsed[detail]
+        else:
+            frame[column] = parse_values(frame[column])
+    return frame
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.pnl
+~~~~~~~~~~~~~~
+
+This module provides the live P&L and exposure of the positions.
+
+Positions are aggregated by instrument into NumPy arrays (long and short
+quantity and cost), so that the unrealized P&L, exposure and CFD margin of
+the whole portfolio follow from the latest quotes in one vectorized pass.
+When only some quotes change, only their instruments are recomputed and
+the portfolio totals are moved by the difference, so the engine can follow
+every tick of a QuoteCache it observes. Amounts are not converted: the
+totals are kept by currency, that of the exchange of each instrument.
+Positions without quotes are valued at cost.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .utils import BUY, TRADING_MODES
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.pnl')
+
+# Portfolio totals in one currency
+Risk = namedtuple('Risk', [
+    'unrealized', 'long_exposure', 'short_exposure', 'gross_exposure',
+    'net_exposure', 'used_margin'])
+
+# Trading currency of the exchanges of the instruments catalog
+EXCHANGE_CURRENCIES = {
+    'NASDAQ': 'USD',
+    'NYSE': 'USD',
+    'London Stock Exchange': 'GBP',
+    'Deutsche Börse Xetra': 'EUR',
+    'Netherlands': 'EUR',
+    'Euronext Paris': 'EUR',
+    'Bolsa de Madrid': 'EUR',
+    'SIX Swiss': 'CHF',
+}
+# Currency of the instruments of an exchange not listed above
+UNKNOWN_CURRENCY = 'unknown'
+
+# Arrays of the engine, one value per instrument
+ARRAYS = ('long_qty', 'long_cost', 'short_qty', 'short_cost', 'bid', 'ask',
+          'unrealized', 'long_value', 'short_value', 'margin')
+# Arrays summed into the Risk totals
+TOTALS = ('unrealized', 'long_value', 'short_value', 'margin')
+# Recompute the totals from scratch after this many incremental updates
+RESUM_EVERY = 1000
+
+
+class PnLEngine(object):
+    """Unrealized P&L, exposure and margin of the positions of a mode"""
+    def __init__(self, margin_rate=0.2, margin_rates=None, capacity=64):
+        """
+        Args:
+            margin_rate (float): Margin of the CFD positions, share of their
+                value. Default 0.2 (leverage 1:5)
+            margin_rates (dict): Margin rate by symbol, overriding the
+                default
+            capacity (int): Initial number of instrument rows
+        """
+        self.margin_rate = margin_rate
+        self.margin_rates = margin_rates or {}
+        self.mode = None
+        self.rows = {}
+        self.symbols = []
+        self.exchanges = []
+        # currency of each row, as index in currencies
+        self.currencies = []
+        self.currency = np.zeros(0, dtype='int64')
+        # currency indexes of the positions
+        self._held_currencies = []
+        self.positions = pd.DataFrame()
+        self._position_rows = np.zeros(0, dtype='int64')
+        # totals by currency index
+        self._totals = {name: np.zeros(0) for name in TOTALS}
+        self._updates = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        size = len(self.symbols)
+        for name in ARRAYS + ('rate',):
+            new = np.full(capacity, np.nan if name in ('bid', 'ask') else 0.)
+            old = self.__dict__.get(name)
+            if old is not None:
+                new[:size] = old[:size]
+            setattr(self, name, new)
+        currency = np.zeros(capacity, dtype='int64')
+        currency[:size] = self.currency[:size]
+        self.currency = currency
+
+    def _currency_code(self, exchange):
+        """Index in currencies of the currency of an exchange"""
+        currency = EXCHANGE_CURRENCIES.get(exchange, UNKNOWN_CURRENCY)
+        if currency not in self.currencies:
+            self.currencies.append(currency)
+        return self.currencies.index(currency)
+
+    def _rows(self, symbols):
+        """Rows of symbols, adding the new ones"""
+        rows = np.empty(len(symbols), dtype='int64')
+        for i, symbol in enumerate(symbols):
+            row = self.rows.get(symbol)
+            if row is None:
+                row = self.rows[symbol] = len(self.symbols)
+                if row >= len(self.bid):
+                    self._allocate(2 * len(self.bid))
+                self.symbols.append(symbol)
+                self.exchanges.append(None)
+                self.currency[row] = self._currency_code(None)
+                self.rate[row] = self.margin_rates.get(symbol,
+                                                       self.margin_rate)
+            rows[i] = row
+        return rows
+
+    def set_positions(self, positions, mode, instruments=None):
+        """Replace the positions, e.g. after LowLevelAPI.load_positions
+
+        Args:
+            positions (pd.DataFrame): instrument (symbol), direction,
+                quantity and price of each position
+            mode (str): Trading mode, margin only applies to CFD
+            instruments (pd.DataFrame): symbol and exchange of the
+                instruments, for the exposure by exchange / currency
+        """
+        self.mode = mode
+        self.positions = positions
+        for name in ('long_qty', 'long_cost', 'short_qty', 'short_cost'):
+            getattr(self, name)[:] = 0.
+        if positions.empty:
+            self._position_rows = np.zeros(0, dtype='int64')
+        else:
+            rows = self._rows(positions['instrument'].astype(str).tolist())
+            long = (positions['direction'].astype(str) == BUY).to_numpy()
+            quantity = positions['quantity'].to_numpy(dtype='float64')
+            cost = quantity * positions['price'].to_numpy(dtype='float64')
+            size = len(self.bid)
+            self.long_qty[:] = np.bincount(rows[long], quantity[long], size)
+            self.long_cost[:] = np.bincount(rows[long], cost[long], size)
+            self.short_qty[:] = np.bincount(rows[~long], quantity[~long],
+                                            size)
+            self.short_cost[:] = np.bincount(rows[~long], cost[~long], size)
+            self._position_rows = rows
+        if instruments is not None and not instruments.empty:
+            listed = instruments.drop_duplicates('symbol').set_index(
+                'symbol')['exchange']
+            for symbol, row in self.rows.items():
+                if symbol in listed.index:
+                    self.exchanges[row] = listed[symbol]
+                    self.currency[row] = self._currency_code(listed[symbol])
+        self._held_currencies = np.unique(
+            self.currency[self._position_rows]).tolist()
+        self._recompute(np.arange(len(self.symbols)), exact=True)
+
+    def update_quotes(self, symbols, bids, asks):
+        """Recompute the instruments whose quotes changed
+
+        Quotes equal to the previous ones are skipped.
+
+        Args:
+            symbols (list <str>): Symbols of the quotes
+            bids (list <float>): Sell prices
+            asks (list <float>): Buy prices
+
+        Returns:
+            (dict): The portfolio totals, Risk by currency
+        """
+        if len(symbols):
+            rows = self._rows(symbols)
+            bids = np.asarray(bids, dtype='float64')
+            asks = np.asarray(asks, dtype='float64')
+            with np.errstate(invalid='ignore'):
+                changed = ~(((bids == self.bid[rows]) |
+                             (np.isnan(bids) & np.isnan(self.bid[rows]))) &
+                            ((asks == self.ask[rows]) |
+                             (np.isnan(asks) & np.isnan(self.ask[rows]))))
+            if changed.any():
+                rows = rows[changed]
+                self.bid[rows] = bids[changed]
+                self.ask[rows] = asks[changed]
+                self._recompute(np.unique(rows))
+        return self.risk()
+
+    def update_from_quotes(self, quotes):
+        """Recompute from Quote objects, see update_quotes
+
+        Args:
+            quotes (iterable <Quote>): Latest quotes
+
+        Returns:
+            (dict): The portfolio totals, Risk by currency
+        """
+        quotes = list(quotes)
+        return self.update_quotes(
+            [quote.symbol for quote in quotes],
+            [np.nan if quote.bid is None else quote.bid for quote in quotes],
+            [np.nan if quote.ask is None else quote.ask for quote in quotes])
+
+    def notify(self, observable, event, quotes):
+        """Follow a QuoteCache, recomputing on each update of its quotes
+
+        Only the quotes of the instruments already tracked are used.
+        """
+        if event == 'quotes':
+            self.update_from_quotes(quote for quote in quotes
+                                    if quote.symbol in self.rows)
+
+    def held(self):
+        """Symbols with positions"""
+        size = len(self.symbols)
+        rows = np.flatnonzero((self.long_qty[:size] +
+                               self.short_qty[:size]) > 0)
+        return [self.symbols[row] for row in rows]
+
+    def _recompute(self, rows, exact=False):
+        bid, ask = self.bid[rows], self.ask[rows]
+        # a missing side is replaced by the other one
+        bid = np.where(np.isnan(bid), ask, bid)
+        ask = np.where(np.isnan(ask), bid, ask)
+        long_qty, short_qty = self.long_qty[rows], self.short_qty[rows]
+        long_cost, short_cost = self.long_cost[rows], self.short_cost[rows]
+        quoted = ~np.isnan(bid)
+        # longs close at the bid, shorts at the ask, unquoted at cost
+        long_value = np.where(quoted, long_qty * bid, long_cost)
+        short_value = np.where(quoted, short_qty * ask, short_cost)
+        unrealized = (long_value - long_cost) + (short_cost - short_value)
+        margin = np.zeros(len(rows))
+        if self.mode == TRADING_MODES.CFD:
+            margin = np.where(quoted, (long_qty + short_qty) * (bid + ask) / 2,
+                              long_cost + short_cost) * self.rate[rows]
+        values = {'unrealized': unrealized, 'long_value': long_value,
+                  'short_value': short_value, 'margin': margin}
+        self._updates += 1
+        currencies = len(self.currencies)
+        exact = (exact or self._updates % RESUM_EVERY == 0 or
+                 len(self._totals['margin']) != currencies)
+        codes = self.currency[rows]
+        for name, value in values.items():
+            array = getattr(self, name)
+            if not exact:
+                self._totals[name] += np.bincount(codes, value - array[rows],
+                                                  currencies)
+            array[rows] = value
+            if exact:
+                size = len(self.symbols)
+                self._totals[name] = np.bincount(self.currency[:size],
+                                                 array[:size], currencies)
+
+    def risk(self, currency=None):
+        """Portfolio totals at the latest quotes, by currency
+
+        Args:
+            currency (str): Get the totals of this currency only
+
+        Returns:
+            (dict): Risk by currency of the positions, or (Risk) of the
+                currency passed, zero if it has no positions
+        """
+        risks = {}
+        for code in self._held_currencies:
+            totals = {name: float(self._totals[name][code])
+                      for name in TOTALS}
+            long, short = totals['long_value'], totals['short_value']
+            risks[self.currencies[code]] = Risk(
+                unrealized=totals['unrealized'], long_exposure=long,
+                short_exposure=short, gross_exposure=long + short,
+                net_exposure=long - short, used_margin=totals['margin'])
+        if currency is not None:
+            return risks.get(currency, Risk(0., 0., 0., 0., 0., 0.))
+        return risks
+
+    def frame(self):
+        """The positions with their current price and result, as in risk
+
+        Returns:
+            (pd.DataFrame): The positions frame, with current_price, value,
+                result, margin and currency columns
+        """
+        frame = self.positions.copy()
+        if frame.empty:
+            return frame
+        rows = self._position_rows
+        long = (frame['direction'].astype(str) == BUY).to_numpy()
+        quantity = frame['quantity'].to_numpy(dtype='float64')
+        price = frame['price'].to_numpy(dtype='float64')
+        bid, ask = self.bid[rows], self.ask[rows]
+        bid = np.where(np.isnan(bid), ask, bid)
+        ask = np.where(np.isnan(ask), bid, ask)
+        quoted = ~np.isnan(bid)
+        # unquoted at cost
+        current = np.where(quoted, np.where(long, bid, ask), price)
+        frame['current_price'] = current
+        frame['value'] = quantity * current
+        frame['result'] = np.where(long, 1., -1.) * quantity * (
+            current - price)
+        frame['margin'] = 0.
+        if self.mode == TRADING_MODES.CFD:
+            mid = np.where(quoted, (bid + ask) / 2, price)
+            frame['margin'] = quantity * mid * self.rate[rows]
+        frame['currency'] = [self.currencies[code]
+                             for code in self.currency[rows]]
+        return frame
+
+    def exposure(self, by='instrument'):
+        """Exposure, result and margin grouped by instrument, exchange or
+        currency
+
+        Amounts are not converted, the exposure by currency is in that
+        currency.
+
+        Args:
+            by (str): 'instrument', 'exchange' or 'currency'
+
+        Returns:
+            (pd.DataFrame): long, short, gross, net, unrealized and margin
+                by group, of the instruments with positions
+        """
+        size = len(self.symbols)
+        held = (self.long_qty[:size] + self.short_qty[:size]) > 0
+        if by == 'instrument':
+            keys = np.array(self.symbols, dtype=object)
+        elif by == 'exchange':
+            keys = np.array(self.exchanges, dtype=object)
+        elif by == 'currency':
+            keys = np.array([EXCHANGE_CURRENCIES.get(exchange)
+                             for exchange in self.exchanges], dtype=object)
+        else:
+            raise ValueError(f'cannot group exposure by {by}')
+        codes, groups = pd.factorize(pd.Series(keys[held]).fillna('unknown'))
+        sums = {name: np.bincount(codes, getattr(self, name)[:size][held],
+                                  len(groups))
+                for name in TOTALS}
+        return pd.DataFrame({
+            'long': sums['long_value'],
+            'short': sums['short_value'],
+            'gross': sums['long_value'] + sums['short_value'],
+            'net': sums['long_value'] - sums['short_value'],
+            'unrealized': sums['unrealized'],
+            'margin': sums['margin'],
+        }, index=pd.Index(groups, name=by))
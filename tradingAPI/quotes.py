@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.quotes
+~~~~~~~~~~~~~~
+
+This module provides the latest quotes of the streamed prices.
+
+The web app receives prices over a websocket. WebSocketQuoteTap observes
+the DevTools events drained by TrafficCapture and publishes every decoded
+price frame into a QuoteCache, so that price reads are dictionary lookups.
+The cache notifies its observers (e.g. the PnLEngine) with the quotes of
+each frame, so that they follow every tick.
+"""
+
+import json
+import re
+import time
+from collections import namedtuple
+
+from .patterns import Observable, Observer
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.quotes')
+
+Quote = namedtuple('Quote', ['symbol', 'bid', 'ask', 'timestamp'])
+
+# Quotes older than this (seconds) are not served by default
+QUOTE_MAX_AGE = 5
+
+# Names used in the price frames, in order of preference
+TICKER_KEYS = ('ticker', 'instrumentCode', 'code', 'symbol', 'i')
+BID_KEYS = ('bid', 'sell', 'b')
+ASK_KEYS = ('ask', 'buy', 'a')
+
+# socket.io packet type prefix, e.g. 42["event", {...}]
+PACKET_PREFIX = re.compile(r'^\d+')
+# SignalR record separator
+RECORD_SEPARATOR = '\x1e'
+
+
+def _first(item, keys):
+    for key in keys:
+        if key in item and item[key] is not None:
+            return item[key]
+    return None
+
+
+def _find_prices(node, prices):
+    """Walk a decoded frame collecting (ticker, bid, ask)"""
+    if isinstance(node, dict):
+        ticker = _first(node, TICKER_KEYS)
+        bid, ask = _first(node, BID_KEYS), _first(node, ASK_KEYS)
+        if ticker is not None and (bid is not None or ask is not None):
+            prices.append((str(ticker).split('_')[0], bid, ask))
+            return
+        node = node.values()
+    if isinstance(node, (list, tuple, type({}.values()))):
+        for child in node:
+            _find_prices(child, prices)
+
+
+def decode_price_frame(payload):
+    """Decode the prices of a websocket frame
+
+    Args:
+        payload (str): Frame payload, plain JSON, socket.io or SignalR
+
+    Returns:
+        (list <tuple>): (symbol, bid, ask), prices as float or None
+    """
+    prices = []
+    for record in payload.split(RECORD_SEPARATOR):
+        record = PACKET_PREFIX.sub('', record.strip(), count=1)
+        if not record:
+            continue
+        try:
+            _find_prices(json.loads(record), prices)
+        except ValueError:
+            continue
+    return [(symbol,
+             float(bid) if bid is not None else None,
+             float(ask) if ask is not None else None)
+            for symbol, bid, ask in prices]
+
+
+class QuoteCache(Observable):
+    """Latest quote of each symbol
+
+    Observers are notified with the 'quotes' event and the list of the
+    quotes stored, once per update call.
+    """
+    def __init__(self):
+        super().__init__()
+        self._quotes = {}
+
+    def _store(self, symbol, bid, ask, timestamp):
+        previous = self._quotes.get(symbol)
+        if previous is not None:
+            bid = previous.bid if bid is None else bid
+            ask = previous.ask if ask is None else ask
+        quote = self._quotes[symbol] = Quote(symbol, bid, ask, timestamp)
+        return quote
+
+    def update(self, symbol, bid, ask, timestamp=None):
+        """Store a quote, keeping the previous side if one is missing"""
+        quote = self._store(symbol, bid, ask, timestamp or time.time())
+        self.notify_observers('quotes', [quote])
+        return quote
+
+    def update_many(self, prices, timestamp=None):
+        """Store the quotes of a frame, notifying the observers once
+
+        Args:
+            prices (iterable <tuple>): (symbol, bid, ask) of each quote
+            timestamp (float): Epoch of the quotes, now by default
+
+        Returns:
+            (list <Quote>): The quotes stored
+        """
+        timestamp = timestamp or time.time()
+        quotes = [self._store(symbol, bid, ask, timestamp)
+                  for symbol, bid, ask in prices]
+        if quotes:
+            self.notify_observers('quotes', quotes)
+        return quotes
+
+    def get(self, symbol, max_age=QUOTE_MAX_AGE):
+        """Get the latest quote of a symbol
+
+        Args:
+            symbol (str): Ticker e.g. AAPL
+            max_age (float): Ignore quotes older than this, in seconds. None
+                to accept any age
+
+        Returns:
+            (Quote): The quote, None if not available
+        """
+        quote = self._quotes.get(symbol)
+        if quote is None:
+            return None
+        if max_age is not None and time.time() - quote.timestamp > max_age:
+            return None
+        return quote
+
+    def symbols(self):
+        return list(self._quotes)
+
+    def __len__(self):
+        return len(self._quotes)
+
+
+class WebSocketQuoteTap(Observer):
+    """Feed a QuoteCache from the websocket frames seen by a TrafficCapture"""
+    def __init__(self, capture, cache=None, symbols=None):
+        """
+        Args:
+            capture (TrafficCapture): Source of the DevTools events
+            cache (QuoteCache): Cache to publish into, new one by default
+            symbols (iterable <str>): Symbols to keep, all if empty
+        """
+        super().__init__(capture)
+        self.capture = capture
+        self.cache = cache if cache is not None else QuoteCache()
+        self.subscribed = set(symbols or ())
+        self.ticks = 0
+
+    def subscribe(self, *symbols):
+        self.subscribed.update(symbols)
+
+    def unsubscribe(self, *symbols):
+        self.subscribed.difference_update(symbols)
+
+    def notify(self, observable, event, data):
+        if event != 'Network.webSocketFrameReceived':
+            return
+        received = time.time()
+        payload = data.get('response', {}).get('payloadData', '')
+        prices = decode_price_frame(payload)
+        if self.subscribed:
+            prices = [price for price in prices
+                      if price[0] in self.subscribed]
+        self.ticks += len(self.cache.update_many(prices, received))
+
+    def get(self, symbol, max_age=QUOTE_MAX_AGE):
+        """Drain pending frames and get the latest quote of a symbol"""
+        self.capture.poll()
+        return self.cache.get(symbol, max_age)
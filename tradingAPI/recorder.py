@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.recorder
+~~~~~~~~~~~~~~
+
+This module provides the record / replay of WebDriver commands.
+
+RecordingDriver wraps a live driver and records every command sent to it
+or to the elements it returns (find_elements_by_*, text, get_attribute,
+execute_script, click...) with its response and duration. ReplayDriver
+serves a recorded trace back without a browser, so that the parsing and
+decoding layers can be benchmarked and profiled on real page shapes.
+
+Traces are NDJSON, one command per line, gzip compressed if the path ends
+in '.gz'.
+"""
+
+import builtins
+import gzip
+import json
+import time
+from collections import defaultdict, deque
+
+from selenium.common import exceptions as selenium_exceptions
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.recorder')
+
+TRACE_VERSION = 1
+# Target of the commands sent to the driver itself
+DRIVER = 0
+ELEMENT_KEY = '__element__'
+ERROR_KEY = '__error__'
+
+
+def encode(value):
+    """Make arguments and responses JSON compatible, elements by number"""
+    if isinstance(value, (RecordingElement, ReplayElement)):
+        return {ELEMENT_KEY: value._number}
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): encode(v) for k, v in value.items()}
+    return repr(value)
+
+
+def error_class(name):
+    """Exception class of a recorded error, RuntimeError if unknown"""
+    for module in (selenium_exceptions, builtins):
+        cls = getattr(module, name, None)
+        if isinstance(cls, type) and issubclass(cls, Exception):
+            return cls
+    return RuntimeError
+
+
+def rebuild_error(result):
+    """Exception of a recorded error, with the recorded message
+
+    Selenium exceptions format their message (prefix, documentation link)
+    when created and printed, so the raw message is recorded and set back.
+    """
+    error = error_class(result[ERROR_KEY])(result['msg'])
+    if hasattr(error, 'msg'):
+        error.msg = result['msg']
+    return error
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Trace(object):
+    """Recorded commands, in order
+
+    Each command is a dict with 'target' (DRIVER or element number),
+    'name', 'kind' ('call' or 'attr'), 'args', 'result' and 'elapsed'.
+    """
+    def __init__(self, commands=None):
+        self.commands = commands if commands is not None else []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def save(self, path):
+        """Write the trace to path
+
+        Returns:
+            (int): Number of commands written
+        """
+        with _open(path, 'w') as f:
+            f.write(json.dumps({'version': TRACE_VERSION}) + '\n')
+            for command in self.commands:
+                f.write(json.dumps(command, separators=(',', ':')) + '\n')
+        logger.debug('saved %d commands to %s', len(self.commands), path)
+        return len(self.commands)
+
+    @classmethod
+    def load(cls, path):
+        with _open(path, 'r') as f:
+            header = json.loads(f.readline())
+            if header.get('version') != TRACE_VERSION:
+                raise ValueError(f'unsupported trace version {header}')
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def summary(self):
+        """Count and total seconds spent on each command, slowest first
+
+        Returns:
+            (list <tuple>): (name, count, seconds)
+        """
+        totals = defaultdict(lambda: [0, 0.])
+        for command in self.commands:
+            totals[command['name']][0] += 1
+            totals[command['name']][1] += command['elapsed']
+        return sorted(((name, count, seconds) for name, (count, seconds)
+                       in totals.items()), key=lambda t: -t[2])
+
+
+class RecordingDriver(object):
+    """Proxy of a WebDriver recording the commands into a Trace"""
+    def __init__(self, driver, trace=None):
+        self._driver = driver
+        self._trace = trace if trace is not None else Trace()
+        # selenium element id -> RecordingElement
+        self._elements = {}
+
+    @property
+    def trace(self):
+        return self._trace
+
+    @property
+    def driver(self):
+        return self._driver
+
+    def _wrap_element(self, element):
+        key = getattr(element, 'id', id(element))
+        wrapped = self._elements.get(key)
+        if wrapped is None:
+            wrapped = RecordingElement(self, element, len(self._elements) + 1)
+            self._elements[key] = wrapped
+        return wrapped
+
+    def _wrap(self, value):
+        """Wrap the elements of a response"""
+        if hasattr(value, 'id') and hasattr(value, 'find_elements'):
+            return self._wrap_element(value)
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self._wrap(v) for k, v in value.items()}
+        return value
+
+    @staticmethod
+    def _unwrap(value):
+        """Pass the real elements to the driver"""
+        if isinstance(value, RecordingElement):
+            return value._element
+        if isinstance(value, (list, tuple)):
+            return type(value)(RecordingDriver._unwrap(v) for v in value)
+        if isinstance(value, dict):
+            return {k: RecordingDriver._unwrap(v) for k, v in value.items()}
+        return value
+
+    def _append(self, target, name, kind, args, result, start):
+        self._trace.commands.append({
+            'target': target, 'name': name, 'kind': kind,
+            'args': encode(args), 'result': result,
+            'elapsed': time.perf_counter() - start})
+
+    def _record(self, target, name, kind, args, func, start=None):
+        """Run a command, recording its response or exception"""
+        start = time.perf_counter() if start is None else start
+        try:
+            result = self._wrap(func())
+        except Exception as e:
+            self._append(target, name, kind, args,
+                         {ERROR_KEY: type(e).__name__,
+                          'msg': getattr(e, 'msg', None) or str(e)}, start)
+            raise
+        self._append(target, name, kind, args, encode(result), start)
+        return result
+
+    def _proxy(self, target, obj, name):
+        # properties (e.g. text) are commands as well, timed from here
+        start = time.perf_counter()
+        value = self._record(target, name, 'attr', [],
+                             lambda: getattr(obj, name), start)
+        if not callable(value):
+            return value
+        # a method, recorded when called
+        self._trace.commands.pop()
+
+        def call(*args):
+            return self._record(target, name, 'call', list(args),
+                                lambda: value(*self._unwrap(args)))
+        return call
+
+    def __getattr__(self, name):
+        return self._proxy(DRIVER, self._driver, name)
+
+
+class RecordingElement(object):
+    """Proxy of a WebElement, recording through its RecordingDriver"""
+    def __init__(self, recorder, element, number):
+        self._recorder = recorder
+        self._element = element
+        self._number = number
+
+    def __getattr__(self, name):
+        return self._recorder._proxy(self._number, self._element, name)
+
+
+class ReplayDriver(object):
+    """Serve a recorded Trace in place of a WebDriver
+
+    Commands are answered in the recorded order for each (target, name):
+    a call with other arguments than the next recorded one is answered by
+    the first later recording with the same arguments.
+    """
+    def __init__(self, trace, realtime=False):
+        """
+        Args:
+            trace (Trace): The recorded commands
+            realtime (bool): Whether to wait the recorded duration of each
+                command, to reproduce the timing of the session
+        """
+        self._realtime = realtime
+        self._queues = defaultdict(deque)
+        for command in trace.commands:
+            self._queues[(command['target'], command['name'])].append(
+                command)
+        self._elements = {}
+        self.replayed = 0
+
+    @classmethod
+    def load(cls, path, realtime=False):
+        return cls(Trace.load(path), realtime)
+
+    def remaining(self):
+        """Number of recorded commands not replayed yet"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _element(self, number):
+        element = self._elements.get(number)
+        if element is None:
+            element = self._elements[number] = ReplayElement(self, number)
+        return element
+
+    def _decode(self, value):
+        if isinstance(value, dict):
+            if ELEMENT_KEY in value:
+                return self._element(value[ELEMENT_KEY])
+            return {k: self._decode(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._decode(v) for v in value]
+        return value
+
+    def _next(self, target, name, args=None):
+        queue = self._queues.get((target, name))
+        if not queue:
+            raise LookupError(f'no recorded {name} on target {target}')
+        command = queue[0]
+        if args is not None and command['args'] != args:
+            for command in queue:
+                if command['args'] == args:
+                    break
+            else:
+                raise LookupError(f'no recorded {name}{tuple(args)} on '
+                                  f'target {target}')
+        queue.remove(command)
+        self.replayed += 1
+        if self._realtime:
+            time.sleep(command['elapsed'])
+        result = command['result']
+        if isinstance(result, dict) and ERROR_KEY in result:
+            raise rebuild_error(result)
+        return self._decode(result)
+
+    def _proxy(self, target, name):
+        queue = self._queues.get((target, name))
+        if queue and queue[0]['kind'] == 'attr':
+            return self._next(target, name)
+
+        def call(*args):
+            return self._next(target, name, encode(list(args)))
+        return call
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self._proxy(DRIVER, name)
+
+
+class ReplayElement(object):
+    """Element of a replayed trace"""
+    def __init__(self, replay, number):
+        self._replay = replay
+        self._number = number
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self._replay._proxy(self._number, name)
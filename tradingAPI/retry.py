@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.retry
+~~~~~~~~~~~~~~
+
+This module provides the retry policies and circuit breakers.
+
+Selenium exceptions are classified as retryable (the page is still loading
+or changed under us) or fatal (the session is gone, the call is wrong).
+Retryable failures are retried with exponential backoff and jitter within a
+deadline; repeated failures, the fatal ones of the browser included, open a
+circuit breaker so that a broker UI that is down is not hammered.
+"""
+
+import random
+import threading
+import time
+
+from selenium.common import exceptions as selenium_exceptions
+
+from .exceptions import CircuitOpen, ElementNotFound
+from .metrics import Metrics
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.retry')
+
+# The browser or the session is gone, or the call itself is wrong
+FATAL_EXCEPTIONS = tuple(getattr(selenium_exceptions, name) for name in (
+    'InvalidSessionIdException', 'NoSuchWindowException',
+    'SessionNotCreatedException', 'InvalidArgumentException',
+    'InvalidSelectorException', 'UnexpectedAlertPresentException')
+    if hasattr(selenium_exceptions, name))
+
+
+def is_retryable(exc):
+    """Whether an exception is worth retrying
+
+    Any other WebDriverException (timeouts, stale or missing elements,
+    clicks intercepted by an overlay, lost connection) and elements not
+    found (ElementNotFound, not loaded yet) are retryable, other errors of
+    our own (e.g. CredentialsException) are fatal.
+    """
+    if isinstance(exc, FATAL_EXCEPTIONS):
+        return False
+    return isinstance(exc, (selenium_exceptions.WebDriverException,
+                            ElementNotFound))
+
+
+def is_broker_failure(exc):
+    """Whether an exception tells the broker's UI or the browser failed
+
+    FATAL_EXCEPTIONS are not: a bad selector or argument is an error of
+    ours, and a lost session is not fixed by waiting for the broker.
+    """
+    if isinstance(exc, FATAL_EXCEPTIONS):
+        return False
+    return isinstance(exc, (selenium_exceptions.WebDriverException,
+                            ElementNotFound))
+
+
+def retry_anything(exc):
+    return isinstance(exc, Exception)
+
+
+class CircuitBreaker(object):
+    """Fail fast after consecutive failures, until a reset timeout
+
+    Closed lets every call through. After failure_threshold consecutive
+    failures it opens and refuses calls for reset_timeout seconds, then
+    lets exactly one trial call through (half open), refusing the others
+    until it ends: success closes it, failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        """
+        Args:
+            name (str): Name reported in the metrics
+            failure_threshold (int): Consecutive failures opening it
+            reset_timeout (float): Seconds open before a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        # Whether the trial call of the half open state is running
+        self.trial = False
+        self.lock = threading.Lock()
+        self.metrics = Metrics()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allows(self):
+        """Whether a call would be let through now"""
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and
+                                        not self.trial)
+
+    def before_call(self):
+        """Check the breaker before a call
+
+        In the half open state the first call becomes the trial, the
+        others are refused until it ends.
+
+        Raises:
+            (CircuitOpen): If the breaker is open, or half open with the
+                trial running
+        """
+        with self.lock:
+            state = self.state
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self.trial:
+                self.trial = True
+                return
+            self.metrics.incr(f'breaker.{self.name}.rejected')
+            raise CircuitOpen(self.name, max(0., self.opened_at +
+                                             self.reset_timeout - time.time()))
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f'circuit {self.name} closed')
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+        self.metrics.gauge(f'breaker.{self.name}.open', 0)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if (self.trial or self.opened_at is not None or
+                    self.failures >= self.failure_threshold):
+                if self.state != self.OPEN:
+                    logger.warning(f'circuit {self.name} opened after '
+                                   f'{self.failures} failures')
+                    self.metrics.incr(f'breaker.{self.name}.opened')
+                self.opened_at = time.time()
+                self.metrics.gauge(f'breaker.{self.name}.open', 1)
+            self.trial = False
+
+    def release(self):
+        """End a trial call that failed for reasons of its own, letting
+        another one through"""
+        with self.lock:
+            self.trial = False
+
+
+class RetryPolicy(object):
+    """Retry an operation with exponential backoff, jitter and deadline"""
+    def __init__(self, name, attempts=3, base_delay=0.5, max_delay=8,
+                 multiplier=2, jitter=0.5, deadline=None,
+                 retryable=is_retryable, breaker=None):
+        """
+        Args:
+            name (str): Name of the operation, reported in the metrics
+            attempts (int): Max number of calls
+            base_delay (float): Seconds before the first retry
+            max_delay (float): Max seconds between retries
+            multiplier (float): Growth of the delay at each retry
+            jitter (float): Fraction of each delay randomly taken off, so
+                that concurrent sessions do not retry in lockstep
+            deadline (float): Seconds budget of all the attempts, no
+                retry is started that would end past it
+            retryable (callable): Exception -> bool, default is_retryable
+            breaker (CircuitBreaker): Breaker guarding the operation
+        """
+        self.name = name
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.retryable = retryable
+        self.breaker = breaker
+        self.metrics = Metrics()
+
+    def delay(self, retry):
+        """Seconds to wait before a retry, counting from 0"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** retry)
+        return delay * (1 - self.jitter * random.random())
+
+    def call(self, func, *args, **kwargs):
+        """Call func, retrying the retryable failures
+
+        Returns:
+            (mixed): What func returns
+
+        Raises:
+            (CircuitOpen): If the breaker is open
+            (Exception): The last failure of func, once fatal, out of
+                attempts or out of deadline
+        """
+        if self.breaker is not None:
+            self.breaker.before_call()
+        start = time.time()
+        retry = 0
+        while True:
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not self.retryable(e):
+                    self.metrics.incr(f'retry.{self.name}.fatal')
+                    if is_broker_failure(e):
+                        # e.g. not retried by a custom retryable
+                        self._failed()
+                    elif self.breaker is not None:
+                        # not a sign of the broker being down
+                        self.breaker.release()
+                    raise
+                retry += 1
+                delay = self.delay(retry - 1)
+                if retry >= self.attempts:
+                    self.metrics.incr(f'retry.{self.name}.exhausted')
+                    self._failed()
+                    raise
+                if (self.deadline is not None and
+                        time.time() + delay - start > self.deadline):
+                    self.metrics.incr(f'retry.{self.name}.deadline')
+                    self._failed()
+                    raise
+                self.metrics.incr(f'retry.{self.name}.retries')
+                logger.debug('%s failed (%s), retry %d in %.2f s', self.name,
+                             type(e).__name__, retry, delay)
+                time.sleep(delay)
+                continue
+            self.metrics.timing(f'retry.{self.name}', time.time() - start)
+            if self.breaker is not None:
+                self.breaker.record_success()
+            return result
+
+    def _failed(self):
+        if self.breaker is not None:
+            self.breaker.record_failure()
+
+    def __call__(self, func):
+        """Use the policy as a decorator"""
+        def wrapped(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        wrapped.__name__ = func.__name__
+        wrapped.__doc__ = func.__doc__
+        return wrapped
@@ -28,8 +28,8 @@ class Saver(Observable):
     def read(self):
         self.checkFile()
         with open(self.config_file, 'r') as f:
-            yaml_dict = yaml.load(f)
-            logger.debug('yaml: ' + str(yaml_dict))
+            yaml_dict = yaml.safe_load(f)
+            logger.debug('yaml: %s', yaml_dict)
             if yaml_dict is not None:
                 self.config = yaml_dict
         self.notify_observers(event='update', data=self.config)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.scheduler
+~~~~~~~~~~~~~~
+
+This module provides the refresh scheduler of a session.
+
+Each resource (orders, positions, account, quotes, catalog) has a priority
+and a TTL. Requests for a resource are merged until it is refreshed, due
+resources are refreshed in priority order, and TTLs adapt to how often the
+data actually changes.
+"""
+
+import threading
+import time
+
+import pandas as pd
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.scheduler')
+
+
+def fingerprint(value):
+    """Hashable summary of a refreshed value, to detect changes"""
+    if isinstance(value, pd.DataFrame):
+        if value.empty:
+            return 0
+        return int(pd.util.hash_pandas_object(value.astype(str),
+                                              index=False).sum())
+    if isinstance(value, dict):
+        return hash(tuple((k, fingerprint(v)) for k, v in value.items()))
+    if hasattr(value, '_asdict'):
+        return hash(tuple(v for k, v in value._asdict().items()
+                          if k != 'time'))
+    if hasattr(value, 'records'):
+        # Stock, only the latest record matters
+        return hash(repr(value.records[-1:]))
+    return hash(repr(value))
+
+
+class Resource(object):
+    """A refreshable piece of data"""
+    def __init__(self, name, priority, ttl, refresh, read=None,
+                 min_ttl=None, max_ttl=None, backoff=1.5):
+        """
+        Args:
+            name (str): Name of the resource
+            priority (int): Lower is refreshed first
+            ttl (float): Base seconds between refreshes
+            refresh (callable): Refreshes the resource
+            read (callable): Returns the refreshed value, used to detect
+                changes. Defaults to the return value of refresh
+            min_ttl (float): Lowest adapted TTL, default ttl
+            max_ttl (float): Highest adapted TTL, default 10 * ttl
+            backoff (float): TTL multiplier while the data does not change,
+                and divisor when it changes
+        """
+        self.name = name
+        self.priority = priority
+        self.base_ttl = ttl
+        self.ttl = ttl
+        self.min_ttl = ttl if min_ttl is None else min_ttl
+        self.max_ttl = 10 * ttl if max_ttl is None else max_ttl
+        self.backoff = backoff
+        self.refresh = refresh
+        self.read = read
+        self.refreshed_at = None
+        self.requested = False
+        self.changes = 0
+        self.refreshes = 0
+        self._fingerprint = None
+
+    def age(self):
+        if self.refreshed_at is None:
+            return float('inf')
+        return time.time() - self.refreshed_at
+
+    def is_due(self):
+        return self.requested or self.age() >= self.ttl
+
+    def run(self):
+        """Refresh and adapt the TTL to whether the data changed"""
+        value = self.refresh()
+        if self.read is not None:
+            value = self.read()
+        self.refreshed_at = time.time()
+        self.requested = False
+        self.refreshes += 1
+        new_fingerprint = fingerprint(value)
+        if new_fingerprint != self._fingerprint:
+            self.changes += 1
+            # shrink back step by step, a single change after a long quiet
+            # period doesn't make the resource busy
+            self.ttl = max(self.min_ttl, self.ttl / self.backoff)
+        else:
+            self.ttl = min(self.ttl * self.backoff, self.max_ttl)
+        self._fingerprint = new_fingerprint
+        return value
+
+
+class RefreshScheduler(object):
+    """Coalescing refresh scheduler attached to a LowLevelAPI session
+
+    The refreshes run under the lock of the session, also held by the
+    methods of the session driving the browser, so calls made from other
+    threads wait for the refresh in progress.
+    """
+    # name: (priority, ttl in seconds)
+    DEFAULTS = {
+        'orders': (0, 5),
+        'positions': (1, 10),
+        'account': (2, 10),
+        'quotes': (3, 1),
+        'catalog': (4, 24 * 3600),
+    }
+
+    def __init__(self, api, ttls=None, max_per_tick=None):
+        """
+        Args:
+            api (LowLevelAPI): The session
+            ttls (dict): Override the default TTL of resources, by name
+            max_per_tick (int): Max refreshes per tick, all due by default
+        """
+        self.api = api
+        self.max_per_tick = max_per_tick
+        # The browser can run one command at a time
+        self.lock = api.lock
+        self.resources = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._markets_closed = False
+        ttls = ttls or {}
+
+        def mode():
+            return api.trading_mode
+
+        self.add('orders', api.load_orders,
+                 read=lambda: api.placed_orders[mode()], ttls=ttls)
+        self.add('positions', api.load_positions,
+                 read=lambda: api.positions[mode()], ttls=ttls)
+        self.add('account',
+                 lambda: api.get_account_snapshot(max_age=0), ttls=ttls)
+        if hasattr(api, 'checkStock'):
+            self.add('quotes', api.checkStock, ttls=ttls)
+        self.add('catalog', api.load_instruments,
+                 read=lambda: api.instruments[mode()], ttls=ttls)
+
+    def add(self, name, refresh, read=None, priority=None, ttl=None,
+            ttls=None, **kwargs):
+        """Register a resource, priority and ttl default to DEFAULTS"""
+        default_priority, default_ttl = self.DEFAULTS.get(
+            name, (len(self.DEFAULTS), 60))
+        ttl = (ttls or {}).get(name, ttl or default_ttl)
+        priority = default_priority if priority is None else priority
+        self.resources[name] = Resource(name, priority, ttl, refresh, read,
+                                        **kwargs)
+        return self.resources[name]
+
+    def request(self, *names):
+        """Ask for a refresh at the next tick, merged with other requests"""
+        for name in names:
+            self.resources[name].requested = True
+
+    def due(self):
+        """Due resources, in priority order"""
+        self._adapt_to_market()
+        return sorted((r for r in self.resources.values() if r.is_due()),
+                      key=lambda r: r.priority)
+
+    def tick(self):
+        """Refresh the due resources
+
+        Returns:
+            (list <str>): Names of the refreshed resources
+        """
+        breaker = getattr(self.api, 'breaker', None)
+        if breaker is not None and not breaker.allows():
+            # the broker is down, do not pile up refreshes
+            return []
+        refreshed = []
+        for resource in self.due()[:self.max_per_tick]:
+            with self.lock:
+                # may have been refreshed by get() meanwhile
+                if not resource.is_due():
+                    continue
+                try:
+                    resource.run()
+                except Exception:
+                    logger.exception(f'refresh of {resource.name} failed')
+                    continue
+            refreshed.append(resource.name)
+        if refreshed:
+            logger.debug('refreshed %s', refreshed)
+        return refreshed
+
+    def get(self, name, max_age=None):
+        """Refresh a resource now if older than max_age (default its TTL)
+
+        Concurrent callers wait for the same refresh instead of repeating it.
+        """
+        resource = self.resources[name]
+        max_age = resource.ttl if max_age is None else max_age
+        with self.lock:
+            if resource.requested or resource.age() > max_age:
+                resource.run()
+
+    def call(self, func, *args, **kwargs):
+        """Call a function between the refreshes, e.g. to run several calls
+        of the session in a row
+
+        Returns:
+            (mixed): What func returns
+        """
+        with self.lock:
+            return func(*args, **kwargs)
+
+    def _adapt_to_market(self):
+        """Slow quotes down to their max TTL while all markets are closed,
+        back to the configured TTL once one reopens"""
+        quotes = self.resources.get('quotes')
+        stocks = getattr(self.api, 'stocks', None)
+        if quotes is None or not stocks:
+            return
+        closed = not any(stock.market for stock in stocks.values())
+        if closed:
+            quotes.ttl = quotes.max_ttl
+        elif self._markets_closed:
+            quotes.ttl = quotes.base_ttl
+        self._markets_closed = closed
+
+    def run(self, interval=0.1):
+        """Tick until stopped"""
+        self._stop.clear()
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(interval)
+
+    def start(self, interval=0.1):
+        """Tick in a background thread"""
+        self._thread = threading.Thread(target=self.run, args=(interval,),
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """TTL, refreshes and changes of each resource"""
+        return {name: {'ttl': r.ttl, 'refreshes': r.refreshes,
+                       'changes': r.changes, 'age': r.age()}
+                for name, r in self.resources.items()}
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.schema
+~~~~~~~~~~~~~~
+
+This module provides the dtype schemas of the scraped dataframes.
+"""
+
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_datetime64_any_dtype
+
+from .utils import BUY, SELL, ORDER_TYPES, CFD_ORDER_TYPES, ORDER_STATUS
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.schema')
+
+# Format of the 'created' column in the orders / positions tables
+CREATED_FORMAT = '%d.%m.%Y %H:%M:%S'
+
+DATETIME = 'datetime'
+
+DIRECTION_DTYPE = CategoricalDtype([BUY, SELL])
+ORDER_TYPE_DTYPE = CategoricalDtype(sorted(set(ORDER_TYPES) |
+                                           set(CFD_ORDER_TYPES)))
+ORDER_STATUS_DTYPE = CategoricalDtype(list(ORDER_STATUS))
+
+# Money and quantities stay float64 - fractional shares and prices with many
+# decimals would lose precision in float32
+ORDERS_SCHEMA = {
+    'instrument': 'category',
+    'direction': DIRECTION_DTYPE,
+    'order_type': ORDER_TYPE_DTYPE,
+    'status': ORDER_STATUS_DTYPE,
+    'quantity': 'float64',
+    'price': 'float64',
+    'cost': 'float64',
+    'limit': 'float64',
+    'stop': 'float64',
+    'take_profit': 'float64',
+    'stop_loss': 'float64',
+    'timestamp': DATETIME,
+}
+
+POSITIONS_SCHEMA = {
+    'instrument': 'category',
+    'direction': DIRECTION_DTYPE,
+    'quantity': 'float64',
+    'price': 'float64',
+    'timestamp': DATETIME,
+}
+
+INSTRUMENTS_SCHEMA = {
+    'symbol': 'category',
+    'exchange': 'category',
+    'fractional': 'bool',
+}
+
+
+def parse_datetimes(values, fmt=CREATED_FORMAT):
+    """Vectorized parsing of a column of timestamps
+
+    Tries the known format first, then ISO 8601 and then inferring it day
+    first, so that columns holding datetime objects or ISO strings are
+    parsed as well.
+
+    Args:
+        values (pd.Series): Column with timestamps as text or datetime
+        fmt (str): Expected strftime format
+
+    Returns:
+        (pd.Series): datetime64 column, unparseable values set to NaT
+    """
+    if is_datetime64_any_dtype(values):
+        return values
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    for fallback in ({'format': 'ISO8601'}, {'dayfirst': True}):
+        missing = parsed.isna() & values.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(values[missing], errors='coerce',
+                                         **fallback)
+    return parsed
+
+
+def apply_schema(df, schema):
+    """Cast the columns of a dataframe to the dtypes in schema
+
+    Columns missing from the dataframe are skipped, columns not in the
+    schema are left as they are.
+
+    Args:
+        df (pd.DataFrame): Dataframe to cast, modified in place
+        schema (dict): Column name to dtype, or DATETIME
+
+    Returns:
+        (pd.DataFrame): The same dataframe
+    """
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype == DATETIME:
+            df[column] = parse_datetimes(df[column])
+        elif dtype is DIRECTION_DTYPE:
+            values = df[column]
+            df[column] = (values.where(values.isna(),
+                                       values.astype(str).str.lower())
+                          .astype(dtype))
+        elif dtype == 'bool':
+            df[column] = df[column].fillna(False).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def read_instruments_csv(csv_path):
+    """Read an instruments CSV straight into the instruments schema
+
+    Args:
+        csv_path (str): Path to the CSV
+
+    Returns:
+        (pd.DataFrame): Instruments dataframe
+    """
+    dtypes = {column: dtype for column, dtype in INSTRUMENTS_SCHEMA.items()
+              if dtype != 'bool'}
+    return apply_schema(pd.read_csv(csv_path, dtype=dtypes),
+                        INSTRUMENTS_SCHEMA)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.scripts
+~~~~~~~~~~~~~~
+
+This module provides the javascript snippets executed in the page.
+"""
+
+# Navigation timings (ms from navigation start) and JS heap of the page
+PAGE_METRICS = '''
+var t = window.performance.timing;
+var m = window.performance.memory || {};
+return {
+    dom_interactive: t.domInteractive - t.navigationStart,
+    dom_content_loaded: t.domContentLoadedEventEnd - t.navigationStart,
+    load: t.loadEventEnd > 0 ? t.loadEventEnd - t.navigationStart : null,
+    js_heap: m.usedJSHeapSize || null
+};
+'''
+
+# Text of the equity fields at the bottom of the page, by field name.
+# arguments[0]: field name to element id
+ACCOUNT_SNAPSHOT = '''
+var ids = arguments[0];
+var values = {};
+for (var key in ids) {
+    var el = document.querySelector(
+        'div#' + ids[key] + ' span.equity-item-value');
+    values[key] = el ? el.textContent : null;
+}
+return values;
+'''
+
+# Names of the instruments in the watchlist, in tradebox order.
+# arguments[0]: tradebox name CSS selector
+WATCHLIST_NAMES = '''
+var names = document.querySelectorAll(arguments[0]);
+return Array.prototype.map.call(names, function (el) {
+    return el.textContent.trim();
+});
+'''
+
+# Fill an order window in one call and read back the resulting form.
+# arguments[0]: order control element, arguments[1]: spec with
+#   direction: CSS of the buy / sell button, or null
+#   by_value: {disabled, toggle, item} CSS in the control, or null
+#   quantity: {css, value} in the control, or null
+#   limits: list of {xpath, value}
+# Returns {quantity, limits, errors}
+FILL_ORDER = '''
+var control = arguments[0], spec = arguments[1], errors = [];
+var valueSetter = Object.getOwnPropertyDescriptor(
+    HTMLInputElement.prototype, 'value').set;
+function setValue(input, value) {
+    input.focus();
+    valueSetter.call(input, String(value));
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    input.dispatchEvent(new Event('change', {bubbles: true}));
+    input.dispatchEvent(new Event('blur', {bubbles: true}));
+}
+function byXpath(xpath) {
+    return document.evaluate(xpath, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+if (spec.direction) {
+    var button = document.querySelector(spec.direction);
+    if (button) { button.click(); } else { errors.push('direction'); }
+}
+if (spec.by_value && !control.querySelector(spec.by_value.disabled)) {
+    var toggle = control.querySelector(spec.by_value.toggle);
+    if (toggle) { toggle.click(); }
+    var item = control.querySelector(spec.by_value.item);
+    if (item) { item.click(); } else { errors.push('by_value'); }
+}
+var quantity = null;
+if (spec.quantity) {
+    var input = control.querySelector(spec.quantity.css);
+    if (input) {
+        setValue(input, spec.quantity.value);
+        quantity = input.value;
+    } else {
+        errors.push('quantity');
+    }
+}
+var limits = [];
+spec.limits.forEach(function (limit) {
+    var input = byXpath(limit.xpath);
+    if (input) {
+        setValue(input, limit.value);
+        limits.push(input.value);
+    } else {
+        errors.push(limit.xpath);
+        limits.push(null);
+    }
+});
+return {quantity: quantity, limits: limits, errors: errors};
+'''
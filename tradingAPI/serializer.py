@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.serializer
+~~~~~~~~~~~~~~
+
+This module provides bulk export / import of orders and positions.
+
+Objects are written as NDJSON, one object per line, so that files can be
+streamed and appended to. Paths ending in '.gz' are gzip compressed.
+"""
+
+import gzip
+import json
+
+from .base import Serializable
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.serializer')
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def dump_ndjson(objects, fp):
+    """Write Serializable objects to a file object, one per line
+
+    Args:
+        objects (iterable <Serializable>): Orders, positions, instruments
+        fp (file): Text file object open for writing
+
+    Returns:
+        (int): Number of objects written
+    """
+    count = 0
+    for obj in objects:
+        fp.write(json.dumps(obj.to_serializable()))
+        fp.write('\n')
+        count += 1
+    return count
+
+
+def iter_ndjson(fp):
+    """Lazily read Serializable objects from a file object
+
+    Args:
+        fp (file): Text file object open for reading
+
+    Yields:
+        (Serializable): Decoded objects
+    """
+    for line in fp:
+        if line.strip():
+            yield Serializable.from_serializable(json.loads(line))
+
+
+def export_ndjson(objects, path, append=False):
+    """Export objects to an NDJSON file
+
+    Args:
+        objects (iterable <Serializable>): Objects to export
+        path (str): Destination, gzip compressed if ending in '.gz'
+        append (bool): Whether to append instead of overwriting
+
+    Returns:
+        (int): Number of objects written
+    """
+    with _open(path, 'a' if append else 'w') as f:
+        count = dump_ndjson(objects, f)
+    logger.debug("exported %d objects to %s", count, path)
+    return count
+
+
+def import_ndjson(path):
+    """Import all objects from an NDJSON file
+
+    Args:
+        path (str): Source, gzip compressed if ending in '.gz'
+
+    Returns:
+        (list <Serializable>): Decoded objects
+    """
+    with _open(path, 'r') as f:
+        return list(iter_ndjson(f))
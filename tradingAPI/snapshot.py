@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.snapshot
+~~~~~~~~~~~~~~
+
+This module provides read-only snapshots of the page.
+
+The html of a subtree is read once and parsed locally. CSS selectors are
+compiled once and matched with soupsieve, XPaths of the subset used in
+links.dommap (child and descendant steps, positions, @attr="value" and
+contains(@attr, "value")) are evaluated on the parsed tree, so that the
+decoders run many queries without a driver round trip each.
+
+As with the live page, XPaths starting with '/' are anchored at the
+document (only a snapshot of the whole page answers them) and './/' ones at
+the element. Subtrees hidden by their own markup (the hidden attribute,
+display: none or visibility: hidden in the style attribute) are left out of
+text and not displayed; the stylesheets are not evaluated.
+"""
+
+import re
+
+import soupsieve
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, Tag
+
+from tradingAPI import exceptions
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.snapshot')
+
+# Inline styles hiding an element
+HIDDEN_STYLE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden',
+                          re.IGNORECASE)
+# Elements whose text is never rendered
+UNRENDERED = frozenset(('script', 'style', 'template', 'noscript', 'head'))
+
+XPATH_STEP = re.compile(r'(//|/)([\w*-]+)((?:\[[^\]]+\])*)')
+XPATH_PREDICATE = re.compile(r'\[([^\]]+)\]')
+XPATH_ATTR_EQUALS = re.compile(r'^@([\w-]+)\s*=\s*["\']([^"\']*)["\']$')
+XPATH_CONTAINS = re.compile(
+    r'^contains\(\s*@([\w-]+)\s*,\s*["\']([^"\']*)["\']\s*\)$')
+
+# tag.class.class selectors, matched without soupsieve
+SIMPLE_CSS = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$')
+
+_css_cache = {}
+_xpath_cache = {}
+
+
+class SimpleSelector(object):
+    """Selector of a tag name and / or classes, e.g. td.name"""
+    def __init__(self, name, classes):
+        self.name = name
+        self.classes = frozenset(classes)
+
+    def match(self, tag):
+        return ((self.name is None or tag.name == self.name) and
+                self.classes.issubset(tag.get('class') or ()))
+
+    def select(self, tag):
+        return tag.find_all(self.match)
+
+
+def compile_css(css_path):
+    """Compiled selector of a CSS path, cached"""
+    selector = _css_cache.get(css_path)
+    if selector is None:
+        match = SIMPLE_CSS.match(css_path.strip())
+        if match and any(match.groups()):
+            name, classes = match.groups()
+            selector = SimpleSelector(name, classes.split('.')[1:])
+        else:
+            selector = soupsieve.compile(css_path)
+        _css_cache[css_path] = selector
+    return selector
+
+
+def _compile_predicate(text):
+    text = text.strip()
+    if text.isdigit():
+        return 'position', int(text)
+    match = XPATH_ATTR_EQUALS.match(text)
+    if match:
+        return 'equals', match.groups()
+    match = XPATH_CONTAINS.match(text)
+    if match:
+        return 'contains', match.groups()
+    raise ValueError(f'unsupported xpath predicate [{text}]')
+
+
+def compile_xpath(xpath):
+    """Compile an XPath of the supported subset, cached
+
+    Returns:
+        (tuple): Whether it is anchored at the document, and the
+            (descendant, name, predicates) of each step
+
+    Raises:
+        (ValueError): If the XPath is not in the supported subset
+    """
+    compiled = _xpath_cache.get(xpath)
+    if compiled is not None:
+        return compiled
+    # './/td' and './td' start from the element, '//td' from the document
+    relative = xpath.startswith('.')
+    path = xpath[1:] if relative else xpath
+    steps, position = [], 0
+    for match in XPATH_STEP.finditer(path):
+        if match.start() != position:
+            break
+        axis, name, predicates = match.groups()
+        steps.append((axis == '//', True if name == '*' else name,
+                      [_compile_predicate(p) for p
+                       in XPATH_PREDICATE.findall(predicates)]))
+        position = match.end()
+    if not steps or position != len(path):
+        raise ValueError(f'unsupported xpath {xpath}')
+    _xpath_cache[xpath] = compiled = (not relative, steps)
+    return compiled
+
+
+def _attribute(tag, name):
+    value = tag.get(name)
+    if isinstance(value, list):
+        return ' '.join(value)
+    return value
+
+
+def _filter(tags, predicate):
+    kind, arg = predicate
+    if kind == 'position':
+        return tags[arg - 1:arg]
+    name, value = arg
+    if kind == 'equals':
+        return [tag for tag in tags if _attribute(tag, name) == value]
+    return [tag for tag in tags if value in (_attribute(tag, name) or '')]
+
+
+def _document(tag):
+    """Parsed document of a node, None if only a subtree was parsed"""
+    while tag.parent is not None:
+        tag = tag.parent
+    return tag if isinstance(tag, BeautifulSoup) else None
+
+
+def select_xpath(root, xpath):
+    """Evaluate an XPath of the supported subset from a parsed node
+
+    Returns:
+        (list <Tag>): Matching tags
+
+    Raises:
+        (ValueError): If the XPath is not in the supported subset, or is
+            anchored at the document and only a subtree was parsed
+    """
+    absolute, steps = compile_xpath(xpath)
+    if absolute:
+        root = _document(root)
+        if root is None:
+            raise ValueError(f'{xpath} needs a snapshot of the page')
+    nodes = [root]
+    for descendant, name, predicates in steps:
+        found, seen = [], set()
+        for node in nodes:
+            contexts = [node]
+            if descendant:
+                contexts.extend(node.find_all(True))
+            for context in contexts:
+                tags = context.find_all(name, recursive=False)
+                for predicate in predicates:
+                    tags = _filter(tags, predicate)
+                for tag in tags:
+                    if id(tag) not in seen:
+                        seen.add(id(tag))
+                        found.append(tag)
+        nodes = found
+    return nodes
+
+
+def is_hidden(tag):
+    """Whether the markup of a tag hides it"""
+    if tag.name in UNRENDERED or tag.has_attr('hidden'):
+        return True
+    if tag.name == 'input' and tag.get('type') == 'hidden':
+        return True
+    style = tag.get('style')
+    return bool(style) and HIDDEN_STYLE.search(style) is not None
+
+
+def visible_strings(tag):
+    """Strings of a tag, without the ones of its hidden subtrees"""
+    stack = [tag]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Tag):
+            if not is_hidden(node):
+                stack.extend(reversed(node.contents))
+        elif type(node) is NavigableString:
+            # comments, CDATA and doctypes are subclasses
+            yield node
+
+
+class SnapshotElement(object):
+    """Read-only element of a snapshot, answering as a WebElement"""
+    __slots__ = ('tag',)
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    @property
+    def text(self):
+        """Rendered text, as WebElement.text"""
+        if is_hidden(self.tag) or not self.is_displayed():
+            # as selenium, hidden elements have no text
+            return ''
+        return ' '.join(' '.join(visible_strings(self.tag)).split())
+
+    @property
+    def id(self):
+        return id(self.tag)
+
+    @property
+    def tag_name(self):
+        return self.tag.name
+
+    def get_attribute(self, name):
+        if name == 'outerHTML':
+            return str(self.tag)
+        if name == 'innerHTML':
+            return self.tag.decode_contents()
+        if name in ('textContent', 'innerText'):
+            return self.tag.get_text()
+        return _attribute(self.tag, name)
+
+    def is_displayed(self):
+        """Whether no ancestor, nor the element, is hidden by its markup"""
+        tag = self.tag
+        while isinstance(tag, Tag) and not isinstance(tag, BeautifulSoup):
+            if is_hidden(tag):
+                return False
+            tag = tag.parent
+        return True
+
+    def find_elements_by_css_selector(self, css_path):
+        return [SnapshotElement(tag)
+                for tag in compile_css(css_path).select(self.tag)]
+
+    def find_elements_by_xpath(self, xpath):
+        return [SnapshotElement(tag) for tag in select_xpath(self.tag, xpath)]
+
+    def find_elements_by_name(self, name):
+        return self.find_elements_by_css_selector(f'[name="{name}"]')
+
+    def find_elements(self, by, value):
+        """WebElement.find_elements, by css selector, xpath or name"""
+        finders = {'css selector': self.find_elements_by_css_selector,
+                   'xpath': self.find_elements_by_xpath,
+                   'name': self.find_elements_by_name}
+        return finders[by](value)
+
+    def _read_only(self, *args, **kwargs):
+        raise exceptions.BrowserException(
+            'snapshot', 'is read-only, actions need the live page')
+
+    click = send_keys = clear = submit = _read_only
+
+    def __eq__(self, other):
+        return isinstance(other, SnapshotElement) and other.tag is self.tag
+
+    def __hash__(self):
+        return id(self.tag)
+
+
+class DomSnapshot(object):
+    """Parsed html of the page, or of an element of it"""
+    def __init__(self, html, source=None):
+        """
+        Args:
+            html (str): outerHTML of the element, or the page source
+            source (WebElement): Live element the html was read from, queries
+                on it are answered by the snapshot. None for the page
+        """
+        self.source = source
+        soup = BeautifulSoup(html, 'html.parser')
+        if source is not None:
+            # queries on an element do not match the element itself, and
+            # the XPaths anchored at the document are not answered
+            soup = next((child for child in soup.children
+                         if isinstance(child, Tag)), soup).extract()
+        self.root = SnapshotElement(soup)
+
+    def answers(self, dom):
+        """Whether queries on dom (None for the page) can be answered"""
+        return dom is self.source or isinstance(dom, SnapshotElement)
+
+    def _dom(self, dom):
+        # the page, as None or as the driver, or the source element
+        if isinstance(dom, SnapshotElement):
+            return dom
+        return self.root
+
+    def css(self, css_path, dom=None):
+        return self._dom(dom).find_elements_by_css_selector(css_path)
+
+    def xpath(self, xpath, dom=None):
+        return self._dom(dom).find_elements_by_xpath(xpath)
+
+    def names(self, name, dom=None):
+        return self._dom(dom).find_elements_by_name(name)
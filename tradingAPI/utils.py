@@ -7,6 +7,8 @@ tradingAPI.utils
 This module provides utility functions.
 """
 import datetime
+import decimal
+import functools
 import os
 import time
 import re
@@ -14,12 +16,13 @@ from collections import namedtuple
 
 import numpy as np
 
-from tradingAPI import exceptions
 from .glob import Glob
+from .retry import RetryPolicy, retry_anything
 
 # logging
 import logging
 logger = logging.getLogger('tradingAPI.utils')
+num_logger = logging.getLogger('tradingAPI.utils.num')
 
 
 # Constants
@@ -37,6 +40,11 @@ TRADING_MODES = TradingModes('CFD', 'INVEST', 'ISA')
 BUY = 'buy'
 SELL = 'sell'
 
+# Patterns of num and format_float
+NUM_NOISE = re.compile(r'[^a-zA-Z0-9.\-]')
+NUM_NUMBER = re.compile(r'[-+]?\d*\.\d+|[-+]?\d+')
+FLOAT_NOISE = re.compile(r'[^0-9.]')
+
 # Directories
 ROOT_DIR = os.path.dirname(os.path.realpath(__file__))
 DATA_DIR = os.path.join(ROOT_DIR, 'data')
@@ -44,34 +52,39 @@ DATA_DIR = os.path.join(ROOT_DIR, 'data')
 INVEST_INSTRUMENTS_CSV = os.path.join(DATA_DIR, 'INVEST_instruments.csv')
 ISA_INSTRUMENTS_CSV = os.path.join(DATA_DIR, 'ISA_instruments.csv')
 CFD_INSTRUMENTS_CSV = os.path.join(DATA_DIR, 'CFD_instruments.csv')
+INSTRUMENTS_CSV = {
+    TRADING_MODES.CFD: CFD_INSTRUMENTS_CSV,
+    TRADING_MODES.INVEST: INVEST_INSTRUMENTS_CSV,
+    TRADING_MODES.ISA: ISA_INSTRUMENTS_CSV,
+}
+# Files written while running, outside the package that may be read-only
+USER_DATA_DIR = os.environ.get('TRADINGAPI_DATA_DIR') or os.path.join(
+    os.environ.get('XDG_DATA_HOME') or
+    os.path.join(os.path.expanduser('~'), '.local', 'share'), 'tradingAPI')
+CATALOG_DELTAS = os.path.join(USER_DATA_DIR, 'catalog_deltas.ndjson')
+QUANT_LIMITS = os.path.join(USER_DATA_DIR, 'quant_limits.yml')
 
 
 def expect(func, args, times=7, sleep_t=0.5):
-    """try many times as in times with sleep time"""
-    while times > 0:
-        try:
-            return func(*args)
-        except Exception as e:
-            times -= 1
-            logger.debug("expect failed - attempts left: %d" % times)
-            time.sleep(sleep_t)
-            if times == 0:
-                raise exceptions.BaseExc(e)
+    """try many times as in times with sleep time
+
+    Kept for compatibility, see retry.RetryPolicy for retries of selenium
+    calls.
+    """
+    policy = RetryPolicy('expect', attempts=times, base_delay=sleep_t,
+                         multiplier=1, jitter=0, retryable=retry_anything)
+    return policy.call(func, *args)
 
 
 def num(string):
-    """convert a string to float"""
+    """convert a string to float, see parsers.parse_numbers for columns"""
     if not isinstance(string, type('')):
         raise ValueError(type(''))
-    try:
-        string = re.sub('[^a-zA-Z0-9\.\-]', '', string)
-        number = re.findall(r"[-+]?\d*\.\d+|[-+]?\d+", string)
-        return float(number[0])
-    except Exception as e:
-        logger = logging.getLogger('tradingAPI.utils.num')
-        logger.debug("number not found in %s" % string)
-        logger.debug(e)
+    number = NUM_NUMBER.search(NUM_NOISE.sub('', string))
+    if number is None:
+        num_logger.debug("number not found in %s", string)
         return None
+    return float(number.group())
 
 
 def get_number_unit(number):
@@ -85,6 +98,12 @@ def get_number_unit(number):
         return float(1)
 
 
+def decimal_places(number):
+    """Number of decimals of a price, from its shortest float repr"""
+    number = decimal.Decimal(repr(float(number))).normalize()
+    return max(0, -number.as_tuple().exponent)
+
+
 def get_pip(mov=None, api=None, name=None):
     """get value of pip"""
     # ~ check args
@@ -133,15 +152,11 @@ def get_pip(mov=None, api=None, name=None):
                 raise TimeoutError("no variation")
         else:
             break
-    # find longer price
-    for price in records:
-        if 'best_price' not in locals():
-            best_price = price
-        if len(str(price)) > len(str(best_price)):
-            logger.debug("found new best_price %f" % price)
-            best_price = price
-    # get pip
-    pip = get_number_unit(best_price)
+    # the pip is the unit of the most precise price, prices are floats
+    # from both the quotes and the DOM so their repr has no padding
+    places = max(decimal_places(price) for price in records)
+    logger.debug("prices have up to %d decimals", places)
+    pip = 10.0 ** -places
     Glob().pipHandler.add_val({mov.product: pip})
     return pip
 
@@ -165,6 +180,17 @@ def send_keys_human(element, string):
         element.send_keys(ch)
 
 
+def fill(element, value):
+    """Replace the value of a WebElement input
+
+    Args:
+        element (WebElement): DOM input element
+        value (mixed): Value to type in
+    """
+    element.clear()
+    element.send_keys(str(value))
+
+
 def click(element):
     """Click an element, waiting before and after
 
@@ -185,11 +211,21 @@ def format_float(text) -> float or None:
     Returns:
         (float): The price as float
     """
-    text = re.sub(r'[^0-9.]', '', text)
+    text = FLOAT_NOISE.sub('', text)
     if not text:
         return None
     return float(text)
 
 
+def synchronized(method):
+    """Run a method of the session, or of one of its windows, holding the
+    lock of the session, as the browser can run one command at a time"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with getattr(self, 'api', self).lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
 def get_timestamp():
     return datetime.datetime.now()
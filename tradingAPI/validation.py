@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""
+tradingAPI.validation
+~~~~~~~~~~~~~~
+
+This module provides the pre-trade validation of orders.
+
+Orders are checked locally, before any UI action, against the quantity
+bounds learned from the broker's widget messages, the fractional flag of
+the instrument, the cached account snapshot and the open positions and
+pending orders.
+"""
+
+import math
+
+from tradingAPI import exceptions
+from .base import Instrument
+from .saver import Saver
+from .utils import num, BUY, SELL, TRADING_MODES, QUANT_LIMITS
+
+# logging
+import logging
+logger = logging.getLogger('tradingAPI.validation')
+
+
+class PreTradeValidator(object):
+    """Reject or clamp orders before they reach the order window"""
+    # learned bounds, shared by the sessions of the process
+    _limits = None
+
+    def __init__(self, api, clamp=True):
+        """
+        Args:
+            api (LowLevelAPI): Session to read account and positions from
+            clamp (bool): Whether check clamps quantities into the limits
+                instead of raising. Default True
+        """
+        self.api = api
+        self.clamp = clamp
+
+    @property
+    def bounds(self):
+        """Learned quantity bounds, {key: {'min': float, 'max': float}}"""
+        return self._saver().config
+
+    @classmethod
+    def _saver(cls):
+        """The saver of the bounds in the user data dir, read once"""
+        if cls._limits is None:
+            cls._limits = Saver(QUANT_LIMITS, 'quant_limits')
+            cls._limits.read()
+        return cls._limits
+
+    def _instrument(self, instrument):
+        if isinstance(instrument, Instrument):
+            return instrument
+        return self.api.find_instrument(instrument)
+
+    def _key(self, instrument):
+        found = self._instrument(instrument)
+        return found.symbol if found is not None else instrument
+
+    def learn(self, instrument, text):
+        """Learn from a widget message decoded by an order window
+
+        Args:
+            instrument (mixed): Instrument or its name
+            text (str): Text of the message
+
+        Returns:
+            (bool): True if something was learned
+        """
+        if 'you have funds to' in text:
+            # the cached free funds are out of date
+            self.api.invalidate_account_snapshot()
+            return True
+        if 'maximum remaining quantity' in text:
+            bound = 'max'
+        elif 'minimum' in text:
+            bound = 'min'
+        else:
+            return False
+        value = num(text)
+        if value is None:
+            return False
+        key = self._key(instrument)
+        limits = dict(self.bounds.get(key, {}))
+        limits[bound] = value
+        self.bounds[key] = limits
+        self._saver().save()
+        logger.debug('learned %s quantity %s for %s', bound, value, key)
+        return True
+
+    def check(self, instrument, quantity, price=None, direction=BUY,
+              by_value=False, clamp=None):
+        """Validate an order, clamping the quantity if allowed
+
+        Args:
+            instrument (mixed): Instrument or its name
+            quantity (float): Number of shares, or order value if by_value
+            price (float): Expected price, needed for the funds check
+            direction (str): BUY or SELL
+            by_value (bool): Whether quantity is the order value
+            clamp (bool): Override the validator's clamp setting
+
+        Returns:
+            (float): The quantity to place, in the same unit as passed
+
+        Raises:
+            (FractionalShares): Fractional shares of an instrument not
+                allowing them, not clamping
+            (MaxQuantLimit): Above the learned maximum, not clamping
+            (MinQuantLimit): Below the learned minimum, not clamping
+            (InsufficientFunds): Not enough funds / shares, not clamping
+        """
+        clamp = self.clamp if clamp is None else clamp
+        found = self._instrument(instrument)
+        key = found.symbol if found is not None else instrument
+        if by_value and not price:
+            # nothing to check shares against without a price
+            return quantity
+        shares = quantity / price if by_value else quantity
+        # Fractional shares
+        if (found is not None and not found.fractional and not by_value and
+                shares != int(shares)):
+            if not clamp:
+                raise exceptions.FractionalShares(key, shares)
+            shares = float(math.floor(shares))
+        # Learned bounds
+        limits = self.bounds.get(key, {})
+        if 'max' in limits and shares > limits['max']:
+            if not clamp:
+                raise exceptions.MaxQuantLimit(limits['max'])
+            shares = limits['max']
+        if 'min' in limits and shares < limits['min']:
+            if not clamp:
+                raise exceptions.MinQuantLimit(limits['min'])
+            shares = limits['min']
+        # Funds and exposure
+        available = self._available_shares(key, direction, price)
+        if available is not None and shares > available:
+            if not clamp or available <= 0:
+                raise exceptions.InsufficientFunds(key, shares, available)
+            shares = available
+            if found is not None and not found.fractional:
+                shares = float(math.floor(shares))
+        if shares != (quantity / price if by_value else quantity):
+            logger.debug('clamped %s order to %s shares', key, shares)
+        return shares * price if by_value else shares
+
+    def _available_shares(self, symbol, direction, price):
+        """Max shares the account allows for the order, None if unknown"""
+        mode = getattr(self.api, 'trading_mode', None)
+        if mode is None:
+            return None
+        if direction == SELL and mode != TRADING_MODES.CFD:
+            # can only sell what is held and not already being sold
+            positions = self.api.positions[mode]
+            if positions.empty:
+                return 0.
+            held = positions.loc[positions['instrument'] == symbol,
+                                 'quantity'].sum()
+            orders = self.api.placed_orders[mode]
+            if not orders.empty:
+                held -= orders.loc[(orders['instrument'] == symbol) &
+                                   (orders['direction'] == SELL),
+                                   'quantity'].sum()
+            return max(float(held), 0.)
+        if direction == BUY and mode != TRADING_MODES.CFD and price:
+            # pending orders are already blocked out of the free funds
+            free_funds = self.api.get_account_snapshot().free_funds
+            if free_funds is None:
+                return None
+            return free_funds / price
+        # CFD margin depends on the leverage of the instrument
+        return None